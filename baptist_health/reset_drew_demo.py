@@ -1,8 +1,15 @@
 import random
+import sys
 from datetime import date, timedelta
+from pathlib import Path
 from google.cloud import firestore
 import uuid
 
+# Timecard writes go through the agent's FirestoreClient, which keeps the pay period
+# index and the per-manager summaries consistent with the timecards
+sys.path.insert(0, str(Path(__file__).parent / "timecard_management_agent" / "timecard_management_agent"))
+from shared_libraries.firestore_client import FirestoreClient  # noqa: E402
+
 # --- Configuration ---
 PROJECT_ID = "agent-space-465923"  
 DATABASE_ID = "timecard-demo-database"
@@ -50,20 +57,14 @@ def reset_drew_current_week_timecards(db):
     
     # Delete existing timecards for current week for Drew
     current_week_query = timecards_ref.where('pay_period_end', '==', '2025-09-05').where('manager_id', '==', drew_info['manager_id'])
-    current_week_docs = current_week_query.stream()
-    
-    batch = db.batch()
-    deleted_count = 0
-    for doc in current_week_docs:
-        batch.delete(doc.reference)
-        deleted_count += 1
+    current_week_ids = [doc.id for doc in current_week_query.select(['manager_id']).stream()]
     
-    batch.commit()
+    timecard_db = FirestoreClient(PROJECT_ID, DATABASE_ID)
+    deleted_count = timecard_db.delete_timecards(current_week_ids)
     print(f"Deleted {deleted_count} existing timecards for current week for Drew.")
     
     # Recreate timecards for current week with original distribution
-    batch = db.batch()
-    created_count = 0
+    new_timecards = {}
     
     for emp_doc in employee_docs:
         is_submitted = random.random() > 0.1  # 90% chance of being submitted
@@ -114,11 +115,9 @@ def reset_drew_current_week_timecards(db):
                 'approved_by': approved_by
             }
         
-        # Add the generated timecard to the batch
-        batch.set(timecards_ref.document(), timecard_data)
-        created_count += 1
+        new_timecards[timecards_ref.document().id] = timecard_data
     
-    batch.commit()
+    created_count = timecard_db.write_timecards(new_timecards)
     print(f"Created {created_count} new timecards for current week for Drew.")
     print("✅ Drew's demo reset complete! Current week is ready for agent interaction.")
 
@@ -1,8 +1,19 @@
 import random
+import sys
 from datetime import date, timedelta, datetime
+from pathlib import Path
 from google.cloud import firestore
 import uuid
 
+# Timecard writes go through the agent's FirestoreClient, which keeps the pay period
+# index and the per-manager summaries consistent with the timecards
+sys.path.insert(0, str(Path(__file__).parent / "timecard_management_agent" / "timecard_management_agent"))
+from shared_libraries.firestore_client import (  # noqa: E402
+    FirestoreClient,
+    PAY_PERIOD_INDEX_COLLECTION,
+    TIMECARD_SUMMARY_COLLECTION,
+)
+
 # --- Configuration ---
 PROJECT_ID = "agent-space-465923"  
 DATABASE_ID = "timecard-demo-database"
@@ -114,7 +125,7 @@ def seed_timecards(db, manager_id, manager_name):
         "2025-09-05"
     ]
 
-    batch = db.batch()
+    new_timecards = {}
     for emp_doc in employee_docs:
         for pay_period in pay_periods:
             is_submitted = random.random() > 0.1  # 90% chance of being submitted
@@ -179,10 +190,9 @@ def seed_timecards(db, manager_id, manager_name):
                     'approved_by': approved_by   # Will be set when approved by agent
                 }
             
-            # Add the generated timecard to the batch
-            batch.set(timecards_ref.document(), timecard_data)
+            new_timecards[timecards_ref.document().id] = timecard_data
 
-    batch.commit()
+    FirestoreClient(PROJECT_ID, DATABASE_ID).write_timecards(new_timecards)
     print(f"Seeded timecards for {len(employee_docs)} employees across {len(pay_periods)} pay periods.")
 
 def seed_schedules(db, manager_id, manager_name):
@@ -242,13 +252,15 @@ def main():
     
     db = get_db_client()
     
-    confirmation = input("This will DELETE all existing data in collections (managers, employees, timecards, schedules). Are you sure? (y/n): ")
+    confirmation = input("This will DELETE all existing data in collections (managers, employees, timecards, schedules, timecard summaries). Are you sure? (y/n): ")
     if confirmation.lower() != 'y':
         print("Operation cancelled.")
         return
 
     # Clear existing data
     clear_collection(db, 'timecards')
+    clear_collection(db, TIMECARD_SUMMARY_COLLECTION)
+    clear_collection(db, PAY_PERIOD_INDEX_COLLECTION)
     clear_collection(db, 'schedules')
     clear_collection(db, 'employees')
     clear_collection(db, 'managers')
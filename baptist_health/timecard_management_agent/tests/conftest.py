@@ -0,0 +1,149 @@
+"""Fixtures for the timecard agent unit tests: an in-memory stand-in for firestore.Client."""
+
+import os
+from types import SimpleNamespace
+
+import pytest
+
+# Importing the package loads the agent; keep it from dialing Firestore
+os.environ.setdefault("WARM_FIRESTORE_ON_START", "false")
+
+from timecard_management_agent.shared_libraries import firestore_client  # noqa: E402
+
+
+class FakeSnapshot:
+    def __init__(self, reference, data):
+        self.reference = reference
+        self.id = reference.id
+        self.exists = data is not None
+        self.update_time = f"t-{reference.id}"
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+
+class FakeDocument:
+    def __init__(self, store, collection, doc_id):
+        self.store = store
+        self.collection = collection
+        self.id = doc_id
+
+    def get(self):
+        return FakeSnapshot(self, self.store.get(self.collection, {}).get(self.id))
+
+    def set(self, data, merge=False):
+        self.store.setdefault('_document_sets', []).append((self.collection, self.id, data))
+
+
+class FakeCollection:
+    def __init__(self, store, name, filters=()):
+        self.store = store
+        self.name = name
+        self.filters = filters
+
+    def document(self, doc_id):
+        return FakeDocument(self.store, self.name, doc_id)
+
+    def where(self, field, op, value):
+        assert op == '=='
+        return FakeCollection(self.store, self.name, self.filters + ((field, value),))
+
+    def stream(self):
+        for doc_id, data in self.store.get(self.name, {}).items():
+            if all(data.get(field) == value for field, value in self.filters):
+                yield FakeSnapshot(FakeDocument(self.store, self.name, doc_id), data)
+
+
+class FakeBatch:
+    def __init__(self, commits, fail):
+        self.commits = commits
+        self.fail = fail
+        self.writes = []
+
+    def set(self, ref, data, merge=False):
+        self.writes.append((ref.collection, ref.id, data))
+
+    def commit(self):
+        if self.fail:
+            raise RuntimeError("batch commit failed")
+        self.commits.append(self.writes)
+
+
+class FakeBulkWriter:
+    """Calls the result / error callbacks on flush(); outcomes maps a doc ID to its error codes per attempt."""
+
+    def __init__(self, outcomes):
+        self.outcomes = outcomes
+        self.updates = []
+        self.closed = False
+
+    def on_write_result(self, callback):
+        self.result_callback = callback
+
+    def on_write_error(self, callback):
+        self.error_callback = callback
+
+    def update(self, reference, data, option=None):
+        assert not self.closed
+        self.updates.append((reference, data, option))
+
+    def flush(self):
+        for reference, _, _ in self.updates:
+            for attempt, code in enumerate(self.outcomes.get(reference.id, []), start=1):
+                error = SimpleNamespace(
+                    code=code,
+                    attempts=attempt,
+                    message=f"code {code}",
+                    operation=SimpleNamespace(reference=reference),
+                )
+                if not self.error_callback(error, self):
+                    break
+            else:
+                self.result_callback(reference, None, self)
+
+    def close(self):
+        self.closed = True
+
+
+class FakeFirestore:
+    """Documents kept as {collection: {doc_id: data}}; batch commits and bulk writers are recorded."""
+
+    def __init__(self, store=None):
+        self.store = store or {}
+        self.commits = []
+        self.fail_batches = False
+        self.write_outcomes = {}
+        self.writers = []
+
+    def collection(self, name):
+        return FakeCollection(self.store, name)
+
+    def get_all(self, refs, field_paths=None):
+        return [ref.get() for ref in refs]
+
+    def bulk_writer(self, options=None):
+        writer = FakeBulkWriter(self.write_outcomes)
+        writer.options = options
+        self.writers.append(writer)
+        return writer
+
+    def write_option(self, **kwargs):
+        return kwargs
+
+    def batch(self):
+        return FakeBatch(self.commits, self.fail_batches)
+
+
+@pytest.fixture
+def fake_firestore():
+    return FakeFirestore()
+
+
+@pytest.fixture
+def db(monkeypatch, fake_firestore):
+    """A FirestoreClient backed by fake_firestore, with manager 'Jenica' as m1."""
+    monkeypatch.setattr(firestore_client.firestore, "Client", lambda **kwargs: fake_firestore)
+    client = firestore_client.FirestoreClient("project", "database")
+    client.directory = SimpleNamespace(manager_id=lambda name: {"Jenica": "m1"}.get(name))
+    return client
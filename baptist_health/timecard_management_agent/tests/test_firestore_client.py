@@ -0,0 +1,266 @@
+"""Unit tests for the summary counters, metrics and approval path of FirestoreClient."""
+
+import pytest
+from google.rpc import code_pb2
+
+from timecard_management_agent.shared_libraries.firestore_client import (
+    OperationMetrics,
+    SUMMARIZED_PERIODS_FIELD,
+    SUMMARY_COUNTERS,
+    TIMECARD_SUMMARY_COLLECTION,
+    summary_counts,
+    summary_deltas,
+)
+
+PERIOD = "2025-06-14"
+
+
+def timecard(status="submitted", has_exception=False, manager_id="m1", hours=40.0, overtime=0.0):
+    return {
+        "manager_id": manager_id,
+        "pay_period_end": PERIOD,
+        "status": status,
+        "has_exception": has_exception,
+        "total_hours": hours,
+        "overtime_hours": overtime,
+    }
+
+
+def summary(manager_id, total, submitted=0, approved=0, hours=0.0, pay_period_end=PERIOD, **fields):
+    counts = dict.fromkeys(SUMMARY_COUNTERS, 0)
+    counts.update(total_timecards=total, submitted=submitted, approved=approved, total_hours=hours)
+    return dict(counts, manager_id=manager_id, pay_period_end=pay_period_end, **fields)
+
+
+@pytest.mark.unit
+class TestSummaryCounters:
+    def test_standard_submitted_timecard(self):
+        counts = summary_counts(timecard(hours=42.5, overtime=2.5))
+        assert counts == {
+            "total_timecards": 1,
+            "submitted": 1,
+            "approved": 0,
+            "not_submitted": 0,
+            "with_exceptions": 0,
+            "standard_timecards": 1,
+            "total_hours": 42.5,
+            "overtime_hours": 2.5,
+        }
+
+    def test_exception_is_not_standard(self):
+        counts = summary_counts(timecard(has_exception=True))
+        assert counts["with_exceptions"] == 1
+        assert counts["standard_timecards"] == 0
+
+    def test_missing_hours_count_as_zero(self):
+        counts = summary_counts({"status": "not submitted", "total_hours": None})
+        assert counts["not_submitted"] == 1
+        assert counts["total_hours"] == 0
+        assert counts["overtime_hours"] == 0
+
+    def test_approval_moves_submitted_to_approved(self):
+        old = timecard()
+        deltas = summary_deltas([(old, dict(old, status="approved"))])
+        delta = deltas[("m1", PERIOD)]
+        assert delta["submitted"] == -1
+        assert delta["approved"] == 1
+        assert delta["standard_timecards"] == -1
+        assert delta["total_timecards"] == 0
+        assert delta["total_hours"] == 0
+
+    def test_create_and_delete_per_manager(self):
+        deltas = summary_deltas([
+            (None, timecard(manager_id="m1", hours=40)),
+            (None, timecard(manager_id="m1", hours=8)),
+            (timecard(manager_id="m2", hours=30), None),
+        ])
+        assert deltas[("m1", PERIOD)]["total_timecards"] == 2
+        assert deltas[("m1", PERIOD)]["total_hours"] == 48
+        assert deltas[("m2", PERIOD)]["total_timecards"] == -1
+        assert deltas[("m2", PERIOD)]["total_hours"] == -30
+
+    def test_moving_manager_updates_both_summaries(self):
+        old = timecard(manager_id="m1")
+        deltas = summary_deltas([(old, dict(old, manager_id="m2"))])
+        assert deltas[("m1", PERIOD)]["total_timecards"] == -1
+        assert deltas[("m2", PERIOD)]["total_timecards"] == 1
+
+    def test_timecards_without_keys_are_skipped(self):
+        assert summary_deltas([(None, {"status": "submitted"}), (None, None)]) == {}
+
+
+@pytest.mark.unit
+class TestOperationMetrics:
+    def test_track_records_calls_and_reads(self):
+        metrics = OperationMetrics()
+        for reads in (3, 5):
+            with metrics.track("get_timecards") as call:
+                call["reads"] = reads
+
+        stats = metrics.snapshot()
+        assert stats["operations"]["get_timecards"]["calls"] == 2
+        assert stats["operations"]["get_timecards"]["documents_read"] == 8
+        assert stats["operations"]["get_timecards"]["errors"] == 0
+        assert stats["total_calls"] == 2
+        assert stats["total_documents_read"] == 8
+
+    def test_track_counts_errors_and_reraises(self):
+        metrics = OperationMetrics()
+        with pytest.raises(ValueError):
+            with metrics.track("approve") as call:
+                call["reads"] = 1
+                raise ValueError("boom")
+
+        stats = metrics.snapshot()["operations"]["approve"]
+        assert stats["calls"] == 1
+        assert stats["errors"] == 1
+        assert stats["documents_read"] == 1
+
+    def test_percentiles_and_reset(self):
+        metrics = OperationMetrics()
+        for seconds in (0.001, 0.002, 0.003, 0.004):
+            metrics.record("query", seconds)
+
+        stats = metrics.snapshot()["operations"]["query"]
+        assert stats["p50_ms"] == 3.0
+        assert stats["max_ms"] == 4.0
+        assert stats["mean_ms"] == 2.5
+
+        metrics.reset()
+        assert metrics.snapshot()["total_calls"] == 0
+
+
+@pytest.mark.unit
+class TestApproveTimecards:
+    def test_result_per_timecard(self, db, fake_firestore):
+        fake_firestore.store["timecards"] = {
+            "tc-ok": timecard(),
+            "tc-retried": timecard(),
+            "tc-conflict": timecard(),
+            "tc-failed": timecard(),
+            "tc-approved": timecard(status="approved"),
+        }
+        fake_firestore.write_outcomes = {
+            "tc-retried": [code_pb2.UNAVAILABLE, code_pb2.ABORTED],
+            "tc-conflict": [code_pb2.FAILED_PRECONDITION],
+            "tc-failed": [code_pb2.PERMISSION_DENIED],
+        }
+
+        results = db.approve_timecards(
+            ["tc-ok", "tc-retried", "tc-conflict", "tc-failed", "tc-approved", "tc-missing", "tc-ok"],
+            approved_by="Jenica",
+        )
+
+        assert results == {
+            "tc-ok": "approved",
+            "tc-retried": "approved",
+            "tc-conflict": "conflict",
+            "tc-failed": "failed",
+            "tc-approved": "not_submitted",
+            "tc-missing": "not_found",
+        }
+        writer = fake_firestore.writers[0]
+        assert writer.closed
+        assert [reference.id for reference, _, _ in writer.updates] == ["tc-ok", "tc-retried", "tc-conflict", "tc-failed"]
+        assert writer.updates[0][2] == {"last_update_time": "t-tc-ok"}
+
+    def test_transient_errors_fail_after_max_attempts(self, db, fake_firestore):
+        fake_firestore.store["timecards"] = {"tc-1": timecard()}
+        fake_firestore.write_outcomes = {"tc-1": [code_pb2.UNAVAILABLE] * 10}
+
+        assert db.approve_timecards(["tc-1"], approved_by="Jenica") == {"tc-1": "failed"}
+        assert fake_firestore.commits == []
+
+    def test_summary_increment_counts_only_approved(self, db, fake_firestore):
+        fake_firestore.store["timecards"] = {"tc-ok": timecard(), "tc-conflict": timecard()}
+        fake_firestore.write_outcomes = {"tc-conflict": [code_pb2.FAILED_PRECONDITION]}
+
+        db.approve_timecards(["tc-ok", "tc-conflict"], approved_by="Jenica")
+
+        [[(collection, doc_id, data)]] = fake_firestore.commits
+        assert collection == TIMECARD_SUMMARY_COLLECTION
+        assert doc_id == f"m1_{PERIOD}"
+        assert data["submitted"].value == -1
+        assert data["approved"].value == 1
+
+    def test_failed_summary_increment_marks_summary_for_rebuild(self, db, fake_firestore):
+        fake_firestore.store["timecards"] = {"tc-1": timecard()}
+        db._summarized_periods.add(PERIOD)
+        fake_firestore.fail_batches = True
+
+        assert db.approve_timecards(["tc-1"], approved_by="Jenica") == {"tc-1": "approved"}
+        assert PERIOD not in db._summarized_periods
+        [(_, _, index_update)] = fake_firestore.store["_document_sets"]
+        assert index_update[SUMMARIZED_PERIODS_FIELD].values == [PERIOD]
+
+
+@pytest.mark.unit
+class TestPartialSummaries:
+    def test_period_without_complete_summaries_is_rebuilt(self, db, fake_firestore, monkeypatch):
+        # Only m1's summary exists, e.g. written by an earlier manager-scoped call
+        fake_firestore.store[TIMECARD_SUMMARY_COLLECTION] = {
+            f"m1_{PERIOD}": summary("m1", 2, submitted=2, hours=80, complete=True),
+        }
+        rebuilt = {
+            "m1": summary("m1", 2, submitted=2, hours=80),
+            "m2": summary("m2", 3, approved=3, hours=120),
+        }
+        monkeypatch.setattr(db, "rebuild_period_summaries", lambda pay_period_end: rebuilt)
+
+        totals = db.get_period_summary(PERIOD)
+
+        assert totals["total_timecards"] == 5
+        assert totals["approved"] == 3
+        assert totals["total_hours"] == 200
+
+    def test_summarized_period_reads_summary_documents(self, db, fake_firestore, monkeypatch):
+        fake_firestore.store["metadata"] = {"pay_periods": {SUMMARIZED_PERIODS_FIELD: [PERIOD]}}
+        fake_firestore.store[TIMECARD_SUMMARY_COLLECTION] = {
+            f"m1_{PERIOD}": summary("m1", 2, submitted=2),
+            f"m2_{PERIOD}": summary("m2", 3, approved=3),
+        }
+        monkeypatch.setattr(db, "rebuild_period_summaries", pytest.fail)
+
+        assert db.get_period_summary(PERIOD)["total_timecards"] == 5
+
+    def test_incomplete_manager_summary_is_recounted(self, db, fake_firestore, monkeypatch):
+        # Created by increments alone: no complete flag and no total_timecards
+        fake_firestore.store[TIMECARD_SUMMARY_COLLECTION] = {
+            f"m1_{PERIOD}": {"manager_id": "m1", "pay_period_end": PERIOD, "submitted": -1, "approved": 1},
+        }
+        recounted = []
+
+        def rebuild_manager_summary(manager_id, pay_period_end):
+            recounted.append(manager_id)
+            return summary(manager_id, 4, submitted=3, approved=1, complete=True)
+
+        monkeypatch.setattr(db, "rebuild_manager_summary", rebuild_manager_summary)
+
+        totals = db.get_period_summary(PERIOD, "Jenica")
+
+        assert recounted == ["m1"]
+        assert totals["total_timecards"] == 4
+
+    def test_manager_without_timecards_returns_none(self, db, fake_firestore, monkeypatch):
+        monkeypatch.setattr(db, "rebuild_manager_summary", lambda manager_id, pay_period_end: None)
+
+        assert db.get_period_summary(PERIOD, "Jenica") is None
+
+    def test_trend_counts_periods_without_complete_summaries(self, db, fake_firestore, monkeypatch):
+        fake_firestore.store["metadata"] = {"pay_periods": {SUMMARIZED_PERIODS_FIELD: [PERIOD]}}
+        fake_firestore.store[TIMECARD_SUMMARY_COLLECTION] = {
+            f"m1_{PERIOD}": summary("m1", 2, submitted=2),
+            "m1_2025-06-28": summary("m1", 1, submitted=1, pay_period_end="2025-06-28"),
+        }
+        counted = []
+
+        def count_period(pay_period_end, manager_id=None):
+            counted.append(pay_period_end)
+            return summary("m1", 7, pay_period_end=pay_period_end)
+
+        monkeypatch.setattr(db, "count_period", count_period)
+
+        trend = db.get_period_trend([PERIOD, "2025-06-28"])
+
+        assert counted == ["2025-06-28"]
+        assert [period["total_timecards"] for period in trend] == [2, 7]
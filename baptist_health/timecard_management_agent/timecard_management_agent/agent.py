@@ -12,8 +12,10 @@ from .tools import (
     approve_standard_timecards,
     get_employee_schedule,
     get_historical_comparison,
+    get_pay_period_trend,
     draft_reminder_message,
 )
+from .tools.tools import get_db_manager
 
 warnings.filterwarnings("ignore", category=UserWarning, module=".*pydantic.*")
 
@@ -22,6 +24,10 @@ configs = Config()
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Create the shared Firestore client and open its channel before the first tool call
+if configs.agent_settings.warm_firestore_on_start:
+    get_db_manager().start_warm_up()
+
 
 root_agent = Agent(
     model=configs.agent_model,
@@ -35,6 +41,7 @@ root_agent = Agent(
         approve_standard_timecards,
         get_employee_schedule,
         get_historical_comparison,
+        get_pay_period_trend,
         draft_reminder_message,
     ],
 )
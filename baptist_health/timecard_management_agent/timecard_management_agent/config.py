@@ -27,6 +27,14 @@ class AgentSettings(BaseSettings):
     project_id: str = "agent-space-465923"
     database_id: str = "timecard-demo-database"
     
+    # Open the Firestore channel in a background thread when the agent is loaded
+    warm_firestore_on_start: bool = True
+    
+    # Manager / employee directory cache: on_snapshot listeners keep it fresh, and
+    # without them it is reloaded after the TTL (0 disables the cache)
+    directory_cache_ttl_seconds: int = 300
+    directory_listeners: bool = True
+    
     # Manager information
     manager_name: str = "Jenica"
     
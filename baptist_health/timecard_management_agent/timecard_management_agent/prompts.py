@@ -35,6 +35,7 @@ Common Scenarios:
 3. For exceptions: "What exceptions do I have?" → Use get_exceptions("2025-09-05") (no manager_name needed)
 4. For approvals: "Approve my standard timecards" → Use approve_standard_timecards("2025-09-05") (no manager_name needed)
 5. For comparisons: "Compare this week to last week" → Use get_historical_comparison("2025-09-05", "2025-08-29") (no manager_name needed)
+6. For trends: "How have my exceptions trended over the last 6 pay periods?" → Use get_pay_period_trend(6) (no manager_name needed)
 
 Seamless Experience:
 - Once the manager context is established, all subsequent operations are seamless
@@ -0,0 +1,184 @@
+"""In-memory directory of managers and employees for the timecard management agent.
+
+Nearly every tool resolves a manager name and builds an employee_id -> name map,
+and the rosters rarely change. DirectoryCache loads the `managers` and
+`employees` collections once and keeps them fresh with Firestore on_snapshot
+listeners, so name resolution and roster lookups are memory reads.
+
+When the listeners cannot start (or stop), the directory is reloaded with
+plain queries once it is older than the TTL.
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_SECONDS = 300
+
+# How long load() waits for the listeners' first snapshots before querying instead
+LISTENER_START_TIMEOUT_SECONDS = 10
+
+
+class DirectoryCache:
+    """Managers and employees in memory, kept fresh by snapshot listeners with a TTL fallback."""
+
+    def __init__(self, client, metrics=None, ttl_seconds: int = DEFAULT_TTL_SECONDS, listen: bool = True):
+        """
+        Args:
+            client: firestore.Client
+            metrics: Optional OperationMetrics that loads and snapshot updates are recorded in
+            ttl_seconds: Age after which a directory without live listeners is reloaded
+            listen: Keep the directory fresh with on_snapshot listeners
+        """
+        self.client = client
+        self.metrics = metrics
+        self.ttl_seconds = ttl_seconds
+        self.listen = listen
+        self._lock = threading.Lock()
+        self._managers: Dict[str, Dict[str, Any]] = {}
+        self._employees: Dict[str, Dict[str, Any]] = {}
+        self._manager_ids: Dict[str, str] = {}
+        self._rosters: Dict[str, List[Dict[str, Any]]] = {}
+        self._watches: List[Any] = []
+        self._first_snapshots: Dict[str, threading.Event] = {}
+        self.loaded_at: Optional[float] = None
+        self.reloads = 0
+        self.snapshot_updates = 0
+
+    # Loading
+
+    def load(self) -> None:
+        """Load the directory: from the listeners' first snapshots, or by querying both collections."""
+        with self._lock:
+            if self.loaded_at is not None and self._fresh():
+                return
+            self.close_listeners()
+            if self.listen and self._start_listeners():
+                return
+            self._query_all()
+
+    def _fresh(self) -> bool:
+        if self.listening:
+            return True
+        return time.time() - self.loaded_at < self.ttl_seconds
+
+    def _start_listeners(self) -> bool:
+        """Subscribe to both collections; True once both delivered their first snapshot."""
+        try:
+            for collection, handler in (("managers", self._set_managers), ("employees", self._set_employees)):
+                self._first_snapshots[collection] = threading.Event()
+                self._watches.append(self.client.collection(collection).on_snapshot(self._on_snapshot(collection, handler)))
+
+            deadline = time.monotonic() + LISTENER_START_TIMEOUT_SECONDS
+            for event in self._first_snapshots.values():
+                if not event.wait(max(deadline - time.monotonic(), 0)):
+                    raise TimeoutError(f"no snapshot within {LISTENER_START_TIMEOUT_SECONDS}s")
+            logger.info(f"Directory listening: {len(self._managers)} managers, {len(self._employees)} employees")
+            return True
+
+        except Exception as e:
+            logger.warning(f"Directory listeners unavailable, falling back to a {self.ttl_seconds}s TTL: {e}")
+            self.close_listeners()
+            return False
+
+    def _on_snapshot(self, collection: str, handler: Callable[[Dict[str, Dict[str, Any]]], None]):
+        """on_snapshot callback that replaces one collection with the snapshot's documents."""
+        def callback(docs, changes, read_time):
+            documents = {}
+            for doc in docs:
+                data = doc.to_dict()
+                data['doc_id'] = doc.id
+                documents[doc.id] = data
+            # Listeners are billed a read per changed document (every document on the first snapshot)
+            if self.metrics is not None:
+                self.metrics.record(f"directory_snapshot_{collection}", 0.0, reads=len(changes))
+            handler(documents)
+            self.loaded_at = time.time()
+            self.snapshot_updates += 1
+            self._first_snapshots[collection].set()
+        return callback
+
+    def _query_all(self) -> None:
+        """Reload both collections with plain queries."""
+        start = time.perf_counter()
+        managers, employees = {}, {}
+        for collection, documents in (("managers", managers), ("employees", employees)):
+            for doc in self.client.collection(collection).stream():
+                data = doc.to_dict()
+                data['doc_id'] = doc.id
+                documents[doc.id] = data
+        self._set_managers(managers)
+        self._set_employees(employees)
+        self.loaded_at = time.time()
+        self.reloads += 1
+        if self.metrics is not None:
+            self.metrics.record("directory_load", time.perf_counter() - start, reads=len(managers) + len(employees))
+        logger.info(f"Directory loaded: {len(managers)} managers, {len(employees)} employees")
+
+    def _set_managers(self, managers: Dict[str, Dict[str, Any]]) -> None:
+        # First document per name wins, in document ID order (like the limit(1) name query)
+        manager_ids = {}
+        for doc_id in sorted(managers):
+            manager_ids.setdefault(managers[doc_id].get('name'), doc_id)
+        self._managers, self._manager_ids = managers, manager_ids
+
+    def _set_employees(self, employees: Dict[str, Dict[str, Any]]) -> None:
+        rosters: Dict[str, List[Dict[str, Any]]] = {}
+        for doc_id in sorted(employees):
+            rosters.setdefault(employees[doc_id].get('manager_id'), []).append(employees[doc_id])
+        self._employees, self._rosters = employees, rosters
+
+    def _ensure_loaded(self) -> None:
+        if self.loaded_at is None or not self._fresh():
+            self.load()
+
+    # Lookups (memory reads)
+
+    def manager_id(self, manager_name: str) -> Optional[str]:
+        """Document ID of the manager with this exact name, or None."""
+        self._ensure_loaded()
+        return self._manager_ids.get(manager_name)
+
+    def manager(self, manager_id: str) -> Optional[Dict[str, Any]]:
+        """A copy of the manager's document, or None."""
+        self._ensure_loaded()
+        manager = self._managers.get(manager_id)
+        return dict(manager) if manager is not None else None
+
+    def manager_names(self) -> List[str]:
+        self._ensure_loaded()
+        return sorted(name for name in self._manager_ids if name)
+
+    def employees(self, manager_id: str) -> List[Dict[str, Any]]:
+        """Copies of the manager's employee documents, in document ID order."""
+        self._ensure_loaded()
+        return [dict(employee) for employee in self._rosters.get(manager_id, [])]
+
+    # Lifecycle
+
+    @property
+    def listening(self) -> bool:
+        """Whether live listeners keep the directory fresh."""
+        return bool(self._watches) and all(getattr(watch, "is_active", True) for watch in self._watches)
+
+    def close_listeners(self) -> None:
+        for watch in self._watches:
+            try:
+                watch.unsubscribe()
+            except Exception as e:
+                logger.debug(f"Error closing directory listener: {e}")
+        self._watches = []
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "managers": len(self._managers),
+            "employees": len(self._employees),
+            "listening": self.listening,
+            "age_seconds": round(time.time() - self.loaded_at, 1) if self.loaded_at else None,
+            "ttl_seconds": self.ttl_seconds,
+            "query_reloads": self.reloads,
+            "snapshot_updates": self.snapshot_updates,
+        }
@@ -1,44 +1,278 @@
-"""Shared Firestore client utilities for the timecard management agent."""
+"""Shared Firestore client utilities for the timecard management agent.
+
+One FirestoreClient per process: firestore.Client owns gRPC channels and
+refreshes credentials, so building one per tool call pays connection setup
+every time. FirestoreClientManager creates it once (thread-safe, the client
+is shared by concurrent sessions), warms the channel at startup and keeps
+per-operation latency and document-read counters. Manager and employee
+lookups are answered from its DirectoryCache when one is attached.
+"""
 
 import logging
-from typing import Dict, List, Any, Optional
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Any, Optional, Set, Tuple
 from google.cloud import firestore
+from google.cloud.firestore_v1.bulk_writer import BulkRetry, BulkWriterOptions, SendMode
+from google.rpc import code_pb2
 from datetime import datetime
 
+from .directory_cache import DirectoryCache
+
 logger = logging.getLogger(__name__)
 
+# Latest latencies kept per operation for the percentiles
+LATENCY_WINDOW = 1000
+
+# Index document listing every pay_period_end that has timecards (one read for get_pay_periods)
+PAY_PERIOD_INDEX_COLLECTION = "metadata"
+PAY_PERIOD_INDEX_DOCUMENT = "pay_periods"
+
+# Firestore's limit on writes per batch
+MAX_BATCH_WRITES = 500
+
+# Per manager x pay period counters, one document each, kept consistent with the timecards.
+# A period's summaries are trusted once rebuild_period_summaries has counted every manager
+# (the period is then listed under SUMMARIZED_PERIODS_FIELD of the pay period index);
+# a single manager's document is trusted once it is marked complete by a recount.
+TIMECARD_SUMMARY_COLLECTION = "timecard_summaries"
+SUMMARIZED_PERIODS_FIELD = "summarized_periods"
+SUMMARY_COUNTERS = [
+    "total_timecards",
+    "submitted",
+    "approved",
+    "not_submitted",
+    "with_exceptions",
+    "standard_timecards",
+    "total_hours",
+    "overtime_hours",
+]
+
+# Timecard fields the summary counters are computed from
+SUMMARY_FIELDS = ['manager_id', 'pay_period_end', 'status', 'has_exception', 'total_hours', 'overtime_hours']
+
+# Timecards per transaction, leaving room under MAX_BATCH_WRITES for the summaries and index
+TIMECARD_WRITE_CHUNK = 400
+
+# Timecards read per get_all call by approve_timecards
+APPROVAL_READ_CHUNK = 1000
+
+# BulkWriter attempts per approval before a transient error is reported as 'failed'
+APPROVAL_MAX_ATTEMPTS = 5
+RETRYABLE_WRITE_CODES = {
+    code_pb2.ABORTED,
+    code_pb2.UNAVAILABLE,
+    code_pb2.DEADLINE_EXCEEDED,
+    code_pb2.RESOURCE_EXHAUSTED,
+    code_pb2.INTERNAL,
+}
+
+# BulkWriter write rate for approvals: starts at Firestore's 500 ops/s guideline and
+# ramps (+50% every 5 minutes) up to the max; BulkWriter's own max is also 500
+APPROVAL_INITIAL_OPS_PER_SECOND = 500
+APPROVAL_MAX_OPS_PER_SECOND = 5000
+
+# Pay periods read at once by get_period_trend
+TREND_QUERY_WORKERS = 8
+
+# Aggregation queries behind count_period: (counter, extra filters) for every count
+PERIOD_COUNT_FILTERS = [
+    ("submitted", [('status', 'submitted')]),
+    ("approved", [('status', 'approved')]),
+    ("not_submitted", [('status', 'not submitted')]),
+    ("with_exceptions", [('has_exception', True)]),
+    ("standard_timecards", [('status', 'submitted'), ('has_exception', False)]),
+]
+
+
+def summary_doc_id(manager_id: str, pay_period_end: str) -> str:
+    return f"{manager_id}_{pay_period_end}"
+
+
+def summary_counts(timecard: Dict[str, Any]) -> Dict[str, float]:
+    """One timecard's contribution to its summary document."""
+    status = timecard.get('status')
+    has_exception = bool(timecard.get('has_exception', False))
+    return {
+        "total_timecards": 1,
+        "submitted": int(status == 'submitted'),
+        "approved": int(status == 'approved'),
+        "not_submitted": int(status == 'not submitted'),
+        "with_exceptions": int(has_exception),
+        # Standard = submitted with no exceptions (what approve_standard_timecards approves)
+        "standard_timecards": int(status == 'submitted' and not has_exception),
+        "total_hours": timecard.get('total_hours', 0) or 0,
+        "overtime_hours": timecard.get('overtime_hours', 0) or 0,
+    }
+
+
+def summary_deltas(
+    changes: Iterable[Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]]
+) -> Dict[Tuple[str, str], Dict[str, float]]:
+    """Counter changes per (manager_id, pay_period_end) for (old, new) timecard pairs (None = absent)."""
+    deltas: Dict[Tuple[str, str], Dict[str, float]] = {}
+    for old, new in changes:
+        for timecard, sign in ((old, -1), (new, 1)):
+            if not timecard or not timecard.get('manager_id') or not timecard.get('pay_period_end'):
+                continue
+            delta = deltas.setdefault((timecard['manager_id'], timecard['pay_period_end']), dict.fromkeys(SUMMARY_COUNTERS, 0))
+            for counter, value in summary_counts(timecard).items():
+                delta[counter] += sign * value
+    return deltas
+
+
+def _total_summaries(summaries: List[Dict[str, Any]], pay_period_end: str) -> Dict[str, Any]:
+    """Add up summary documents (one per manager) into the counters of a pay period."""
+    totals = {counter: sum(summary.get(counter, 0) or 0 for summary in summaries) for counter in SUMMARY_COUNTERS}
+    totals['total_hours'] = round(totals['total_hours'], 2)
+    totals['overtime_hours'] = round(totals['overtime_hours'], 2)
+    totals['pay_period_end'] = pay_period_end
+    return totals
+
+
+def _aggregation_values(results) -> Dict[str, Any]:
+    """alias -> value of an aggregation query's results."""
+    return {result.alias: result.value for row in results for result in row}
+
+
+class OperationMetrics:
+    """Thread-safe call, latency and document-read counters per Firestore operation."""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._operations: Dict[str, Dict[str, Any]] = {}
+    
+    @contextmanager
+    def track(self, operation: str):
+        """
+        Time one operation; the block sets call['reads'] to the documents it read.
+        
+        Example:
+            with self.metrics.track('get_manager_info') as call:
+                doc = ref.get()
+                call['reads'] = 1
+        """
+        call = {"reads": 0}
+        start = time.perf_counter()
+        failed = False
+        try:
+            yield call
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self.record(operation, time.perf_counter() - start, call["reads"], failed)
+    
+    def record(self, operation: str, seconds: float, reads: int = 0, failed: bool = False) -> None:
+        """Add one call of an operation."""
+        with self._lock:
+            stats = self._operations.setdefault(operation, {
+                "calls": 0,
+                "errors": 0,
+                "documents_read": 0,
+                "total_seconds": 0.0,
+                "max_seconds": 0.0,
+                "latencies": deque(maxlen=LATENCY_WINDOW),
+            })
+            stats["calls"] += 1
+            stats["errors"] += int(failed)
+            stats["documents_read"] += reads
+            stats["total_seconds"] += seconds
+            stats["max_seconds"] = max(stats["max_seconds"], seconds)
+            stats["latencies"].append(seconds)
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Counters and latency (ms) per operation, plus totals."""
+        with self._lock:
+            operations = {name: dict(stats, latencies=list(stats["latencies"])) for name, stats in self._operations.items()}
+        
+        def percentile(latencies: List[float], p: float) -> float:
+            ordered = sorted(latencies)
+            return ordered[min(int(len(ordered) * p / 100), len(ordered) - 1)]
+        
+        report = {}
+        for name, stats in sorted(operations.items()):
+            latencies = stats["latencies"]
+            report[name] = {
+                "calls": stats["calls"],
+                "errors": stats["errors"],
+                "documents_read": stats["documents_read"],
+                "mean_ms": round(stats["total_seconds"] / stats["calls"] * 1000, 2),
+                "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+                "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+                "max_ms": round(stats["max_seconds"] * 1000, 2),
+            }
+        return {
+            "operations": report,
+            "total_calls": sum(stats["calls"] for stats in report.values()),
+            "total_documents_read": sum(stats["documents_read"] for stats in report.values()),
+        }
+    
+    def reset(self) -> None:
+        with self._lock:
+            self._operations.clear()
+
 
 class FirestoreClient:
     """Firestore client wrapper for timecard operations."""
     
-    def __init__(self, project_id: str, database_id: str):
+    def __init__(self, project_id: str, database_id: str, metrics: Optional[OperationMetrics] = None):
         """Initialize Firestore client."""
         self.project_id = project_id
         self.database_id = database_id
         self.client = firestore.Client(project=project_id, database=database_id)
+        self.metrics = metrics or OperationMetrics()
+        # Set by FirestoreClientManager; manager and roster lookups then read memory
+        self.directory: Optional[DirectoryCache] = None
+        # Periods known to have complete summaries (see is_period_summarized)
+        self._summarized_periods: Set[str] = set()
+        self._summarized_lock = threading.Lock()
+        
+    def get_timecards_by_pay_period(
+        self,
+        pay_period_end: str,
+        manager_name: Optional[str] = None,
+        status: Optional[str] = None,
+        has_exception: Optional[bool] = None,
+        fields: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Get all timecards for a specific pay period, optionally filtered by manager, status and exception flag.
         
-    def get_timecards_by_pay_period(self, pay_period_end: str, manager_name: Optional[str] = None) -> List[Dict[str, Any]]:
-        """Get all timecards for a specific pay period, optionally filtered by manager."""
+        With fields, only those fields are transferred (plus doc_id, which is always set).
+        """
         try:
-            timecards_ref = self.client.collection('timecards')
-            query = timecards_ref.where('pay_period_end', '==', pay_period_end)
-            
             # If manager_name is provided, filter by manager
+            manager_id = None
             if manager_name:
                 # First get the manager_id for the given manager_name
                 manager_id = self.get_manager_id_by_name(manager_name)
-                if manager_id:
-                    query = query.where('manager_id', '==', manager_id)
-                else:
+                if not manager_id:
                     logger.warning(f"Manager '{manager_name}' not found, returning all timecards")
             
-            docs = query.stream()
-            
-            timecards = []
-            for doc in docs:
-                timecard_data = doc.to_dict()
-                timecard_data['doc_id'] = doc.id
-                timecards.append(timecard_data)
+            with self.metrics.track('get_timecards_by_pay_period') as call:
+                timecards_ref = self.client.collection('timecards')
+                query = timecards_ref.where('pay_period_end', '==', pay_period_end)
+                if manager_id:
+                    query = query.where('manager_id', '==', manager_id)
+                if status is not None:
+                    query = query.where('status', '==', status)
+                if has_exception is not None:
+                    query = query.where('has_exception', '==', has_exception)
+                if fields:
+                    query = query.select(fields)
+                
+                docs = query.stream()
+                
+                timecards = []
+                for doc in docs:
+                    timecard_data = doc.to_dict()
+                    timecard_data['doc_id'] = doc.id
+                    timecards.append(timecard_data)
+                call['reads'] = len(timecards)
             
             logger.info(f"Retrieved {len(timecards)} timecards for pay period {pay_period_end}" + 
                        (f" for manager {manager_name}" if manager_name else ""))
@@ -50,13 +284,19 @@ class FirestoreClient:
     
     def get_manager_id_by_name(self, manager_name: str) -> Optional[str]:
         """Get manager ID by manager name."""
+        if self.directory is not None:
+            try:
+                return self.directory.manager_id(manager_name)
+            except Exception as e:
+                logger.warning(f"Directory unavailable, querying manager {manager_name}: {e}")
         try:
-            managers_ref = self.client.collection('managers')
-            query = managers_ref.where('name', '==', manager_name)
-            docs = query.stream()
+            with self.metrics.track('get_manager_id_by_name') as call:
+                managers_ref = self.client.collection('managers')
+                query = managers_ref.where('name', '==', manager_name).limit(1)
+                docs = list(query.stream())
+                call['reads'] = len(docs)
             
             for doc in docs:
-                manager_data = doc.to_dict()
                 logger.info(f"Found manager ID {doc.id} for manager {manager_name}")
                 return doc.id
             
@@ -69,16 +309,23 @@ class FirestoreClient:
 
     def get_employees_by_manager(self, manager_id: str) -> List[Dict[str, Any]]:
         """Get all employees for a specific manager."""
+        if self.directory is not None:
+            try:
+                return self.directory.employees(manager_id)
+            except Exception as e:
+                logger.warning(f"Directory unavailable, querying employees of {manager_id}: {e}")
         try:
-            employees_ref = self.client.collection('employees')
-            query = employees_ref.where('manager_id', '==', manager_id)
-            docs = query.stream()
-            
-            employees = []
-            for doc in docs:
-                employee_data = doc.to_dict()
-                employee_data['doc_id'] = doc.id
-                employees.append(employee_data)
+            with self.metrics.track('get_employees_by_manager') as call:
+                employees_ref = self.client.collection('employees')
+                query = employees_ref.where('manager_id', '==', manager_id)
+                docs = query.stream()
+                
+                employees = []
+                for doc in docs:
+                    employee_data = doc.to_dict()
+                    employee_data['doc_id'] = doc.id
+                    employees.append(employee_data)
+                call['reads'] = len(employees)
             
             logger.info(f"Retrieved {len(employees)} employees for manager {manager_id}")
             return employees
@@ -102,9 +349,16 @@ class FirestoreClient:
     
     def get_manager_info(self, manager_id: str) -> Optional[Dict[str, Any]]:
         """Get manager information."""
+        if self.directory is not None:
+            try:
+                return self.directory.manager(manager_id)
+            except Exception as e:
+                logger.warning(f"Directory unavailable, reading manager {manager_id}: {e}")
         try:
-            manager_ref = self.client.collection('managers').document(manager_id)
-            manager_doc = manager_ref.get()
+            with self.metrics.track('get_manager_info') as call:
+                manager_ref = self.client.collection('managers').document(manager_id)
+                manager_doc = manager_ref.get()
+                call['reads'] = 1
             
             if manager_doc.exists:
                 manager_data = manager_doc.to_dict()
@@ -119,13 +373,27 @@ class FirestoreClient:
             logger.error(f"Error retrieving manager {manager_id}: {e}")
             raise
     
+    def get_manager_names(self) -> List[str]:
+        """Names of all managers."""
+        if self.directory is not None:
+            try:
+                return self.directory.manager_names()
+            except Exception as e:
+                logger.warning(f"Directory unavailable, querying manager names: {e}")
+        with self.metrics.track('get_manager_names') as call:
+            docs = list(self.client.collection('managers').stream())
+            call['reads'] = len(docs)
+        return sorted({doc.to_dict().get('name') for doc in docs} - {None})
+    
     def get_employee_schedule(self, employee_id: str, year: int, month: int) -> Optional[Dict[str, Any]]:
         """Get employee schedule for a specific month."""
         try:
-            schedules_ref = self.client.collection('schedules')
-            schedule_doc_id = f"{employee_id}_{year}_{month}"
-            schedule_ref = schedules_ref.document(schedule_doc_id)
-            schedule_doc = schedule_ref.get()
+            with self.metrics.track('get_employee_schedule') as call:
+                schedules_ref = self.client.collection('schedules')
+                schedule_doc_id = f"{employee_id}_{year}_{month}"
+                schedule_ref = schedules_ref.document(schedule_doc_id)
+                schedule_doc = schedule_ref.get()
+                call['reads'] = 1
             
             if schedule_doc.exists:
                 schedule_data = schedule_doc.to_dict()
@@ -140,44 +408,635 @@ class FirestoreClient:
             logger.error(f"Error retrieving schedule for employee {employee_id}: {e}")
             raise
     
-    def approve_timecards(self, timecard_ids: List[str], approved_by: str) -> bool:
-        """Approve multiple timecards in a batch operation."""
+    def approve_timecards(self, timecard_ids: List[str], approved_by: str) -> Dict[str, str]:
+        """
+        Approve the timecards that are still submitted; returns a result per timecard ID.
+        
+        Every card is read, then updated through a BulkWriter (chunked, parallel
+        commits, retries with backoff) with its update_time as precondition, so a
+        card changed after it was read is reported instead of overwritten.
+        Results: 'approved', 'not_found', 'not_submitted' (any other status),
+        'conflict' (changed since read) or 'failed'.
+        
+        The approved cards' summary documents are updated afterwards from the
+        states that were read (exact, since the preconditions held), in separate
+        batches: they are not atomic with the approvals. If that update fails, the
+        affected summaries are marked incomplete so the next read rebuilds them.
+        """
         try:
-            batch = self.client.batch()
-            current_time = datetime.now().isoformat()
+            ids = list(dict.fromkeys(timecard_ids))
+            results: Dict[str, str] = {}
+            results_lock = threading.Lock()
+            
+            with self.metrics.track('approve_timecards') as call:
+                timecards_ref = self.client.collection('timecards')
+                snapshots = {}
+                for start in range(0, len(ids), APPROVAL_READ_CHUNK):
+                    refs = [timecards_ref.document(timecard_id) for timecard_id in ids[start:start + APPROVAL_READ_CHUNK]]
+                    for snapshot in self.client.get_all(refs, field_paths=SUMMARY_FIELDS):
+                        snapshots[snapshot.id] = snapshot
+                call['reads'] = len(ids)
+                
+                pending = []
+                for timecard_id in ids:
+                    snapshot = snapshots.get(timecard_id)
+                    if snapshot is None or not snapshot.exists:
+                        results[timecard_id] = 'not_found'
+                    elif snapshot.to_dict().get('status') != 'submitted':
+                        results[timecard_id] = 'not_submitted'
+                    else:
+                        pending.append(snapshot)
+                
+                def on_result(reference, result, bulk_writer):
+                    with results_lock:
+                        results[reference.id] = 'approved'
+                
+                def on_error(error, bulk_writer) -> bool:
+                    if error.code in RETRYABLE_WRITE_CODES and error.attempts < APPROVAL_MAX_ATTEMPTS:
+                        return True
+                    reference = error.operation.reference
+                    logger.warning(f"Timecard {reference.id} not approved: {error.message}")
+                    with results_lock:
+                        results[reference.id] = 'conflict' if error.code == code_pb2.FAILED_PRECONDITION else 'failed'
+                    return False
+                
+                if pending:
+                    update = {
+                        'status': 'approved',
+                        'approved_at': datetime.now().isoformat(),
+                        'approved_by': approved_by
+                    }
+                    writer = self.client.bulk_writer(options=BulkWriterOptions(
+                        initial_ops_per_second=APPROVAL_INITIAL_OPS_PER_SECOND,
+                        max_ops_per_second=APPROVAL_MAX_OPS_PER_SECOND,
+                        mode=SendMode.parallel,
+                        retry=BulkRetry.exponential
+                    ))
+                    writer.on_write_result(on_result)
+                    writer.on_write_error(on_error)
+                    for snapshot in pending:
+                        writer.update(
+                            snapshot.reference, update,
+                            option=self.client.write_option(last_update_time=snapshot.update_time)
+                        )
+                    # flush() first: retries re-enqueue on the writer, which close() would reject
+                    writer.flush()
+                    writer.close()
             
-            for timecard_id in timecard_ids:
-                timecard_ref = self.client.collection('timecards').document(timecard_id)
-                batch.update(timecard_ref, {
-                    'status': 'approved',
-                    'approved_at': current_time,
-                    'approved_by': approved_by
-                })
+            approved = [snapshot for snapshot in pending if results.get(snapshot.id) == 'approved']
+            deltas = summary_deltas(
+                (snapshot.to_dict(), dict(snapshot.to_dict(), status='approved')) for snapshot in approved
+            )
+            try:
+                self._commit_summary_deltas(deltas)
+            except Exception as e:
+                # The approvals stand; their summaries must be recounted instead
+                logger.error(f"Error updating summaries after approvals, marking them for rebuild: {e}")
+                self._invalidate_summaries(deltas.keys())
             
+            logger.info(f"Approved {len(approved)} of {len(ids)} timecards by {approved_by}")
+            return {timecard_id: results.get(timecard_id, 'failed') for timecard_id in ids}
+            
+        except Exception as e:
+            logger.error(f"Error approving timecards: {e}")
+            raise
+    
+    def _commit_summary_deltas(self, deltas: Dict[Tuple[str, str], Dict[str, float]]) -> None:
+        """Apply counter deltas to the summary documents in their own batches."""
+        items = list(deltas.items())
+        for start in range(0, len(items), MAX_BATCH_WRITES):
+            batch = self.client.batch()
+            self._apply_summary_deltas(batch, dict(items[start:start + MAX_BATCH_WRITES]))
             batch.commit()
-            logger.info(f"Approved {len(timecard_ids)} timecards by {approved_by}")
+    
+    def _invalidate_summaries(self, keys: Iterable[Tuple[str, str]]) -> None:
+        """
+        Mark manager x pay period summaries incomplete, so the next read rebuilds them.
+        
+        Other processes may still hold the periods as summarized until they restart.
+        """
+        keys = list(keys)
+        periods = sorted({pay_period_end for _, pay_period_end in keys})
+        with self._summarized_lock:
+            self._summarized_periods.difference_update(periods)
+        try:
+            if periods:
+                self.pay_period_index_ref().set({
+                    SUMMARIZED_PERIODS_FIELD: firestore.ArrayRemove(periods),
+                    'updated_at': datetime.now().isoformat()
+                }, merge=True)
+            for start in range(0, len(keys), MAX_BATCH_WRITES):
+                batch = self.client.batch()
+                for manager_id, pay_period_end in keys[start:start + MAX_BATCH_WRITES]:
+                    ref = self.client.collection(TIMECARD_SUMMARY_COLLECTION).document(summary_doc_id(manager_id, pay_period_end))
+                    batch.set(ref, {'complete': False, 'updated_at': datetime.now().isoformat()}, merge=True)
+                batch.commit()
+        except Exception as e:
+            logger.error(f"Error marking summaries of {periods} for rebuild: {e}")
+    
+    def _apply_summary_deltas(self, writer, deltas: Dict[Tuple[str, str], Dict[str, float]]) -> None:
+        """Add counter deltas to the summary documents in a batch or transaction."""
+        for (manager_id, pay_period_end), delta in deltas.items():
+            changed = {counter: firestore.Increment(value) for counter, value in delta.items() if value}
+            if not changed:
+                continue
+            ref = self.client.collection(TIMECARD_SUMMARY_COLLECTION).document(summary_doc_id(manager_id, pay_period_end))
+            writer.set(ref, dict(changed, **{
+                'manager_id': manager_id,
+                'pay_period_end': pay_period_end,
+                'updated_at': datetime.now().isoformat()
+            }), merge=True)
+    
+    def get_period_summary(self, pay_period_end: str, manager_name: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Summary counters of a pay period: one document read for a manager, one per manager otherwise.
+        
+        Summaries are only used when they are known to be complete. A period that
+        has not been summarized for every manager is rebuilt once
+        (rebuild_period_summaries); a manager whose document is not complete is
+        recounted from their own timecards (rebuild_manager_summary). Returns None
+        when there are no timecards.
+        """
+        try:
+            manager_id = self.get_manager_id_by_name(manager_name) if manager_name else None
+            if manager_name and not manager_id:
+                logger.warning(f"Manager '{manager_name}' not found, summarizing all timecards")
+            
+            if manager_id:
+                summary = self._read_manager_summary(pay_period_end, manager_id)
+                if summary is None:
+                    summary = self.rebuild_manager_summary(manager_id, pay_period_end)
+                summaries = [summary] if summary else []
+            elif self.is_period_summarized(pay_period_end):
+                summaries = self._read_period_summaries(pay_period_end)
+            else:
+                summaries = list(self.rebuild_period_summaries(pay_period_end).values())
+            
+            if not summaries or not any(summary.get('total_timecards') for summary in summaries):
+                return None
+            return _total_summaries(summaries, pay_period_end)
+            
+        except Exception as e:
+            logger.error(f"Error retrieving summary for pay period {pay_period_end}: {e}")
+            raise
+    
+    def _read_manager_summary(
+        self,
+        pay_period_end: str,
+        manager_id: str,
+        summarized: Optional[Set[str]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        The manager's summary document if it can be trusted, else None.
+        
+        An empty dict means the period is summarized and the manager has no timecards
+        in it. summarized, when given, is used instead of checking the index.
+        """
+        with self.metrics.track('get_period_summary') as call:
+            doc = self.client.collection(TIMECARD_SUMMARY_COLLECTION).document(summary_doc_id(manager_id, pay_period_end)).get()
+            call['reads'] = 1
+        summary = doc.to_dict() if doc.exists else None
+        if summary is not None and summary.get('complete'):
+            return summary
+        if summarized is None:
+            summarized = {pay_period_end} if self.is_period_summarized(pay_period_end) else set()
+        if pay_period_end in summarized:
+            return summary or {}
+        return None
+    
+    def _read_period_summaries(self, pay_period_end: str) -> List[Dict[str, Any]]:
+        """Every manager's summary document of the pay period."""
+        with self.metrics.track('get_period_summary') as call:
+            summaries_ref = self.client.collection(TIMECARD_SUMMARY_COLLECTION)
+            summaries = [doc.to_dict() for doc in summaries_ref.where('pay_period_end', '==', pay_period_end).stream()]
+            call['reads'] = max(len(summaries), 1)
+            return summaries
+    
+    def is_period_summarized(self, pay_period_end: str) -> bool:
+        """Whether every manager of the period has a complete summary (index read only while unknown)."""
+        if pay_period_end in self._summarized_periods:
             return True
+        return pay_period_end in self.summarized_periods()
+    
+    def summarized_periods(self) -> Set[str]:
+        """Read the periods listed as fully summarized in the pay period index."""
+        with self.metrics.track('summarized_periods') as call:
+            index_doc = self.pay_period_index_ref().get()
+            call['reads'] = 1
+        periods = set(index_doc.to_dict().get(SUMMARIZED_PERIODS_FIELD, [])) if index_doc.exists else set()
+        with self._summarized_lock:
+            self._summarized_periods |= periods
+            return set(self._summarized_periods)
+    
+    def count_period(self, pay_period_end: str, manager_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Summary counters of a pay period computed server-side with count() / sum() aggregation queries.
+        
+        For periods without summary documents. No timecard is transferred; each
+        aggregation is billed one read per 1,000 matching index entries.
+        """
+        try:
+            with self.metrics.track('count_period') as call:
+                base = self.client.collection('timecards').where('pay_period_end', '==', pay_period_end)
+                if manager_id:
+                    base = base.where('manager_id', '==', manager_id)
+                
+                totals = (
+                    base.count(alias='total_timecards')
+                    .sum('total_hours', alias='total_hours')
+                    .sum('overtime_hours', alias='overtime_hours')
+                )
+                counts = _aggregation_values(totals.get())
+                for counter, filters in PERIOD_COUNT_FILTERS:
+                    query = base
+                    for field, value in filters:
+                        query = query.where(field, '==', value)
+                    counts.update(_aggregation_values(query.count(alias=counter).get()))
+                # At least one read per aggregation query
+                call['reads'] = 1 + len(PERIOD_COUNT_FILTERS)
+            
+            return _total_summaries([counts], pay_period_end)
             
         except Exception as e:
-            logger.error(f"Error approving timecards: {e}")
+            logger.error(f"Error counting timecards for pay period {pay_period_end}: {e}")
+            raise
+    
+    def get_period_trend(self, pay_periods: List[str], manager_name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Summary counters of several pay periods, read concurrently, in the order given.
+        
+        Each period is answered from its summary documents when they are complete
+        (see get_period_summary), or with aggregation queries (count_period)
+        otherwise, so reads grow with the number of periods rather than with the
+        number of timecards. Read-only: incomplete summaries are not rebuilt here.
+        """
+        try:
+            manager_id = self.get_manager_id_by_name(manager_name) if manager_name else None
+            if manager_name and not manager_id:
+                logger.warning(f"Manager '{manager_name}' not found, summarizing all timecards")
+            
+            # One index read, and none when every period is already known to be summarized
+            summarized = set(self._summarized_periods)
+            if not summarized.issuperset(pay_periods):
+                summarized = self.summarized_periods()
+            
+            def period_counts(pay_period_end: str) -> Dict[str, Any]:
+                if manager_id:
+                    summary = self._read_manager_summary(pay_period_end, manager_id, summarized)
+                    if summary is not None:
+                        return _total_summaries([summary], pay_period_end)
+                elif pay_period_end in summarized:
+                    return _total_summaries(self._read_period_summaries(pay_period_end), pay_period_end)
+                return self.count_period(pay_period_end, manager_id)
+            
+            with ThreadPoolExecutor(max_workers=min(TREND_QUERY_WORKERS, max(len(pay_periods), 1))) as executor:
+                trend = list(executor.map(period_counts, pay_periods))
+            
+            logger.info(f"Retrieved counters for {len(trend)} pay periods" +
+                       (f" for manager {manager_name}" if manager_name else ""))
+            return trend
+            
+        except Exception as e:
+            logger.error(f"Error retrieving pay period trend: {e}")
             raise
     
+    def rebuild_period_summaries(self, pay_period_end: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Recount a pay period's summary documents from its timecards (backfill / repair); by manager ID.
+        
+        Covers every manager with timecards or a summary document in the period,
+        each recounted in its own transaction (rebuild_manager_summary).
+        """
+        try:
+            with self.metrics.track('rebuild_period_summaries') as call:
+                timecards_ref = self.client.collection('timecards').where('pay_period_end', '==', pay_period_end)
+                summaries_ref = self.client.collection(TIMECARD_SUMMARY_COLLECTION).where('pay_period_end', '==', pay_period_end)
+                manager_ids = set()
+                for doc in timecards_ref.select(['manager_id']).stream():
+                    call['reads'] += 1
+                    manager_ids.add(doc.to_dict().get('manager_id'))
+                for doc in summaries_ref.select(['manager_id']).stream():
+                    call['reads'] += 1
+                    manager_ids.add(doc.to_dict().get('manager_id'))
+                manager_ids.discard(None)
+            
+            summaries = {}
+            for manager_id in sorted(manager_ids):
+                summary = self.rebuild_manager_summary(manager_id, pay_period_end)
+                if summary:
+                    summaries[manager_id] = summary
+            
+            if summaries:
+                # Every manager with timecards now has a complete summary
+                self.pay_period_index_ref().set({
+                    SUMMARIZED_PERIODS_FIELD: firestore.ArrayUnion([pay_period_end]),
+                    'updated_at': datetime.now().isoformat()
+                }, merge=True)
+                with self._summarized_lock:
+                    self._summarized_periods.add(pay_period_end)
+            
+            logger.info(f"Rebuilt {len(manager_ids)} summaries for pay period {pay_period_end}")
+            return summaries
+            
+        except Exception as e:
+            logger.error(f"Error rebuilding summaries for pay period {pay_period_end}: {e}")
+            raise
+    
+    def rebuild_manager_summary(self, manager_id: str, pay_period_end: str) -> Optional[Dict[str, Any]]:
+        """
+        Recount one manager's summary document for a pay period from their timecards.
+        
+        Runs in a transaction that also reads the summary document, so an increment
+        committed meanwhile makes it retry instead of being overwritten. The document
+        is marked complete. Returns None, and writes nothing (or removes a stale
+        document), when the manager has no timecards in the period.
+        """
+        try:
+            summary_ref = self.client.collection(TIMECARD_SUMMARY_COLLECTION).document(summary_doc_id(manager_id, pay_period_end))
+            query = (
+                self.client.collection('timecards')
+                .where('pay_period_end', '==', pay_period_end)
+                .where('manager_id', '==', manager_id)
+                .select(SUMMARY_FIELDS)
+            )
+            
+            @firestore.transactional
+            def recount(transaction):
+                existing = [snapshot for snapshot in transaction.get_all([summary_ref]) if snapshot.exists]
+                timecards = [doc.to_dict() for doc in transaction.get(query)]
+                if not timecards:
+                    if existing:
+                        transaction.delete(summary_ref)
+                    return None, 0
+                counts = summary_deltas((None, tc) for tc in timecards)[(manager_id, pay_period_end)]
+                summary = dict(counts, manager_id=manager_id, pay_period_end=pay_period_end, complete=True)
+                transaction.set(summary_ref, dict(summary, updated_at=datetime.now().isoformat()))
+                return summary, len(timecards)
+            
+            with self.metrics.track('rebuild_manager_summary') as call:
+                summary, read_count = recount(self.client.transaction())
+                call['reads'] = read_count + 1
+            return summary
+            
+        except Exception as e:
+            logger.error(f"Error rebuilding summary of manager {manager_id} for pay period {pay_period_end}: {e}")
+            raise
+    
+    def pay_period_index_ref(self):
+        return self.client.collection(PAY_PERIOD_INDEX_COLLECTION).document(PAY_PERIOD_INDEX_DOCUMENT)
+    
     def get_pay_periods(self) -> List[str]:
-        """Get all available pay periods."""
+        """Get all available pay periods (one read of the pay period index)."""
         try:
-            timecards_ref = self.client.collection('timecards')
-            docs = timecards_ref.stream()
+            with self.metrics.track('get_pay_periods') as call:
+                index_doc = self.pay_period_index_ref().get()
+                call['reads'] = 1
             
-            pay_periods = set()
-            for doc in docs:
-                timecard_data = doc.to_dict()
-                if 'pay_period_end' in timecard_data:
-                    pay_periods.add(timecard_data['pay_period_end'])
+            if not index_doc.exists:
+                logger.warning("Pay period index missing, rebuilding it from the timecards")
+                return self.rebuild_pay_period_index()
             
-            sorted_periods = sorted(list(pay_periods))
+            sorted_periods = sorted(index_doc.to_dict().get('periods', []))
             logger.info(f"Retrieved {len(sorted_periods)} pay periods")
             return sorted_periods
             
         except Exception as e:
             logger.error(f"Error retrieving pay periods: {e}")
             raise
+    
+    def rebuild_pay_period_index(self) -> List[str]:
+        """Scan every timecard once and rewrite the pay period index (backfill / repair)."""
+        try:
+            with self.metrics.track('rebuild_pay_period_index') as call:
+                docs = self.client.collection('timecards').select(['pay_period_end']).stream()
+                
+                pay_periods = set()
+                for doc in docs:
+                    call['reads'] += 1
+                    timecard_data = doc.to_dict()
+                    if timecard_data.get('pay_period_end'):
+                        pay_periods.add(timecard_data['pay_period_end'])
+                
+                sorted_periods = sorted(pay_periods)
+                # merge keeps SUMMARIZED_PERIODS_FIELD
+                self.pay_period_index_ref().set({
+                    'periods': sorted_periods,
+                    'updated_at': datetime.now().isoformat()
+                }, merge=True)
+            
+            logger.info(f"Rebuilt pay period index with {len(sorted_periods)} pay periods")
+            return sorted_periods
+            
+        except Exception as e:
+            logger.error(f"Error rebuilding pay period index: {e}")
+            raise
+    
+    def write_timecards(self, timecards: Dict[str, Dict[str, Any]]) -> int:
+        """
+        Create or replace timecards (doc ID -> data) and register their pay periods.
+        
+        Each transaction also adds its pay periods to the index and applies the
+        timecards' changes to their summary documents, so neither can drift from the
+        timecards. Writers of timecards should use this to keep get_pay_periods and
+        get_period_summary correct.
+        """
+        try:
+            with self.metrics.track('write_timecards') as call:
+                items = list(timecards.items())
+                
+                @firestore.transactional
+                def write_chunk(transaction, chunk):
+                    refs = [self.client.collection('timecards').document(doc_id) for doc_id, _ in chunk]
+                    previous = {snapshot.id: snapshot.to_dict() for snapshot in transaction.get_all(refs) if snapshot.exists}
+                    periods = set()
+                    for ref, (doc_id, data) in zip(refs, chunk):
+                        transaction.set(ref, data)
+                        if data.get('pay_period_end'):
+                            periods.add(data['pay_period_end'])
+                    self._apply_summary_deltas(
+                        transaction, summary_deltas((previous.get(doc_id), data) for doc_id, data in chunk)
+                    )
+                    if periods:
+                        transaction.set(self.pay_period_index_ref(), {
+                            'periods': firestore.ArrayUnion(sorted(periods)),
+                            'updated_at': datetime.now().isoformat()
+                        }, merge=True)
+                
+                for start in range(0, len(items), TIMECARD_WRITE_CHUNK):
+                    chunk = items[start:start + TIMECARD_WRITE_CHUNK]
+                    write_chunk(self.client.transaction(), chunk)
+                    call['reads'] += len(chunk)
+            
+            logger.info(f"Wrote {len(items)} timecards")
+            return len(items)
+            
+        except Exception as e:
+            logger.error(f"Error writing timecards: {e}")
+            raise
+    
+    def delete_timecards(self, timecard_ids: List[str]) -> int:
+        """
+        Delete timecards, removing their counts from the summary documents in the same transactions.
+        
+        Returns the number of timecards that existed. The pay period index is left
+        as is (a period stays listed once it has had timecards).
+        """
+        try:
+            with self.metrics.track('delete_timecards') as call:
+                deleted = 0
+                
+                @firestore.transactional
+                def delete_chunk(transaction, refs):
+                    changes = []
+                    for snapshot in transaction.get_all(refs):
+                        if snapshot.exists:
+                            transaction.delete(snapshot.reference)
+                            changes.append((snapshot.to_dict(), None))
+                    self._apply_summary_deltas(transaction, summary_deltas(changes))
+                    return len(changes)
+                
+                for start in range(0, len(timecard_ids), TIMECARD_WRITE_CHUNK):
+                    refs = [
+                        self.client.collection('timecards').document(timecard_id)
+                        for timecard_id in timecard_ids[start:start + TIMECARD_WRITE_CHUNK]
+                    ]
+                    deleted += delete_chunk(self.client.transaction(), refs)
+                    call['reads'] += len(refs)
+            
+            logger.info(f"Deleted {deleted} timecards")
+            return deleted
+            
+        except Exception as e:
+            logger.error(f"Error deleting timecards: {e}")
+            raise
+    
+    def add_pay_periods(self, pay_periods: List[str]) -> None:
+        """Register pay periods in the index (for timecards written outside write_timecards)."""
+        try:
+            with self.metrics.track('add_pay_periods'):
+                self.pay_period_index_ref().set({
+                    'periods': firestore.ArrayUnion(sorted(set(pay_periods))),
+                    'updated_at': datetime.now().isoformat()
+                }, merge=True)
+            
+        except Exception as e:
+            logger.error(f"Error adding pay periods {pay_periods}: {e}")
+            raise
+    
+    def warm_up(self) -> None:
+        """Open the gRPC channel and fetch credentials (loading the directory does both)."""
+        if self.directory is not None:
+            self.directory.load()
+            return
+        with self.metrics.track('warm_up') as call:
+            call['reads'] = len(list(self.client.collection('managers').limit(1).stream()))
+    
+    def close(self) -> None:
+        """Stop the directory listeners and close the underlying client's channels."""
+        if self.directory is not None:
+            self.directory.close_listeners()
+        self.client.close()
+
+
+class FirestoreClientManager:
+    """
+    Process-wide owner of one FirestoreClient.
+    
+    The client is created on first use (or by warm_up) under a lock, then shared by
+    every tool call and session; firestore.Client is safe for concurrent use.
+    """
+    
+    def __init__(
+        self,
+        project_id: str,
+        database_id: str,
+        directory_ttl_seconds: Optional[int] = None,
+        directory_listeners: bool = True
+    ):
+        """
+        Args:
+            project_id: Firestore project
+            database_id: Firestore database
+            directory_ttl_seconds: Attach a DirectoryCache with this TTL (None: no directory)
+            directory_listeners: Keep the directory fresh with on_snapshot listeners
+        """
+        self.project_id = project_id
+        self.database_id = database_id
+        self.directory_ttl_seconds = directory_ttl_seconds
+        self.directory_listeners = directory_listeners
+        self.metrics = OperationMetrics()
+        self._client: Optional[FirestoreClient] = None
+        self._lock = threading.Lock()
+        self.created_at: Optional[float] = None
+        self.warmed_up = False
+    
+    def get_client(self) -> FirestoreClient:
+        """The shared client, created on first call."""
+        client = self._client
+        if client is None:
+            with self._lock:
+                if self._client is None:
+                    start = time.perf_counter()
+                    self._client = FirestoreClient(self.project_id, self.database_id, metrics=self.metrics)
+                    if self.directory_ttl_seconds is not None:
+                        self._client.directory = DirectoryCache(
+                            self._client.client, self.metrics, self.directory_ttl_seconds, self.directory_listeners
+                        )
+                    self.metrics.record('create_client', time.perf_counter() - start)
+                    self.created_at = time.time()
+                    logger.info(f"Created Firestore client for {self.project_id}/{self.database_id}")
+                client = self._client
+        return client
+    
+    def warm_up(self) -> None:
+        """Create the client and open its channel now, so the first tool call does not wait."""
+        try:
+            self.get_client().warm_up()
+            self.warmed_up = True
+            logger.info("Firestore channel warmed up")
+        except Exception as e:
+            # Best-effort; the first tool call connects and reports errors itself
+            logger.warning(f"Firestore warm-up failed: {e}")
+    
+    def start_warm_up(self) -> threading.Thread:
+        """Run warm_up() in a daemon thread so startup returns immediately."""
+        thread = threading.Thread(target=self.warm_up, name="firestore-warm-up", daemon=True)
+        thread.start()
+        return thread
+    
+    def stats(self) -> Dict[str, Any]:
+        """Client state plus the per-operation latency and document-read counters."""
+        return {
+            "project_id": self.project_id,
+            "database_id": self.database_id,
+            "client_created": self._client is not None,
+            "warmed_up": self.warmed_up,
+            "directory": self._client.directory.stats() if self._client and self._client.directory else None,
+            **self.metrics.snapshot(),
+        }
+    
+    def close(self) -> None:
+        """Close the client; the next get_client() creates a new one."""
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+                self.warmed_up = False
+
+
+_managers: Dict[Tuple[str, str], FirestoreClientManager] = {}
+_managers_lock = threading.Lock()
+
+
+def get_client_manager(
+    project_id: str,
+    database_id: str,
+    directory_ttl_seconds: Optional[int] = None,
+    directory_listeners: bool = True
+) -> FirestoreClientManager:
+    """The process-wide manager of a project's database (the first call's directory settings apply)."""
+    key = (project_id, database_id)
+    with _managers_lock:
+        if key not in _managers:
+            _managers[key] = FirestoreClientManager(project_id, database_id, directory_ttl_seconds, directory_listeners)
+        return _managers[key]
@@ -7,6 +7,7 @@ from .tools import (
     approve_standard_timecards,
     get_employee_schedule,
     get_historical_comparison,
+    get_pay_period_trend,
     draft_reminder_message,
 )
 
@@ -17,5 +18,6 @@ __all__ = [
     "approve_standard_timecards",
     "get_employee_schedule",
     "get_historical_comparison",
+    "get_pay_period_trend",
     "draft_reminder_message",
 ]
@@ -5,7 +5,7 @@ from typing import Dict, List, Any, Optional
 from datetime import datetime
 from tabulate import tabulate
 
-from ..shared_libraries.firestore_client import FirestoreClient
+from ..shared_libraries.firestore_client import FirestoreClient, FirestoreClientManager, get_client_manager
 from ..config import Config
 
 logger = logging.getLogger(__name__)
@@ -14,15 +14,29 @@ config = Config()
 # Global manager context - this will be set once and used throughout the session
 _current_manager = None
 
+# Timecard fields shown in breakdowns (the rest of each document is not transferred)
+BREAKDOWN_FIELDS = ['employee_id', 'manager_id', 'status', 'has_exception', 'exception_reason', 'total_hours', 'overtime_hours']
 
-def get_db_client() -> FirestoreClient:
-    """Get Firestore client instance."""
-    return FirestoreClient(
+# Most pay periods get_pay_period_trend reports on
+MAX_TREND_PERIODS = 26
+
+
+def get_db_manager() -> FirestoreClientManager:
+    """Get the process-wide Firestore client manager (its stats() has per-operation metrics)."""
+    ttl = config.agent_settings.directory_cache_ttl_seconds
+    return get_client_manager(
         project_id=config.agent_settings.project_id,
-        database_id=config.agent_settings.database_id
+        database_id=config.agent_settings.database_id,
+        directory_ttl_seconds=ttl if ttl > 0 else None,
+        directory_listeners=config.agent_settings.directory_listeners
     )
 
 
+def get_db_client() -> FirestoreClient:
+    """Get the shared Firestore client instance (created once per process)."""
+    return get_db_manager().get_client()
+
+
 def set_manager_context(manager_name: str) -> Dict[str, Any]:
     """
     Set the current manager context for the session.
@@ -43,7 +57,7 @@ def set_manager_context(manager_name: str) -> Dict[str, Any]:
         if not manager_id:
             return {
                 "status": "error",
-                "message": f"Manager '{manager_name}' not found in the system. Available managers are: Rahul, Drew",
+                "message": f"Manager '{manager_name}' not found in the system. Available managers are: {', '.join(db.get_manager_names())}",
                 "current_manager": _current_manager
             }
         
@@ -75,25 +89,29 @@ def get_current_manager() -> Optional[str]:
     return _current_manager
 
 
-def get_summary(pay_period_end: str, manager_name: Optional[str] = None) -> Dict[str, Any]:
+def get_summary(pay_period_end: str, manager_name: Optional[str] = None, include_breakdown: bool = False) -> Dict[str, Any]:
     """
     Get a summary of timecards for a specific pay period and manager.
     
+    The counts come from the pay period's summary documents; the timecards themselves
+    are only read when a per-employee breakdown is requested.
+    
     Args:
         pay_period_end: The pay period end date (YYYY-MM-DD format)
         manager_name: The name of the manager (e.g., "Rahul" or "Drew"). If not provided, uses current manager context.
+        include_breakdown: Also list every timecard with its employee and the IDs of the standard timecards
     
     Returns:
-        Dictionary containing summary statistics and breakdown
+        Dictionary containing summary statistics and, if requested, the breakdown
     """
     try:
         # Use provided manager_name or fall back to current context
         effective_manager = manager_name or _current_manager
         
         db = get_db_client()
-        timecards = db.get_timecards_by_pay_period(pay_period_end, effective_manager)
+        counts = db.get_period_summary(pay_period_end, effective_manager)
         
-        if not timecards:
+        if not counts or not counts['total_timecards']:
             manager_msg = f" for manager {effective_manager}" if effective_manager else ""
             return {
                 "status": "no_data",
@@ -101,38 +119,44 @@ def get_summary(pay_period_end: str, manager_name: Optional[str] = None) -> Dict
                 "summary": {}
             }
         
+        total_timecards = counts['total_timecards']
+        summary = {
+            "pay_period_end": pay_period_end,
+            "total_timecards": total_timecards,
+            "submitted": counts['submitted'],
+            "approved": counts['approved'],
+            "not_submitted": counts['not_submitted'],
+            "with_exceptions": counts['with_exceptions'],
+            "without_exceptions": total_timecards - counts['with_exceptions'],
+            "standard_timecards": counts['standard_timecards'],
+            "total_hours": counts['total_hours'],
+            "overtime_hours": counts['overtime_hours']
+        }
+        
+        if not include_breakdown:
+            return {
+                "status": "success",
+                "summary": summary,
+                "message": f"Found {total_timecards} timecards for pay period ending {pay_period_end}"
+            }
+        
+        timecards = db.get_timecards_by_pay_period(pay_period_end, effective_manager, fields=BREAKDOWN_FIELDS)
+        
         # Get employee names for mapping
         if effective_manager:
             employees = db.get_employees_by_manager_name(effective_manager)
         else:
             # Fallback to getting manager ID from first timecard
-            manager_id = timecards[0].get('manager_id')
-            employees = db.get_employees_by_manager(manager_id)
+            manager_id = timecards[0].get('manager_id') if timecards else None
+            employees = db.get_employees_by_manager(manager_id) if manager_id else []
         
         employee_map = {emp['employee_id']: emp['name'] for emp in employees}
         
-        # Calculate statistics
-        total_timecards = len(timecards)
-        submitted = [tc for tc in timecards if tc['status'] == 'submitted']
-        approved = [tc for tc in timecards if tc['status'] == 'approved']
-        not_submitted = [tc for tc in timecards if tc['status'] == 'not submitted']
-        with_exceptions = [tc for tc in timecards if tc.get('has_exception', False)]
-        without_exceptions = [tc for tc in timecards if not tc.get('has_exception', False)]
-        
         # Standard timecards (submitted with no exceptions)
-        standard_timecards = [tc for tc in submitted if not tc.get('has_exception', False)]
-        
-        summary = {
-            "pay_period_end": pay_period_end,
-            "total_timecards": total_timecards,
-            "submitted": len(submitted),
-            "approved": len(approved),
-            "not_submitted": len(not_submitted),
-            "with_exceptions": len(with_exceptions),
-            "without_exceptions": len(without_exceptions),
-            "standard_timecards": len(standard_timecards),
-            "standard_timecard_ids": [tc['doc_id'] for tc in standard_timecards]
-        }
+        summary["standard_timecard_ids"] = [
+            tc['doc_id'] for tc in timecards
+            if tc['status'] == 'submitted' and not tc.get('has_exception', False)
+        ]
         
         # Create detailed breakdown with employee names
         breakdown = []
@@ -185,9 +209,9 @@ def get_exceptions(pay_period_end: str, manager_name: Optional[str] = None) -> D
         effective_manager = manager_name or _current_manager
         
         db = get_db_client()
-        timecards = db.get_timecards_by_pay_period(pay_period_end, effective_manager)
+        counts = db.get_period_summary(pay_period_end, effective_manager)
         
-        if not timecards:
+        if not counts or not counts['total_timecards']:
             manager_msg = f" for manager {effective_manager}" if effective_manager else ""
             return {
                 "status": "no_data",
@@ -195,20 +219,12 @@ def get_exceptions(pay_period_end: str, manager_name: Optional[str] = None) -> D
                 "exceptions": []
             }
         
-        # Get employee names for mapping
-        if effective_manager:
-            employees = db.get_employees_by_manager_name(effective_manager)
-            employee_map = {emp['employee_id']: emp['name'] for emp in employees}
-        else:
-            if timecards:
-                manager_id = timecards[0].get('manager_id')
-                employees = db.get_employees_by_manager(manager_id)
-                employee_map = {emp['employee_id']: emp['name'] for emp in employees}
-            else:
-                employee_map = {}
-        
-        # Filter for exceptions
-        exceptions = [tc for tc in timecards if tc.get('has_exception', False)]
+        # Only the timecards with exceptions are read, and none when the summary has none
+        exceptions = []
+        if counts['with_exceptions']:
+            exceptions = db.get_timecards_by_pay_period(
+                pay_period_end, effective_manager, has_exception=True, fields=BREAKDOWN_FIELDS + ['notes']
+            )
         
         if not exceptions:
             return {
@@ -217,6 +233,13 @@ def get_exceptions(pay_period_end: str, manager_name: Optional[str] = None) -> D
                 "exceptions": []
             }
         
+        # Get employee names for mapping
+        if effective_manager:
+            employees = db.get_employees_by_manager_name(effective_manager)
+        else:
+            employees = db.get_employees_by_manager(exceptions[0].get('manager_id'))
+        employee_map = {emp['employee_id']: emp['name'] for emp in employees}
+        
         # Group by status
         not_submitted = [tc for tc in exceptions if tc['status'] == 'not submitted']
         submitted_with_exceptions = [tc for tc in exceptions if tc['status'] == 'submitted']
@@ -270,9 +293,9 @@ def approve_standard_timecards(pay_period_end: str, manager_name: Optional[str]
         effective_manager = manager_name or _current_manager
         
         db = get_db_client()
-        timecards = db.get_timecards_by_pay_period(pay_period_end, effective_manager)
+        counts = db.get_period_summary(pay_period_end, effective_manager)
         
-        if not timecards:
+        if not counts or not counts['total_timecards']:
             manager_msg = f" for manager {effective_manager}" if effective_manager else ""
             return {
                 "status": "no_data",
@@ -280,11 +303,13 @@ def approve_standard_timecards(pay_period_end: str, manager_name: Optional[str]
                 "approved_count": 0
             }
         
-        # Find standard timecards (submitted with no exceptions)
-        standard_timecards = [
-            tc for tc in timecards 
-            if tc['status'] == 'submitted' and not tc.get('has_exception', False)
-        ]
+        # Find standard timecards (submitted with no exceptions); only submitted ones are read
+        standard_timecards = []
+        if counts['standard_timecards']:
+            submitted = db.get_timecards_by_pay_period(
+                pay_period_end, effective_manager, status='submitted', fields=['has_exception']
+            )
+            standard_timecards = [tc for tc in submitted if not tc.get('has_exception', False)]
         
         if not standard_timecards:
             manager_msg = f" for manager {effective_manager}" if effective_manager else ""
@@ -300,27 +325,32 @@ def approve_standard_timecards(pay_period_end: str, manager_name: Optional[str]
         # Use the effective manager or fall back to config
         approved_by = effective_manager if effective_manager else config.agent_settings.manager_name
         
-        # Approve the timecards
-        success = db.approve_timecards(timecard_ids, approved_by)
+        # Approve the timecards (each only if still submitted and unchanged since read)
+        results = db.approve_timecards(timecard_ids, approved_by)
+        approved_count = sum(1 for result in results.values() if result == 'approved')
+        not_approved = {timecard_id: result for timecard_id, result in results.items() if result != 'approved'}
         
-        if success:
-            manager_msg = f" for manager {manager_name}" if manager_name else ""
-            return {
-                "status": "success",
-                "pay_period_end": pay_period_end,
-                "manager_name": manager_name,
-                "approved_count": len(timecard_ids),
-                "approved_by": approved_by,
-                "approved_at": datetime.now().isoformat(),
-                "message": f"Successfully approved {len(timecard_ids)} standard timecards for pay period ending {pay_period_end}{manager_msg}"
-            }
-        else:
+        if not approved_count:
             return {
                 "status": "error",
                 "message": "Failed to approve timecards",
-                "approved_count": 0
+                "approved_count": 0,
+                "not_approved": not_approved
             }
         
+        manager_msg = f" for manager {manager_name}" if manager_name else ""
+        skipped_msg = f" ({len(not_approved)} changed or failed and were left unapproved)" if not_approved else ""
+        return {
+            "status": "success" if not not_approved else "partial",
+            "pay_period_end": pay_period_end,
+            "manager_name": manager_name,
+            "approved_count": approved_count,
+            "not_approved": not_approved,
+            "approved_by": approved_by,
+            "approved_at": datetime.now().isoformat(),
+            "message": f"Successfully approved {approved_count} standard timecards for pay period ending {pay_period_end}{manager_msg}{skipped_msg}"
+        }
+        
     except Exception as e:
         logger.error(f"Error approving timecards for pay period {pay_period_end}: {e}")
         return {
@@ -389,17 +419,13 @@ def get_historical_comparison(current_period: str, comparison_period: str, manag
         
         db = get_db_client()
         
-        # Get timecards for both periods
-        current_timecards = db.get_timecards_by_pay_period(current_period, effective_manager)
-        comparison_timecards = db.get_timecards_by_pay_period(comparison_period, effective_manager)
+        # Counters of both periods (summary documents or aggregation queries, no timecards)
+        current, comparison = db.get_period_trend([current_period, comparison_period], effective_manager)
         
-        # Calculate statistics for current period
-        current_exceptions = len([tc for tc in current_timecards if tc.get('has_exception', False)])
-        current_not_submitted = len([tc for tc in current_timecards if tc['status'] == 'not submitted'])
-        
-        # Calculate statistics for comparison period
-        comparison_exceptions = len([tc for tc in comparison_timecards if tc.get('has_exception', False)])
-        comparison_not_submitted = len([tc for tc in comparison_timecards if tc['status'] == 'not submitted'])
+        current_exceptions = current['with_exceptions']
+        current_not_submitted = current['not_submitted']
+        comparison_exceptions = comparison['with_exceptions']
+        comparison_not_submitted = comparison['not_submitted']
         
         # Calculate changes
         exception_change = current_exceptions - comparison_exceptions
@@ -408,13 +434,13 @@ def get_historical_comparison(current_period: str, comparison_period: str, manag
         comparison_data = {
             "current_period": {
                 "pay_period_end": current_period,
-                "total_timecards": len(current_timecards),
+                "total_timecards": current['total_timecards'],
                 "exceptions": current_exceptions,
                 "not_submitted": current_not_submitted
             },
             "comparison_period": {
                 "pay_period_end": comparison_period,
-                "total_timecards": len(comparison_timecards),
+                "total_timecards": comparison['total_timecards'],
                 "exceptions": comparison_exceptions,
                 "not_submitted": comparison_not_submitted
             },
@@ -441,6 +467,74 @@ def get_historical_comparison(current_period: str, comparison_period: str, manag
         }
 
 
+def get_pay_period_trend(num_periods: int = 6, end_period: Optional[str] = None, manager_name: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Show exception and non-submission rates over the last several pay periods.
+    
+    Args:
+        num_periods: Number of pay periods to include (up to 26)
+        end_period: Latest pay period end date to include (YYYY-MM-DD). If not provided, uses the latest pay period.
+        manager_name: The name of the manager (e.g., "Rahul" or "Drew"). If not provided, uses current manager context.
+    
+    Returns:
+        Dictionary containing the counts and rates of every period, oldest first
+    """
+    try:
+        # Use provided manager_name or fall back to current context
+        effective_manager = manager_name or _current_manager
+        num_periods = max(1, min(num_periods, MAX_TREND_PERIODS))
+        
+        db = get_db_client()
+        pay_periods = db.get_pay_periods()
+        if end_period:
+            pay_periods = [period for period in pay_periods if period <= end_period]
+        pay_periods = pay_periods[-num_periods:]
+        
+        if not pay_periods:
+            return {
+                "status": "no_data",
+                "message": "No pay periods found" + (f" up to {end_period}" if end_period else ""),
+                "trend": []
+            }
+        
+        trend = []
+        for counts in db.get_period_trend(pay_periods, effective_manager):
+            total = counts['total_timecards']
+            trend.append({
+                "pay_period_end": counts['pay_period_end'],
+                "total_timecards": total,
+                "exceptions": counts['with_exceptions'],
+                "not_submitted": counts['not_submitted'],
+                "exception_rate": round(counts['with_exceptions'] / total * 100, 1) if total else 0.0,
+                "not_submitted_rate": round(counts['not_submitted'] / total * 100, 1) if total else 0.0,
+                "overtime_hours": counts['overtime_hours']
+            })
+        
+        first, last = trend[0], trend[-1]
+        exception_rate_change = round(last['exception_rate'] - first['exception_rate'], 1)
+        not_submitted_rate_change = round(last['not_submitted_rate'] - first['not_submitted_rate'], 1)
+        
+        return {
+            "status": "success",
+            "trend": trend,
+            "changes": {
+                "exception_rate_change": exception_rate_change,
+                "not_submitted_rate_change": not_submitted_rate_change,
+                "exception_trend": "higher" if exception_rate_change > 0 else "lower" if exception_rate_change < 0 else "same",
+                "not_submitted_trend": "higher" if not_submitted_rate_change > 0 else "lower" if not_submitted_rate_change < 0 else "same"
+            },
+            "message": f"Trend over {len(trend)} pay periods from {first['pay_period_end']} to {last['pay_period_end']}"
+        }
+        
+    except Exception as e:
+        logger.error(f"Error getting pay period trend: {e}")
+        return {
+            "status": "error",
+            "message": f"Error retrieving pay period trend: {str(e)}",
+            "trend": []
+        }
+
+
 def draft_reminder_message(employee_ids: List[str], pay_period_end: str, manager_name: Optional[str] = None) -> Dict[str, Any]:
     """
     Draft a reminder message for employees who haven't submitted timecards.
@@ -466,7 +560,7 @@ def draft_reminder_message(employee_ids: List[str], pay_period_end: str, manager
             employee_names = [employee_map.get(emp_id, emp_id) for emp_id in employee_ids]
         else:
             # Fallback: try to get employees from timecards
-            timecards = db.get_timecards_by_pay_period(pay_period_end)
+            timecards = db.get_timecards_by_pay_period(pay_period_end, fields=['manager_id'])
             if timecards:
                 manager_id = timecards[0].get('manager_id')
                 all_employees = db.get_employees_by_manager(manager_id)
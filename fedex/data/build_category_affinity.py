@@ -0,0 +1,84 @@
+"""Build the category co-demand matrices for the FedEx Market Intelligence Agent.
+
+For the nation and every region, state and metro of the demand tensor, computes
+the correlation, lift and support of every pair of product categories over the
+last 24 months (see shared_libraries/category_affinity.py) and writes them as
+[market, category, category] arrays:
+
+    data/output/category_affinity.npz
+
+find_adjacent_categories reads it with CATEGORY_AFFINITY_PATH; without it the
+agent computes the same matrices from the demand tensor on first use.
+
+Usage:
+    python data/build_category_affinity.py                  # tensor from DEMAND_TENSOR_PATH
+    python data/build_category_affinity.py --tensor data/output/demand_tensor
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fedex_market_intelligence.config import config
+from fedex_market_intelligence.shared_libraries.category_affinity import compute_affinity
+from fedex_market_intelligence.shared_libraries.demand_tensor import DemandTensor
+from fedex_market_intelligence.shared_libraries.feature_store import NATIONAL_KEY
+
+DATA_DIR = Path(__file__).parent / "output"
+DEFAULT_TENSOR_DIR = DATA_DIR / "demand_tensor"
+DEFAULT_OUTPUT_FILE = DATA_DIR / "category_affinity.npz"
+
+# National pairs printed after the build
+TOP_PAIRS = 10
+
+
+def main():
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description="Build the category co-demand matrices")
+    parser.add_argument("--tensor", type=Path, default=config.demand_tensor_path or DEFAULT_TENSOR_DIR,
+                        help="Demand tensor directory (default: DEMAND_TENSOR_PATH)")
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT_FILE, help="Output .npz file")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("FedEx Market Intelligence - Category Affinity Build")
+    print("=" * 60)
+
+    if not (Path(args.tensor) / "index.json").exists():
+        print(f"\nERROR: Demand tensor not found: {args.tensor}")
+        print("Please run build_demand_tensor.py first")
+        sys.exit(1)
+
+    tensor = DemandTensor(Path(args.tensor))
+    print(f"\nComputing {len(tensor.categories)} x {len(tensor.categories)} matrices per market...")
+    start = time.perf_counter()
+    affinity = compute_affinity(tensor)
+    print(f"  ✓ {len(affinity):,} markets in {time.perf_counter() - start:.1f}s")
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    affinity.save(args.output)
+    print(f"  ✓ Wrote {args.output}")
+
+    national = affinity.find_market("national", NATIONAL_KEY)
+    correlation = affinity.correlation[national]
+    first, second = np.triu_indices(len(affinity.categories), k=1)
+    order = np.argsort(-np.nan_to_num(correlation[first, second], nan=-2))[:TOP_PAIRS]
+    print("\nMost correlated category pairs (national):")
+    for i in order:
+        a, b = first[i], second[i]
+        print(f"  {affinity.categories[a]:>24} ~ {affinity.categories[b]:<24} "
+              f"r={correlation[a, b]:+.2f}  lift={affinity.lift[national, a, b]:.2f}")
+
+    print("\nSet CATEGORY_AFFINITY_PATH to use it:")
+    print(f"  CATEGORY_AFFINITY_PATH={args.output.resolve()}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""Build the shipper / subcategory concentration cube for the FedEx Market Intelligence Agent.
+
+Rolls shipment_data up to package volume by destination ZIP x month x
+subcategory x shipper and precomputes the concentration tables of every market:
+
+    volume.npz          CSR float32 [category x month x zip, segment], one segment
+                        per (subcategory, shipper) pair
+    concentration.npz   shipper HHI (this year and the year before), shipper
+                        count, top shippers and their shares, and subcategory
+                        volume and HHI of every national / region / state /
+                        metro / city / ZIP market and category
+    index.json          category / month / ZIP / subcategory / shipper lists,
+                        segments, pooled-shipper flags and ZIP labels
+
+See fedex_market_intelligence/shared_libraries/concentration.py for the layout.
+
+Usage:
+    python data/build_concentration_cube.py                  # from data/output/*.csv
+    python data/build_concentration_cube.py --from-bigquery  # from the BigQuery dataset
+    python data/build_concentration_cube.py --output /path/to/concentration_cube
+
+Point the agent at the output directory with CONCENTRATION_CUBE_PATH.
+"""
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+from scipy import sparse
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fedex_market_intelligence.shared_libraries.concentration import ConcentrationCube  # noqa: E402
+
+# Load environment variables from .env file
+env_path = Path(__file__).parent.parent / ".env"
+if env_path.exists():
+    load_dotenv(env_path)
+
+DATA_DIR = Path(__file__).parent / "output"
+DEFAULT_OUTPUT_DIR = DATA_DIR / "concentration_cube"
+
+# Shipper names that stand for many independent senders rather than one competitor
+POOLED_SHIPPERS = {"Individual", "Unknown", ""}
+
+# ZIP label -> geographic_metadata column
+ZIP_LABEL_COLUMNS = {
+    "city": "city",
+    "metro": "metro_area",
+    "state": "state",
+    "region": "region",
+}
+
+VOLUME_COLUMNS = ["product_category", "year_month", "zip_code", "product_subcategory", "shipper_name", "shipments"]
+
+
+def load_volume_from_csv():
+    """Aggregate shipment_data.csv (written by generate_synthetic_data.py) to the cube's volume rows."""
+    dtypes = {"destination_zip_code": str, "zip_code": str}
+    shipments = pd.read_csv(
+        DATA_DIR / "shipment_data.csv", dtype=dtypes,
+        usecols=["date", "product_category", "product_subcategory", "destination_zip_code",
+                 "shipper_name", "package_count"]
+    )
+    shipments["year_month"] = shipments["date"].str[:7]
+    shipments = shipments.rename(columns={"destination_zip_code": "zip_code", "package_count": "shipments"})
+    shipments[["product_subcategory", "shipper_name"]] = shipments[["product_subcategory", "shipper_name"]].fillna("")
+    volume = shipments.groupby(VOLUME_COLUMNS[:5], as_index=False)["shipments"].sum()
+    geo = pd.read_csv(DATA_DIR / "geographic_metadata.csv", dtype=dtypes)
+    return volume, geo
+
+
+def load_volume_from_bigquery():
+    """Aggregate shipment_data to the cube's volume rows in BigQuery."""
+    from google.cloud import bigquery
+
+    project_id = os.getenv("GOOGLE_CLOUD_PROJECT")
+    dataset_id = os.getenv("BIGQUERY_DATASET")
+    if not project_id or not dataset_id:
+        print("ERROR: GOOGLE_CLOUD_PROJECT and BIGQUERY_DATASET must be set")
+        sys.exit(1)
+
+    client = bigquery.Client(project=project_id)
+    print("  Aggregating shipment_data...")
+    volume = client.query(f"""
+        SELECT
+            product_category,
+            FORMAT_DATE('%Y-%m', date) AS year_month,
+            destination_zip_code AS zip_code,
+            COALESCE(product_subcategory, '') AS product_subcategory,
+            COALESCE(shipper_name, '') AS shipper_name,
+            SUM(package_count) AS shipments
+        FROM `{project_id}.{dataset_id}.shipment_data`
+        WHERE destination_zip_code IS NOT NULL
+        GROUP BY 1, 2, 3, 4, 5
+    """).to_dataframe()
+    print("  Reading geographic_metadata...")
+    geo = client.query(f"SELECT * FROM `{project_id}.{dataset_id}.geographic_metadata`").to_dataframe()
+    return volume, geo
+
+
+def build_concentration_cube(volume, geo, output_dir):
+    """Write the volume cube, its index and the precomputed market tables to output_dir."""
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    geo = geo.drop_duplicates("zip_code").sort_values("zip_code").reset_index(drop=True)
+    zip_codes = geo["zip_code"].astype(str).tolist()
+    zip_index = {z: i for i, z in enumerate(zip_codes)}
+
+    # Shipments to ZIP codes missing from geographic_metadata are dropped
+    volume = volume[volume["zip_code"].isin(zip_index)]
+    categories = sorted(volume["product_category"].unique())
+    months = sorted(volume["year_month"].unique())
+    shippers = sorted(volume["shipper_name"].unique())
+
+    # Subcategories are kept per category ('accessories' of two categories are two subcategories)
+    pairs = volume[["product_category", "product_subcategory"]].drop_duplicates().sort_values(
+        ["product_category", "product_subcategory"]
+    )
+    subcategory_index = {(c, s): i for i, (c, s) in enumerate(pairs.itertuples(index=False))}
+    category_index = {c: i for i, c in enumerate(categories)}
+
+    subcategory = np.array([
+        subcategory_index[key] for key in zip(volume["product_category"], volume["product_subcategory"])
+    ])
+    shipper = volume["shipper_name"].map({s: i for i, s in enumerate(shippers)}).to_numpy()
+    segments, segment = np.unique(np.stack([subcategory, shipper], axis=1), axis=0, return_inverse=True)
+
+    c = volume["product_category"].map(category_index).to_numpy()
+    t = volume["year_month"].map({m: i for i, m in enumerate(months)}).to_numpy()
+    z = volume["zip_code"].map(zip_index).to_numpy()
+    rows = (c * len(months) + t) * len(zip_codes) + z
+    matrix = sparse.csr_matrix(
+        (volume["shipments"].fillna(0).to_numpy(dtype=np.float32), (rows, segment.ravel())),
+        shape=(len(categories) * len(months) * len(zip_codes), len(segments)), dtype=np.float32
+    )
+    matrix.sum_duplicates()
+    sparse.save_npz(output_dir / "volume.npz", matrix)
+
+    index = {
+        "categories": categories,
+        "months": months,
+        "zip_codes": zip_codes,
+        "subcategories": pairs["product_subcategory"].astype(str).tolist(),
+        "subcategory_category": pairs["product_category"].map(category_index).tolist(),
+        "shippers": shippers,
+        "pooled_shippers": [s in POOLED_SHIPPERS for s in shippers],
+        "segments": segments.tolist(),
+        "zip_labels": {
+            label: geo[column].fillna("").astype(str).tolist() for label, column in ZIP_LABEL_COLUMNS.items()
+        },
+    }
+    with open(output_dir / "index.json", "w") as f:
+        json.dump(index, f)
+    print(f"  {len(categories)} categories, {len(pairs)} subcategories, {len(shippers):,} shippers, "
+          f"{matrix.nnz:,} non-zero cells")
+
+    # Without concentration.npz the cube computes the market tables itself; save them
+    stale = output_dir / "concentration.npz"
+    if stale.exists():
+        stale.unlink()
+    cube = ConcentrationCube(output_dir)
+    cube.save_tables(output_dir / "concentration.npz")
+    print(f"  {len(cube.market_keys):,} markets precomputed")
+
+    print(f"  ✓ Wrote {output_dir}")
+
+
+def main():
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description="Build the shipper / subcategory concentration cube")
+    parser.add_argument("--from-bigquery", action="store_true", help="Read shipment_data from BigQuery")
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT_DIR, help="Output directory")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("FedEx Market Intelligence - Concentration Cube Build")
+    print("=" * 60)
+
+    if args.from_bigquery:
+        print("\nLoading volume from BigQuery...")
+        volume, geo = load_volume_from_bigquery()
+    else:
+        if not (DATA_DIR / "shipment_data.csv").exists():
+            print(f"\nERROR: shipment_data.csv not found in {DATA_DIR}")
+            print("Please run generate_synthetic_data.py first (or use --from-bigquery)")
+            sys.exit(1)
+        print(f"\nLoading shipments from {DATA_DIR}...")
+        volume, geo = load_volume_from_csv()
+
+    print(f"  {len(volume):,} category x month x ZIP x subcategory x shipper rows")
+
+    print("\nBuilding cube...")
+    build_concentration_cube(volume, geo, args.output)
+
+    print("\nSet CONCENTRATION_CUBE_PATH to use it:")
+    print(f"  CONCENTRATION_CUBE_PATH={args.output.resolve()}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Build the demand anomaly index for the FedEx Market Intelligence Agent.
+
+Scans every zip x category series of the demand tensor for spikes and
+collapses (robust z-score of deseasonalized shipments against the trailing 12
+months, see shared_libraries/anomalies.py) and writes the anomalies sorted by
+month, most extreme first:
+
+    data/output/demand_anomalies.parquet
+
+find_demand_anomalies reads it with ANOMALY_INDEX_PATH; without it the agent
+runs the same scan on the demand tensor on first use.
+
+Usage:
+    python data/build_demand_anomalies.py                  # tensor from DEMAND_TENSOR_PATH
+    python data/build_demand_anomalies.py --tensor data/output/demand_tensor --threshold 4
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fedex_market_intelligence.config import config
+from fedex_market_intelligence.shared_libraries.anomalies import (
+    MIN_EXPECTED_SHIPMENTS,
+    SCANNED_MONTHS_ATTR,
+    Z_THRESHOLD,
+    scan_anomalies,
+    scanned_months,
+)
+from fedex_market_intelligence.shared_libraries.demand_tensor import DemandTensor
+
+DATA_DIR = Path(__file__).parent / "output"
+DEFAULT_TENSOR_DIR = DATA_DIR / "demand_tensor"
+DEFAULT_OUTPUT_FILE = DATA_DIR / "demand_anomalies.parquet"
+
+
+def main():
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description="Build the demand anomaly index")
+    parser.add_argument("--tensor", type=Path, default=config.demand_tensor_path or DEFAULT_TENSOR_DIR,
+                        help="Demand tensor directory (default: DEMAND_TENSOR_PATH)")
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT_FILE, help="Output parquet file")
+    parser.add_argument("--threshold", type=float, default=Z_THRESHOLD, help="Minimum |robust z| to keep")
+    parser.add_argument("--min-expected", type=float, default=MIN_EXPECTED_SHIPMENTS,
+                        help="Minimum expected monthly shipments of a flagged series")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("FedEx Market Intelligence - Demand Anomaly Scan")
+    print("=" * 60)
+
+    if not (Path(args.tensor) / "index.json").exists():
+        print(f"\nERROR: Demand tensor not found: {args.tensor}")
+        print("Please run build_demand_tensor.py first")
+        sys.exit(1)
+
+    tensor = DemandTensor(Path(args.tensor))
+    print(f"\nScanning {len(tensor.zip_codes):,} ZIPs x {len(tensor.categories)} categories "
+          f"x {len(tensor.months)} months...")
+    start = time.perf_counter()
+    anomalies = scan_anomalies(tensor, args.threshold, args.min_expected)
+    print(f"  ✓ {len(anomalies):,} anomalies in {time.perf_counter() - start:.1f}s")
+
+    anomalies = anomalies.assign(abs_z=anomalies["robust_z"].abs()).sort_values(
+        ["year_month", "abs_z"], ascending=[True, False]
+    ).drop(columns="abs_z")
+    # Kept in the parquet metadata so months without anomalies stay queryable
+    anomalies.attrs[SCANNED_MONTHS_ATTR] = scanned_months(tensor)
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    anomalies.to_parquet(args.output, index=False)
+    print(f"  ✓ Wrote {args.output}")
+
+    counts = anomalies.groupby(["year_month", "direction"]).size().unstack(fill_value=0).tail(6)
+    print("\nRecent months:")
+    print(counts.to_string())
+
+    print("\nSet ANOMALY_INDEX_PATH to use it:")
+    print(f"  ANOMALY_INDEX_PATH={args.output.resolve()}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
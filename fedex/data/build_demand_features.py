@@ -0,0 +1,273 @@
+"""Build the demand feature store for the FedEx Market Intelligence Agent.
+
+Computes, for every zip / metro / state (and the nation) x category, the
+features forecast_demand and query_shipment_trends would otherwise derive per
+call, and writes them as one compact table:
+
+    data/output/demand_features.parquet
+
+    level, key, product_category   lookup key (level = zip, metro, state, national)
+    as_of                          last month of the data (the forecast reference)
+    months_with_data
+    baseline_shipments             mean monthly shipments over the baseline window
+    avg_growth_rate                mean YoY growth over the baseline window
+    stddev_shipments               sample stddev of monthly shipments in the window
+    seasonal_index_01..12          calendar-month mean / overall mean (all history)
+    peak_month                     calendar month with the highest seasonal index
+    trend_slope                    OLS slope of deseasonalized shipments in the window
+    trend_slope_pct                trend_slope as % of the baseline per month
+    trend_direction                growing / declining / stable
+    volatility                     stddev / baseline (coefficient of variation)
+    momentum_3m_pct                last 3 months vs the 3 before, % change
+
+The baseline, growth, stddev and seasonality use the same window and rules as
+forecast_demand, so the tool's output is unchanged when it reads them. Every
+series of a level is computed at once from the demand tensor (run
+build_demand_tensor.py first).
+
+Usage:
+    python data/build_demand_features.py                   # tensor from DEMAND_TENSOR_PATH
+    python data/build_demand_features.py --tensor data/output/demand_tensor
+    python data/build_demand_features.py --to-bigquery     # also load BIGQUERY_DATASET.demand_features
+
+Point the agent at the output file with DEMAND_FEATURES_PATH.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fedex_market_intelligence.config import config
+from fedex_market_intelligence.shared_libraries.demand_tensor import (
+    REFERENCE_YEAR_MONTH,
+    DemandTensor,
+    month_serial,
+)
+from fedex_market_intelligence.shared_libraries.feature_store import (
+    FEATURE_LEVELS,
+    NATIONAL_KEY,
+    SEASONAL_COLUMNS,
+)
+from fedex_market_intelligence.tools.forecasting import BASELINE_WINDOW_MONTHS
+
+DATA_DIR = Path(__file__).parent / "output"
+DEFAULT_TENSOR_DIR = DATA_DIR / "demand_tensor"
+DEFAULT_OUTPUT_FILE = DATA_DIR / "demand_features.parquet"
+
+# |trend_slope_pct| below this (% of baseline per month) is 'stable'
+STABLE_TREND_PCT = 1.0
+
+MOMENTUM_MONTHS = 3
+
+
+def level_membership(tensor, level):
+    """Keys and the 0/1 [key, zip] matrix of one feature level (None = one series per ZIP)."""
+    if level == "zip":
+        return tensor.zip_codes, None
+    if level == "national":
+        return [NATIONAL_KEY], np.ones((1, len(tensor.zip_codes)))
+    return tensor.group_labels[level], np.asarray(tensor.membership[level], dtype=np.float64)
+
+
+def detrended_seasonal(y, observed, month_serials, month_numbers, onehot):
+    """
+    Seasonal index per calendar month from the ratio of each month to its centered
+    12-month moving average (2x12 MA), normalized to average 1.
+
+    Months without the 6 consecutive observed months on either side have no
+    moving average; calendar months with no ratio at all get NaN.
+    """
+    months = y.shape[1]
+    total = np.zeros_like(y)
+    complete = np.ones(y.shape, dtype=bool)
+    for offset in range(-6, 7):
+        weight = 1 / 24 if abs(offset) == 6 else 1 / 12
+        source = np.arange(months) + offset
+        inside = (source >= 0) & (source < months)
+        source = np.clip(source, 0, months - 1)
+        # Columns are months but need not be consecutive; check the serial gap
+        consecutive = inside & (month_serials[source] - month_serials == offset)
+        complete &= consecutive[None, :] & observed[:, source]
+        total += weight * y[:, source]
+
+    ratio = np.where(complete, y / np.where(total > 0, total, np.nan), np.nan)
+    valid = np.isfinite(ratio)
+    seasonal = (np.where(valid, ratio, 0) @ onehot) / (valid.astype(np.float64) @ onehot)
+    present = np.isfinite(seasonal)
+    return seasonal / (np.where(present, seasonal, 0).sum(axis=1) / present.sum(axis=1))[:, None]
+
+
+def series_features(shipments, growth_sum, rows, month_serials, month_numbers, reference):
+    """
+    Features of many monthly series at once.
+
+    Args:
+        shipments, growth_sum, rows: [series, month] sums of total_shipments,
+            growth_rate_yoy and source rows
+        month_serials, month_numbers: month serial and calendar month of each month
+        reference: serial of the forecast reference month
+
+    Returns:
+        Dict of feature name -> [series] array (seasonal indices as [series, 12])
+    """
+    observed = rows > 0
+    n = observed.astype(np.float64)
+    y = np.where(observed, shipments, 0.0)
+    growth = np.divide(growth_sum, rows, out=np.zeros_like(growth_sum), where=observed)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # Baseline window, as in forecast_demand
+        recent = observed & (month_serials >= reference - BASELINE_WINDOW_MONTHS)[None, :]
+        count = recent.sum(axis=1)
+        baseline = np.where(recent, y, 0).sum(axis=1) / count
+        avg_growth = np.where(recent, growth, 0).sum(axis=1) / count
+        deviation = np.where(recent, y - baseline[:, None], 0)
+        stddev = np.where(count > 1, np.sqrt((deviation ** 2).sum(axis=1) / (count - 1)), np.nan)
+
+        # Seasonal index per calendar month over all history
+        onehot = (month_numbers[:, None] == np.arange(1, 13)[None, :]).astype(np.float64)
+        overall = y.sum(axis=1) / n.sum(axis=1)
+        seasonal = (y @ onehot) / (n @ onehot) / overall[:, None]
+        seasonal = np.where(np.isfinite(seasonal), seasonal, np.nan)
+        has_season = np.isfinite(seasonal).any(axis=1)
+        peak_month = np.where(has_season, np.nanargmax(np.where(has_season[:, None], seasonal, 0), axis=1) + 1, 0)
+
+        # Trend: weighted OLS slope of deseasonalized shipments over the baseline window.
+        # The indices above include the trend (a growing series has high late-year
+        # months), so deseasonalize with indices from detrended history instead
+        factor = detrended_seasonal(y, observed, month_serials, month_numbers, onehot)[:, month_numbers - 1]
+        factor = np.where(np.isfinite(factor) & (factor > 0), factor, 1.0)
+        deseasonalized = y / factor
+        x = (month_serials - reference).astype(np.float64)[None, :]
+        w = recent.astype(np.float64)
+        x_mean = (w * x).sum(axis=1) / count
+        d_mean = (w * deseasonalized).sum(axis=1) / count
+        slope = (w * (x - x_mean[:, None]) * (deseasonalized - d_mean[:, None])).sum(axis=1) / (
+            (w * (x - x_mean[:, None]) ** 2).sum(axis=1)
+        )
+        slope_pct = slope / baseline * 100
+
+        # Momentum: last MOMENTUM_MONTHS vs the MOMENTUM_MONTHS before
+        age = reference - month_serials
+        last = observed & (age < MOMENTUM_MONTHS)[None, :]
+        prior = observed & ((age >= MOMENTUM_MONTHS) & (age < 2 * MOMENTUM_MONTHS))[None, :]
+        last_mean = np.where(last, y, 0).sum(axis=1) / last.sum(axis=1)
+        prior_mean = np.where(prior, y, 0).sum(axis=1) / prior.sum(axis=1)
+        momentum = (last_mean / prior_mean - 1) * 100
+        volatility = stddev / baseline
+
+    direction = np.where(
+        slope_pct >= STABLE_TREND_PCT, "growing", np.where(slope_pct <= -STABLE_TREND_PCT, "declining", "stable")
+    )
+    direction = np.where(np.isfinite(slope_pct), direction, None)
+
+    def finite(values):
+        return np.where(np.isfinite(values), values, np.nan)
+
+    return {
+        "months_with_data": n.sum(axis=1).astype(np.int32),
+        "baseline_shipments": finite(baseline),
+        "avg_growth_rate": finite(avg_growth),
+        "stddev_shipments": finite(stddev),
+        "seasonal": seasonal,
+        "peak_month": peak_month.astype(np.int8),
+        "trend_slope": finite(slope),
+        "trend_slope_pct": finite(slope_pct),
+        "trend_direction": direction,
+        "volatility": finite(volatility),
+        "momentum_3m_pct": finite(momentum),
+    }
+
+
+def compute_features(tensor, levels=FEATURE_LEVELS):
+    """Feature table for every level x key x category of the tensor."""
+    reference = month_serial(REFERENCE_YEAR_MONTH)
+    month_serials = np.asarray(tensor.month_serials)
+    month_numbers = np.asarray(tensor.month_numbers)
+    frames = []
+
+    for level in levels:
+        keys, membership = level_membership(tensor, level)
+        for category in tensor.categories:
+            def series(metric):
+                values = tensor.slice(category, metric)  # month x zip
+                if membership is None:
+                    return np.asarray(values, dtype=np.float64).T
+                return membership @ np.asarray(values, dtype=np.float64).T
+
+            features = series_features(
+                series("total_shipments"), series("growth_rate_yoy"), series("demand_rows"),
+                month_serials, month_numbers, reference
+            )
+            seasonal = features.pop("seasonal")
+            frame = pd.DataFrame({"level": level, "key": keys, "product_category": category,
+                                  "as_of": REFERENCE_YEAR_MONTH, **features})
+            frame[SEASONAL_COLUMNS] = seasonal
+            frames.append(frame[frame["months_with_data"] > 0])
+
+        print(f"  {level}: {len(keys):,} keys")
+
+    table = pd.concat(frames, ignore_index=True)
+    # Compact storage: float32 features, categorical keys
+    float_columns = table.select_dtypes("float64").columns
+    table[float_columns] = table[float_columns].astype(np.float32)
+    for column in ["level", "product_category", "as_of", "trend_direction"]:
+        table[column] = table[column].astype("category")
+    return table
+
+
+def upload_features(table):
+    """Load the feature table into BIGQUERY_DATASET.demand_features."""
+    from google.cloud import bigquery
+
+    client = bigquery.Client(project=config.project_id)
+    table_id = f"{config.project_id}.{config.dataset_id}.demand_features"
+    job_config = bigquery.LoadJobConfig(write_disposition=bigquery.WriteDisposition.WRITE_TRUNCATE)
+    frame = table.astype({column: str for column in ["level", "product_category", "as_of"]})
+    client.load_table_from_dataframe(frame, table_id, job_config=job_config).result()
+    print(f"  ✓ Loaded {len(table):,} rows into {table_id}")
+
+
+def main():
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description="Build the demand feature store")
+    parser.add_argument("--tensor", type=Path, default=config.demand_tensor_path or DEFAULT_TENSOR_DIR,
+                        help="Demand tensor directory (default: DEMAND_TENSOR_PATH)")
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT_FILE, help="Output parquet file")
+    parser.add_argument("--to-bigquery", action="store_true", help="Also load the table into BigQuery")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("FedEx Market Intelligence - Demand Feature Build")
+    print("=" * 60)
+
+    if not (Path(args.tensor) / "index.json").exists():
+        print(f"\nERROR: Demand tensor not found: {args.tensor}")
+        print("Please run build_demand_tensor.py first")
+        sys.exit(1)
+
+    tensor = DemandTensor(Path(args.tensor))
+    print(f"\nComputing features as of {REFERENCE_YEAR_MONTH}...")
+    table = compute_features(tensor)
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    table.to_parquet(args.output, index=False)
+    size_mb = args.output.stat().st_size / 1024 / 1024
+    print(f"  ✓ Wrote {args.output} ({len(table):,} rows, {size_mb:,.1f} MB)")
+
+    if args.to_bigquery:
+        upload_features(table)
+
+    print("\nSet DEMAND_FEATURES_PATH to use it:")
+    print(f"  DEMAND_FEATURES_PATH={args.output.resolve()}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""Build the memory-mapped demand tensor for the FedEx Market Intelligence Agent.
+
+aggregated_demand and market_share are dense over (zip code, month, category), so
+they are written as one NumPy array that the tools memory-map and slice instead of
+re-deriving the same series through SQL joins:
+
+    demand.npy           float32 [category, metric, month, zip]
+    membership_<level>.npy
+                         float32 [group, zip] 0/1 geo-hierarchy membership
+                         (level = city, metro, state, region)
+    zip_coords.npy       float64 [zip, 2] lat/lng
+    demographics.npy     float64 [zip, field] ZCTA demographics (NaN where unknown)
+    segments.npy         bool [segment, zip] demographic segment flags
+    index.json           category / metric / month / zip index lists, per-zip geo
+                         labels, the group labels of each membership matrix and the
+                         demographic field / segment names
+
+The demographics files are written when zcta_demographics is available (run
+load_zcta_demographics.py first); the tensor works without them.
+
+Category and metric are the outer axes so a (category, metric) slice - what every
+tool reads - is one contiguous month x zip block.
+
+Usage:
+    python data/build_demand_tensor.py                  # from data/output/*.csv
+    python data/build_demand_tensor.py --from-bigquery  # from the BigQuery dataset
+    python data/build_demand_tensor.py --output /path/to/demand_tensor
+
+Point the agent at the output directory with DEMAND_TENSOR_PATH.
+"""
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+env_path = Path(__file__).parent.parent / ".env"
+if env_path.exists():
+    load_dotenv(env_path)
+
+DATA_DIR = Path(__file__).parent / "output"
+DEFAULT_OUTPUT_DIR = DATA_DIR / "demand_tensor"
+
+# Metric axis of the tensor. The *_rows metrics are 1 where the source row exists,
+# so averages can be taken over existing rows exactly like SQL AVG does
+METRICS = [
+    "total_shipments",
+    "total_value",
+    "unique_shippers",
+    "growth_rate_mom",
+    "growth_rate_yoy",
+    "demand_rows",
+    "major_brand_volume",
+    "small_business_volume",
+    "market_concentration_index",
+    "share_rows",
+]
+
+# Boolean zcta_demographics columns (segment_high_income, ...) become segments.npy rows
+SEGMENT_PREFIX = "segment_"
+
+GEO_LEVELS = {
+    "city": "city",
+    "metro": "metro_area",
+    "state": "state",
+    "region": "region",
+}
+
+
+def load_tables_from_csv():
+    """Load the source tables written by generate_synthetic_data.py (and load_zcta_demographics.py)."""
+    dtypes = {"zip_code": str, "year_month": str}
+    demand = pd.read_csv(DATA_DIR / "aggregated_demand.csv", dtype=dtypes)
+    share = pd.read_csv(DATA_DIR / "market_share.csv", dtype=dtypes)
+    geo = pd.read_csv(DATA_DIR / "geographic_metadata.csv", dtype=dtypes)
+    zcta_file = DATA_DIR / "zcta_demographics.csv"
+    zcta = pd.read_csv(zcta_file, dtype=dtypes) if zcta_file.exists() else None
+    return demand, share, geo, zcta
+
+
+def load_tables_from_bigquery():
+    """Load the source tables from the configured BigQuery dataset."""
+    from google.cloud import bigquery
+
+    project_id = os.getenv("GOOGLE_CLOUD_PROJECT")
+    dataset_id = os.getenv("BIGQUERY_DATASET")
+    if not project_id or not dataset_id:
+        print("ERROR: GOOGLE_CLOUD_PROJECT and BIGQUERY_DATASET must be set")
+        sys.exit(1)
+
+    client = bigquery.Client(project=project_id)
+
+    def read(table):
+        print(f"  Reading {table}...")
+        return client.query(f"SELECT * FROM `{project_id}.{dataset_id}.{table}`").to_dataframe()
+
+    try:
+        zcta = read("zcta_demographics")
+    except Exception as e:
+        print(f"  zcta_demographics not available, building without demographics: {e}")
+        zcta = None
+
+    return read("aggregated_demand"), read("market_share"), read("geographic_metadata"), zcta
+
+
+def build_demographics(zcta, zip_codes, output_dir):
+    """Write the ZCTA demographics and segment flags aligned to the tensor's zip axis."""
+    zcta = zcta.drop_duplicates("zip_code").set_index("zip_code").reindex(zip_codes)
+    segment_columns = [c for c in zcta.columns if c.startswith(SEGMENT_PREFIX)]
+    fields = [c for c in zcta.columns if c not in segment_columns]
+
+    np.save(output_dir / "demographics.npy", zcta[fields].to_numpy(dtype=np.float64, na_value=np.nan))
+    # ZIP codes without a ZCTA record are in no segment
+    segments = zcta[segment_columns].fillna(False).astype(bool).to_numpy().T
+    np.save(output_dir / "segments.npy", segments)
+
+    names = [c[len(SEGMENT_PREFIX):] for c in segment_columns]
+    matched = int(zcta[fields].notna().any(axis=1).sum())
+    print(f"  demographics: {matched:,}/{len(zip_codes):,} ZIPs, segments: {', '.join(names)}")
+    return fields, names
+
+
+def build_tensor(demand, share, geo, output_dir, zcta=None):
+    """Write the tensor, membership matrices and index (plus demographics when given) to output_dir."""
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    geo = geo.drop_duplicates("zip_code").sort_values("zip_code").reset_index(drop=True)
+    zip_codes = geo["zip_code"].tolist()
+    months = sorted(set(demand["year_month"]) | set(share["year_month"]))
+    categories = sorted(set(demand["product_category"]) | set(share["product_category"]))
+
+    zip_index = {z: i for i, z in enumerate(zip_codes)}
+    month_index = {m: i for i, m in enumerate(months)}
+    category_index = {c: i for i, c in enumerate(categories)}
+    metric_index = {m: i for i, m in enumerate(METRICS)}
+
+    shape = (len(categories), len(METRICS), len(months), len(zip_codes))
+    print(f"  Tensor shape (category, metric, month, zip): {shape}")
+    tensor = np.lib.format.open_memmap(output_dir / "demand.npy", mode="w+", dtype=np.float32, shape=shape)
+    tensor[:] = 0
+
+    def scatter(frame, columns, rows_metric):
+        # Rows for ZIP codes missing from geographic_metadata are dropped (no geography)
+        frame = frame[frame["zip_code"].isin(zip_index)]
+        c = frame["product_category"].map(category_index).to_numpy()
+        t = frame["year_month"].map(month_index).to_numpy()
+        z = frame["zip_code"].map(zip_index).to_numpy()
+        for column in columns:
+            values = frame[column].fillna(0).to_numpy(dtype=np.float32)
+            tensor[c, metric_index[column], t, z] = values
+        tensor[c, metric_index[rows_metric], t, z] = 1
+
+    scatter(demand, ["total_shipments", "total_value", "unique_shippers", "growth_rate_mom", "growth_rate_yoy"],
+            "demand_rows")
+    scatter(share, ["major_brand_volume", "small_business_volume", "market_concentration_index"], "share_rows")
+    tensor.flush()
+
+    # Geo hierarchy: one 0/1 membership matrix per level, group x zip
+    zip_labels = {}
+    group_labels = {}
+    for level, column in GEO_LEVELS.items():
+        labels = geo[column].fillna("").astype(str)
+        groups = sorted(label for label in labels.unique() if label)
+        group_index = {g: i for i, g in enumerate(groups)}
+        membership = np.zeros((len(groups), len(zip_codes)), dtype=np.float32)
+        has_group = labels != ""
+        membership[labels[has_group].map(group_index).to_numpy(), np.flatnonzero(has_group)] = 1
+        np.save(output_dir / f"membership_{level}.npy", membership)
+        zip_labels[level] = labels.tolist()
+        group_labels[level] = groups
+        print(f"  {level}: {len(groups)} groups")
+
+    np.save(output_dir / "zip_coords.npy", geo[["lat", "lng"]].to_numpy(dtype=np.float64))
+
+    index = {
+        "shape": list(shape),
+        "categories": categories,
+        "metrics": METRICS,
+        "months": months,
+        "zip_codes": zip_codes,
+        "zip_labels": zip_labels,
+        "group_labels": group_labels,
+    }
+    if zcta is not None:
+        index["demographic_fields"], index["segments"] = build_demographics(zcta, zip_codes, output_dir)
+
+    with open(output_dir / "index.json", "w") as f:
+        json.dump(index, f)
+
+    size_mb = tensor.nbytes / 1024 / 1024
+    print(f"  ✓ Wrote {output_dir} ({size_mb:,.1f} MB tensor)")
+
+
+def main():
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description="Build the memory-mapped demand tensor")
+    parser.add_argument("--from-bigquery", action="store_true", help="Read source tables from BigQuery")
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT_DIR, help="Output directory")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("FedEx Market Intelligence - Demand Tensor Build")
+    print("=" * 60)
+
+    if args.from_bigquery:
+        print("\nLoading tables from BigQuery...")
+        demand, share, geo, zcta = load_tables_from_bigquery()
+    else:
+        if not DATA_DIR.exists():
+            print(f"\nERROR: Data directory not found: {DATA_DIR}")
+            print("Please run generate_synthetic_data.py first (or use --from-bigquery)")
+            sys.exit(1)
+        print(f"\nLoading tables from {DATA_DIR}...")
+        demand, share, geo, zcta = load_tables_from_csv()
+
+    print(f"  aggregated_demand: {len(demand):,} rows, market_share: {len(share):,} rows")
+
+    print("\nBuilding tensor...")
+    build_tensor(demand, share, geo, args.output, zcta)
+
+    print("\nSet DEMAND_TENSOR_PATH to use it:")
+    print(f"  DEMAND_TENSOR_PATH={args.output.resolve()}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""Build the origin-destination lane matrices for the FedEx Market Intelligence Agent.
+
+shipment_data carries origin and destination ZIP codes, but aggregated_demand
+keeps only the destination. This rolls the shipments up into sparse origin x
+destination flow matrices, one block per category and month, at three levels:
+
+    flows_zip.npz        CSR float32 [category x month x origin zip, destination zip]
+    flows_metro.npz      same, rolled up to metro areas
+    flows_state.npz      same, rolled up to states
+    index.json           category / month lists and, per level, the area labels,
+                         centroid lat/lng and parent names (a ZIP's city, metro
+                         and state; a metro's state) for market matching
+
+Row (category c, month t, origin o) of a level is row (c * months + t) * areas + o,
+so one category-month is a contiguous block of rows - a CSR row slice. Flows are
+summed package counts, like aggregated_demand.total_shipments.
+
+Usage:
+    python data/build_od_matrices.py                  # from data/output/*.csv
+    python data/build_od_matrices.py --from-bigquery  # from the BigQuery dataset
+    python data/build_od_matrices.py --output /path/to/od_matrices
+
+Point the agent at the output directory with OD_MATRICES_PATH.
+"""
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+from scipy import sparse
+
+# Load environment variables from .env file
+env_path = Path(__file__).parent.parent / ".env"
+if env_path.exists():
+    load_dotenv(env_path)
+
+DATA_DIR = Path(__file__).parent / "output"
+DEFAULT_OUTPUT_DIR = DATA_DIR / "od_matrices"
+
+# Flow level -> geographic_metadata column of its areas
+OD_LEVELS = {
+    "zip": "zip_code",
+    "metro": "metro_area",
+    "state": "state",
+}
+
+# Names each level's areas are matched by besides their own label
+LEVEL_PARENTS = {
+    "zip": {"city": "city", "metro": "metro_area", "state": "state"},
+    "metro": {"state": "state"},
+    "state": {},
+}
+
+FLOW_COLUMNS = ["product_category", "year_month", "origin_zip_code", "destination_zip_code", "shipments"]
+
+
+def load_flows_from_csv():
+    """Aggregate shipment_data.csv (written by generate_synthetic_data.py) to monthly ZIP-to-ZIP flows."""
+    dtypes = {"origin_zip_code": str, "destination_zip_code": str, "zip_code": str}
+    shipments = pd.read_csv(
+        DATA_DIR / "shipment_data.csv", dtype=dtypes,
+        usecols=["date", "product_category", "origin_zip_code", "destination_zip_code", "package_count"]
+    )
+    shipments["year_month"] = shipments["date"].str[:7]
+    flows = shipments.groupby(FLOW_COLUMNS[:4], as_index=False)["package_count"].sum()
+    geo = pd.read_csv(DATA_DIR / "geographic_metadata.csv", dtype=dtypes)
+    return flows.rename(columns={"package_count": "shipments"}), geo
+
+
+def load_flows_from_bigquery():
+    """Aggregate shipment_data to monthly ZIP-to-ZIP flows in BigQuery."""
+    from google.cloud import bigquery
+
+    project_id = os.getenv("GOOGLE_CLOUD_PROJECT")
+    dataset_id = os.getenv("BIGQUERY_DATASET")
+    if not project_id or not dataset_id:
+        print("ERROR: GOOGLE_CLOUD_PROJECT and BIGQUERY_DATASET must be set")
+        sys.exit(1)
+
+    client = bigquery.Client(project=project_id)
+    print("  Aggregating shipment_data...")
+    flows = client.query(f"""
+        SELECT
+            product_category,
+            FORMAT_DATE('%Y-%m', date) AS year_month,
+            origin_zip_code,
+            destination_zip_code,
+            SUM(package_count) AS shipments
+        FROM `{project_id}.{dataset_id}.shipment_data`
+        WHERE origin_zip_code IS NOT NULL AND destination_zip_code IS NOT NULL
+        GROUP BY 1, 2, 3, 4
+    """).to_dataframe()
+    print("  Reading geographic_metadata...")
+    geo = client.query(f"SELECT * FROM `{project_id}.{dataset_id}.geographic_metadata`").to_dataframe()
+    return flows, geo
+
+
+def build_od_matrices(flows, geo, output_dir):
+    """Write the flow matrices of every level and the index to output_dir."""
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    geo = geo.drop_duplicates("zip_code").sort_values("zip_code").reset_index(drop=True)
+    categories = sorted(flows["product_category"].unique())
+    months = sorted(flows["year_month"].unique())
+    c = flows["product_category"].map({v: i for i, v in enumerate(categories)}).to_numpy()
+    t = flows["year_month"].map({v: i for i, v in enumerate(months)}).to_numpy()
+    values = flows["shipments"].fillna(0).to_numpy(dtype=np.float32)
+
+    index = {"categories": categories, "months": months, "levels": {}}
+    for level, column in OD_LEVELS.items():
+        labels = geo[column].fillna("").astype(str)
+        has_area = labels != ""
+        areas = sorted(labels[has_area].unique())
+        area_index = {a: i for i, a in enumerate(areas)}
+        zip_area = dict(zip(geo.loc[has_area, "zip_code"], labels[has_area].map(area_index)))
+
+        # Flows from or to ZIP codes without an area at this level are dropped
+        origin = flows["origin_zip_code"].map(zip_area).to_numpy(dtype=np.float64)
+        destination = flows["destination_zip_code"].map(zip_area).to_numpy(dtype=np.float64)
+        known = ~np.isnan(origin) & ~np.isnan(destination)
+        rows = (c[known] * len(months) + t[known]) * len(areas) + origin[known].astype(np.int64)
+
+        # Duplicate (row, destination) entries - ZIP flows within one area pair - are summed
+        matrix = sparse.csr_matrix(
+            (values[known], (rows, destination[known].astype(np.int64))),
+            shape=(len(categories) * len(months) * len(areas), len(areas)), dtype=np.float32
+        )
+        matrix.sum_duplicates()
+        sparse.save_npz(output_dir / f"flows_{level}.npz", matrix)
+
+        by_area = geo[has_area].groupby(labels[has_area])
+        coords = by_area[["lat", "lng"]].mean().reindex(areas)
+        parents = by_area[list(LEVEL_PARENTS[level].values())].first().reindex(areas)
+        index["levels"][level] = {
+            "labels": areas,
+            "coords": coords.round(4).to_numpy().tolist(),
+            "parents": {
+                name: parents[column].fillna("").astype(str).tolist()
+                for name, column in LEVEL_PARENTS[level].items()
+            },
+        }
+        print(f"  {level}: {len(areas):,} areas, {matrix.nnz:,} non-zero lane-months")
+
+    with open(output_dir / "index.json", "w") as f:
+        json.dump(index, f)
+
+    print(f"  ✓ Wrote {output_dir}")
+
+
+def main():
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description="Build the origin-destination lane matrices")
+    parser.add_argument("--from-bigquery", action="store_true", help="Read shipment_data from BigQuery")
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT_DIR, help="Output directory")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("FedEx Market Intelligence - Lane Matrix Build")
+    print("=" * 60)
+
+    if args.from_bigquery:
+        print("\nLoading flows from BigQuery...")
+        flows, geo = load_flows_from_bigquery()
+    else:
+        if not (DATA_DIR / "shipment_data.csv").exists():
+            print(f"\nERROR: shipment_data.csv not found in {DATA_DIR}")
+            print("Please run generate_synthetic_data.py first (or use --from-bigquery)")
+            sys.exit(1)
+        print(f"\nLoading shipments from {DATA_DIR}...")
+        flows, geo = load_flows_from_csv()
+
+    print(f"  {len(flows):,} category x month x ZIP-to-ZIP flows")
+
+    print("\nBuilding matrices...")
+    build_od_matrices(flows, geo, args.output)
+
+    print("\nSet OD_MATRICES_PATH to use them:")
+    print(f"  OD_MATRICES_PATH={args.output.resolve()}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Download ZCTA demographics from the Census API for the FedEx Market Intelligence Agent.
+
+One ACS 5-Year request returns every ZIP Code Tabulation Area at once, so the
+whole country is loaded in a single call instead of one call per ZIP code. The
+result is written with precomputed demographic segment flags (segment_* columns)
+that analyze_geographic_demand filters on with a plain join:
+
+    data/output/zcta_demographics.csv
+
+upload_to_bigquery.py loads it as the zcta_demographics table and
+build_demand_tensor.py adds it to the local demand tensor.
+
+Usage:
+    python data/load_zcta_demographics.py
+"""
+
+import sys
+from pathlib import Path
+
+import pandas as pd
+import requests
+
+DATA_DIR = Path(__file__).parent / "output"
+
+# Same ACS release as the get_demographics tool
+CENSUS_API_BASE = "https://api.census.gov/data/2021/acs/acs5"
+
+# Census variable codes
+# https://api.census.gov/data/2021/acs/acs5/variables.html
+BASE_VARIABLES = {
+    'B01003_001E': 'total_population',
+    'B19013_001E': 'median_household_income',
+    'B01002_001E': 'median_age',
+    'B11001_001E': 'total_households',
+    'B23025_005E': 'employed_population',
+    'B11005_002E': 'households_with_children',
+}
+
+# Sex by age (B01001): male and female cells for ages 25-34 and 65+
+AGE_25_34_VARIABLES = ['B01001_011E', 'B01001_012E', 'B01001_035E', 'B01001_036E']
+AGE_65_PLUS_VARIABLES = [f'B01001_{i:03d}E' for i in list(range(20, 26)) + list(range(44, 50))]
+
+# Count columns stay integers (nullable) so they load into INTEGER columns
+COUNT_COLUMNS = ['total_population', 'total_households', 'employed_population', 'households_with_children']
+
+# Segment flags: name -> (description, rule on the demographics frame)
+SEGMENT_RULES = {
+    'high_income': ("Median household income of $100k or more",
+                    lambda df: df['median_household_income'] >= 100000),
+    'low_income': ("Median household income under $50k",
+                   lambda df: df['median_household_income'] < 50000),
+    'millennial_heavy': ("18%+ of residents aged 25-34",
+                         lambda df: df['pct_age_25_34'] >= 18),
+    'family_heavy': ("35%+ of households with children under 18",
+                     lambda df: df['pct_households_with_children'] >= 35),
+    'senior_heavy': ("20%+ of residents aged 65 or older",
+                     lambda df: df['pct_age_65_plus'] >= 20),
+}
+
+# Census marks unavailable estimates with large negative sentinels (e.g. -666666666)
+MIN_VALID_VALUE = 0
+
+
+def fetch_all_zctas():
+    """Fetch the ACS variables for every ZCTA in one request."""
+    variables = list(BASE_VARIABLES) + AGE_25_34_VARIABLES + AGE_65_PLUS_VARIABLES
+    url = f"{CENSUS_API_BASE}?get={','.join(variables)}&for=zip%20code%20tabulation%20area:*"
+
+    print("Requesting ACS 5-Year estimates for all ZCTAs...")
+    response = requests.get(url, timeout=300)
+    response.raise_for_status()
+    rows = response.json()
+
+    df = pd.DataFrame(rows[1:], columns=rows[0])
+    df = df.rename(columns={'zip code tabulation area': 'zip_code'})
+    for column in variables:
+        df[column] = pd.to_numeric(df[column], errors='coerce')
+        df.loc[df[column] < MIN_VALID_VALUE, column] = None
+    return df
+
+
+def build_demographics(raw):
+    """Derive shares and segment flags from the raw ACS columns."""
+    df = raw[['zip_code']].copy()
+    for code, name in BASE_VARIABLES.items():
+        df[name] = raw[code]
+
+    population = df['total_population'].where(df['total_population'] > 0)
+    households = df['total_households'].where(df['total_households'] > 0)
+    df['pct_age_25_34'] = (raw[AGE_25_34_VARIABLES].sum(axis=1) / population * 100).round(2)
+    df['pct_age_65_plus'] = (raw[AGE_65_PLUS_VARIABLES].sum(axis=1) / population * 100).round(2)
+    df['pct_households_with_children'] = (df['households_with_children'] / households * 100).round(2)
+
+    # A missing input never matches a segment
+    for segment, (_, rule) in SEGMENT_RULES.items():
+        df[f'segment_{segment}'] = rule(df).fillna(False).astype(bool)
+
+    df[COUNT_COLUMNS] = df[COUNT_COLUMNS].round().astype('Int64')
+
+    return df.sort_values('zip_code').reset_index(drop=True)
+
+
+def main():
+    """Main execution function."""
+    print("=" * 60)
+    print("FedEx Market Intelligence - ZCTA Demographics")
+    print("=" * 60)
+
+    try:
+        raw = fetch_all_zctas()
+    except requests.exceptions.RequestException as e:
+        print(f"✗ Census API request failed: {str(e)}")
+        sys.exit(1)
+
+    df = build_demographics(raw)
+
+    DATA_DIR.mkdir(exist_ok=True)
+    output_file = DATA_DIR / "zcta_demographics.csv"
+    df.to_csv(output_file, index=False)
+    print(f"✓ Saved {output_file.name} ({len(df):,} ZCTAs)")
+
+    print("\nSegment sizes:")
+    for segment, (description, _) in SEGMENT_RULES.items():
+        print(f"  {segment:18s} {df[f'segment_{segment}'].sum():6,d}  {description}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -87,6 +87,23 @@ def create_table_schemas():
             bigquery.SchemaField("subcategory", "STRING"),
             bigquery.SchemaField("keywords", "STRING"),
         ],
+        "zcta_demographics": [
+            bigquery.SchemaField("zip_code", "STRING", mode="REQUIRED"),
+            bigquery.SchemaField("total_population", "INTEGER"),
+            bigquery.SchemaField("median_household_income", "FLOAT"),
+            bigquery.SchemaField("median_age", "FLOAT"),
+            bigquery.SchemaField("total_households", "INTEGER"),
+            bigquery.SchemaField("employed_population", "INTEGER"),
+            bigquery.SchemaField("households_with_children", "INTEGER"),
+            bigquery.SchemaField("pct_age_25_34", "FLOAT"),
+            bigquery.SchemaField("pct_age_65_plus", "FLOAT"),
+            bigquery.SchemaField("pct_households_with_children", "FLOAT"),
+            bigquery.SchemaField("segment_high_income", "BOOLEAN"),
+            bigquery.SchemaField("segment_low_income", "BOOLEAN"),
+            bigquery.SchemaField("segment_millennial_heavy", "BOOLEAN"),
+            bigquery.SchemaField("segment_family_heavy", "BOOLEAN"),
+            bigquery.SchemaField("segment_senior_heavy", "BOOLEAN"),
+        ],
     }
     return schemas
 
@@ -238,6 +255,12 @@ def main():
         ("market_share", "market_share.csv"),
     ]
     
+    # Written by load_zcta_demographics.py; uploaded when present
+    if (DATA_DIR / "zcta_demographics.csv").exists():
+        tables_to_upload.append(("zcta_demographics", "zcta_demographics.csv"))
+    else:
+        print("\nSkipping zcta_demographics (run load_zcta_demographics.py to enable demographic filters)")
+    
     success_count = 0
     for table_name, csv_filename in tables_to_upload:
         csv_file = DATA_DIR / csv_filename
@@ -67,10 +67,14 @@ def create() -> None:
             "google-adk (>=1.0.0)",
             "google-cloud-aiplatform[agent_engines] (>=1.91.0,<2.0.0)",
             "google-genai (>=1.5.0,<2.0.0)",
-            "google-cloud-bigquery (>=3.11.0)",
+            "google-cloud-bigquery[bqstorage,pandas] (>=3.11.0)",
+            "pyarrow (>=14.0.0)",
+            "scipy (>=1.11.0)",
+            "db-dtypes (>=1.1.0)",
             "pydantic (>=2.10.6,<3.0.0)",
             "python-dotenv (>=1.0.0)",
             "requests (>=2.31.0)",
+            "httpx (>=0.27.0)",
             "pandas (>=2.1.0)",
             "numpy (>=1.24.0)",
             "absl-py (>=2.2.1)",
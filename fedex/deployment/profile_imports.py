@@ -0,0 +1,87 @@
+"""Import-time profile of the FedEx Market Intelligence Agent.
+
+Runs `python -X importtime -c "import fedex_market_intelligence.agent"` in a fresh
+interpreter (what an Agent Engine cold start pays before the first request) and
+reports the total import time, the slowest modules and whether any of the heavy
+modules that should load lazily were imported eagerly.
+
+Usage:
+    python deployment/profile_imports.py
+    python deployment/profile_imports.py --top 40
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+# Loaded on first tool use / first agent turn, never at import
+# (httpx is not listed: google.genai, which agent.py needs for its types, imports it)
+DEFERRED_MODULES = ["pandas", "numpy", "pyarrow", "scipy", "google.cloud.bigquery", "vertexai"]
+
+
+def run_importtime(target: str):
+    """Import target in a fresh interpreter; return (wall seconds, importtime rows)."""
+    env = dict(os.environ, PYTHONPATH=str(PROJECT_ROOT))
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        cwd=PROJECT_ROOT, env=env, capture_output=True, text=True
+    )
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        print(proc.stderr[-2000:])
+        sys.exit(proc.returncode)
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.rstrip(), int(self_us), int(cumulative_us)))
+    return wall, rows
+
+
+def main():
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description="Profile agent import time")
+    parser.add_argument("--top", type=int, default=25, help="Number of modules to list")
+    parser.add_argument("--target", default="fedex_market_intelligence.agent", help="Module to import")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("FedEx Market Intelligence Agent - Import Time Profile")
+    print("=" * 70)
+
+    wall, rows = run_importtime(args.target)
+    imported = {name.strip() for name, _, _ in rows}
+    total_self = sum(self_us for _, self_us, _ in rows) / 1e6
+
+    print(f"\nTarget:            {args.target}")
+    print(f"Interpreter wall:  {wall:.2f}s (includes interpreter startup)")
+    print(f"Import time:       {total_self:.2f}s across {len(rows)} modules")
+
+    print(f"\nTop {args.top} modules by cumulative import time:")
+    print(f"  {'cumulative':>10}  {'self':>8}  module")
+    for name, self_us, cumulative_us in sorted(rows, key=lambda r: -r[2])[:args.top]:
+        # importtime indents nested imports; keep it so the tree stays readable
+        print(f"  {cumulative_us / 1000:8.1f}ms  {self_us / 1000:6.1f}ms  {name}")
+
+    print("\nDeferred modules:")
+    eager = []
+    for name in DEFERRED_MODULES:
+        status = "IMPORTED EAGERLY" if name in imported else "deferred"
+        if name in imported:
+            eager.append(name)
+        print(f"  {name:25s} {status}")
+
+    print("=" * 70)
+    return 1 if eager else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,331 @@
+"""Rolling-origin backtest of forecast_demand for the FedEx Market Intelligence Agent.
+
+Every category x market series is evaluated at once: the demand tensor (see
+data/build_demand_tensor.py) is collapsed to a [series, month] matrix with one
+membership-matrix multiply per category, and every cutoff / horizon forecast is
+computed from prefix sums over that matrix - no per-series or per-cutoff loop,
+and no tool calls. forecast_demand's model (project_shipments) is scored
+alongside simple reference models, each with the tool's +/- one stddev band:
+
+    forecast_demand   12-month baseline x YoY growth x seasonality (the tool)
+    naive             last observed month
+    seasonal_naive    same month one year earlier
+    moving_average    12-month baseline only
+
+MAPE, sMAPE and interval coverage are reported per model, overall, per category
+and per horizon. The thresholds turn a run into a gate on accuracy and speed.
+
+Usage:
+    python evaluation/backtest_forecasts.py                                # DEMAND_TENSOR_PATH, metros
+    python evaluation/backtest_forecasts.py --tensor data/output/demand_tensor --level state
+    python evaluation/backtest_forecasts.py --max-smape 25 --max-seconds 10  # exits 1 when violated
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fedex_market_intelligence.config import config
+from fedex_market_intelligence.shared_libraries.demand_tensor import GEO_LEVELS, DemandTensor
+from fedex_market_intelligence.tools.forecasting import BASELINE_WINDOW_MONTHS, project_shipments
+
+MODELS = ["forecast_demand", "naive", "seasonal_naive", "moving_average"]
+
+# forecast_demand forecasts at most 12 months ahead (seasonal_naive needs <= 12 too)
+MAX_HORIZON = 12
+
+
+def market_series(tensor, level):
+    """
+    Monthly totals for every category x market at one geo level.
+
+    Returns:
+        (shipments, growth, observed) - [category, market, month] arrays: summed
+        shipments, mean YoY growth over the market's ZIP rows, and whether the
+        month has any rows (months without rows are absent from the tool's SQL)
+    """
+    membership = np.asarray(tensor.membership[level], dtype=np.float64).T  # zip x market
+    shape = (len(tensor.categories), membership.shape[1], len(tensor.months))
+    shipments = np.empty(shape)
+    growth = np.empty(shape)
+    rows = np.empty(shape)
+
+    for c, category in enumerate(tensor.categories):
+        shipments[c] = (tensor.slice(category, "total_shipments") @ membership).T
+        rows[c] = (tensor.slice(category, "demand_rows") @ membership).T
+        growth_sum = (tensor.slice(category, "growth_rate_yoy") @ membership).T
+        growth[c] = np.divide(growth_sum, rows[c], out=np.zeros_like(growth_sum), where=rows[c] > 0)
+
+    return shipments, growth, rows > 0
+
+
+def prefix_sums(values):
+    """Cumulative sums along the month axis with a leading zero, so sum(t0..t1) = P[t1 + 1] - P[t0]."""
+    zeros = np.zeros(values.shape[:1] + (1,) + values.shape[2:])
+    return np.concatenate([zeros, np.cumsum(values, axis=1)], axis=1)
+
+
+def rolling_origin_forecasts(shipments, growth, observed, month_numbers, horizon, min_history):
+    """
+    Forecasts of every model from every cutoff, for every series at once.
+
+    Args:
+        shipments, growth, observed: [series, month] arrays
+        month_numbers: calendar month (1-12) of each month
+        horizon: months forecast after each cutoff
+        min_history: months of history required before the first cutoff
+
+    Returns:
+        (forecasts, actual, band, valid) - forecasts maps model -> [series, cutoff, horizon];
+        band is the +/- stddev of each [series, cutoff]; valid marks the points to score
+    """
+    n_series, n_months = shipments.shape
+    y = np.where(observed, shipments, 0.0)
+    n = observed.astype(np.float64)
+
+    # Cutoff = last month the model may see; every cutoff has at least one target
+    cutoffs = np.arange(min_history - 1, n_months - 1)
+    steps = np.arange(1, horizon + 1)
+    window_start = np.maximum(cutoffs - BASELINE_WINDOW_MONTHS, 0)
+
+    def window(prefix):
+        return prefix[:, cutoffs + 1] - prefix[:, window_start]
+
+    # Baseline window statistics (mean, mean growth, sample stddev) per series x cutoff
+    count = window(prefix_sums(n))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        baseline = window(prefix_sums(y)) / count
+        avg_growth = window(prefix_sums(np.where(observed, growth, 0.0))) / count
+        variance = (window(prefix_sums(y * y)) - count * baseline ** 2) / (count - 1)
+    band = np.where(count > 1, np.sqrt(np.clip(variance, 0, None)), 0.0)
+
+    # Seasonality: mean of each calendar month over all history / overall mean
+    month_onehot = month_numbers[:, None] == np.arange(1, 13)[None, :]
+    month_totals = prefix_sums(y[:, :, None] * month_onehot)[:, cutoffs + 1]  # series x cutoff x 12
+    month_counts = prefix_sums(n[:, :, None] * month_onehot)[:, cutoffs + 1]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        overall = prefix_sums(y)[:, cutoffs + 1] / prefix_sums(n)[:, cutoffs + 1]
+
+    targets = cutoffs[:, None] + steps[None, :]  # cutoff x horizon
+    in_range = targets < n_months
+    targets = np.minimum(targets, n_months - 1)
+    target_months = month_numbers[targets] - 1
+    cutoff_index = np.arange(len(cutoffs))[:, None]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        seasonality = (
+            month_totals[:, cutoff_index, target_months] / month_counts[:, cutoff_index, target_months]
+        ) / overall[:, :, None]
+    # Missing or zero factors fall back to 1.0, like the tool
+    seasonality = np.where(np.isfinite(seasonality) & (seasonality != 0), seasonality, 1.0)
+
+    tool_forecast, _ = project_shipments(
+        baseline[:, :, None], avg_growth[:, :, None], seasonality, steps[None, None, :]
+    )
+    last_year = np.maximum(targets - 12, 0)
+    forecasts = {
+        "forecast_demand": tool_forecast,
+        "naive": np.broadcast_to(y[:, cutoffs][:, :, None], tool_forecast.shape),
+        "seasonal_naive": y[:, last_year],
+        "moving_average": np.broadcast_to(baseline[:, :, None], tool_forecast.shape),
+    }
+
+    # Scored points: the target and the reference months exist, and the tool would forecast
+    valid = (
+        in_range[None]
+        & observed[:, targets]
+        & observed[:, cutoffs][:, :, None]
+        & observed[:, last_year]
+        & (targets - 12 >= 0)[None]
+        & (np.nan_to_num(baseline) > 0)[:, :, None]
+    )
+    return forecasts, y[:, targets], band, valid
+
+
+def score(forecast, actual, band, valid, axes):
+    """MAPE / sMAPE / coverage (percent) of one model, summed over axes of [category, market, cutoff, horizon]."""
+    error = np.abs(actual - forecast)
+    lower = np.maximum(forecast - band[..., None], 0)
+    upper = forecast + band[..., None]
+
+    mape_points = valid & (actual > 0)
+    denominator = np.abs(actual) + np.abs(forecast)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ape = np.where(mape_points, error / actual, 0.0)
+        sape = np.where(valid & (denominator > 0), 2 * error / denominator, 0.0)
+    covered = valid & (actual >= lower) & (actual <= upper)
+
+    points = valid.sum(axis=axes)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return {
+            "mape": 100 * ape.sum(axis=axes) / mape_points.sum(axis=axes),
+            "smape": 100 * sape.sum(axis=axes) / points,
+            "coverage": 100 * covered.sum(axis=axes) / points,
+            "points": points,
+        }
+
+
+def metrics_record(metrics, index=()):
+    """One segment's metrics as JSON-friendly values."""
+    record = {}
+    for name, values in metrics.items():
+        value = values[index] if index != () else values
+        if name == "points":
+            record[name] = int(value)
+        else:
+            record[name] = round(float(value), 2) if np.isfinite(value) else None
+    return record
+
+
+def run_backtest(tensor, level="metro", horizon=MAX_HORIZON, min_history=24):
+    """
+    Backtest every model over all category x market series of a demand tensor.
+
+    Returns:
+        Report dict with the run shape, elapsed seconds and per-model metrics
+        (overall, by_category, by_horizon)
+    """
+    if level not in GEO_LEVELS:
+        raise ValueError(f"level must be one of {', '.join(GEO_LEVELS)}")
+    if not 1 <= horizon <= MAX_HORIZON:
+        raise ValueError(f"horizon must be between 1 and {MAX_HORIZON}")
+    if np.any(np.diff(tensor.month_serials) != 1):
+        raise ValueError("tensor months are not contiguous")
+    if not BASELINE_WINDOW_MONTHS + 1 <= min_history < len(tensor.months):
+        raise ValueError(f"min_history must be between {BASELINE_WINDOW_MONTHS + 1} and {len(tensor.months) - 1}")
+
+    start = time.perf_counter()
+    shipments, growth, observed = market_series(tensor, level)
+    n_categories, n_markets, n_months = shipments.shape
+
+    forecasts, actual, band, valid = rolling_origin_forecasts(
+        shipments.reshape(-1, n_months), growth.reshape(-1, n_months), observed.reshape(-1, n_months),
+        np.asarray(tensor.month_numbers), horizon, min_history
+    )
+
+    def by_category(array):
+        return array.reshape((n_categories, n_markets) + array.shape[1:])
+
+    actual, band, valid = by_category(actual), by_category(band), by_category(valid)
+    models = {}
+    for model, forecast in forecasts.items():
+        forecast = by_category(forecast)
+        overall = score(forecast, actual, band, valid, axes=None)
+        per_category = score(forecast, actual, band, valid, axes=(1, 2, 3))
+        per_horizon = score(forecast, actual, band, valid, axes=(0, 1, 2))
+        models[model] = {
+            "overall": metrics_record(overall),
+            "by_category": {
+                category: metrics_record(per_category, i) for i, category in enumerate(tensor.categories)
+            },
+            "by_horizon": {str(h + 1): metrics_record(per_horizon, h) for h in range(horizon)},
+        }
+
+    return {
+        "level": level,
+        "series": n_categories * n_markets,
+        "cutoffs": int(actual.shape[2]),
+        "horizon": horizon,
+        "points": int(valid.sum()),
+        "seconds": round(time.perf_counter() - start, 3),
+        "models": models,
+    }
+
+
+def print_report(report):
+    """Print the per-model tables."""
+    def cell(value, width=10):
+        return f"{value:>{width}.2f}" if value is not None else f"{'-':>{width}}"
+
+    print(f"\n{report['series']:,} series ({report['level']}) x {report['cutoffs']} cutoffs x "
+          f"{report['horizon']} months = {report['points']:,} scored points in {report['seconds']:.2f}s")
+
+    print(f"\n{'Model':18s}{'MAPE %':>10}{'sMAPE %':>10}{'Cover %':>10}")
+    for model, metrics in report["models"].items():
+        overall = metrics["overall"]
+        print(f"{model:18s}{cell(overall['mape'])}{cell(overall['smape'])}{cell(overall['coverage'])}")
+
+    print("\nsMAPE % by horizon")
+    print(f"{'Months':18s}" + "".join(f"{model[:14]:>16}" for model in MODELS))
+    for h in report["models"][MODELS[0]]["by_horizon"]:
+        print(f"{h:18s}" + "".join(cell(report["models"][m]["by_horizon"][h]["smape"], 16) for m in MODELS))
+
+    print("\nsMAPE % by category")
+    print(f"{'Category':22s}" + "".join(f"{model[:14]:>16}" for model in MODELS))
+    for category in report["models"][MODELS[0]]["by_category"]:
+        print(f"{category:22s}" + "".join(
+            cell(report["models"][m]["by_category"][category]["smape"], 16) for m in MODELS
+        ))
+
+
+def check_gates(report, args):
+    """Return the failed thresholds (forecast_demand accuracy and run time)."""
+    overall = report["models"]["forecast_demand"]["overall"]
+    failures = []
+    if args.max_mape is not None and (overall["mape"] is None or overall["mape"] > args.max_mape):
+        failures.append(f"MAPE {overall['mape']} > {args.max_mape}")
+    if args.max_smape is not None and (overall["smape"] is None or overall["smape"] > args.max_smape):
+        failures.append(f"sMAPE {overall['smape']} > {args.max_smape}")
+    if args.min_coverage is not None and (overall["coverage"] is None or overall["coverage"] < args.min_coverage):
+        failures.append(f"coverage {overall['coverage']} < {args.min_coverage}")
+    if args.max_seconds is not None and report["seconds"] > args.max_seconds:
+        failures.append(f"run took {report['seconds']:.2f}s > {args.max_seconds}s")
+    return failures
+
+
+def main():
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description="Rolling-origin backtest of forecast_demand")
+    parser.add_argument("--tensor", type=Path, default=config.demand_tensor_path,
+                        help="Demand tensor directory (default: DEMAND_TENSOR_PATH)")
+    parser.add_argument("--level", choices=GEO_LEVELS, default="metro", help="Market level of the series")
+    parser.add_argument("--horizon", type=int, default=MAX_HORIZON, help="Months forecast after each cutoff")
+    parser.add_argument("--min-history", type=int, default=24, help="Months of history before the first cutoff")
+    parser.add_argument("--output", type=Path, help="Write the full report as JSON")
+    parser.add_argument("--max-mape", type=float, help="Fail when forecast_demand MAPE %% exceeds this")
+    parser.add_argument("--max-smape", type=float, help="Fail when forecast_demand sMAPE %% exceeds this")
+    parser.add_argument("--min-coverage", type=float, help="Fail when forecast_demand interval coverage %% is below this")
+    parser.add_argument("--max-seconds", type=float, help="Fail when the backtest takes longer than this")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("FedEx Market Intelligence - Forecast Backtest")
+    print("=" * 60)
+
+    if not args.tensor:
+        print("\nERROR: No demand tensor - pass --tensor or set DEMAND_TENSOR_PATH")
+        print("Build one with data/build_demand_tensor.py")
+        sys.exit(1)
+
+    tensor = DemandTensor(Path(args.tensor))
+    try:
+        report = run_backtest(tensor, args.level, args.horizon, args.min_history)
+    except ValueError as e:
+        print(f"\nERROR: {str(e)}")
+        sys.exit(1)
+
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✓ Report written to {args.output}")
+
+    failures = check_gates(report, args)
+    print("\n" + "=" * 60)
+    if failures:
+        print("✗ Backtest gate failed: " + "; ".join(failures))
+        print("=" * 60)
+        sys.exit(1)
+    print("✓ Backtest passed")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
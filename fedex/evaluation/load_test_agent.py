@@ -0,0 +1,425 @@
+"""End-to-end load test of the FedEx Market Intelligence Agent with a scripted model.
+
+root_agent's Gemini model is swapped for ScriptedLlm, which replays recorded
+tool-call sequences instead of calling an LLM. Everything else is real: N
+concurrent sessions run through ADK's InMemoryRunner, the agent's callbacks and
+the actual tools against the local backend (demand tensor and the other
+optional engines configured in .env). No model calls are made or paid for.
+
+Each session replays one scripted conversation (load_scripts.json by default):
+
+    {"conversations": [{"name": "...", "turns": [{
+        "user": "user message",
+        "tool_calls": [[{"name": "forecast_demand", "args": {...}}], ...],
+        "reply": "final model text"}]}]}
+
+tool_calls holds one list per model step; the calls of a step are issued
+together (parallel function calls). After the last step the model replies.
+
+Reported: sessions/sec and turns/sec, per-turn latency split into the model stub
+(including --model-latency-ms), tools and the remaining runner overhead,
+per-tool latency, and memory per session from a separate tracemalloc pass (so
+tracing does not slow the throughput run).
+
+Usage:
+    python evaluation/load_test_agent.py                              # 100 sessions, 10 at a time
+    python evaluation/load_test_agent.py --sessions 1000 --concurrency 50 --model-latency-ms 800
+    python evaluation/load_test_agent.py --min-sessions-per-second 20 --max-turn-p95-ms 500  # exits 1 when violated
+
+Set DEMAND_TENSOR_PATH (and the other local engines) first; without them the
+tools query BigQuery and the run measures BigQuery instead of the agent.
+USE_ASYNC_TOOLS=false runs the sync tools for comparison.
+"""
+
+import argparse
+import asyncio
+import contextvars
+import json
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, AsyncGenerator, Dict, List, Optional
+
+import numpy as np
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fedex_market_intelligence.agent import root_agent
+from fedex_market_intelligence.config import config
+
+DEFAULT_SCRIPTS = Path(__file__).parent / "load_scripts.json"
+
+APP_NAME = "fedex_load_test"
+
+LATENCY_PERCENTILES = [50, 95, 99]
+
+
+@dataclass
+class TurnTiming:
+    """Where one user turn spent its time."""
+    conversation: str
+    seconds: float = 0.0
+    model_seconds: float = 0.0
+    tool_seconds: float = 0.0
+    model_calls: int = 0
+    tool_calls: List[tuple] = field(default_factory=list)  # (tool name, seconds, error)
+    pending: Dict[str, float] = field(default_factory=dict)
+    error: Optional[str] = None
+
+
+# The turn being run by the current session task (ADK's model and tool calls inherit it)
+current_turn: contextvars.ContextVar[Optional[TurnTiming]] = contextvars.ContextVar("current_turn", default=None)
+
+
+def load_scripts(path: Path) -> List[dict]:
+    """Read and validate the scripted conversations."""
+    with open(path) as f:
+        conversations = json.load(f)["conversations"]
+    if not conversations:
+        raise ValueError(f"{path} has no conversations")
+    for conversation in conversations:
+        for turn in conversation["turns"]:
+            if not turn.get("user"):
+                raise ValueError(f"Turn without a user message in '{conversation['name']}'")
+            for step in turn.get("tool_calls", []):
+                for call in step:
+                    if "name" not in call:
+                        raise ValueError(f"Tool call without a name in '{conversation['name']}'")
+    return conversations
+
+
+def last_user_text(contents: List[types.Content]):
+    """(index, text) of the last user message with text; function responses are user contents too."""
+    for i in range(len(contents) - 1, -1, -1):
+        content = contents[i]
+        if content.role == "user" and content.parts:
+            text = "".join(part.text or "" for part in content.parts)
+            if text:
+                return i, text
+    return -1, ""
+
+
+class ScriptedLlm(BaseLlm):
+    """
+    Stand-in model that replays the scripted tool calls of the current user turn.
+
+    The step is the number of model function-call contents since the last user
+    message, so the model is stateless and any number of sessions can share it.
+    """
+
+    turns: Dict[str, dict] = {}
+    latency_seconds: float = 0.0
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        started = time.perf_counter()
+        if self.latency_seconds:
+            await asyncio.sleep(self.latency_seconds)
+
+        index, text = last_user_text(llm_request.contents)
+        turn = self.turns.get(text)
+        if turn is None:
+            parts = [types.Part(text=f"No script for: {text}")]
+        else:
+            step = sum(
+                1 for content in llm_request.contents[index + 1:]
+                if content.role == "model" and any(part.function_call for part in content.parts or [])
+            )
+            steps = turn.get("tool_calls", [])
+            if step < len(steps):
+                parts = [
+                    types.Part(function_call=types.FunctionCall(name=call["name"], args=call.get("args", {})))
+                    for call in steps[step]
+                ]
+            else:
+                parts = [types.Part(text=turn.get("reply", ""))]
+
+        timing = current_turn.get()
+        if timing is not None:
+            timing.model_seconds += time.perf_counter() - started
+            timing.model_calls += 1
+            if turn is None:
+                timing.error = f"No script for: {text}"
+        yield LlmResponse(content=types.Content(role="model", parts=parts))
+
+
+def start_tool_timer(tool, args, tool_context):
+    timing = current_turn.get()
+    if timing is not None:
+        timing.pending[tool_context.function_call_id] = time.perf_counter()
+    return None
+
+
+def stop_tool_timer(tool, args, tool_context, tool_response):
+    timing = current_turn.get()
+    if timing is None:
+        return None
+    started = timing.pending.pop(tool_context.function_call_id, None)
+    if started is not None:
+        seconds = time.perf_counter() - started
+        timing.tool_seconds += seconds
+        timing.tool_calls.append((tool.name, seconds, tool_error(tool_response)))
+    return None
+
+
+def tool_error(tool_response: Any) -> Optional[str]:
+    """The 'error' of a tool's JSON response, if any."""
+    if isinstance(tool_response, dict) and "result" in tool_response:
+        tool_response = tool_response["result"]
+    if isinstance(tool_response, str):
+        try:
+            tool_response = json.loads(tool_response)
+        except ValueError:
+            return None
+    return tool_response.get("error") if isinstance(tool_response, dict) else None
+
+
+def scripted_agent(conversations: List[dict], model_latency_ms: float):
+    """root_agent with the scripted model and tool timers; tools and callbacks are the real ones."""
+    turns = {turn["user"]: turn for conversation in conversations for turn in conversation["turns"]}
+    model = ScriptedLlm(model="scripted", turns=turns, latency_seconds=model_latency_ms / 1000)
+    return root_agent.model_copy(update={
+        "model": model,
+        "before_tool_callback": start_tool_timer,
+        "after_tool_callback": stop_tool_timer,
+    })
+
+
+async def run_session(runner: InMemoryRunner, conversation: dict, user_id: str) -> List[TurnTiming]:
+    """Run one scripted conversation in a new session."""
+    session = await runner.session_service.create_session(app_name=APP_NAME, user_id=user_id)
+    timings = []
+    for turn in conversation["turns"]:
+        timing = TurnTiming(conversation["name"])
+        token = current_turn.set(timing)
+        started = time.perf_counter()
+        try:
+            message = types.Content(role="user", parts=[types.Part(text=turn["user"])])
+            async for _ in runner.run_async(user_id=user_id, session_id=session.id, new_message=message):
+                pass
+        except Exception as e:
+            timing.error = f"{type(e).__name__}: {e}"
+        finally:
+            timing.seconds = time.perf_counter() - started
+            current_turn.reset(token)
+        timings.append(timing)
+    return timings
+
+
+async def run_sessions(runner: InMemoryRunner, conversations: List[dict], sessions: int, concurrency: int):
+    """Run the sessions, at most concurrency at a time; return (turn timings, wall seconds)."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def limited(i):
+        async with semaphore:
+            return await run_session(runner, conversations[i % len(conversations)], f"load-user-{i}")
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(limited(i) for i in range(sessions)))
+    return [timing for session in results for timing in session], time.perf_counter() - started
+
+
+def latency_record(seconds: List[float]) -> dict:
+    """Mean and percentiles in milliseconds."""
+    if not seconds:
+        return {"count": 0}
+    ms = np.asarray(seconds) * 1000
+    record = {"count": len(ms), "mean_ms": round(float(ms.mean()), 2)}
+    for p, value in zip(LATENCY_PERCENTILES, np.percentile(ms, LATENCY_PERCENTILES)):
+        record[f"p{p}_ms"] = round(float(value), 2)
+    return record
+
+
+def summarize(timings: List[TurnTiming], wall_seconds: float, sessions: int) -> dict:
+    """Throughput, per-turn breakdown and per-tool latency of a run."""
+    per_tool: Dict[str, List[float]] = {}
+    tool_errors: Dict[str, int] = {}
+    for timing in timings:
+        for name, seconds, error in timing.tool_calls:
+            per_tool.setdefault(name, []).append(seconds)
+            if error:
+                tool_errors[name] = tool_errors.get(name, 0) + 1
+
+    return {
+        "sessions": sessions,
+        "turns": len(timings),
+        "wall_seconds": round(wall_seconds, 3),
+        "sessions_per_second": round(sessions / wall_seconds, 2) if wall_seconds else None,
+        "turns_per_second": round(len(timings) / wall_seconds, 2) if wall_seconds else None,
+        "turn_latency": {
+            "total": latency_record([t.seconds for t in timings]),
+            "model_stub": latency_record([t.model_seconds for t in timings]),
+            "tools": latency_record([t.tool_seconds for t in timings]),
+            # Runner, session service, callbacks and event handling
+            "overhead": latency_record([max(t.seconds - t.model_seconds - t.tool_seconds, 0) for t in timings]),
+        },
+        "tools": {
+            name: dict(latency_record(seconds), errors=tool_errors.get(name, 0))
+            for name, seconds in sorted(per_tool.items())
+        },
+        "turn_errors": sorted({t.error for t in timings if t.error}),
+    }
+
+
+async def measure_memory(agent, conversations: List[dict], sessions: int, concurrency: int) -> dict:
+    """
+    Python heap per session from a tracemalloc pass on a fresh runner.
+
+    retained: what finished sessions keep (session events and state, stored results)
+    peak_in_flight: the peak above the baseline divided by the concurrent sessions
+    """
+    runner = InMemoryRunner(agent=agent, app_name=APP_NAME)
+    # Warm-up outside the trace so lazy imports and engine loads are not charged to sessions
+    await run_session(runner, conversations[0], "load-warmup")
+
+    tracemalloc.start()
+    try:
+        baseline, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        await run_sessions(runner, conversations, sessions, concurrency)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "sessions": sessions,
+        "retained_kb_per_session": round((current - baseline) / sessions / 1024, 1),
+        "peak_in_flight_kb_per_session": round((peak - baseline) / min(sessions, concurrency) / 1024, 1),
+    }
+
+
+async def run_load_test(
+    conversations: List[dict],
+    sessions: int,
+    concurrency: int,
+    model_latency_ms: float = 0.0,
+    memory_sessions: int = 0
+) -> dict:
+    """
+    Drive sessions through the ADK runner with the scripted model.
+
+    Returns:
+        Report dict (see summarize), with 'memory' when memory_sessions > 0
+    """
+    if sessions < 1 or concurrency < 1:
+        raise ValueError("sessions and concurrency must be at least 1")
+
+    agent = scripted_agent(conversations, model_latency_ms)
+    runner = InMemoryRunner(agent=agent, app_name=APP_NAME)
+
+    # One session per conversation first, so cold loads do not skew the measured run
+    for i, conversation in enumerate(conversations):
+        await run_session(runner, conversation, f"load-warmup-{i}")
+
+    timings, wall_seconds = await run_sessions(runner, conversations, sessions, concurrency)
+    report = summarize(timings, wall_seconds, sessions)
+    report.update({
+        "concurrency": concurrency,
+        "model_latency_ms": model_latency_ms,
+        "async_tools": config.use_async_tools,
+    })
+    if memory_sessions:
+        report["memory"] = await measure_memory(agent, conversations, memory_sessions, concurrency)
+    return report
+
+
+def print_report(report):
+    """Print throughput, the per-turn breakdown and per-tool latency."""
+    def cell(record, key, width=10):
+        value = record.get(key)
+        return f"{value:>{width}.1f}" if value is not None else f"{'-':>{width}}"
+
+    print(f"\n{report['sessions']:,} sessions ({report['turns']:,} turns), {report['concurrency']} concurrent, "
+          f"model stub {report['model_latency_ms']:.0f}ms, async tools {'on' if report['async_tools'] else 'off'}")
+    print(f"  {report['sessions_per_second']} sessions/s, {report['turns_per_second']} turns/s "
+          f"in {report['wall_seconds']:.2f}s")
+
+    print(f"\n{'Per turn':18s}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, record in report["turn_latency"].items():
+        print(f"{name:18s}" + "".join(cell(record, key) for key in ["mean_ms", "p50_ms", "p95_ms", "p99_ms"]))
+
+    print(f"\n{'Tool':28s}{'calls':>8}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}")
+    for name, record in report["tools"].items():
+        print(f"{name:28s}{record['count']:>8}{record['errors']:>8}{cell(record, 'p50_ms')}{cell(record, 'p95_ms')}")
+
+    if report.get("memory"):
+        memory = report["memory"]
+        print(f"\nMemory ({memory['sessions']} traced sessions): {memory['retained_kb_per_session']} KB retained "
+              f"per session, {memory['peak_in_flight_kb_per_session']} KB peak per in-flight session")
+
+    for error in report["turn_errors"]:
+        print(f"  ✗ {error}")
+
+
+def check_gates(report, args):
+    """Return the failed thresholds (throughput, turn latency and errors)."""
+    failures = []
+    if args.min_sessions_per_second is not None and report["sessions_per_second"] < args.min_sessions_per_second:
+        failures.append(f"{report['sessions_per_second']} sessions/s < {args.min_sessions_per_second}")
+    p95 = report["turn_latency"]["total"].get("p95_ms")
+    if args.max_turn_p95_ms is not None and p95 is not None and p95 > args.max_turn_p95_ms:
+        failures.append(f"turn p95 {p95}ms > {args.max_turn_p95_ms}ms")
+    if report["turn_errors"]:
+        failures.append(f"{len(report['turn_errors'])} distinct turn errors")
+    return failures
+
+
+def main():
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description="Scripted-model load test of the agent")
+    parser.add_argument("--scripts", type=Path, default=DEFAULT_SCRIPTS, help="Scripted conversations (JSON)")
+    parser.add_argument("--sessions", type=int, default=100, help="Sessions to run")
+    parser.add_argument("--concurrency", type=int, default=10, help="Sessions in flight at once")
+    parser.add_argument("--model-latency-ms", type=float, default=0.0,
+                        help="Simulated model latency per model call (0 measures the agent alone)")
+    parser.add_argument("--memory-sessions", type=int, default=50,
+                        help="Sessions in the tracemalloc memory pass (0 skips it)")
+    parser.add_argument("--output", type=Path, help="Write the full report as JSON")
+    parser.add_argument("--min-sessions-per-second", type=float, help="Fail below this throughput")
+    parser.add_argument("--max-turn-p95-ms", type=float, help="Fail when the p95 turn latency exceeds this")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("FedEx Market Intelligence - Scripted Load Test")
+    print("=" * 70)
+
+    if not config.demand_tensor_path:
+        print("\nWARNING: DEMAND_TENSOR_PATH is not set - tools will query BigQuery")
+
+    try:
+        conversations = load_scripts(args.scripts)
+        report = asyncio.run(run_load_test(
+            conversations, args.sessions, args.concurrency, args.model_latency_ms, args.memory_sessions
+        ))
+    except (OSError, ValueError, KeyError) as e:
+        print(f"\nERROR: {str(e)}")
+        sys.exit(1)
+
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✓ Report written to {args.output}")
+
+    failures = check_gates(report, args)
+    print("\n" + "=" * 70)
+    if failures:
+        print("✗ Load test gate failed: " + "; ".join(failures))
+        print("=" * 70)
+        sys.exit(1)
+    print("✓ Load test passed")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
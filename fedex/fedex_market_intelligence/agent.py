@@ -7,21 +7,14 @@ from google.adk.agents import LlmAgent
 from google.adk.agents.callback_context import CallbackContext
 from google.adk.tools import FunctionTool
 from google.genai import types
-import vertexai
 
 # Import configuration
 from fedex_market_intelligence.config import config
+from fedex_market_intelligence.shared_libraries.clients import init_vertexai, start_prewarm
 
 # Import tools
-from fedex_market_intelligence.tools import (
-    query_shipment_trends,
-    analyze_geographic_demand,
-    find_market_opportunities,
-    compare_markets,
-    forecast_demand,
-    get_demographics,
-    generate_map_visualization,
-)
+from fedex_market_intelligence import tools as sync_tools
+from fedex_market_intelligence.tools import async_tools
 
 # Import prompts
 from fedex_market_intelligence.prompt import SYSTEM_PROMPT
@@ -33,15 +26,15 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Initialize Vertex AI
-vertexai.init(project=config.project_id, location=config.location)
-logger.info(
-    f"Initialized Vertex AI with project={config.project_id}, location={config.location}"
-)
+# Vertex AI, the BigQuery client and pandas/NumPy load on first use, not at import;
+# optionally warm them up in the background right after startup
+if config.prewarm_on_start:
+    start_prewarm()
 
 
 def load_config_in_context(callback_context: CallbackContext):
     """Load configuration settings into the callback context on first use."""
+    init_vertexai()
     if "config" not in callback_context.state:
         callback_context.state["config"] = {
             "project_id": config.project_id,
@@ -51,14 +44,8 @@ def load_config_in_context(callback_context: CallbackContext):
         logger.debug("Loaded config into callback context")
 
 
-# Create function tools (FunctionTool automatically uses function name and docstring)
-query_shipment_trends_tool = FunctionTool(query_shipment_trends)
-analyze_geographic_demand_tool = FunctionTool(analyze_geographic_demand)
-find_market_opportunities_tool = FunctionTool(find_market_opportunities)
-compare_markets_tool = FunctionTool(compare_markets)
-forecast_demand_tool = FunctionTool(forecast_demand)
-get_demographics_tool = FunctionTool(get_demographics)
-generate_map_visualization_tool = FunctionTool(generate_map_visualization)
+# Async variants are awaited by ADK instead of holding a worker thread per call
+TOOLS = async_tools.TOOLS if config.use_async_tools else sync_tools.TOOLS
 
 
 # Main agent for deployment
@@ -66,15 +53,8 @@ root_agent = LlmAgent(
     name="fedex_market_intelligence_agent",
     model=config.root_agent_model,
     instruction=SYSTEM_PROMPT,
-    tools=[
-        query_shipment_trends_tool,
-        analyze_geographic_demand_tool,
-        find_market_opportunities_tool,
-        compare_markets_tool,
-        forecast_demand_tool,
-        get_demographics_tool,
-        generate_map_visualization_tool,
-    ],
+    # FunctionTool uses the function name and docstring
+    tools=[FunctionTool(tool) for tool in TOOLS],
     before_agent_callback=load_config_in_context,
     generate_content_config=types.GenerateContentConfig(
         temperature=config.temperature,
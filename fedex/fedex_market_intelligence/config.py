@@ -29,6 +29,53 @@ class Config:
         self.temperature: float = float(os.getenv("MODEL_TEMPERATURE", "0.1"))
         self.google_maps_api_key: Optional[str] = os.getenv("GOOGLE_MAPS_API_KEY")
         self.log_level: str = os.getenv("LOG_LEVEL", "INFO")
+        
+        # Session result store (handles passed between tools instead of raw rows)
+        self.result_store_max_handles: int = int(os.getenv("RESULT_STORE_MAX_HANDLES", "10"))
+        
+        # Results with at least this many rows are read via the BigQuery Storage API (Arrow)
+        self.arrow_min_rows: int = int(os.getenv("ARROW_MIN_ROWS", "5000"))
+        
+        # Async tools: awaited by ADK instead of blocking a worker thread per call
+        self.use_async_tools: bool = os.getenv("USE_ASYNC_TOOLS", "true").lower() == "true"
+        # Admission control per backend (per replica) for the async tools: max in-flight
+        # calls, max callers queued for a slot, and how long a caller may wait (seconds)
+        self.bigquery_max_concurrency: int = int(os.getenv("BIGQUERY_MAX_CONCURRENCY", "20"))
+        self.census_max_concurrency: int = int(os.getenv("CENSUS_MAX_CONCURRENCY", "5"))
+        self.bigquery_max_queue: int = int(os.getenv("BIGQUERY_MAX_QUEUE", "100"))
+        self.census_max_queue: int = int(os.getenv("CENSUS_MAX_QUEUE", "50"))
+        self.admission_queue_timeout: float = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "30"))
+        
+        # Memory-mapped demand tensor built by data/build_demand_tensor.py (SQL is used when unset)
+        self.demand_tensor_path: Optional[str] = os.getenv("DEMAND_TENSOR_PATH")
+        
+        # Precomputed seasonality / trend features built by data/build_demand_features.py
+        self.demand_features_path: Optional[str] = os.getenv("DEMAND_FEATURES_PATH")
+        
+        # Precomputed demand anomalies built by data/build_demand_anomalies.py (scanned
+        # from the demand tensor on first use when unset)
+        self.anomaly_index_path: Optional[str] = os.getenv("ANOMALY_INDEX_PATH")
+        
+        # Sparse origin x destination flow matrices built by data/build_od_matrices.py
+        self.od_matrices_path: Optional[str] = os.getenv("OD_MATRICES_PATH")
+        
+        # Category co-demand matrices built by data/build_category_affinity.py (computed
+        # from the demand tensor on first use when unset)
+        self.category_affinity_path: Optional[str] = os.getenv("CATEGORY_AFFINITY_PATH")
+        
+        # Shipper / subcategory concentration cube built by data/build_concentration_cube.py
+        self.concentration_cube_path: Optional[str] = os.getenv("CONCENTRATION_CUBE_PATH")
+        
+        # Most candidate sites select_sites scores (the highest-demand ZIPs); every ZIP
+        # stays a demand point, so the distance matrix is ZIPs x this
+        self.max_site_candidates: int = int(os.getenv("MAX_SITE_CANDIDATES", "500"))
+        
+        # ZCTA demographics table with segment flags (data/load_zcta_demographics.py),
+        # joined by analyze_geographic_demand when set (the table is optional)
+        self.zcta_demographics_table: str = os.getenv("ZCTA_DEMOGRAPHICS_TABLE", "")
+        
+        # Load heavy modules and clients in a background thread right after startup
+        self.prewarm_on_start: bool = os.getenv("PREWARM_ON_START", "false").lower() == "true"
     
     def validate(self) -> bool:
         """Validate that all required configuration is present."""
@@ -0,0 +1 @@
+"""Shared libraries for FedEx Market Intelligence Agent tools."""
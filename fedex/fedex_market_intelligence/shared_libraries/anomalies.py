@@ -0,0 +1,218 @@
+"""Demand anomaly scan and month index (see data/build_demand_anomalies.py).
+
+Every zip x category series of the demand tensor is scanned in one pass per
+category: shipments are deseasonalized with the series' own calendar-month
+indices (leaving each month out of its own index, so a spike cannot explain
+itself away), and each month is scored against the trailing 12 months with a
+robust (median / MAD) modified z-score. Months scoring beyond the threshold on series
+with meaningful volume are kept, with their expected (seasonal) value.
+
+The anomalies are grouped by month once, so listing the top anomalies of a
+month for any market is a filter over one small frame. The index is read from
+ANOMALY_INDEX_PATH, or scanned from the demand tensor on first use when only
+DEMAND_TENSOR_PATH is set.
+"""
+
+from __future__ import annotations
+
+import logging
+import warnings
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from fedex_market_intelligence.config import config
+from fedex_market_intelligence.shared_libraries.demand_tensor import DemandTensor, load_demand_tensor
+from fedex_market_intelligence.shared_libraries.lazy import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+logger = logging.getLogger(__name__)
+
+# Months of history each month is scored against
+TRAILING_MONTHS = 12
+
+# |modified z| at or above this is an anomaly (Iglewicz & Hoaglin)
+Z_THRESHOLD = 3.5
+
+# Series expected to ship fewer than this in the month are too noisy to flag
+MIN_EXPECTED_SHIPMENTS = 20
+
+# Scores are capped so a break from a very steady history stays readable
+MAX_ABS_Z = 99.0
+
+# DataFrame.attrs key (kept in the parquet file) listing every month the scan scored
+SCANNED_MONTHS_ATTR = "scanned_months"
+
+ANOMALY_COLUMNS = [
+    'year_month', 'zip_code', 'product_category', 'city', 'state', 'metro_area', 'region', 'lat', 'lng',
+    'actual_shipments', 'expected_shipments', 'change_pct', 'robust_z', 'direction'
+]
+
+
+def modified_z_scores(values: np.ndarray, window: int = TRAILING_MONTHS):
+    """
+    Robust z-score of each month against the window months before it.
+
+    The MAD is floored at the MAD of Poisson counting noise (0.6745 * sqrt(median)),
+    so a steady low-volume series does not flag every wobble.
+
+    Args:
+        values: [series, month] deseasonalized shipments (NaN where unobserved)
+
+    Returns:
+        (z, median) - [series, month - window] arrays for months window.. of values
+    """
+    history = np.lib.stride_tricks.sliding_window_view(values, window, axis=1)[:, :-1]
+    current = values[:, window:]
+    # All-NaN windows (no history) give NaN scores, which are never flagged
+    with np.errstate(invalid="ignore", divide="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        median = np.nanmedian(history, axis=2)
+        mad = np.nanmedian(np.abs(history - median[:, :, None]), axis=2)
+        mad = np.maximum(mad, 0.6745 * np.sqrt(np.maximum(median, 0)))
+        z = 0.6745 * (current - median) / mad
+    return np.clip(z, -MAX_ABS_Z, MAX_ABS_Z), median
+
+
+def scan_category(tensor: DemandTensor, category: str, threshold: float, min_expected: float) -> pd.DataFrame:
+    """Anomalies of every ZIP series of one category."""
+    shipments = np.asarray(tensor.slice(category, "total_shipments"), dtype=np.float64).T  # zip x month
+    observed = np.asarray(tensor.slice(category, "demand_rows")).T > 0
+    month_numbers = np.asarray(tensor.month_numbers)
+
+    # Seasonal index per ZIP and calendar month over all history
+    y = np.where(observed, shipments, 0.0)
+    n = observed.astype(np.float64)
+    onehot = (month_numbers[:, None] == np.arange(1, 13)[None, :]).astype(np.float64)
+    month_sums = (y @ onehot)[:, month_numbers - 1]
+    month_counts = (n @ onehot)[:, month_numbers - 1]
+    overall = (y.sum(axis=1) / n.sum(axis=1))[:, None]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # Each month is left out of its own calendar-month index
+        factor = (month_sums - y) / (month_counts - n) / overall
+    factor = np.where(np.isfinite(factor) & (factor > 0), factor, 1.0)
+    deseasonalized = np.where(observed, shipments / factor, np.nan)
+
+    z, median = modified_z_scores(deseasonalized)
+    expected = median * factor[:, TRAILING_MONTHS:]
+    actual = shipments[:, TRAILING_MONTHS:]
+    flagged = (
+        observed[:, TRAILING_MONTHS:]
+        & np.isfinite(z)
+        & (np.abs(z) >= threshold)
+        & (expected >= min_expected)
+    )
+
+    zip_positions, month_positions = np.nonzero(flagged)
+    expected = expected[flagged]
+    actual = actual[flagged]
+    z = z[flagged]
+    return pd.DataFrame({
+        'year_month': np.asarray(tensor.months)[month_positions + TRAILING_MONTHS],
+        'zip_code': np.asarray(tensor.zip_codes)[zip_positions],
+        'product_category': category,
+        'city': tensor.zip_labels["city"][zip_positions],
+        'state': tensor.zip_labels["state"][zip_positions],
+        'metro_area': tensor.zip_labels["metro"][zip_positions],
+        'region': tensor.zip_labels["region"][zip_positions],
+        'lat': np.asarray(tensor.zip_coords)[zip_positions, 0],
+        'lng': np.asarray(tensor.zip_coords)[zip_positions, 1],
+        'actual_shipments': actual.round().astype(np.int64),
+        'expected_shipments': expected.round().astype(np.int64),
+        'change_pct': ((actual - expected) / expected * 100).round(1),
+        'robust_z': z.round(2),
+        'direction': np.where(z > 0, 'spike', 'collapse'),
+    }, columns=ANOMALY_COLUMNS)
+
+
+def scan_anomalies(
+    tensor: DemandTensor,
+    threshold: float = Z_THRESHOLD,
+    min_expected: float = MIN_EXPECTED_SHIPMENTS
+) -> pd.DataFrame:
+    """Anomalies of every zip x category series of the tensor (scored months in attrs)."""
+    frames = [scan_category(tensor, category, threshold, min_expected) for category in tensor.categories]
+    anomalies = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=ANOMALY_COLUMNS)
+    anomalies.attrs[SCANNED_MONTHS_ATTR] = scanned_months(tensor)
+    return anomalies
+
+
+def scanned_months(tensor: DemandTensor) -> List[str]:
+    """Months the scan scores: all but the first TRAILING_MONTHS, which have no history."""
+    return list(tensor.months[TRAILING_MONTHS:])
+
+
+class AnomalyIndex:
+    """Anomalies grouped by month, most extreme first within each month.
+
+    months lists every scanned month, including those without anomalies (taken
+    from the frame's attrs; frames without them fall back to the anomaly months).
+    """
+
+    def __init__(self, frame: pd.DataFrame, months: Optional[List[str]] = None):
+        if months is None:
+            months = frame.attrs.get(SCANNED_MONTHS_ATTR)
+        frame = frame.assign(abs_z=frame['robust_z'].abs()).sort_values(
+            ['year_month', 'abs_z'], ascending=[True, False]
+        )
+        self.by_month: Dict[str, pd.DataFrame] = {
+            month: group.drop(columns='abs_z').reset_index(drop=True)
+            for month, group in frame.groupby('year_month', sort=True)
+        }
+        self.months: List[str] = sorted(set(months) | set(self.by_month)) if months is not None else list(self.by_month)
+
+    def __len__(self) -> int:
+        return sum(len(group) for group in self.by_month.values())
+
+    def for_month(
+        self,
+        year_month: str,
+        market: Optional[str] = None,
+        product_category: Optional[str] = None,
+        direction: Optional[str] = None
+    ) -> pd.DataFrame:
+        """Anomalies of one month, filtered like the SQL tools filter locations."""
+        frame = self.by_month.get(year_month)
+        if frame is None:
+            return pd.DataFrame(columns=ANOMALY_COLUMNS)
+
+        mask = np.ones(len(frame), dtype=bool)
+        if product_category:
+            mask &= (frame['product_category'] == product_category).to_numpy()
+        if direction:
+            mask &= (frame['direction'] == direction).to_numpy()
+        if market:
+            market = market.strip()
+            if len(market) == 5 and market.isdigit():
+                mask &= (frame['zip_code'] == market).to_numpy()
+            elif len(market) == 2 and market.isalpha():
+                mask &= (frame['state'].str.upper() == market.upper()).to_numpy()
+            else:
+                needle = market.lower()
+                matches = np.zeros(len(frame), dtype=bool)
+                for column in ['city', 'metro_area', 'region', 'state']:
+                    matches |= frame[column].fillna('').str.lower().str.contains(needle, regex=False).to_numpy()
+                mask &= matches
+        return frame[mask]
+
+
+@lru_cache(maxsize=1)
+def load_anomaly_index() -> Optional[AnomalyIndex]:
+    """Load (or scan, from the demand tensor) the anomaly index once per process."""
+    if config.anomaly_index_path:
+        path = Path(config.anomaly_index_path)
+        try:
+            index = AnomalyIndex(pd.read_parquet(path, columns=ANOMALY_COLUMNS))
+            logger.info(f"Loaded {len(index):,} anomalies from {path}")
+            return index
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Anomaly index at {path} not usable: {e}")
+
+    tensor = load_demand_tensor()
+    if tensor is None:
+        return None
+    index = AnomalyIndex(scan_anomalies(tensor))
+    logger.info(f"Scanned {len(index):,} anomalies from the demand tensor")
+    return index
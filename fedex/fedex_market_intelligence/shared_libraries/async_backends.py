@@ -0,0 +1,147 @@
+"""Async access to the agent's backends with admission control per backend.
+
+The async tools never block the event loop: BigQuery jobs are submitted and
+polled from worker threads with an async backoff between polls, so hundreds of
+sessions can wait on their jobs while only a handful of threads are busy at any
+moment. Each backend gets its own admission controller so a burst against one
+API (e.g. the Census API) cannot starve calls to another, and identical
+concurrent queries are coalesced onto one job (see coalescing.py).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import weakref
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, Optional, Tuple
+
+from fedex_market_intelligence.config import config
+from fedex_market_intelligence.shared_libraries.bigquery_results import FrameResult, read_frame
+from fedex_market_intelligence.shared_libraries.coalescing import bigquery_flight, flight_key
+
+if TYPE_CHECKING:
+    from google.cloud import bigquery
+    from google.cloud.bigquery.table import RowIterator
+
+# Seconds between job status polls: start fast for small queries, back off for big ones
+POLL_INITIAL_DELAY = 0.1
+POLL_MAX_DELAY = 2.0
+POLL_BACKOFF = 1.5
+
+
+class AdmissionRejected(Exception):
+    """Raised when a backend call cannot be admitted (queue full or deadline passed)."""
+
+
+class AdmissionController:
+    """Caps in-flight calls to one backend and bounds the queue waiting for a slot.
+
+    Calls beyond max_concurrency wait in a queue of at most max_queue callers for
+    up to queue_timeout seconds; anything past that is rejected right away instead
+    of piling up against the backend's quota.
+
+    asyncio primitives are bound to the event loop that first uses them, so one
+    semaphore is kept per running loop (tests and scripts may start several).
+    """
+
+    def __init__(self, name: str, max_concurrency: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self.waiting = 0
+        self.rejected = 0
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphores[loop] = semaphore
+        return semaphore
+
+    @asynccontextmanager
+    async def admit(self):
+        """Hold one of the backend's slots for the duration of the block."""
+        semaphore = self._semaphore()
+        if not semaphore.locked():
+            # A free slot is taken without yielding, so the check above cannot go stale
+            await semaphore.acquire()
+        elif self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise AdmissionRejected(
+                f"{self.name} is at capacity ({self.max_concurrency} running, {self.waiting} queued) - try again shortly"
+            )
+        else:
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(semaphore.acquire(), timeout=self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                raise AdmissionRejected(
+                    f"{self.name} request waited more than {self.queue_timeout:g}s for a free slot - try again shortly"
+                )
+            finally:
+                self.waiting -= 1
+
+        try:
+            yield
+        finally:
+            semaphore.release()
+
+
+bigquery_admission = AdmissionController(
+    "BigQuery", config.bigquery_max_concurrency, config.bigquery_max_queue, config.admission_queue_timeout
+)
+census_admission = AdmissionController(
+    "Census API", config.census_max_concurrency, config.census_max_queue, config.admission_queue_timeout
+)
+
+
+async def run_query(
+    client: bigquery.Client,
+    query: str,
+    max_results: Optional[int] = None
+) -> Tuple[bigquery.QueryJob, RowIterator]:
+    """
+    Run a BigQuery query without blocking the event loop.
+
+    Args:
+        client: BigQuery client
+        query: SQL to run
+        max_results: Rows to fetch in the first page (None for all)
+
+    Returns:
+        (query_job, rows) - the same pair the sync tools get from client.query().result()
+    """
+    async with bigquery_admission.admit():
+        query_job = await asyncio.to_thread(client.query, query)
+
+        delay = POLL_INITIAL_DELAY
+        while not await asyncio.to_thread(query_job.done):
+            await asyncio.sleep(delay)
+            delay = min(delay * POLL_BACKOFF, POLL_MAX_DELAY)
+
+        # The job is finished, so this only fetches the first page of rows
+        rows = await asyncio.to_thread(query_job.result, max_results=max_results)
+        return query_job, rows
+
+
+async def run_shared_query(
+    client: bigquery.Client,
+    query: str,
+    max_results: Optional[int] = None
+) -> Tuple[bigquery.QueryJob, FrameResult]:
+    """
+    Like run_query, but identical concurrent queries share one job and one read.
+
+    A row iterator can only be consumed once, so the shared result is read into
+    a DataFrame first; every caller builds its own response from a copy of it.
+    """
+    async def execute():
+        query_job, rows = await run_query(client, query, max_results)
+        frame = await asyncio.to_thread(read_frame, rows, max_results)
+        return query_job, FrameResult(frame, rows.total_rows)
+
+    return await bigquery_flight.do(flight_key(query, max_results), execute)
@@ -0,0 +1,110 @@
+"""Columnar reading of BigQuery query results.
+
+Every result lands in a pandas DataFrame, so rounding, derived metrics and
+summary statistics run vectorized instead of in per-row Python loops.
+
+Whole-table reads (read_frame(..., bulk=True), e.g. the ZIP centroids) and
+unpaged results of at least ARROW_MIN_ROWS rows are downloaded through the
+BigQuery Storage Read API as Arrow record batches. Tool results are paged or
+aggregated down to a few hundred rows, where the Storage API session setup
+costs more than it saves, so they are read from the row iterator.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Optional, Union
+
+from fedex_market_intelligence.config import config
+from fedex_market_intelligence.shared_libraries.lazy import lazy_import
+
+if TYPE_CHECKING:
+    from google.cloud.bigquery.table import RowIterator
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+
+class FrameResult:
+    """A query result already read into a DataFrame.
+
+    Stands in for the row iterator when one result is shared by several callers
+    (a RowIterator can only be consumed once); each reader gets its own copy.
+    """
+
+    def __init__(self, frame: pd.DataFrame, total_rows: Optional[int]):
+        self.frame = frame
+        self.total_rows = total_rows
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(frame_to_records(self.frame))
+
+
+def read_frame(
+    rows: Union[RowIterator, FrameResult],
+    max_rows: Optional[int] = None,
+    bulk: bool = False
+) -> pd.DataFrame:
+    """
+    Read a BigQuery row iterator into a DataFrame, using Arrow for large results.
+
+    Args:
+        rows: Row iterator from QueryJob.result() or Client.list_rows(), or an
+              already-read FrameResult
+        max_rows: Page size the iterator was limited to, if any
+        bulk: Whole-table read; use the Storage Read API whatever the row count
+
+    Returns:
+        DataFrame with one column per result field
+    """
+    if isinstance(rows, FrameResult):
+        return rows.frame.copy()
+
+    expected_rows = rows.total_rows or 0
+    if max_rows is not None:
+        expected_rows = min(expected_rows, max_rows)
+
+    if (bulk and max_rows is None) or expected_rows >= config.arrow_min_rows:
+        # The Storage Read API cannot honour max_results; the client falls back to
+        # Arrow-over-REST pages in that case, which is still columnar
+        return rows.to_dataframe(create_bqstorage_client=max_rows is None)
+
+    columns = [field.name for field in rows.schema] if rows.schema else None
+    return pd.DataFrame([dict(row) for row in rows], columns=columns)
+
+
+def round_columns(df: pd.DataFrame, columns: Iterable[str], decimals: int = 2) -> pd.DataFrame:
+    """Round the given numeric columns in place (columns missing from df are ignored)."""
+    present = [col for col in columns if col in df.columns]
+    if present:
+        df[present] = df[present].astype("float64").round(decimals)
+    return df
+
+
+def column_sum(df: pd.DataFrame, column: str) -> float:
+    """Sum a column, treating a missing column or nulls as zero."""
+    if column not in df.columns or df.empty:
+        return 0
+    return to_python(df[column].fillna(0).sum())
+
+
+def column_mean(df: pd.DataFrame, column: str) -> float:
+    """Mean of a column with nulls counted as zero (matches the per-row defaults)."""
+    if column not in df.columns or df.empty:
+        return 0
+    return to_python(df[column].fillna(0).mean())
+
+
+def to_python(value: Any) -> Any:
+    """numpy scalar -> Python scalar (object-dtype reductions already return Python values)."""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def frame_to_records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Convert a DataFrame to JSON-friendly row dicts (NaN/NA -> None, numpy -> Python)."""
+    if df.empty:
+        return []
+    cleaned = df.astype(object).where(df.notna(), None)
+    return [
+        {key: to_python(value) for key, value in row.items()}
+        for row in cleaned.to_dict(orient="records")
+    ]
@@ -0,0 +1,159 @@
+"""Catchment areas of candidate locations over every ZIP centroid.
+
+All ZIP centroids (from the demand tensor when it is configured, otherwise one
+geographic_metadata query per process) sit in one coordinate array. The
+distances from every ZIP to a set of candidate locations are a single
+vectorized haversine call, cached per candidate set, so repeated questions
+about the same locations - other radii, rings or categories - reuse them.
+
+A catchment is either every ZIP within the radius of a location ('radius',
+catchments may overlap) or the ZIPs within the radius that are closer to it
+than to any other candidate ('nearest'). Catchment totals are matrix products
+of the ZIP x catchment membership with per-ZIP period totals.
+"""
+
+from __future__ import annotations
+
+import logging
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from fedex_market_intelligence.config import config
+from fedex_market_intelligence.shared_libraries.bigquery_results import read_frame
+from fedex_market_intelligence.shared_libraries.clients import get_bigquery_client
+from fedex_market_intelligence.shared_libraries.demand_tensor import load_demand_tensor, period_mask
+from fedex_market_intelligence.shared_libraries.lazy import lazy_import
+from fedex_market_intelligence.shared_libraries.site_selection import haversine_miles
+
+np = lazy_import("numpy")
+
+logger = logging.getLogger(__name__)
+
+ASSIGNMENTS = ["nearest", "radius"]
+
+# Candidate sets whose distance columns are kept (each is 4 bytes x ZIPs x candidates)
+DISTANCE_CACHE_SIZE = 32
+
+# Monthly per-ZIP metrics a catchment is summarized from. Averaged metrics are
+# stored as sums over source rows, with demand_rows / share_rows as the counts
+CATCHMENT_METRICS = [
+    "total_shipments",
+    "total_value",
+    "unique_shippers",
+    "demand_rows",
+    "market_concentration_index",
+    "major_brand_volume",
+    "small_business_volume",
+    "share_rows",
+]
+
+
+class ZipPoints:
+    """Every ZIP code with its centroid and city / state / metro labels."""
+
+    def __init__(self, zip_codes: List[str], coords: np.ndarray, labels: Dict[str, np.ndarray]):
+        self.zip_codes = np.asarray(zip_codes, dtype=object)
+        self.coords = np.asarray(coords, dtype=np.float64)
+        self.labels = labels
+        self.index = {z: i for i, z in enumerate(zip_codes)}
+
+
+@lru_cache(maxsize=1)
+def load_zip_points() -> ZipPoints:
+    """ZIP centroids from the demand tensor, or from geographic_metadata (once per process)."""
+    tensor = load_demand_tensor()
+    if tensor is not None:
+        return ZipPoints(
+            tensor.zip_codes,
+            np.asarray(tensor.zip_coords),
+            {"city": tensor.zip_labels["city"], "state": tensor.zip_labels["state"], "metro": tensor.zip_labels["metro"]}
+        )
+
+    query = f"""
+        SELECT zip_code, city, state, metro_area, lat, lng
+        FROM `{config.project_id}.{config.dataset_id}.geographic_metadata`
+        WHERE lat IS NOT NULL AND lng IS NOT NULL
+        ORDER BY zip_code
+    """
+    geo = read_frame(get_bigquery_client().query(query).result(), bulk=True)
+    geo = geo.drop_duplicates("zip_code").reset_index(drop=True)
+    logger.info(f"Loaded {len(geo):,} ZIP centroids from geographic_metadata")
+    return ZipPoints(
+        geo["zip_code"].astype(str).tolist(),
+        geo[["lat", "lng"]].to_numpy(dtype=np.float64),
+        {
+            "city": geo["city"].fillna("").astype(str).to_numpy(dtype=object),
+            "state": geo["state"].fillna("").astype(str).to_numpy(dtype=object),
+            "metro": geo["metro_area"].fillna("").astype(str).to_numpy(dtype=object),
+        }
+    )
+
+
+@lru_cache(maxsize=DISTANCE_CACHE_SIZE)
+def candidate_distances(candidates: Tuple[str, ...]) -> np.ndarray:
+    """
+    [zip, candidate] distances in miles from every ZIP centroid to each candidate ZIP.
+
+    Cached per candidate tuple; the array is shared between calls, so it is read-only.
+    ZIPs without coordinates get NaN, which no radius test accepts.
+    """
+    points = load_zip_points()
+    positions = [points.index[z] for z in candidates]
+    distance = haversine_miles(
+        points.coords[:, 0], points.coords[:, 1], points.coords[positions, 0], points.coords[positions, 1]
+    ).astype(np.float32)
+    distance.flags.writeable = False
+    return distance
+
+
+def catchment_membership(
+    distance: np.ndarray,
+    radius_miles: float,
+    assignment: str
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    ZIPs in any catchment and their [zip, candidate] membership.
+
+    Returns:
+        (positions of the ZIPs within the radius of some candidate,
+         boolean membership of those ZIPs in each candidate's catchment)
+    """
+    within = distance <= radius_miles
+    positions = np.flatnonzero(within.any(axis=1))
+    membership = within[positions]
+    if assignment == "nearest":
+        # Ties go to the first listed candidate
+        nearest = np.argmin(np.where(membership, distance[positions], np.inf), axis=1)
+        membership = np.zeros_like(membership)
+        membership[np.arange(len(positions)), nearest] = True
+    return positions, membership
+
+
+def period_totals(
+    monthly: Dict[str, np.ndarray],
+    month_serials: np.ndarray,
+    time_period: str
+) -> Dict[str, np.ndarray]:
+    """
+    Per-ZIP totals of each [month, zip] metric over the period.
+
+    Adds 'comparable_shipments' and 'prior_shipments': shipments in the period's
+    months that have data one year earlier, and in those year-earlier months, so
+    growth compares the same months even when the history is shorter than the period.
+    """
+    months = period_mask(month_serials, time_period)
+    totals = {name: values[months].sum(axis=0, dtype=np.float64) for name, values in monthly.items()}
+
+    comparable = months & np.isin(month_serials - 12, month_serials)
+    prior = np.isin(month_serials, month_serials[comparable] - 12)
+    shipments = monthly["total_shipments"]
+    totals["comparable_shipments"] = shipments[comparable].sum(axis=0, dtype=np.float64)
+    totals["prior_shipments"] = shipments[prior].sum(axis=0, dtype=np.float64)
+    return totals
+
+
+def ring_radii(radius_miles: float, ring_miles: Optional[List[float]]) -> List[float]:
+    """Ring radii up to and including the catchment radius (quarter, half and full radius by default)."""
+    if not ring_miles:
+        ring_miles = [radius_miles / 4, radius_miles / 2]
+    return sorted({float(r) for r in ring_miles if 0 < r < radius_miles} | {float(radius_miles)})
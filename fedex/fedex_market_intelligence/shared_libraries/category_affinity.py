@@ -0,0 +1,194 @@
+"""Category co-demand matrices (see data/build_category_affinity.py).
+
+For every market - the nation and each region, state and metro - and every pair
+of product categories, two measures of categories rising together in the same
+ZIP codes over the affinity period:
+
+    correlation  Pearson correlation of log shipments over the market's
+                 ZIP x month cells, after removing each ZIP's mean and each
+                 month's mean per category, so large ZIPs and shared
+                 seasonality do not make every pair look related
+    lift         how much more often two categories both over-index in a ZIP
+                 (their share of the ZIP's shipments above their share of the
+                 market) than if they were independent; support is the number
+                 of ZIPs where both do
+
+Each measure is one [market, category, category] array, so a request is an
+index lookup. The matrices are read from CATEGORY_AFFINITY_PATH, or computed
+from the demand tensor on first use when only DEMAND_TENSOR_PATH is set.
+"""
+
+from __future__ import annotations
+
+import logging
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Optional
+
+from fedex_market_intelligence.config import config
+from fedex_market_intelligence.shared_libraries.demand_tensor import DemandTensor, load_demand_tensor
+from fedex_market_intelligence.shared_libraries.feature_store import NATIONAL_KEY
+from fedex_market_intelligence.shared_libraries.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+logger = logging.getLogger(__name__)
+
+AFFINITY_LEVELS = ["national", "region", "state", "metro"]
+
+# Months the matrices are computed over (a tool time_period value)
+AFFINITY_PERIOD = "last_24_months"
+
+
+def correlation_matrix(shipments: np.ndarray) -> np.ndarray:
+    """
+    [category, category] correlation of two-way demeaned log shipments.
+
+    Args:
+        shipments: [category, month, zip] shipments of one market
+
+    Returns:
+        Correlations, NaN for categories without variation in the market
+    """
+    x = np.log1p(np.maximum(shipments, 0))
+    x = x - x.mean(axis=1, keepdims=True) - x.mean(axis=2, keepdims=True) + x.mean(axis=(1, 2), keepdims=True)
+    x = x.reshape(len(x), -1)
+    norms = np.sqrt((x * x).sum(axis=1))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        correlation = (x @ x.T) / np.outer(norms, norms)
+    return np.where(np.isfinite(correlation), np.clip(correlation, -1, 1), np.nan)
+
+
+def lift_matrix(shipments: np.ndarray):
+    """
+    [category, category] lift and support of categories over-indexing in the same ZIPs.
+
+    Args:
+        shipments: [category, month, zip] shipments of one market
+
+    Returns:
+        (lift, NaN where a category never over-indexes; support, ZIPs where both over-index)
+    """
+    totals = shipments.sum(axis=1)
+    zip_totals = totals.sum(axis=0)
+    active = zip_totals > 0
+    totals, zip_totals = totals[:, active], zip_totals[active]
+    if not active.any():
+        size = len(shipments)
+        return np.full((size, size), np.nan), np.zeros((size, size), dtype=np.int32)
+
+    market_share = totals.sum(axis=1) / totals.sum()
+    over_index = ((totals / zip_totals) > market_share[:, None]).astype(np.float64)
+    support = over_index @ over_index.T
+    rate = over_index.mean(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        lift = (support / active.sum()) / np.outer(rate, rate)
+    return np.where(np.isfinite(lift), lift, np.nan), support.astype(np.int32)
+
+
+class CategoryAffinity:
+    """Correlation, lift and support matrices of every market, indexed by (level, key)."""
+
+    def __init__(self, categories, levels, keys, zip_counts, correlation, lift, support, as_of: str):
+        self.categories: List[str] = [str(c) for c in categories]
+        self.levels = np.asarray(levels, dtype=str)
+        self.keys = np.asarray(keys, dtype=str)
+        self.zip_counts = np.asarray(zip_counts)
+        self.correlation = np.asarray(correlation)
+        self.lift = np.asarray(lift)
+        self.support = np.asarray(support)
+        self.as_of = str(as_of)
+        self.category_index = {c: i for i, c in enumerate(self.categories)}
+        self.lookup_keys = np.char.upper(self.keys)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def has_category(self, category: str) -> bool:
+        return category in self.category_index
+
+    def find_market(self, level: str, key: str) -> Optional[int]:
+        """Position of the market with this level and key (case-insensitive), or None."""
+        matches = np.flatnonzero((self.levels == level) & (self.lookup_keys == key.upper()))
+        return int(matches[0]) if len(matches) else None
+
+    def markets_containing(self, level: str, needle: str) -> List[int]:
+        """Positions of the markets of a level whose key contains needle (case-insensitive)."""
+        needle = needle.upper()
+        return [int(i) for i in np.flatnonzero(self.levels == level) if needle in self.lookup_keys[i]]
+
+    def save(self, path: Path) -> None:
+        np.savez_compressed(
+            path,
+            categories=np.asarray(self.categories, dtype=str),
+            levels=self.levels,
+            keys=self.keys,
+            zip_counts=self.zip_counts,
+            correlation=self.correlation.astype(np.float32),
+            lift=self.lift.astype(np.float32),
+            support=self.support,
+            as_of=np.asarray(self.as_of),
+        )
+
+    @classmethod
+    def load(cls, path: Path) -> "CategoryAffinity":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                data["categories"], data["levels"], data["keys"], data["zip_counts"],
+                data["correlation"], data["lift"], data["support"], data["as_of"].item()
+            )
+
+
+def compute_affinity(tensor: DemandTensor, levels=AFFINITY_LEVELS) -> CategoryAffinity:
+    """Affinity matrices of every market of the given levels, from the demand tensor."""
+    months = tensor.month_mask(AFFINITY_PERIOD)
+    shipments = np.stack([
+        np.asarray(tensor.slice(category, "total_shipments")[months], dtype=np.float64)
+        for category in tensor.categories
+    ])
+    as_of = tensor.months[int(np.flatnonzero(months)[-1])] if months.any() else ""
+
+    market_levels, keys, zip_counts, correlations, lifts, supports = [], [], [], [], [], []
+    for level in levels:
+        if level == "national":
+            markets = [(NATIONAL_KEY, np.ones(len(tensor.zip_codes), dtype=bool))]
+        else:
+            membership = tensor.membership[level]
+            markets = [(key, np.asarray(membership[i]) > 0) for i, key in enumerate(tensor.group_labels[level])]
+
+        for key, zips in markets:
+            market = shipments[:, :, zips]
+            lift, support = lift_matrix(market)
+            market_levels.append(level)
+            keys.append(key)
+            zip_counts.append(int((market.sum(axis=(0, 1)) > 0).sum()))
+            correlations.append(correlation_matrix(market))
+            lifts.append(lift)
+            supports.append(support)
+
+    size = len(tensor.categories)
+    return CategoryAffinity(
+        tensor.categories, market_levels, keys, np.asarray(zip_counts, dtype=np.int32),
+        np.asarray(correlations).reshape(-1, size, size), np.asarray(lifts).reshape(-1, size, size),
+        np.asarray(supports, dtype=np.int32).reshape(-1, size, size), as_of
+    )
+
+
+@lru_cache(maxsize=1)
+def load_category_affinity() -> Optional[CategoryAffinity]:
+    """Load (or compute, from the demand tensor) the category affinity matrices once per process."""
+    if config.category_affinity_path:
+        path = Path(config.category_affinity_path)
+        try:
+            affinity = CategoryAffinity.load(path)
+            logger.info(f"Loaded category affinity for {len(affinity):,} markets from {path}")
+            return affinity
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Category affinity at {path} not usable: {e}")
+
+    tensor = load_demand_tensor()
+    if tensor is None:
+        return None
+    affinity = compute_affinity(tensor)
+    logger.info(f"Computed category affinity for {len(affinity):,} markets from the demand tensor")
+    return affinity
@@ -0,0 +1,320 @@
+"""Free-text product category resolution over category_hierarchy.
+
+Tools take category IDs like 'home_fitness', but the model often passes what
+the user said ('Home Fitness', 'dog food', 'electroncs'). Every tool resolves
+its product_category through this index before it queries anything, so a
+near miss costs a dictionary lookup instead of a failed query and another
+model turn.
+
+The index is built once per process from category_hierarchy - category IDs
+and names, subcategories and the keywords JSON - and holds:
+
+    exact     compacted ID / name / subcategory (lowercase, alphanumerics only)
+              -> category, so 'Home Fitness', 'home-fitness' and 'homefitness'
+              all hit directly
+    postings  word -> {category: field weight}, an inverted index of the
+              stemmed words of every field
+    grams     character trigram -> words, to match misspelled words by
+              trigram similarity
+
+Query words that are not in the index are expanded through SYNONYMS
+('dog' -> 'pet', 'laptop' -> 'electronic') or, failing that, matched to the
+most similar indexed word. Without category_hierarchy (no BigQuery access)
+the index falls back to the demand tensor's category IDs.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import re
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from fedex_market_intelligence.config import config
+from fedex_market_intelligence.shared_libraries.clients import get_bigquery_client
+
+logger = logging.getLogger(__name__)
+
+# Weight of a word by the field it came from
+FIELD_WEIGHTS = {
+    "category": 1.0,
+    "subcategory": 0.8,
+    "keyword": 0.6,
+}
+
+# Words that do not tell categories apart ('pet supplies', 'sporting goods')
+GENERIC_WORDS = {
+    "a", "an", "and", "for", "in", "of", "the", "to", "with",
+    "category", "good", "item", "product", "stuff", "supply",
+}
+
+# Query word -> indexed words it stands for (stemmed, like indexed words);
+# targets missing from the index are dropped when it is built
+SYNONYMS = {
+    "dog": ["pet"], "cat": ["pet"], "puppy": ["pet"], "kitten": ["pet"], "aquarium": ["pet"],
+    "gym": ["fitness"], "workout": ["fitness"], "exercise": ["fitness"], "treadmill": ["fitness"],
+    "dumbbell": ["fitness"], "yoga": ["fitness"],
+    "laptop": ["electronic"], "computer": ["electronic"], "phone": ["electronic"],
+    "smartphone": ["electronic"], "tv": ["electronic"], "television": ["electronic"],
+    "headphone": ["electronic"], "gadget": ["electronic"], "tech": ["electronic"],
+    "espresso": ["coffee"], "latte": ["coffee"],
+    "skin": ["skincare"], "lotion": ["skincare"], "moisturizer": ["skincare"], "serum": ["skincare"],
+    "sunscreen": ["skincare"],
+    "makeup": ["beauty", "cosmetic"], "lipstick": ["cosmetic"], "perfume": ["beauty"], "fragrance": ["beauty"],
+    "coat": ["outerwear"], "jacket": ["outerwear"], "parka": ["outerwear"], "snow": ["winter"],
+    "novel": ["book"], "ebook": ["book"], "reading": ["book"],
+    "game": ["toy"], "lego": ["toy"], "doll": ["toy"], "kid": ["toy"],
+    "furniture": ["decor"], "decoration": ["decor"], "rug": ["decor"], "lamp": ["decor"],
+    "cookware": ["kitchen"], "blender": ["kitchen", "appliance"], "microwave": ["kitchen", "appliance"],
+    "infant": ["baby"], "diaper": ["baby"], "stroller": ["baby"], "newborn": ["baby"], "nursery": ["baby"],
+    "multivitamin": ["vitamin"], "nutrition": ["supplement"], "protein": ["supplement"],
+    "camping": ["outdoor"], "hiking": ["outdoor"], "tent": ["outdoor"], "fishing": ["outdoor"],
+    "ring": ["jewelry"], "necklace": ["jewelry"], "bracelet": ["jewelry"], "earring": ["jewelry"],
+    "jewellery": ["jewelry"],
+    "sport": ["sporting"], "athletic": ["sporting"],
+}
+SYNONYM_WEIGHT = 0.9
+
+# Misspelled words match indexed words at least this similar (trigram Jaccard)
+FUZZY_MIN_SIMILARITY = 0.5
+
+# A category is picked when it scores at least MIN_SCORE and beats the
+# runner-up by MIN_MARGIN; otherwise the best candidates are returned
+MIN_SCORE = 0.5
+MIN_MARGIN = 0.15
+MAX_CANDIDATES = 5
+
+
+def compact(text: str) -> str:
+    """Lowercase alphanumerics only ('Home-Fitness' -> 'homefitness')."""
+    return re.sub(r"[^a-z0-9]", "", text.lower())
+
+
+def stem(word: str) -> str:
+    """Strip a plural ending ('supplies' -> 'supply', 'toys' -> 'toy'; 'fitness' is kept)."""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us")):
+        return word[:-1]
+    return word
+
+
+def words(text: str) -> List[str]:
+    """Stemmed, non-generic words of a text ('Pet_Supplies' -> ['pet'])."""
+    stems = (stem(w) for w in re.findall(r"[a-z0-9]+", text.lower()))
+    return [w for w in stems if w not in GENERIC_WORDS]
+
+
+def trigrams(word: str) -> Set[str]:
+    padded = f" {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class CategoryIndex:
+    """Inverted index from words, phrases and trigrams to category IDs."""
+
+    def __init__(self, records: Iterable[Dict[str, Optional[str]]]):
+        self.names: Dict[str, str] = {}
+        self.exact: Dict[str, str] = {}
+        self.postings: Dict[str, Dict[str, float]] = defaultdict(dict)
+        ambiguous_phrases = set()
+
+        def add(category_id: str, text: str, field: str) -> None:
+            weight = FIELD_WEIGHTS[field]
+            for word in words(text):
+                if self.postings[word].get(category_id, 0) < weight:
+                    self.postings[word][category_id] = weight
+            phrase = compact(text)
+            if not phrase or phrase in ambiguous_phrases:
+                return
+            if self.exact.setdefault(phrase, category_id) != category_id:
+                # A phrase of two categories is not an exact match for either
+                del self.exact[phrase]
+                ambiguous_phrases.add(phrase)
+
+        for record in records:
+            category_id = record["category_id"]
+            name = record.get("category_name") or category_id.replace("_", " ").title()
+            self.names.setdefault(category_id, name)
+            add(category_id, category_id, "category")
+            add(category_id, name, "category")
+            if record.get("subcategory"):
+                add(category_id, record["subcategory"], "subcategory")
+            for keyword in parse_keywords(record.get("keywords")):
+                add(category_id, keyword, "keyword")
+
+        self.categories = sorted(self.names)
+        self.postings = dict(self.postings)
+        self.synonyms = {
+            word: [t for t in targets if t in self.postings]
+            for word, targets in SYNONYMS.items()
+            if word not in self.postings and any(t in self.postings for t in targets)
+        }
+        self.grams: Dict[str, Set[str]] = defaultdict(set)
+        for word in list(self.postings) + list(self.synonyms):
+            for gram in trigrams(word):
+                self.grams[gram].add(word)
+
+    def __len__(self) -> int:
+        return len(self.categories)
+
+    def closest_word(self, word: str) -> Optional[Tuple[str, float]]:
+        """The indexed word or synonym most similar to a misspelled word, if similar enough."""
+        grams = trigrams(word)
+        shared = defaultdict(int)
+        for gram in grams:
+            for other in self.grams.get(gram, ()):
+                shared[other] += 1
+        best = None
+        for other, count in shared.items():
+            similarity = count / (len(grams) + len(trigrams(other)) - count)
+            if similarity >= FUZZY_MIN_SIMILARITY and (best is None or similarity > best[1]):
+                best = (other, similarity)
+        return best
+
+    def expand(self, word: str) -> List[Tuple[str, float]]:
+        """Indexed words a query word stands for, with the confidence of each."""
+        if word in self.postings:
+            return [(word, 1.0)]
+        if word in self.synonyms:
+            return [(target, SYNONYM_WEIGHT) for target in self.synonyms[word]]
+        closest = self.closest_word(word)
+        if closest is None:
+            return []
+        other, similarity = closest
+        if other in self.synonyms:
+            return [(target, SYNONYM_WEIGHT * similarity) for target in self.synonyms[other]]
+        return [(other, similarity)]
+
+    def search(self, text: str) -> List[Tuple[str, float]]:
+        """
+        Categories matching a free-text description, best first.
+
+        Scores are in [0, 1]: 1 for an exact ID / name / subcategory, otherwise the
+        mean over the recognized query words of the best field weight x confidence.
+        Words matching nothing are ignored ('dog food' scores on 'dog' alone).
+        """
+        category_id = self.exact.get(compact(text))
+        if category_id is not None:
+            return [(category_id, 1.0)]
+
+        totals: Dict[str, float] = defaultdict(float)
+        recognized = 0
+        for word in words(text):
+            expansions = self.expand(word)
+            if not expansions:
+                continue
+            recognized += 1
+            best: Dict[str, float] = {}
+            for indexed, confidence in expansions:
+                for candidate, weight in self.postings[indexed].items():
+                    best[candidate] = max(best.get(candidate, 0.0), weight * confidence)
+            for candidate, score in best.items():
+                totals[candidate] += score
+
+        if not recognized:
+            return []
+        return sorted(
+            ((candidate, total / recognized) for candidate, total in totals.items()),
+            key=lambda item: (-item[1], item[0])
+        )
+
+    def resolve(self, text: str) -> Tuple[Optional[str], List[str]]:
+        """
+        Resolve free text to one category ID.
+
+        Returns:
+            (category ID, []) when one category clearly matches, else
+            (None, the best candidate IDs - empty when nothing matched)
+        """
+        matches = self.search(text)
+        if matches:
+            top, score = matches[0]
+            runner_up = matches[1][1] if len(matches) > 1 else 0.0
+            if score >= MIN_SCORE and score - runner_up >= MIN_MARGIN:
+                return top, []
+        return None, [candidate for candidate, _ in matches[:MAX_CANDIDATES]]
+
+
+def parse_keywords(keywords: Optional[str]) -> List[str]:
+    """The keywords column: a JSON list of strings (a plain string is one keyword)."""
+    if not keywords:
+        return []
+    try:
+        parsed = json.loads(keywords)
+    except (TypeError, ValueError):
+        return [str(keywords)]
+    return [str(k) for k in parsed] if isinstance(parsed, list) else [str(parsed)]
+
+
+@lru_cache(maxsize=1)
+def load_category_index() -> CategoryIndex:
+    """
+    Build the category index from category_hierarchy once per process.
+
+    Falls back to the demand tensor's category IDs when the table cannot be
+    read; raises when neither is available (the next call retries).
+    """
+    query = f"""
+        SELECT category_id, category_name, subcategory, keywords
+        FROM `{config.project_id}.{config.dataset_id}.category_hierarchy`
+        WHERE category_id IS NOT NULL
+    """
+    try:
+        records = [dict(row.items()) for row in get_bigquery_client().query(query).result()]
+        index = CategoryIndex(records)
+        logger.info(f"Built category index for {len(index)} categories from category_hierarchy")
+        return index
+    except Exception as e:
+        from fedex_market_intelligence.shared_libraries.demand_tensor import load_demand_tensor
+
+        tensor = load_demand_tensor()
+        if tensor is None:
+            raise
+        logger.warning(f"category_hierarchy not readable ({e}); indexing the demand tensor's categories")
+        return CategoryIndex({"category_id": c} for c in tensor.categories)
+
+
+def known_categories() -> List[str]:
+    """Every category ID of the index ([] when it cannot be built)."""
+    try:
+        return load_category_index().categories
+    except Exception:
+        return []
+
+
+def resolve_category(product_category: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Resolve a tool's product_category argument to a category ID.
+
+    Returns:
+        (category ID, None) on a match, (None, JSON error with the closest
+        categories) otherwise. Empty values and - when the index cannot be
+        built - any value are passed through unchanged.
+    """
+    if not product_category:
+        return product_category, None
+
+    try:
+        index = load_category_index()
+    except Exception as e:
+        logger.warning(f"Category index unavailable, using '{product_category}' as given: {e}")
+        return product_category, None
+
+    category_id, candidates = index.resolve(product_category)
+    if category_id is not None:
+        if category_id != product_category:
+            logger.info(f"Resolved product category '{product_category}' to '{category_id}'")
+        return category_id, None
+
+    error = {"error": f"Unknown product category '{product_category}'"}
+    if candidates:
+        error["error"] = f"Product category '{product_category}' does not clearly match one category"
+        error["did_you_mean"] = [
+            {"category_id": c, "category_name": index.names[c]} for c in candidates
+        ]
+    error["available_categories"] = index.categories
+    error["suggestion"] = "Call the tool again with one of these category_id values"
+    return None, json.dumps(error, indent=2)
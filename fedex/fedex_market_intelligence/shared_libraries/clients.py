@@ -0,0 +1,96 @@
+"""Process-wide clients, created on first use.
+
+Nothing here runs at import time: the BigQuery client and Vertex AI are set up
+by the first tool call / agent turn that needs them, and an optional background
+prewarm can do it right after startup instead, off the request path.
+"""
+
+import logging
+import threading
+from functools import lru_cache
+
+from fedex_market_intelligence.config import config
+from fedex_market_intelligence.shared_libraries.lazy import lazy_import
+
+bigquery = lazy_import("google.cloud.bigquery")
+
+logger = logging.getLogger(__name__)
+
+# Modules the tools need on their first call, loaded by prewarm()
+PREWARM_MODULES = ["numpy", "pandas", "google.cloud.bigquery", "requests", "httpx"]
+
+_init_lock = threading.Lock()
+
+
+@lru_cache(maxsize=1)
+def get_bigquery_client():
+    """Shared BigQuery client (thread-safe, reused across tool calls)."""
+    with _init_lock:
+        return bigquery.Client(project=config.project_id)
+
+
+@lru_cache(maxsize=1)
+def init_vertexai() -> None:
+    """Initialize Vertex AI once, on the first agent turn rather than at import."""
+    with _init_lock:
+        import vertexai
+
+        vertexai.init(project=config.project_id, location=config.location)
+        logger.info(
+            f"Initialized Vertex AI with project={config.project_id}, location={config.location}"
+        )
+
+
+def prewarm() -> None:
+    """Load the heavy modules and clients now so the first request does not wait for them."""
+    import importlib
+
+    for name in PREWARM_MODULES:
+        try:
+            module = importlib.import_module(name)
+            # Touch an attribute so a lazily registered module is really imported
+            getattr(module, "__name__")
+        except ImportError as e:
+            logger.warning(f"Prewarm could not import {name}: {e}")
+
+    try:
+        init_vertexai()
+        get_bigquery_client()
+        if config.demand_tensor_path:
+            from fedex_market_intelligence.shared_libraries.demand_tensor import load_demand_tensor
+
+            load_demand_tensor()
+        if config.demand_features_path:
+            from fedex_market_intelligence.shared_libraries.feature_store import load_feature_store
+
+            load_feature_store()
+        if config.anomaly_index_path:
+            from fedex_market_intelligence.shared_libraries.anomalies import load_anomaly_index
+
+            load_anomaly_index()
+        if config.od_matrices_path:
+            from fedex_market_intelligence.shared_libraries.od_matrices import load_od_matrices
+
+            load_od_matrices()
+        if config.category_affinity_path:
+            from fedex_market_intelligence.shared_libraries.category_affinity import load_category_affinity
+
+            load_category_affinity()
+        if config.concentration_cube_path:
+            from fedex_market_intelligence.shared_libraries.concentration import load_concentration_cube
+
+            load_concentration_cube()
+
+        from fedex_market_intelligence.shared_libraries.category_index import load_category_index
+
+        load_category_index()
+    except Exception as e:
+        # Prewarm is best-effort; the first real call retries and reports errors itself
+        logger.warning(f"Prewarm failed: {e}")
+
+
+def start_prewarm() -> threading.Thread:
+    """Run prewarm() in a daemon thread so startup returns immediately."""
+    thread = threading.Thread(target=prewarm, name="fedex-prewarm", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,66 @@
+"""Single-flight coalescing of identical concurrent backend calls.
+
+When several sessions ask the same question at once (demos, team reviews), each
+tool call would otherwise start its own identical BigQuery job. A SingleFlight
+runs the first call for a key and lets every identical call that arrives while it
+is in flight await that same execution; the result (or exception) is fanned out
+to all of them. Nothing is cached once the call finishes - a later identical
+call runs again and sees fresh data.
+"""
+
+import asyncio
+import hashlib
+from typing import Any, Awaitable, Callable, Dict
+
+
+def flight_key(*parts: Any) -> str:
+    """Build a compact single-flight key from the values that define a call."""
+    raw = "\x1f".join(str(part) for part in parts)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class SingleFlight:
+    """Runs at most one execution per key at a time and shares its outcome."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.executions = 0
+        self.coalesced = 0
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Await fn() - or the identical call already in flight for key.
+
+        The shared execution runs as its own task, so a caller that is cancelled
+        (e.g. its session ends) does not cancel the work for the other callers.
+        """
+        loop = asyncio.get_running_loop()
+        task = self._inflight.get(key)
+        if task is not None and task.get_loop() is loop and not task.done():
+            self.coalesced += 1
+        else:
+            self.executions += 1
+            task = loop.create_task(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done, key=key: self._forget(key, done))
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved even if every caller was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        """Execution / coalescing counters and the number of calls in flight."""
+        return {
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._inflight),
+        }
+
+
+bigquery_flight = SingleFlight("bigquery")
+census_flight = SingleFlight("census")
@@ -0,0 +1,403 @@
+"""Shipper and subcategory concentration cube (see data/build_concentration_cube.py).
+
+market_concentration_index in market_share is only the major-brand share of
+volume. The cube keeps shipment_data's volume by destination ZIP x month x
+subcategory x shipper, so concentration is measured from the shippers
+themselves:
+
+    volume.npz          CSR float32 [category x month x zip, segment]; a segment
+                        is one (subcategory, shipper) pair, and row (category c,
+                        month t, zip z) is (c * months + t) * zips + z, so one
+                        category-month is a contiguous block of rows
+    concentration.npz   for CONCENTRATION_PERIOD and the year before it, at every
+                        level (national, region, state, metro, city, zip) and
+                        category: the shippers' Herfindahl-Hirschman index, the
+                        number of shippers, the top TOP_SHIPPERS shippers with
+                        their shares, and per subcategory volume and HHI
+    index.json          category / month / ZIP / subcategory / shipper lists,
+                        the segments and the ZIPs' city, metro, state and region
+
+HHI is the sum of squared volume shares x 10,000 (a single shipper is 10,000).
+Pooled shippers such as 'Individual' stand for many independent senders: their
+volume counts in every share's denominator but adds nothing to the index and
+never ranks as a top shipper.
+
+Precomputed markets are an index lookup; other ZIP sets and periods are summed
+from the cube's row blocks at request time. The cube is optional: without
+CONCENTRATION_CUBE_PATH the tools report the market_share columns only.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from fedex_market_intelligence.config import config
+from fedex_market_intelligence.shared_libraries.demand_tensor import month_serial, period_mask
+from fedex_market_intelligence.shared_libraries.feature_store import NATIONAL_KEY
+from fedex_market_intelligence.shared_libraries.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+logger = logging.getLogger(__name__)
+
+CONCENTRATION_LEVELS = ["national", "region", "state", "metro", "city", "zip"]
+
+# ZIP label columns of index.json, in the order markets are matched by name
+ZIP_LABELS = ["city", "metro", "state", "region"]
+
+# The period the market tables are precomputed for (a tool time_period value)
+CONCENTRATION_PERIOD = "last_12_months"
+
+TOP_SHIPPERS = 5
+
+# HHI bands of the US horizontal merger guidelines (2010)
+HHI_BANDS = [
+    (2500, "highly concentrated"),
+    (1500, "moderately concentrated"),
+    (0, "unconcentrated"),
+]
+
+
+def concentration_level(hhi: Optional[float]) -> Optional[str]:
+    """Label of an HHI value."""
+    if hhi is None:
+        return None
+    for threshold, label in HHI_BANDS:
+        if hhi >= threshold:
+            return label
+    return HHI_BANDS[-1][1]
+
+
+def shipper_concentration(shipper_volume: np.ndarray, pooled: np.ndarray, top_n: int = TOP_SHIPPERS):
+    """
+    HHI, shipper count and top shippers of every row of a [market, shipper] volume matrix.
+
+    Returns:
+        (hhi, NaN without volume; shipper counts; [market, top_n] top shipper
+         indices, -1 past the last shipper; [market, top_n] their volume shares)
+    """
+    totals = shipper_volume.sum(axis=1)
+    named = np.where(pooled[None, :], 0, shipper_volume)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        shares = named / totals[:, None]
+    shares = np.nan_to_num(shares)
+    hhi = np.where(totals > 0, (shares ** 2).sum(axis=1) * 10000, np.nan)
+    counts = (named > 0).sum(axis=1)
+
+    top_n = min(top_n, shares.shape[1])
+    top = np.argsort(-shares, axis=1, kind="stable")[:, :top_n]
+    top_shares = np.take_along_axis(shares, top, axis=1)
+    top = np.where(top_shares > 0, top, -1)
+    return hhi, counts, top.astype(np.int32), top_shares.astype(np.float32)
+
+
+class ConcentrationCube:
+    """Read-only view of a built concentration cube directory."""
+
+    def __init__(self, path: Path):
+        # scipy is only needed once the cube is actually used
+        from scipy import sparse
+
+        with open(path / "index.json") as f:
+            index = json.load(f)
+
+        self.path = path
+        self.categories: List[str] = index["categories"]
+        self.months: List[str] = index["months"]
+        self.zip_codes: List[str] = index["zip_codes"]
+        self.subcategories: List[str] = index["subcategories"]
+        self.shippers: List[str] = index["shippers"]
+        self.category_index = {c: i for i, c in enumerate(self.categories)}
+        self.zip_index = {z: i for i, z in enumerate(self.zip_codes)}
+        self.month_serials = np.array([month_serial(m) for m in self.months])
+        self.subcategory_category = np.array(index["subcategory_category"], dtype=np.int64)
+        self.pooled = np.array(index["pooled_shippers"], dtype=bool)
+        segments = np.array(index["segments"], dtype=np.int64).reshape(-1, 2)
+        self.segment_subcategory, self.segment_shipper = segments[:, 0], segments[:, 1]
+        self.zip_labels: Dict[str, np.ndarray] = {
+            level: np.array(index["zip_labels"][level], dtype=object) for level in ZIP_LABELS
+        }
+
+        self.volume = sparse.load_npz(path / "volume.npz").tocsr()
+        expected = (len(self.categories) * len(self.months) * len(self.zip_codes), len(segments))
+        if self.volume.shape != expected:
+            raise ValueError(f"volume.npz shape {self.volume.shape} does not match index.json {expected}")
+
+        tables = path / "concentration.npz"
+        if tables.exists():
+            with np.load(tables, allow_pickle=False) as data:
+                self.tables = {name: data[name] for name in data.files}
+        else:
+            logger.info(f"No concentration.npz in {path}; computing the market tables")
+            self.tables = compute_market_tables(self)
+        self.market_levels = np.asarray(self.tables["market_levels"], dtype=str)
+        self.market_keys = np.asarray(self.tables["market_keys"], dtype=str)
+        self.lookup_keys = np.char.upper(self.market_keys)
+        self.as_of = str(np.asarray(self.tables["as_of"]).item())
+        zip_markets = np.flatnonzero(self.market_levels == "zip")
+        self.zip_positions = {str(self.market_keys[i]): int(i) for i in zip_markets}
+
+    def has_category(self, category: str) -> bool:
+        return category in self.category_index
+
+    def month_mask(self, time_period: Optional[str]) -> np.ndarray:
+        """Month mask for the tools' time_period values ('last_12_months', 'q3_2025', ...)."""
+        return period_mask(self.month_serials, time_period)
+
+    def zip_volume(self, category: str, months: np.ndarray):
+        """[zip, segment] CSR volume of one category summed over the masked months."""
+        from scipy import sparse
+
+        zips = len(self.zip_codes)
+        base = self.category_index[category] * len(self.months)
+        total = sparse.csr_matrix((zips, self.volume.shape[1]), dtype=np.float32)
+        for month in np.flatnonzero(months):
+            start = (base + month) * zips
+            total = total + self.volume[start:start + zips]
+        return total
+
+    def label_mask(self, level: str, needle: str) -> np.ndarray:
+        """ZIPs whose label at this level contains needle (case-insensitive), like SQL LIKE '%needle%'."""
+        needle = needle.lower()
+        return np.array([needle in label.lower() for label in self.zip_labels[level]], dtype=bool)
+
+    def save_tables(self, path: Path) -> None:
+        np.savez_compressed(path, **self.tables)
+
+    # Market lookups of the precomputed tables (same interface as CategoryAffinity)
+
+    @property
+    def keys(self) -> np.ndarray:
+        return self.market_keys
+
+    def find_market(self, level: str, key: str) -> Optional[int]:
+        """Position of the market with this level and key (case-insensitive), or None."""
+        matches = np.flatnonzero((self.market_levels == level) & (self.lookup_keys == key.upper()))
+        return int(matches[0]) if len(matches) else None
+
+    def markets_containing(self, level: str, needle: str) -> List[int]:
+        """Positions of the markets of a level whose key contains needle (case-insensitive)."""
+        needle = needle.upper()
+        return [int(i) for i in np.flatnonzero(self.market_levels == level) if needle in self.lookup_keys[i]]
+
+    def market_summary(self, position: int, category: str) -> Optional[dict]:
+        """Precomputed concentration of one market and category over CONCENTRATION_PERIOD."""
+        c = self.category_index[category]
+        hhi = float(self.tables["hhi"][position, c])
+        if np.isnan(hhi):
+            return None
+        prior = float(self.tables["hhi_prior"][position, c])
+        subcategories = np.flatnonzero(self.subcategory_category == c)
+        return {
+            "market_level": str(self.market_levels[position]),
+            "market_key": str(self.market_keys[position]),
+            "period": f"{CONCENTRATION_PERIOD.replace('_', ' ')} through {self.as_of}",
+            "shipper_hhi": round(hhi),
+            "shipper_hhi_year_earlier": None if np.isnan(prior) else round(prior),
+            "concentration_level": concentration_level(hhi),
+            "shipper_count": int(self.tables["shipper_counts"][position, c]),
+            "top_shippers": self.top_shipper_records(
+                self.tables["top_shippers"][position, c], self.tables["top_shares"][position, c]
+            ),
+            "subcategories": self.subcategory_records(
+                subcategories,
+                self.tables["subcategory_volume"][position, subcategories],
+                self.tables["subcategory_hhi"][position, subcategories],
+            ),
+        }
+
+    def zip_summaries(self, zip_codes: List[str], category: str) -> Dict[str, dict]:
+        """Precomputed HHI and top shipper of each ZIP code (ZIPs without volume are left out)."""
+        c = self.category_index[category]
+        summaries = {}
+        for zip_code in zip_codes:
+            position = self.zip_positions.get(str(zip_code))
+            if position is None or np.isnan(self.tables["hhi"][position, c]):
+                continue
+            hhi = float(self.tables["hhi"][position, c])
+            top = self.top_shipper_records(self.tables["top_shippers"][position, c], self.tables["top_shares"][position, c])
+            summaries[str(zip_code)] = {
+                "shipper_hhi": round(hhi),
+                "concentration_level": concentration_level(hhi),
+                "top_shipper": top[0]["shipper"] if top else None,
+                "top_shipper_share_pct": top[0]["share_pct"] if top else None,
+            }
+        return summaries
+
+    def concentration(self, category: str, zips: np.ndarray, months: np.ndarray) -> Optional[dict]:
+        """Concentration of any ZIP set and months, summed from the cube (None without volume)."""
+        segments = np.asarray(self.zip_volume(category, months)[np.flatnonzero(zips)].sum(axis=0)).ravel()
+        shipper_volume = np.bincount(self.segment_shipper, weights=segments, minlength=len(self.shippers))
+        hhi, counts, top, top_shares = shipper_concentration(shipper_volume[None, :], self.pooled)
+        if np.isnan(hhi[0]):
+            return None
+
+        subcategories = np.flatnonzero(self.subcategory_category == self.category_index[category])
+        volume, sub_hhi = subcategory_concentration(
+            segments[None, :], self.segment_subcategory, self.segment_shipper, self.pooled, len(self.subcategories)
+        )
+        return {
+            "shipper_hhi": round(float(hhi[0])),
+            "concentration_level": concentration_level(float(hhi[0])),
+            "shipper_count": int(counts[0]),
+            "top_shippers": self.top_shipper_records(top[0], top_shares[0]),
+            "subcategories": self.subcategory_records(subcategories, volume[0, subcategories], sub_hhi[0, subcategories]),
+        }
+
+    def top_shipper_records(self, indices: np.ndarray, shares: np.ndarray) -> List[dict]:
+        return [
+            {"shipper": self.shippers[i], "share_pct": round(float(s) * 100, 1)}
+            for i, s in zip(indices, shares) if i >= 0
+        ]
+
+    def subcategory_records(self, subcategories: np.ndarray, volume: np.ndarray, hhi: np.ndarray) -> List[dict]:
+        total = float(volume.sum())
+        records = [
+            {
+                "subcategory": self.subcategories[s],
+                "shipments": int(round(float(v))),
+                "share_pct": round(float(v) / total * 100, 1) if total else None,
+                "shipper_hhi": None if np.isnan(h) else round(float(h)),
+            }
+            for s, v, h in zip(subcategories, volume, hhi) if v > 0
+        ]
+        return sorted(records, key=lambda r: -r["shipments"])
+
+
+def subcategory_concentration(segment_volume, segment_subcategory, segment_shipper, pooled, subcategories: int):
+    """
+    Volume and shipper HHI of every subcategory from [market, segment] volume.
+
+    Works on dense arrays and scipy sparse matrices alike.
+
+    Returns:
+        ([market, subcategory] volume, [market, subcategory] HHI, NaN without volume)
+    """
+    from scipy import sparse
+
+    indicator = sparse.csr_matrix(
+        (np.ones(len(segment_subcategory)), (np.arange(len(segment_subcategory)), segment_subcategory)),
+        shape=(len(segment_subcategory), subcategories)
+    )
+    named = sparse.diags((~pooled[segment_shipper]).astype(np.float64))
+
+    def by_subcategory(values):
+        summed = indicator.T @ values.T
+        return (summed.toarray() if sparse.issparse(summed) else np.asarray(summed)).T
+
+    volume = by_subcategory(segment_volume)
+    squares = segment_volume.multiply(segment_volume) if sparse.issparse(segment_volume) else segment_volume ** 2
+    named_squares = by_subcategory((named @ squares.T).T)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        hhi = np.where(volume > 0, named_squares / volume ** 2 * 10000, np.nan)
+    return volume, hhi
+
+
+def level_membership(cube: ConcentrationCube):
+    """
+    [market, zip] CSR membership of every market of every level, with the level and key of each row.
+
+    The zip level is the identity; other levels group the ZIPs by their label.
+    """
+    from scipy import sparse
+
+    zips = len(cube.zip_codes)
+    levels, keys, rows, columns = [], [], [], []
+    for level in CONCENTRATION_LEVELS:
+        if level == "national":
+            groups = {NATIONAL_KEY: np.arange(zips)}
+        elif level == "zip":
+            groups = {z: np.array([i]) for i, z in enumerate(cube.zip_codes)}
+        else:
+            labels = cube.zip_labels[level]
+            groups = {}
+            for i, label in enumerate(labels):
+                if label:
+                    groups.setdefault(label, []).append(i)
+        for key in sorted(groups):
+            members = np.asarray(groups[key])
+            rows.append(np.full(len(members), len(keys)))
+            columns.append(members)
+            levels.append(level)
+            keys.append(key)
+
+    rows, columns = np.concatenate(rows), np.concatenate(columns)
+    membership = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.float64), (rows, columns)), shape=(len(keys), zips)
+    )
+    return membership, levels, keys
+
+
+def compute_market_tables(cube: ConcentrationCube) -> Dict[str, np.ndarray]:
+    """Concentration of every market and category over CONCENTRATION_PERIOD and the year before it."""
+    from scipy import sparse
+
+    membership, levels, keys = level_membership(cube)
+    markets, categories = len(keys), len(cube.categories)
+    months = cube.month_mask(CONCENTRATION_PERIOD)
+    prior = np.isin(cube.month_serials, cube.month_serials[months] - 12)
+
+    shipper_indicator = sparse.csr_matrix(
+        (np.ones(len(cube.segment_shipper)), (np.arange(len(cube.segment_shipper)), cube.segment_shipper)),
+        shape=(len(cube.segment_shipper), len(cube.shippers))
+    )
+
+    hhi = np.full((markets, categories), np.nan, dtype=np.float32)
+    hhi_prior = np.full((markets, categories), np.nan, dtype=np.float32)
+    counts = np.zeros((markets, categories), dtype=np.int32)
+    top = np.full((markets, categories, TOP_SHIPPERS), -1, dtype=np.int32)
+    top_shares = np.zeros((markets, categories, TOP_SHIPPERS), dtype=np.float32)
+    subcategory_volume = np.zeros((markets, len(cube.subcategories)), dtype=np.float32)
+    subcategory_hhi = np.full((markets, len(cube.subcategories)), np.nan, dtype=np.float32)
+
+    for c, category in enumerate(cube.categories):
+        market_volume = (membership @ cube.zip_volume(category, months)).tocsr()
+        shippers = np.asarray((market_volume @ shipper_indicator).todense())
+        hhi[:, c], counts[:, c], found, found_shares = shipper_concentration(shippers, cube.pooled)
+        top[:, c, :found.shape[1]], top_shares[:, c, :found.shape[1]] = found, found_shares
+
+        prior_volume = membership @ cube.zip_volume(category, prior)
+        hhi_prior[:, c] = shipper_concentration(np.asarray((prior_volume @ shipper_indicator).todense()), cube.pooled)[0]
+
+        # Subcategories belong to one category, so each category fills its own columns
+        own = cube.subcategory_category == c
+        volume, sub_hhi = subcategory_concentration(
+            market_volume, cube.segment_subcategory, cube.segment_shipper, cube.pooled, len(cube.subcategories)
+        )
+        subcategory_volume[:, own], subcategory_hhi[:, own] = volume[:, own], sub_hhi[:, own]
+
+    as_of = cube.months[int(np.flatnonzero(months)[-1])] if months.any() else ""
+    return {
+        "market_levels": np.asarray(levels, dtype=str),
+        "market_keys": np.asarray(keys, dtype=str),
+        "hhi": hhi,
+        "hhi_prior": hhi_prior,
+        "shipper_counts": counts,
+        "top_shippers": top,
+        "top_shares": top_shares,
+        "subcategory_volume": subcategory_volume,
+        "subcategory_hhi": subcategory_hhi,
+        "as_of": np.asarray(as_of),
+    }
+
+
+@lru_cache(maxsize=1)
+def load_concentration_cube() -> Optional[ConcentrationCube]:
+    """Load the configured concentration cube once per process (None when not configured)."""
+    if not config.concentration_cube_path:
+        return None
+    path = Path(config.concentration_cube_path)
+    try:
+        cube = ConcentrationCube(path)
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"Concentration cube at {path} not usable: {e}")
+        return None
+    logger.info(
+        f"Loaded concentration cube {path} ({len(cube.categories)} categories, "
+        f"{len(cube.shippers):,} shippers, {len(cube.market_keys):,} markets)"
+    )
+    return cube
@@ -0,0 +1,165 @@
+"""Memory-mapped demand tensor (see data/build_demand_tensor.py).
+
+aggregated_demand joined with market_share is a dense (category, metric, month,
+zip) array of a few hundred MB. Loading it with mmap_mode="r" maps the file
+instead of reading it: every worker process on a replica shares the same page
+cache pages (zero-copy), and a (category, metric) slice is a view, not a query.
+Market filters resolve through the geo-hierarchy membership matrices, and
+per-market aggregates are matrix multiplies over the zip axis. When the tensor
+was built with zcta_demographics, per-zip demographics and segment flags sit on
+the same zip axis, so demographic filters are just another mask.
+
+The tensor is optional: when DEMAND_TENSOR_PATH is unset or unreadable the tools
+use their SQL path.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from fedex_market_intelligence.config import config
+from fedex_market_intelligence.shared_libraries.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+logger = logging.getLogger(__name__)
+
+# The tools' relative time periods are anchored at the end of the dataset
+REFERENCE_YEAR_MONTH = "2025-12"
+
+GEO_LEVELS = ["city", "metro", "state", "region"]
+
+
+def month_serial(year_month: str) -> int:
+    """'2025-03' -> months since year 0, so month differences are plain subtraction."""
+    year, month = year_month.split("-")[:2]
+    return int(year) * 12 + int(month) - 1
+
+
+def period_mask(month_serials: np.ndarray, time_period: Optional[str]) -> np.ndarray:
+    """Month mask for the tools' time_period values ('last_12_months', 'q3_2025', ...)."""
+    reference = month_serial(REFERENCE_YEAR_MONTH)
+    if time_period in ("last_6_months", "last_12_months", "last_24_months", "last_36_months"):
+        months_back = int(time_period.split("_")[1])
+        return reference - month_serials <= months_back
+    if time_period and time_period.startswith("q") and "2025" in time_period:
+        quarter = int(time_period[1])
+        years = month_serials // 12
+        quarters = month_serials % 12 // 3 + 1
+        return (years == 2025) & (quarters == quarter)
+    return np.ones(len(month_serials), dtype=bool)
+
+
+class DemandTensor:
+    """Read-only view of a built demand tensor directory."""
+
+    def __init__(self, path: Path):
+        with open(path / "index.json") as f:
+            index = json.load(f)
+
+        self.path = path
+        self.data = np.load(path / "demand.npy", mmap_mode="r")
+        self.categories: List[str] = index["categories"]
+        self.metrics: List[str] = index["metrics"]
+        self.months: List[str] = index["months"]
+        self.zip_codes: List[str] = index["zip_codes"]
+
+        if list(self.data.shape) != index["shape"]:
+            raise ValueError(f"demand.npy shape {self.data.shape} does not match index.json {index['shape']}")
+
+        self.category_index = {c: i for i, c in enumerate(self.categories)}
+        self.metric_index = {m: i for i, m in enumerate(self.metrics)}
+        self.zip_index = {z: i for i, z in enumerate(self.zip_codes)}
+        self.month_serials = np.array([month_serial(m) for m in self.months])
+        self.month_numbers = self.month_serials % 12 + 1
+
+        # Per-zip geo labels (city, metro, state, region) for exact-match filters
+        self.zip_labels: Dict[str, np.ndarray] = {
+            level: np.array(labels, dtype=object) for level, labels in index["zip_labels"].items()
+        }
+        self.group_labels: Dict[str, List[str]] = index["group_labels"]
+        self.membership: Dict[str, np.ndarray] = {
+            level: np.load(path / f"membership_{level}.npy", mmap_mode="r") for level in GEO_LEVELS
+        }
+        self.zip_coords = np.load(path / "zip_coords.npy", mmap_mode="r")
+
+        # Optional ZCTA demographics (zip x field) and segment flags (segment x zip)
+        self.demographic_fields: List[str] = index.get("demographic_fields", [])
+        self.segments: List[str] = index.get("segments", [])
+        self.demographics: Optional[np.ndarray] = None
+        self.segment_flags: Optional[np.ndarray] = None
+        if self.demographic_fields:
+            self.demographics = np.load(path / "demographics.npy", mmap_mode="r")
+            self.segment_flags = np.load(path / "segments.npy", mmap_mode="r")
+
+    @property
+    def shape(self):
+        return self.data.shape
+
+    def has_category(self, category: str) -> bool:
+        return category in self.category_index
+
+    @property
+    def has_demographics(self) -> bool:
+        return self.demographics is not None
+
+    def slice(self, category: str, metric: str) -> np.ndarray:
+        """Month x zip view of one metric for one category (no copy)."""
+        return self.data[self.category_index[category], self.metric_index[metric]]
+
+    def zip_mask(self, zip_codes: Iterable[str]) -> np.ndarray:
+        """Boolean zip-axis mask for an explicit list of ZIP codes (unknown ZIPs are ignored)."""
+        mask = np.zeros(len(self.zip_codes), dtype=bool)
+        positions = [self.zip_index[z] for z in zip_codes if z in self.zip_index]
+        mask[positions] = True
+        return mask
+
+    def level_mask(self, level: str, needle: str) -> np.ndarray:
+        """ZIPs whose group at this geo level contains needle (case-insensitive), like SQL LIKE '%needle%'."""
+        needle = needle.lower()
+        groups = [i for i, label in enumerate(self.group_labels[level]) if needle in label.lower()]
+        if not groups:
+            return np.zeros(len(self.zip_codes), dtype=bool)
+        return self.membership[level][groups].any(axis=0)
+
+    def label_equals(self, level: str, value: str) -> np.ndarray:
+        """ZIPs whose label at this geo level equals value (case-insensitive)."""
+        labels = self.zip_labels[level]
+        return np.array([label.upper() == value.upper() for label in labels], dtype=bool)
+
+    def segment_mask(self, segment: str) -> np.ndarray:
+        """Boolean zip-axis mask of a demographic segment ('high_income', ...)."""
+        return np.asarray(self.segment_flags[self.segments.index(segment)])
+
+    def zip_demographics(self, zip_code: str) -> Optional[Dict[str, float]]:
+        """Demographic fields of one ZIP code (None when it has no ZCTA record)."""
+        if not self.has_demographics or zip_code not in self.zip_index:
+            return None
+        values = self.demographics[self.zip_index[zip_code]]
+        record = {
+            field: float(value) for field, value in zip(self.demographic_fields, values) if not np.isnan(value)
+        }
+        return record or None
+
+    def month_mask(self, time_period: Optional[str]) -> np.ndarray:
+        """Month-axis mask for the tools' time_period values ('last_12_months', 'q3_2025', ...)."""
+        return period_mask(self.month_serials, time_period)
+
+
+@lru_cache(maxsize=1)
+def load_demand_tensor() -> Optional[DemandTensor]:
+    """Map the configured demand tensor once per process (None when not configured)."""
+    if not config.demand_tensor_path:
+        return None
+    path = Path(config.demand_tensor_path)
+    try:
+        tensor = DemandTensor(path)
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"Demand tensor at {path} not usable, falling back to SQL: {e}")
+        return None
+    logger.info(f"Mapped demand tensor {path} with shape {tensor.shape}")
+    return tensor
@@ -0,0 +1,91 @@
+"""Precomputed demand features (see data/build_demand_features.py).
+
+One row per (level, key, product_category) - level is zip, metro, state or
+national - holding the forecast baseline, seasonal indices, trend slope,
+volatility, recent momentum and peak month as of the end of the dataset. Tools
+read a row with a key lookup instead of recomputing the series.
+
+The store is optional: when DEMAND_FEATURES_PATH is unset or unreadable the
+tools compute from the tensor or SQL as before.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from fedex_market_intelligence.config import config
+from fedex_market_intelligence.shared_libraries.lazy import lazy_import
+
+pd = lazy_import("pandas")
+
+logger = logging.getLogger(__name__)
+
+FEATURE_LEVELS = ["zip", "metro", "state", "national"]
+
+# Key of the single national row per category
+NATIONAL_KEY = "ALL"
+
+SEASONAL_COLUMNS = [f"seasonal_index_{month:02d}" for month in range(1, 13)]
+
+
+class FeatureStore:
+    """In-memory feature table indexed by (level, upper-cased key, product_category)."""
+
+    def __init__(self, path: Path):
+        frame = pd.read_parquet(path)
+        frame["lookup_key"] = frame["key"].astype(str).str.upper()
+        self.path = path
+        self.frame = frame.set_index(["level", "lookup_key", "product_category"]).sort_index()
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    def lookup(self, level: str, key: str, product_category: str) -> Optional[Dict[str, Any]]:
+        """Feature row for one key (NaN -> None), or None when it is not in the store."""
+        try:
+            row = self.frame.loc[(level, key.upper(), product_category)]
+        except KeyError:
+            return None
+        record = {"level": level}
+        for column, value in row.items():
+            if isinstance(value, float) and math.isnan(value):
+                value = None
+            elif hasattr(value, "item"):
+                value = value.item()
+            record[column] = value
+        return record
+
+    def resolve(self, location: Optional[str], product_category: str) -> Optional[Dict[str, Any]]:
+        """
+        Feature row for a location that names exactly one ZIP code, metro or state
+        (None -> national). Anything else returns None so the caller computes it.
+        """
+        if not location:
+            return self.lookup("national", NATIONAL_KEY, product_category)
+        location = location.strip()
+        if len(location) == 5 and location.isdigit():
+            return self.lookup("zip", location, product_category)
+        for level in ("metro", "state"):
+            record = self.lookup(level, location, product_category)
+            if record is not None:
+                return record
+        return None
+
+
+@lru_cache(maxsize=1)
+def load_feature_store() -> Optional[FeatureStore]:
+    """Load the configured feature table once per process (None when not configured)."""
+    if not config.demand_features_path:
+        return None
+    path = Path(config.demand_features_path)
+    try:
+        store = FeatureStore(path)
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"Feature store at {path} not usable, computing features per call: {e}")
+        return None
+    logger.info(f"Loaded {len(store):,} feature rows from {path}")
+    return store
@@ -0,0 +1,40 @@
+"""Deferred imports for heavy third-party modules.
+
+pandas/NumPy, the BigQuery client library and the HTTP clients together take
+seconds to import, and only some tool calls need them. lazy_import returns a
+module object right away and runs the real import on first attribute access,
+so importing the agent (every Agent Engine cold start) does not pay for them.
+"""
+
+import importlib.util
+import sys
+from types import ModuleType
+
+
+def lazy_import(name: str) -> ModuleType:
+    """
+    Return module `name`, importing it only when one of its attributes is first used.
+
+    Already-imported modules are returned as they are. Parent packages are imported
+    eagerly (for google.cloud.bigquery that is only the google.cloud namespace).
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+def is_loaded(name: str) -> bool:
+    """True once module `name` has really been imported (not just lazily registered)."""
+    module = sys.modules.get(name)
+    return module is not None and not isinstance(module, importlib.util._LazyModule)
@@ -0,0 +1,127 @@
+"""Sparse origin-destination lane matrices (see data/build_od_matrices.py).
+
+Each level (zip, metro, state) is one CSR matrix whose rows are (category,
+month, origin area) and columns destination areas, so the flows of a category
+over a period are the sum of a few contiguous row blocks. Inbound and outbound
+totals are column and row sums of that [origin, destination] matrix.
+
+The matrices are optional: when OD_MATRICES_PATH is unset or unreadable the
+lane tool reports that they need to be built.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from fedex_market_intelligence.config import config
+from fedex_market_intelligence.shared_libraries.demand_tensor import month_serial, period_mask
+from fedex_market_intelligence.shared_libraries.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+logger = logging.getLogger(__name__)
+
+OD_LEVELS = ["zip", "metro", "state"]
+
+
+class ODMatrices:
+    """Read-only view of a built lane matrix directory."""
+
+    def __init__(self, path: Path):
+        # scipy is only needed once the matrices are actually used
+        from scipy import sparse
+
+        with open(path / "index.json") as f:
+            index = json.load(f)
+
+        self.path = path
+        self.categories: List[str] = index["categories"]
+        self.months: List[str] = index["months"]
+        self.category_index = {c: i for i, c in enumerate(self.categories)}
+        self.month_serials = np.array([month_serial(m) for m in self.months])
+
+        self.labels: Dict[str, List[str]] = {}
+        self.coords: Dict[str, np.ndarray] = {}
+        # Names each area is matched by: its own label plus parents (a ZIP's city, metro, state)
+        self.names: Dict[str, Dict[str, np.ndarray]] = {}
+        self.flows = {}
+        for level in OD_LEVELS:
+            info = index["levels"][level]
+            self.labels[level] = info["labels"]
+            self.coords[level] = np.array(info["coords"], dtype=np.float64).reshape(-1, 2)
+            self.names[level] = {
+                name: np.array(values, dtype=object)
+                for name, values in {level: info["labels"], **info["parents"]}.items()
+            }
+            self.flows[level] = sparse.load_npz(path / f"flows_{level}.npz").tocsr()
+            expected = (len(self.categories) * len(self.months) * len(info["labels"]), len(info["labels"]))
+            if self.flows[level].shape != expected:
+                raise ValueError(f"flows_{level}.npz shape {self.flows[level].shape} does not match index.json {expected}")
+
+    def has_category(self, category: str) -> bool:
+        return category in self.category_index
+
+    def month_mask(self, time_period: Optional[str]) -> np.ndarray:
+        """Month mask for the tools' time_period values ('last_12_months', 'q3_2025', ...)."""
+        return period_mask(self.month_serials, time_period)
+
+    def year_earlier(self, months: np.ndarray) -> np.ndarray:
+        """Month mask of the same months one year earlier (for year-over-year flow growth)."""
+        return np.isin(self.month_serials, self.month_serials[months] - 12)
+
+    def flow_matrix(self, level: str, category: str, months: np.ndarray):
+        """[origin, destination] CSR matrix of one category's flows summed over the masked months."""
+        from scipy import sparse
+
+        areas = len(self.labels[level])
+        base = self.category_index[category] * len(self.months)
+        total = sparse.csr_matrix((areas, areas), dtype=np.float32)
+        for month in np.flatnonzero(months):
+            start = (base + month) * areas
+            total = total + self.flows[level][start:start + areas]
+        return total
+
+    def area_mask(self, level: str, market: Optional[str]) -> np.ndarray:
+        """
+        Areas of a level that belong to a market (all areas when market is None).
+
+        A 5-digit ZIP code and a 2-letter state code match exactly; any other market
+        matches areas whose label or parent (city, metro, state) contains it, like the
+        SQL tools' LIKE '%market%'.
+        """
+        names = self.names[level]
+        if not market:
+            return np.ones(len(self.labels[level]), dtype=bool)
+        market = market.strip()
+        if len(market) == 5 and market.isdigit():
+            # A ZIP code only names an area at zip level
+            if level != "zip":
+                return np.zeros(len(self.labels[level]), dtype=bool)
+            return names["zip"] == market
+        if len(market) == 2 and market.isalpha():
+            return np.array([state.upper() == market.upper() for state in names["state"]], dtype=bool)
+
+        needle = market.lower()
+        mask = np.zeros(len(self.labels[level]), dtype=bool)
+        for values in names.values():
+            mask |= np.array([needle in value.lower() for value in values], dtype=bool)
+        return mask
+
+
+@lru_cache(maxsize=1)
+def load_od_matrices() -> Optional[ODMatrices]:
+    """Load the configured lane matrices once per process (None when not configured)."""
+    if not config.od_matrices_path:
+        return None
+    path = Path(config.od_matrices_path)
+    try:
+        matrices = ODMatrices(path)
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"Lane matrices at {path} not usable: {e}")
+        return None
+    logger.info(f"Loaded lane matrices {path} ({len(matrices.categories)} categories, {len(matrices.months)} months)")
+    return matrices
@@ -0,0 +1,93 @@
+"""Cursor-based pagination over BigQuery query results.
+
+Paginated tools run their query once without a LIMIT and return only the first
+page. BigQuery keeps the complete result in the job's destination table, so the
+cursor saved in session state (destination table + page geometry) is enough to
+read any later page with tabledata.list, without re-running the SQL.
+"""
+
+from __future__ import annotations
+
+import math
+import uuid
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from fedex_market_intelligence.shared_libraries.bigquery_results import frame_to_records, read_frame
+
+if TYPE_CHECKING:
+    from google.cloud import bigquery
+
+# Session state key prefix for cursors
+CURSOR_KEY_PREFIX = "cursor:"
+
+
+def save_cursor(
+    tool_context,
+    tool_name: str,
+    query_job: bigquery.QueryJob,
+    total_rows: int,
+    page_size: int,
+    query_parameters: Dict[str, Any]
+) -> Optional[Dict[str, Any]]:
+    """
+    Save a pagination cursor for a finished query and describe the first page.
+
+    Args:
+        tool_context: ADK ToolContext of the calling tool (None outside a session)
+        tool_name: Name of the tool that ran the query
+        query_job: Completed query job whose destination table holds all rows
+        total_rows: Total number of rows in the full result
+        page_size: Rows per page
+        query_parameters: Original tool parameters, echoed back with each page
+
+    Returns:
+        Pagination block for the first page, or None when there is nothing more to page
+    """
+    total_pages = max(1, math.ceil(total_rows / page_size)) if page_size > 0 else 1
+    pagination = {
+        "page": 1,
+        "page_size": page_size,
+        "total_rows": total_rows,
+        "total_pages": total_pages,
+        "has_more": total_pages > 1,
+    }
+
+    destination = query_job.destination
+    if tool_context is None or destination is None or total_pages <= 1:
+        return pagination
+
+    cursor_id = f"cur_{uuid.uuid4().hex[:8]}"
+    tool_context.state[f"{CURSOR_KEY_PREFIX}{cursor_id}"] = {
+        "tool": tool_name,
+        "created_at": datetime.now().isoformat(),
+        "destination_table": f"{destination.project}.{destination.dataset_id}.{destination.table_id}",
+        "page_size": page_size,
+        "total_rows": total_rows,
+        "total_pages": total_pages,
+        "query_parameters": query_parameters,
+    }
+    pagination["cursor_id"] = cursor_id
+    return pagination
+
+
+def get_cursor(tool_context, cursor_id: str) -> Optional[Dict[str, Any]]:
+    """Load a saved cursor by id."""
+    if tool_context is None or not cursor_id:
+        return None
+    return tool_context.state.get(f"{CURSOR_KEY_PREFIX}{cursor_id.strip()}")
+
+
+def read_page(
+    client: bigquery.Client,
+    cursor: Dict[str, Any],
+    page_number: int
+) -> List[Dict[str, Any]]:
+    """Read one page of a cursor's destination table (1-based page number)."""
+    page_size = cursor["page_size"]
+    rows = client.list_rows(
+        cursor["destination_table"],
+        start_index=(page_number - 1) * page_size,
+        max_results=page_size,
+    )
+    return frame_to_records(read_frame(rows, max_rows=page_size))
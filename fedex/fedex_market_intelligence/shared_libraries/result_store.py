@@ -0,0 +1,134 @@
+"""Session-scoped result store for handing datasets between tools.
+
+Query tools save their full result rows under a short handle in the ADK
+session state and return that handle to the model. Downstream tools accept
+the handle and load the rows server-side, so large datasets never have to be
+copied back through the model as tool arguments.
+"""
+
+import json
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from fedex_market_intelligence.config import config
+
+# Session state keys
+RESULT_KEY_PREFIX = "result:"
+HANDLE_INDEX_KEY = "result_store_handles"
+
+# Fields checked (in order) when turning a result row into a map location
+LABEL_FIELDS = ["location", "market_name", "zip_code", "city"]
+VALUE_FIELDS = ["total_shipments", "opportunity_score", "total_value", "actual_shipments", "assigned_shipments"]
+
+
+def put_result(
+    tool_context,
+    tool_name: str,
+    rows: List[Dict[str, Any]],
+    summary: Optional[Dict[str, Any]] = None
+) -> Optional[str]:
+    """
+    Save result rows in session state and return a handle for them.
+
+    Args:
+        tool_context: ADK ToolContext of the calling tool (None outside a session)
+        tool_name: Name of the tool that produced the rows
+        rows: Result rows to store
+        summary: Optional summary dict stored alongside the rows
+
+    Returns:
+        Result handle string, or None when no session is available
+    """
+    if tool_context is None:
+        return None
+
+    handle = f"res_{uuid.uuid4().hex[:8]}"
+
+    # Round-trip through JSON so the stored value is serializable by any session service
+    tool_context.state[f"{RESULT_KEY_PREFIX}{handle}"] = json.loads(json.dumps({
+        "tool": tool_name,
+        "created_at": datetime.now().isoformat(),
+        "row_count": len(rows),
+        "summary": summary or {},
+        "rows": rows,
+    }, default=str))
+
+    # Track handles oldest-first and evict beyond the configured limit
+    handles = list(tool_context.state.get(HANDLE_INDEX_KEY) or [])
+    handles.append(handle)
+    while len(handles) > config.result_store_max_handles:
+        evicted = handles.pop(0)
+        tool_context.state[f"{RESULT_KEY_PREFIX}{evicted}"] = None
+    tool_context.state[HANDLE_INDEX_KEY] = handles
+
+    return handle
+
+
+def get_result(tool_context, handle: str) -> Optional[Dict[str, Any]]:
+    """Load a stored result (tool, row_count, summary, rows) by handle."""
+    if tool_context is None or not handle:
+        return None
+    return tool_context.state.get(f"{RESULT_KEY_PREFIX}{handle.strip()}")
+
+
+def list_results(tool_context) -> List[Dict[str, Any]]:
+    """List the handles currently available in the session, newest first."""
+    if tool_context is None:
+        return []
+
+    available = []
+    for handle in reversed(tool_context.state.get(HANDLE_INDEX_KEY) or []):
+        stored = get_result(tool_context, handle)
+        if stored:
+            available.append({
+                "result_handle": handle,
+                "tool": stored.get("tool"),
+                "row_count": stored.get("row_count"),
+            })
+    return available
+
+
+def missing_result_error(tool_context, handle: str) -> str:
+    """Build the JSON error returned when a handle cannot be resolved."""
+    return json.dumps({
+        "error": f"Result handle '{handle}' not found in this session",
+        "suggestion": "Re-run the query tool to get a fresh result_handle",
+        "available_handles": list_results(tool_context)
+    }, indent=2)
+
+
+def rows_to_locations(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Convert stored result rows into map locations (lat, lng, label, value)."""
+    locations = []
+    for row in rows:
+        if row.get("lat") is None or row.get("lng") is None:
+            continue
+
+        label = next((str(row[f]) for f in LABEL_FIELDS if row.get(f)), "Unknown")
+        value = next((row[f] for f in VALUE_FIELDS if row.get(f) is not None), None)
+
+        description = ", ".join(
+            str(row[f]) for f in ["city", "state", "metro_area"] if row.get(f) and str(row[f]) != label
+        )
+        locations.append({
+            "lat": row["lat"],
+            "lng": row["lng"],
+            "label": label,
+            "value": value,
+            "description": description,
+        })
+    return locations
+
+
+def rows_to_zip_codes(rows: List[Dict[str, Any]]) -> List[str]:
+    """Extract distinct 5-digit ZIP codes from stored result rows, preserving order."""
+    zip_codes = []
+    for row in rows:
+        for field in ["zip_code", "location"]:
+            value = str(row.get(field) or "")
+            if len(value) == 5 and value.isdigit():
+                if value not in zip_codes:
+                    zip_codes.append(value)
+                break
+    return zip_codes
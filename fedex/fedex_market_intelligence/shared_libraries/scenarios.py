@@ -0,0 +1,103 @@
+"""Monte Carlo demand scenarios around the forecast_demand model.
+
+Every path follows the forecast's model - baseline x monthly-compounded YoY
+growth x seasonality (tools/forecasting.project_shipments) - with two sources
+of uncertainty drawn from the market's own history:
+
+    growth  the mean of a bootstrap resample of the baseline window's monthly
+            YoY growth rates, so paths spread as much as growth is uncertain
+    noise   a bootstrapped residual per path and month: how far each window
+            month landed from the model's fitted value (centered on zero)
+
+User shocks scale the growth rate and the seasonal amplitude. The baseline and
+scenario paths share the same draws (common random numbers), so the difference
+between them is the shock alone. All paths are simulated at once as
+[path, month] arrays.
+"""
+
+from __future__ import annotations
+
+from typing import Dict
+
+from fedex_market_intelligence.shared_libraries.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+DEFAULT_PATHS = 5000
+MAX_PATHS = 20000
+
+PERCENTILES = [5, 25, 50, 75, 95]
+
+# Fixed, so asking the same question twice returns the same bands
+SIMULATION_SEED = 20251231
+
+
+def fitted_residuals(totals: np.ndarray, expected: np.ndarray) -> np.ndarray:
+    """Relative residuals actual / fitted - 1 of the window months, centered on zero."""
+    valid = np.isfinite(totals) & (expected > 0)
+    residuals = totals[valid] / expected[valid] - 1
+    return residuals - residuals.mean() if len(residuals) else residuals
+
+
+def simulate_paths(
+    project,
+    baseline: float,
+    growth_rates: np.ndarray,
+    residuals: np.ndarray,
+    seasonality: np.ndarray,
+    num_paths: int,
+    growth_change_pct: float = 0.0,
+    seasonality_change_pct: float = 0.0,
+    seed: int = SIMULATION_SEED
+) -> Dict[str, np.ndarray]:
+    """
+    Baseline and shocked [path, month] shipment paths.
+
+    Args:
+        project: The forecast model, project(baseline, growth, seasonality, months_ahead)
+                 -> (shipments, growth_factor), applied elementwise
+        baseline: Baseline monthly shipments
+        growth_rates: The window's monthly YoY growth rates (%), bootstrapped per path
+        residuals: Relative residuals bootstrapped per path and month (may be empty)
+        seasonality: Seasonality factor of each forecast month
+        num_paths: Number of paths
+        growth_change_pct: Relative change to the growth rate (-50 halves it)
+        seasonality_change_pct: Relative change to the seasonal swing (-100 flattens it)
+
+    Returns:
+        Dict with 'baseline' and 'scenario' paths and the per-path 'growth' and
+        'scenario_growth' rates
+    """
+    rng = np.random.default_rng(seed)
+    horizon = len(seasonality)
+    months_ahead = np.arange(1, horizon + 1)[None, :]
+
+    if len(growth_rates):
+        draws = rng.integers(0, len(growth_rates), size=(num_paths, len(growth_rates)))
+        growth = growth_rates[draws].mean(axis=1)
+    else:
+        growth = np.zeros(num_paths)
+    if len(residuals):
+        noise = residuals[rng.integers(0, len(residuals), size=(num_paths, horizon))]
+    else:
+        noise = np.zeros((num_paths, horizon))
+
+    scenario_growth = growth * (1 + growth_change_pct / 100)
+    scenario_seasonality = np.maximum(1 + (seasonality - 1) * (1 + seasonality_change_pct / 100), 0)
+
+    def paths(growth_rate, factors):
+        shipments, _ = project(baseline, growth_rate[:, None], factors[None, :], months_ahead)
+        return np.maximum(shipments * (1 + noise), 0)
+
+    return {
+        "baseline": paths(growth, seasonality),
+        "scenario": paths(scenario_growth, scenario_seasonality),
+        "growth": growth,
+        "scenario_growth": scenario_growth,
+    }
+
+
+def percentile_bands(values: np.ndarray, axis: int = 0) -> Dict[str, np.ndarray]:
+    """{'p5': ..., 'p50': ..., 'p95': ...} percentiles of values along axis."""
+    bands = np.percentile(values, PERCENTILES, axis=axis)
+    return {f"p{p}": band for p, band in zip(PERCENTILES, bands)}
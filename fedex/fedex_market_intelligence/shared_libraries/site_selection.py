@@ -0,0 +1,217 @@
+"""Facility site selection over candidate ZIP codes (p-median / max-coverage).
+
+Demand points and candidate sites are ZIP centroids, and every distance comes
+from one vectorized haversine matrix. Sites are chosen greedily - each step
+opens the candidate that lowers the objective most, scored for all candidates
+in one matrix operation - and then improved by swap passes that replace an open
+site with the best closed candidate while that still lowers the objective.
+
+Objectives, per unit of demand:
+    p_median      distance to the serving site (minimize the weighted average)
+    max_coverage  1 when the serving site is beyond the coverage radius (minimize
+                  uncovered demand), with distance as a tie-breaker
+
+With a site capacity, demand is assigned single-source to the nearest site with
+room left (largest regret first), and swaps are re-scored with that assignment.
+
+Every demand point is kept, but candidates can be capped to the highest-demand
+points (top_candidates), so the matrix is [point, candidate] rather than N x N.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, List, Optional
+
+from fedex_market_intelligence.shared_libraries.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+EARTH_RADIUS_MILES = 3958.8
+
+OBJECTIVES = ["p_median", "max_coverage"]
+
+# Swap passes stop earlier once a full pass finds no improving swap
+MAX_SWAP_PASSES = 20
+
+# Capacitated swaps are re-scored for this many best candidates by uncapacitated cost
+CAPACITATED_SWAP_CANDIDATES = 25
+
+# Weight of distance (in coverage radii) next to uncovered demand in max_coverage
+COVERAGE_TIE_BREAK = 1e-6
+
+
+def haversine_miles(lat1, lng1, lat2, lng2) -> np.ndarray:
+    """Great-circle distance in miles between every point of set 1 and every point of set 2."""
+    lat1, lng1, lat2, lng2 = (np.radians(np.asarray(values, dtype=np.float64)) for values in (lat1, lng1, lat2, lng2))
+    dlat = lat2[None, :] - lat1[:, None]
+    dlng = lng2[None, :] - lng1[:, None]
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1)[:, None] * np.cos(lat2)[None, :] * np.sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def top_candidates(weights: np.ndarray, max_candidates: int) -> np.ndarray:
+    """Positions of the max_candidates heaviest demand points (all of them when fewer), in input order."""
+    if len(weights) <= max_candidates:
+        return np.arange(len(weights))
+    return np.sort(np.argsort(-weights, kind="stable")[:max_candidates])
+
+
+def objective_cost(objective: str, radius_miles: float) -> Callable[[np.ndarray], np.ndarray]:
+    """Per-unit-of-demand cost of being served at a given distance."""
+    if objective == "max_coverage":
+        return lambda distance: (distance > radius_miles) + COVERAGE_TIE_BREAK * distance / radius_miles
+    return lambda distance: distance
+
+
+def candidate_costs(distance: np.ndarray, weights: np.ndarray, served: np.ndarray, cost) -> np.ndarray:
+    """Objective after adding each candidate to sites that serve every point at distance `served`."""
+    return weights @ cost(np.minimum(served[:, None], distance))
+
+
+def greedy_sites(distance: np.ndarray, weights: np.ndarray, num_sites: int, cost) -> List[int]:
+    """Open num_sites candidates one at a time, each the one that lowers the objective most."""
+    served = np.full(distance.shape[0], np.inf)
+    sites: List[int] = []
+    for _ in range(num_sites):
+        costs = candidate_costs(distance, weights, served, cost)
+        costs[sites] = np.inf
+        site = int(np.argmin(costs))
+        sites.append(site)
+        served = np.minimum(served, distance[:, site])
+    return sites
+
+
+def total_cost(distance: np.ndarray, weights: np.ndarray, sites: List[int], cost) -> float:
+    return float(weights @ cost(distance[:, sites].min(axis=1)))
+
+
+def served_without(distance: np.ndarray, sites: List[int], position: int) -> np.ndarray:
+    """Distance of every point to the open sites other than sites[position]."""
+    others = sites[:position] + sites[position + 1:]
+    if not others:
+        return np.full(distance.shape[0], np.inf)
+    return distance[:, others].min(axis=1)
+
+
+def swap_sites(distance: np.ndarray, weights: np.ndarray, sites: List[int], cost):
+    """Replace open sites with the best closed candidate while that lowers the objective."""
+    sites = list(sites)
+    current = total_cost(distance, weights, sites, cost)
+    for _ in range(MAX_SWAP_PASSES):
+        improved = False
+        for position in range(len(sites)):
+            costs = candidate_costs(distance, weights, served_without(distance, sites, position), cost)
+            costs[sites] = np.inf
+            candidate = int(np.argmin(costs))
+            if costs[candidate] < current * (1 - 1e-9):
+                sites[position] = candidate
+                current = float(costs[candidate])
+                improved = True
+        if not improved:
+            break
+    return sites, current
+
+
+def assign_capacitated(site_distance: np.ndarray, weights: np.ndarray, capacity: float) -> np.ndarray:
+    """
+    Single-source assignment of demand points to sites with a capacity each.
+
+    Points with the largest regret (weight x extra distance to their second choice)
+    are placed first, each at the nearest site with room left.
+
+    Returns:
+        Position of each point's site in the site list, -1 where no site had room
+    """
+    order = np.argsort(site_distance, axis=1)
+    if site_distance.shape[1] > 1:
+        nearest = np.take_along_axis(site_distance, order[:, :2], axis=1)
+        regret = weights * (nearest[:, 1] - nearest[:, 0])
+    else:
+        regret = weights
+    remaining = np.full(site_distance.shape[1], float(capacity))
+    assignment = np.full(site_distance.shape[0], -1)
+    for point in np.argsort(-regret, kind="stable"):
+        for site in order[point]:
+            if remaining[site] >= weights[point]:
+                assignment[point] = site
+                remaining[site] -= weights[point]
+                break
+    return assignment
+
+
+def capacitated_cost(distance: np.ndarray, weights: np.ndarray, sites: List[int], capacity: float, cost):
+    """(unserved demand, objective over served demand) - compared lexicographically."""
+    site_distance = distance[:, sites]
+    assignment = assign_capacitated(site_distance, weights, capacity)
+    served = assignment >= 0
+    unserved = float(weights[~served].sum())
+    objective = float(weights[served] @ cost(site_distance[np.flatnonzero(served), assignment[served]]))
+    return unserved, objective
+
+
+def swap_sites_capacitated(distance: np.ndarray, weights: np.ndarray, sites: List[int], capacity: float, cost):
+    """Swap passes scored with the capacitated assignment, over the most promising candidates."""
+    sites = list(sites)
+    current = capacitated_cost(distance, weights, sites, capacity, cost)
+    for _ in range(MAX_SWAP_PASSES):
+        improved = False
+        for position in range(len(sites)):
+            costs = candidate_costs(distance, weights, served_without(distance, sites, position), cost)
+            costs[sites] = np.inf
+            best = None
+            for candidate in np.argsort(costs)[:CAPACITATED_SWAP_CANDIDATES]:
+                if not np.isfinite(costs[candidate]):
+                    break
+                trial = sites[:position] + [int(candidate)] + sites[position + 1:]
+                score = capacitated_cost(distance, weights, trial, capacity, cost)
+                if score < current and (best is None or score < best[0]):
+                    best = (score, trial)
+            if best is not None:
+                current, sites = best
+                improved = True
+        if not improved:
+            break
+    return sites, current
+
+
+def solve_site_selection(
+    distance: np.ndarray,
+    weights: np.ndarray,
+    num_sites: int,
+    objective: str = "p_median",
+    radius_miles: float = 10.0,
+    capacity: Optional[float] = None
+) -> Dict[str, Any]:
+    """
+    Choose num_sites candidate columns of distance that best serve the weighted demand rows.
+
+    Args:
+        distance: [demand point, candidate] distances in miles
+        weights: Demand of each point
+        num_sites: Number of sites to open (at most the number of candidates)
+        objective: 'p_median' or 'max_coverage'
+        radius_miles: Coverage radius (max_coverage objective and coverage stats)
+        capacity: Optional demand each site can serve
+
+    Returns:
+        Dict with 'sites' (candidate positions), 'assignment' (site position per point,
+        -1 when unserved), 'greedy_cost' and 'cost' (objective before and after swaps)
+    """
+    cost = objective_cost(objective, radius_miles)
+    sites = greedy_sites(distance, weights, num_sites, cost)
+    greedy_cost = total_cost(distance, weights, sites, cost)
+    sites, final_cost = swap_sites(distance, weights, sites, cost)
+
+    if capacity:
+        sites, _ = swap_sites_capacitated(distance, weights, sites, capacity, cost)
+        assignment = assign_capacitated(distance[:, sites], weights, capacity)
+        final_cost = total_cost(distance, weights, sites, cost)
+    else:
+        assignment = np.argmin(distance[:, sites], axis=1)
+
+    return {
+        "sites": sites,
+        "assignment": assignment,
+        "greedy_cost": greedy_cost,
+        "cost": final_cost,
+    }
@@ -7,8 +7,34 @@ from .market_comparison import compare_markets
 from .forecasting import forecast_demand
 from .demographics import get_demographics
 from .visualization import generate_map_visualization
+from .result_pages import fetch_result_page
+from .anomaly_detection import find_demand_anomalies
+from .lane_analysis import analyze_shipping_lanes
+from .site_selection import select_sites
+from .catchment_analysis import analyze_catchments
+from .category_affinity import find_adjacent_categories
+from .scenarios import simulate_demand_scenario
+
+# Every tool, in the order the agent registers them
+TOOLS = [
+    query_shipment_trends,
+    analyze_geographic_demand,
+    find_market_opportunities,
+    compare_markets,
+    forecast_demand,
+    get_demographics,
+    generate_map_visualization,
+    fetch_result_page,
+    find_demand_anomalies,
+    analyze_shipping_lanes,
+    select_sites,
+    analyze_catchments,
+    find_adjacent_categories,
+    simulate_demand_scenario,
+]
 
 __all__ = [
+    "TOOLS",
     "query_shipment_trends",
     "analyze_geographic_demand",
     "find_market_opportunities",
@@ -16,5 +42,12 @@ __all__ = [
     "forecast_demand",
     "get_demographics",
     "generate_map_visualization",
+    "fetch_result_page",
+    "find_demand_anomalies",
+    "analyze_shipping_lanes",
+    "select_sites",
+    "analyze_catchments",
+    "find_adjacent_categories",
+    "simulate_demand_scenario",
 ]
 
@@ -0,0 +1,115 @@
+"""Demand anomaly tool - list the month's biggest spikes and collapses for a market."""
+
+from google.adk.tools import ToolContext
+from typing import Optional
+import json
+
+from fedex_market_intelligence.shared_libraries.anomalies import (
+    TRAILING_MONTHS,
+    Z_THRESHOLD,
+    load_anomaly_index,
+)
+from fedex_market_intelligence.shared_libraries.bigquery_results import frame_to_records
+from fedex_market_intelligence.shared_libraries.category_index import resolve_category
+from fedex_market_intelligence.shared_libraries.result_store import put_result
+
+DIRECTIONS = ["spike", "collapse"]
+
+
+def find_demand_anomalies(
+    market: Optional[str] = None,
+    year_month: Optional[str] = None,
+    product_category: Optional[str] = None,
+    direction: Optional[str] = None,
+    top_n: int = 10,
+    tool_context: Optional[ToolContext] = None
+) -> str:
+    """
+    List the strongest demand anomalies (unusual spikes or collapses) of a month.
+    
+    Every ZIP code x product category series is pre-scanned, so this answers instantly
+    for any market. Use this when the user asks:
+    - Where demand spiked or collapsed last month
+    - What was unusual in a market or category recently
+    - Which ZIP codes broke from their normal pattern
+    
+    Args:
+        market: Optional market filter - ZIP code, state code, or city/metro/region name
+                (e.g., '85001', 'AZ', 'Phoenix', 'Northeast'). None for the whole country.
+        year_month: Month to inspect as 'YYYY-MM' (default: latest month in the data)
+        product_category: Optional category filter (e.g., 'pet_supplies')
+        direction: Optional 'spike' or 'collapse' (default: both)
+        top_n: Number of anomalies to return, most extreme first (default: 10)
+    
+    Returns:
+        JSON string with the anomalies (ZIP code, category, actual vs expected shipments,
+        change %, robust z-score, direction), counts of spikes and collapses, and a
+        'result_handle' that generate_map_visualization accepts
+    
+    Example:
+        find_demand_anomalies(market='Phoenix', direction='spike')
+        Returns the Phoenix ZIP codes whose latest-month shipments spiked most
+    """
+    
+    product_category, error = resolve_category(product_category)
+    if error:
+        return error
+    
+    if direction and direction not in DIRECTIONS:
+        return json.dumps({
+            "error": f"Unknown direction '{direction}'",
+            "valid_directions": DIRECTIONS
+        }, indent=2)
+    
+    index = load_anomaly_index()
+    if index is None:
+        return json.dumps({
+            "error": "Demand anomaly index is not available",
+            "suggestion": "Run data/build_demand_anomalies.py and set ANOMALY_INDEX_PATH, or set DEMAND_TENSOR_PATH"
+        }, indent=2)
+    if not index.months:
+        return json.dumps({
+            "error": "The demand data has no scanned months (fewer than 13 months of history, or no anomalies in an older index)"
+        }, indent=2)
+    
+    year_month = year_month or index.months[-1]
+    if year_month not in index.months:
+        return json.dumps({
+            "error": f"No anomaly data for month '{year_month}'",
+            "available_months": f"{index.months[0]} to {index.months[-1]}"
+        }, indent=2)
+    
+    matches = index.for_month(year_month, market, product_category, direction)
+    anomalies = frame_to_records(matches.head(top_n))
+    
+    summary = {
+        "year_month": year_month,
+        "anomalies_found": len(matches),
+        "spikes": int((matches['direction'] == 'spike').sum()),
+        "collapses": int((matches['direction'] == 'collapse').sum()),
+        "anomalies_returned": len(anomalies)
+    }
+    
+    response = {
+        "query_parameters": {
+            "market": market or "All markets",
+            "year_month": year_month,
+            "product_category": product_category or "All categories",
+            "direction": direction or "both",
+            "top_n": top_n
+        },
+        "summary": summary,
+        "anomalies": anomalies,
+        "methodology": (
+            f"Monthly shipments per ZIP code and category, seasonally adjusted, scored against the "
+            f"trailing {TRAILING_MONTHS} months with a median/MAD robust z-score; |z| >= {Z_THRESHOLD} is an anomaly. "
+            f"expected_shipments is the seasonal trailing median."
+        )
+    }
+    
+    # Keep the rows server-side so the map tool can plot them by handle
+    result_handle = put_result(tool_context, "find_demand_anomalies", anomalies, summary)
+    if result_handle:
+        response["result_handle"] = result_handle
+    
+    return json.dumps(response, indent=2, default=str)
@@ -0,0 +1,535 @@
+"""Async versions of the FedEx tools.
+
+ADK awaits coroutine tools on the event loop, so these let one replica serve many
+concurrent sessions: BigQuery jobs are polled asynchronously and Census lookups
+go out concurrently over one async HTTP client. Identical concurrent queries and
+lookups are coalesced onto one backend call. Category names are resolved in a
+worker thread, since the first resolution reads category_hierarchy. Each tool
+has the same name, parameters and docstring as its sync counterpart and shares
+its query and response builders, so the model sees identical tools either way.
+"""
+
+import asyncio
+import json
+from typing import List, Optional
+
+from google.adk.tools import ToolContext
+
+from fedex_market_intelligence.shared_libraries.async_backends import (
+    bigquery_admission,
+    census_admission,
+    run_shared_query,
+)
+from fedex_market_intelligence.shared_libraries.catchments import (
+    candidate_distances,
+    catchment_membership,
+    load_zip_points,
+)
+from fedex_market_intelligence.shared_libraries.category_index import resolve_category
+from fedex_market_intelligence.shared_libraries.clients import get_bigquery_client
+from fedex_market_intelligence.shared_libraries.coalescing import census_flight
+from fedex_market_intelligence.shared_libraries.concentration import load_concentration_cube
+from fedex_market_intelligence.shared_libraries.demand_tensor import load_demand_tensor
+from fedex_market_intelligence.shared_libraries.lazy import lazy_import
+from fedex_market_intelligence.shared_libraries.result_store import (
+    get_result,
+    missing_result_error,
+    rows_to_zip_codes,
+)
+from fedex_market_intelligence.tools import (
+    anomaly_detection,
+    catchment_analysis,
+    category_affinity,
+    demographics,
+    forecasting,
+    geographic_analysis,
+    lane_analysis,
+    market_comparison,
+    market_opportunities,
+    result_pages,
+    scenarios,
+    site_selection,
+    trend_analysis,
+    visualization,
+)
+
+httpx = lazy_import("httpx")
+
+
+def same_docstring(sync_tool):
+    """Give an async tool the docstring of its sync counterpart (used as the tool description)."""
+    def decorate(async_tool):
+        async_tool.__doc__ = sync_tool.__doc__
+        return async_tool
+    return decorate
+
+
+@same_docstring(trend_analysis.query_shipment_trends)
+async def query_shipment_trends(
+    product_category: str,
+    location: Optional[str] = None,
+    time_period: str = "last_12_months",
+    metric: str = "volume",
+    limit: int = 100,
+    tool_context: Optional[ToolContext] = None
+) -> str:
+    product_category, error = await asyncio.to_thread(resolve_category, product_category)
+    if error:
+        return error
+
+    client = get_bigquery_client()
+    query = trend_analysis.build_trends_query(product_category, location, time_period, metric)
+
+    query_parameters = {
+        "product_category": product_category,
+        "location": location or "All locations",
+        "time_period": time_period,
+        "metric": metric
+    }
+
+    try:
+        query_job, results = await run_shared_query(client, query, max_results=limit)
+
+        response = await asyncio.to_thread(
+            trend_analysis.build_trends_response, query_job, results, query_parameters, limit, tool_context,
+            trend_analysis.lookup_trend_features(product_category, location)
+        )
+        return json.dumps(response, indent=2, default=str)
+
+    except Exception as e:
+        return json.dumps({
+            "error": str(e),
+            "query": query
+        }, indent=2)
+
+
+@same_docstring(geographic_analysis.analyze_geographic_demand)
+async def analyze_geographic_demand(
+    product_category: str,
+    geographic_scope: str = "metro",
+    demographic_filter: Optional[str] = None,
+    time_period: str = "last_12_months",
+    top_n: int = 10,
+    tool_context: Optional[ToolContext] = None
+) -> str:
+    product_category, error = await asyncio.to_thread(resolve_category, product_category)
+    if error:
+        return error
+
+    client = get_bigquery_client()
+    query = geographic_analysis.build_geographic_query(
+        product_category, geographic_scope, time_period, demographic_filter
+    )
+
+    try:
+        query_job, results = await run_shared_query(client, query, max_results=top_n)
+
+        response = await asyncio.to_thread(
+            geographic_analysis.build_geographic_response,
+            query_job, results, product_category, geographic_scope, demographic_filter,
+            time_period, top_n, tool_context
+        )
+        return json.dumps(response, indent=2, default=str)
+
+    except Exception as e:
+        return json.dumps({
+            "error": str(e),
+            "query": query
+        }, indent=2)
+
+
+@same_docstring(market_opportunities.find_market_opportunities)
+async def find_market_opportunities(
+    product_category: str,
+    market: str,
+    gap_type: str = "low_competition",
+    min_demand_threshold: int = 50,
+    top_n: int = 10,
+    tool_context: Optional[ToolContext] = None
+) -> str:
+    product_category, error = await asyncio.to_thread(resolve_category, product_category)
+    if error:
+        return error
+
+    client = get_bigquery_client()
+    query = market_opportunities.build_opportunities_query(
+        product_category, market, gap_type, min_demand_threshold, top_n
+    )
+
+    try:
+        _, results = await run_shared_query(client, query)
+
+        response = await asyncio.to_thread(
+            market_opportunities.build_opportunities_response,
+            results, product_category, market, gap_type, min_demand_threshold, tool_context
+        )
+        return json.dumps(response, indent=2, default=str)
+
+    except Exception as e:
+        return json.dumps({
+            "error": str(e),
+            "query": query
+        }, indent=2)
+
+
+@same_docstring(market_comparison.compare_markets)
+async def compare_markets(
+    product_category: str,
+    markets: List[str],
+    time_period: str = "last_12_months",
+    metrics: Optional[List[str]] = None
+) -> str:
+    product_category, error = await asyncio.to_thread(resolve_category, product_category)
+    if error:
+        return error
+
+    if not markets or len(markets) < 2:
+        return json.dumps({
+            "error": "Please provide at least 2 markets to compare"
+        }, indent=2)
+
+    # The tensor path is array slicing in microseconds - no need to leave the event loop;
+    # with a concentration cube the response sums sparse month blocks, so that part runs in a thread
+    tensor = load_demand_tensor()
+    if tensor is not None:
+        results = market_comparison.comparison_results_from_tensor(tensor, product_category, markets, time_period)
+        if load_concentration_cube() is None:
+            response = market_comparison.build_comparison_response(results, product_category, markets, time_period)
+        else:
+            response = await asyncio.to_thread(
+                market_comparison.build_comparison_response, results, product_category, markets, time_period
+            )
+        return json.dumps(response, indent=2, default=str)
+
+    client = get_bigquery_client()
+    query = market_comparison.build_comparison_query(product_category, markets, time_period)
+
+    try:
+        _, results = await run_shared_query(client, query)
+
+        response = await asyncio.to_thread(
+            market_comparison.build_comparison_response, results, product_category, markets, time_period
+        )
+        return json.dumps(response, indent=2, default=str)
+
+    except Exception as e:
+        return json.dumps({
+            "error": str(e),
+            "query": query
+        }, indent=2)
+
+
+@same_docstring(forecasting.forecast_demand)
+async def forecast_demand(
+    product_category: str,
+    market: str,
+    forecast_months: int = 6,
+    result_handle: Optional[str] = None,
+    tool_context: Optional[ToolContext] = None
+) -> str:
+    product_category, error = await asyncio.to_thread(resolve_category, product_category)
+    if error:
+        return error
+
+    zip_codes, error = forecasting.check_forecast_request(forecast_months, result_handle, tool_context)
+    if error:
+        return error
+
+    results = forecasting.forecast_results_from_store(product_category, market, zip_codes)
+    if results is None:
+        tensor = load_demand_tensor()
+        if tensor is not None:
+            results = forecasting.forecast_results_from_tensor(tensor, product_category, market, zip_codes)
+    if results is not None:
+        response = forecasting.build_forecast_response(
+            results, product_category, market, forecast_months, result_handle
+        )
+        return json.dumps(response, indent=2, default=str)
+
+    client = get_bigquery_client()
+    query = forecasting.build_forecast_query(product_category, market, zip_codes)
+
+    try:
+        _, results = await run_shared_query(client, query)
+
+        response = await asyncio.to_thread(
+            forecasting.build_forecast_response,
+            results, product_category, market, forecast_months, result_handle
+        )
+        return json.dumps(response, indent=2, default=str)
+
+    except Exception as e:
+        return json.dumps({
+            "error": str(e),
+            "query": query
+        }, indent=2)
+
+
+@same_docstring(scenarios.simulate_demand_scenario)
+async def simulate_demand_scenario(
+    product_category: str,
+    market: str,
+    forecast_months: int = 6,
+    growth_change_pct: float = 0.0,
+    seasonality_change_pct: float = 0.0,
+    num_paths: int = scenarios.DEFAULT_PATHS,
+    result_handle: Optional[str] = None,
+    tool_context: Optional[ToolContext] = None
+) -> str:
+    product_category, error = await asyncio.to_thread(resolve_category, product_category)
+    if error:
+        return error
+
+    zip_codes, error = scenarios.check_scenario_request(
+        forecast_months, seasonality_change_pct, num_paths, result_handle, tool_context
+    )
+    if error:
+        return error
+
+    # The simulation is CPU-bound, so it runs in a worker thread on both paths
+    tensor = load_demand_tensor()
+    if tensor is not None:
+        history = forecasting.history_from_tensor(tensor, product_category, market, zip_codes)
+        response = await asyncio.to_thread(
+            scenarios.build_scenario_response,
+            history, product_category, market, forecast_months, growth_change_pct,
+            seasonality_change_pct, num_paths, result_handle, tool_context
+        )
+        return json.dumps(response, indent=2, default=str)
+
+    client = get_bigquery_client()
+    query = forecasting.build_history_query(product_category, market, zip_codes)
+
+    try:
+        _, history = await run_shared_query(client, query)
+
+        response = await asyncio.to_thread(
+            scenarios.build_scenario_response,
+            history, product_category, market, forecast_months, growth_change_pct,
+            seasonality_change_pct, num_paths, result_handle, tool_context
+        )
+        return json.dumps(response, indent=2, default=str)
+
+    except Exception as e:
+        return json.dumps({
+            "error": str(e),
+            "query": query
+        }, indent=2)
+
+
+@same_docstring(site_selection.select_sites)
+async def select_sites(
+    product_category: str,
+    market: str,
+    num_sites: int = 3,
+    objective: str = "p_median",
+    coverage_radius_miles: float = 10.0,
+    site_capacity: Optional[int] = None,
+    time_period: str = "last_12_months",
+    tool_context: Optional[ToolContext] = None
+) -> str:
+    product_category, error = await asyncio.to_thread(resolve_category, product_category)
+    if error:
+        return error
+
+    error = site_selection.check_site_request(num_sites, objective, coverage_radius_miles)
+    if error:
+        return error
+
+    # The solve is CPU-bound, so it runs in a worker thread on both paths
+    tensor = load_demand_tensor()
+    if tensor is not None:
+        results = site_selection.site_demand_from_tensor(tensor, product_category, market, time_period)
+        response = await asyncio.to_thread(
+            site_selection.build_site_selection_response,
+            results, product_category, market, num_sites, objective, coverage_radius_miles,
+            site_capacity, time_period, tool_context
+        )
+        return json.dumps(response, indent=2, default=str)
+
+    client = get_bigquery_client()
+    query = site_selection.build_site_demand_query(product_category, market, time_period)
+
+    try:
+        _, results = await run_shared_query(client, query)
+
+        response = await asyncio.to_thread(
+            site_selection.build_site_selection_response,
+            results, product_category, market, num_sites, objective, coverage_radius_miles,
+            site_capacity, time_period, tool_context
+        )
+        return json.dumps(response, indent=2, default=str)
+
+    except Exception as e:
+        return json.dumps({
+            "error": str(e),
+            "query": query
+        }, indent=2)
+
+
+@same_docstring(catchment_analysis.analyze_catchments)
+async def analyze_catchments(
+    product_category: str,
+    locations: List[str],
+    radius_miles: float = 10.0,
+    assignment: str = "nearest",
+    ring_miles: Optional[List[float]] = None,
+    time_period: str = "last_12_months",
+    tool_context: Optional[ToolContext] = None
+) -> str:
+    product_category, error = await asyncio.to_thread(resolve_category, product_category)
+    if error:
+        return error
+
+    error = catchment_analysis.check_catchment_request(locations, radius_miles, assignment)
+    if error:
+        return error
+
+    try:
+        # Without a demand tensor the first call reads the ZIP centroids from BigQuery
+        points = await asyncio.to_thread(load_zip_points)
+    except Exception as e:
+        return json.dumps({
+            "error": f"Could not load ZIP code coordinates: {e}"
+        }, indent=2)
+
+    candidates, error = catchment_analysis.resolve_locations(points, locations)
+    if error:
+        return error
+
+    distance = candidate_distances(candidates)
+    positions, membership = catchment_membership(distance, radius_miles, assignment)
+
+    tensor = load_demand_tensor()
+    if tensor is not None:
+        monthly, month_serials = catchment_analysis.catchment_monthly_from_tensor(tensor, product_category, positions)
+        response = catchment_analysis.build_catchment_response(
+            points, candidates, distance, positions, membership, monthly, month_serials,
+            product_category, radius_miles, assignment, ring_miles, time_period, tool_context
+        )
+        return json.dumps(response, indent=2, default=str)
+
+    client = get_bigquery_client()
+    zip_codes = points.zip_codes[positions].tolist()
+    query = catchment_analysis.build_catchment_demand_query(product_category, zip_codes)
+
+    try:
+        _, results = await run_shared_query(client, query)
+
+        def build():
+            monthly, month_serials = catchment_analysis.catchment_monthly_from_results(results, zip_codes)
+            return catchment_analysis.build_catchment_response(
+                points, candidates, distance, positions, membership, monthly, month_serials,
+                product_category, radius_miles, assignment, ring_miles, time_period, tool_context
+            )
+
+        response = await asyncio.to_thread(build)
+        return json.dumps(response, indent=2, default=str)
+
+    except Exception as e:
+        return json.dumps({
+            "error": str(e),
+            "query": query
+        }, indent=2)
+
+
+async def fetch_census_record(
+    http: "httpx.AsyncClient",
+    zip_code: str,
+    variables: List[str]
+) -> dict:
+    """Fetch and parse one ZIP code's Census record under Census admission control."""
+    url = demographics.census_url(zip_code, variables)
+
+    async def request():
+        async with census_admission.admit():
+            response = await http.get(url)
+        data = response.json() if response.status_code == 200 else None
+        return response.status_code, data
+
+    try:
+        # Identical lookups in flight from other sessions share one request
+        status_code, data = await census_flight.do(url, request)
+        return demographics.parse_census_response(zip_code, status_code, data, variables)
+
+    except httpx.HTTPError as e:
+        return {
+            'zip_code': zip_code,
+            'error': f'Request failed: {str(e)}'
+        }
+    except Exception as e:
+        return {
+            'zip_code': zip_code,
+            'error': f'Unexpected error: {str(e)}'
+        }
+
+
+@same_docstring(demographics.get_demographics)
+async def get_demographics(
+    zip_codes: Optional[List[str]] = None,
+    metrics: Optional[List[str]] = None,
+    result_handle: Optional[str] = None,
+    tool_context: Optional[ToolContext] = None
+) -> str:
+    if result_handle:
+        stored = get_result(tool_context, result_handle)
+        if stored is None:
+            return missing_result_error(tool_context, result_handle)
+        zip_codes = rows_to_zip_codes(stored["rows"])
+
+    if not zip_codes:
+        return json.dumps({
+            "error": "Please provide at least one zip code"
+        }, indent=2)
+
+    if metrics is None:
+        metrics = ['population', 'income', 'age']
+
+    variables = demographics.census_variables(metrics)
+    # The local table is read from the memory-mapped tensor, which may page in from disk
+    local = await asyncio.to_thread(demographics.local_demographics, zip_codes, metrics)
+    remote = [z for z in zip_codes if z not in local][:demographics.MAX_ZIP_CODES]
+
+    # The remaining ZIP codes are requested concurrently
+    fetched = {}
+    if remote:
+        async with httpx.AsyncClient(timeout=10) as http:
+            records = await asyncio.gather(*[
+                fetch_census_record(http, zip_code, variables) for zip_code in remote
+            ])
+        fetched = dict(zip(remote, records))
+
+    records = demographics.merge_in_order(zip_codes, local, fetched)
+    response = demographics.build_demographics_response(zip_codes, metrics, records, result_handle)
+
+    return json.dumps(response, indent=2, default=str)
+
+
+@same_docstring(result_pages.fetch_result_page)
+async def fetch_result_page(
+    cursor_id: str,
+    page_number: int = 2,
+    tool_context: Optional[ToolContext] = None
+) -> str:
+    # A page read is a single tabledata.list call, so the sync tool runs in a worker thread
+    async with bigquery_admission.admit():
+        return await asyncio.to_thread(result_pages.fetch_result_page, cursor_id, page_number, tool_context)
+
+
+# The agent's tools with the async variants where there is one, in the same order as tools.TOOLS
+TOOLS = [
+    query_shipment_trends,
+    analyze_geographic_demand,
+    find_market_opportunities,
+    compare_markets,
+    forecast_demand,
+    get_demographics,
+    visualization.generate_map_visualization,
+    fetch_result_page,
+    anomaly_detection.find_demand_anomalies,
+    lane_analysis.analyze_shipping_lanes,
+    select_sites,
+    analyze_catchments,
+    category_affinity.find_adjacent_categories,
+    simulate_demand_scenario,
+]
@@ -0,0 +1,384 @@
+"""Catchment analysis tool - demand, growth and competition around candidate locations."""
+
+from google.adk.tools import ToolContext
+from typing import List, Optional, Tuple
+import json
+
+from fedex_market_intelligence.config import config
+from fedex_market_intelligence.shared_libraries.bigquery_results import read_frame
+from fedex_market_intelligence.shared_libraries.catchments import (
+    ASSIGNMENTS,
+    CATCHMENT_METRICS,
+    ZipPoints,
+    candidate_distances,
+    catchment_membership,
+    load_zip_points,
+    period_totals,
+    ring_radii,
+)
+from fedex_market_intelligence.shared_libraries.category_index import resolve_category
+from fedex_market_intelligence.shared_libraries.clients import get_bigquery_client
+from fedex_market_intelligence.shared_libraries.demand_tensor import (
+    DemandTensor,
+    load_demand_tensor,
+    month_serial,
+)
+from fedex_market_intelligence.shared_libraries.lazy import lazy_import
+from fedex_market_intelligence.shared_libraries.result_store import put_result
+from fedex_market_intelligence.tools.lane_analysis import growth_pct
+
+np = lazy_import("numpy")
+
+PROJECT_ID = config.project_id
+DATASET_ID = config.dataset_id
+
+# Most candidate locations and largest radius a single call may use
+MAX_LOCATIONS = 20
+MAX_RADIUS_MILES = 100.0
+
+# ZIP codes listed per catchment, busiest first
+TOP_CATCHMENT_ZIPS = 5
+
+
+def check_catchment_request(locations: List[str], radius_miles: float, assignment: str) -> Optional[str]:
+    """Validate analyze_catchments arguments; returns an error JSON string or None."""
+    if assignment not in ASSIGNMENTS:
+        return json.dumps({
+            "error": f"Unknown assignment '{assignment}'",
+            "valid_assignments": ASSIGNMENTS
+        }, indent=2)
+    if not locations or len(locations) > MAX_LOCATIONS:
+        return json.dumps({
+            "error": f"Provide between 1 and {MAX_LOCATIONS} candidate ZIP codes"
+        }, indent=2)
+    if not 0 < radius_miles <= MAX_RADIUS_MILES:
+        return json.dumps({
+            "error": f"radius_miles must be between 0 and {MAX_RADIUS_MILES:g}"
+        }, indent=2)
+    return None
+
+
+def resolve_locations(points: ZipPoints, locations: List[str]) -> Tuple[Tuple[str, ...], Optional[str]]:
+    """Candidate ZIP codes in request order without duplicates, or an error JSON string."""
+    candidates = tuple(dict.fromkeys(str(location).strip() for location in locations))
+    unknown = [z for z in candidates if z not in points.index]
+    if unknown:
+        return candidates, json.dumps({
+            "error": f"Unknown ZIP codes: {', '.join(unknown)}",
+            "suggestion": "Candidate locations must be 5-digit ZIP codes from geographic_metadata"
+        }, indent=2)
+    missing = [z for z in candidates if not np.isfinite(points.coords[points.index[z]]).all()]
+    if missing:
+        return candidates, json.dumps({
+            "error": f"No coordinates for ZIP codes: {', '.join(missing)}"
+        }, indent=2)
+    return candidates, None
+
+
+def build_catchment_demand_query(product_category: str, zip_codes: List[str]) -> str:
+    """Build the SQL for the monthly demand of the catchment ZIPs (shared by the sync and async tool)."""
+
+    zip_list = ", ".join(f"'{z}'" for z in zip_codes)
+
+    query = f"""
+        SELECT
+            ad.zip_code,
+            ad.year_month,
+            SUM(ad.total_shipments) as total_shipments,
+            SUM(ad.total_value) as total_value,
+            SUM(ad.unique_shippers) as unique_shippers,
+            COUNT(*) as demand_rows,
+            SUM(ms.market_concentration_index) as market_concentration_index,
+            SUM(ms.major_brand_volume) as major_brand_volume,
+            SUM(ms.small_business_volume) as small_business_volume,
+            COUNTIF(ms.zip_code IS NOT NULL) as share_rows
+        FROM `{PROJECT_ID}.{DATASET_ID}.aggregated_demand` ad
+        LEFT JOIN `{PROJECT_ID}.{DATASET_ID}.market_share` ms
+            ON ad.zip_code = ms.zip_code
+            AND ad.year_month = ms.year_month
+            AND ad.product_category = ms.product_category
+        WHERE ad.product_category = '{product_category}'
+        AND ad.zip_code IN ({zip_list})
+        GROUP BY ad.zip_code, ad.year_month
+    """
+
+    return query
+
+
+def catchment_monthly_from_tensor(tensor: DemandTensor, product_category: str, positions):
+    """[month, zip] catchment metrics of the ZIPs at positions, read from the demand tensor."""
+
+    if not tensor.has_category(product_category):
+        return {name: np.zeros((0, len(positions))) for name in CATCHMENT_METRICS}, np.zeros(0, dtype=np.int64)
+
+    def metric(name):
+        return np.asarray(tensor.slice(product_category, name)[:, positions], dtype=np.float64)
+
+    # market_share is LEFT JOINed onto demand rows, so share metrics only count there
+    demand_rows = metric("demand_rows")
+    share_rows = demand_rows * metric("share_rows")
+    monthly = {
+        "total_shipments": metric("total_shipments"),
+        "total_value": metric("total_value"),
+        "unique_shippers": metric("unique_shippers") * demand_rows,
+        "demand_rows": demand_rows,
+        "market_concentration_index": metric("market_concentration_index") * share_rows,
+        "major_brand_volume": metric("major_brand_volume") * share_rows,
+        "small_business_volume": metric("small_business_volume") * share_rows,
+        "share_rows": share_rows,
+    }
+    return monthly, tensor.month_serials
+
+
+def catchment_monthly_from_results(results, zip_codes: List[str]):
+    """[month, zip] catchment metrics of zip_codes, pivoted from the demand query's rows."""
+
+    df = read_frame(results)
+    if df.empty:
+        return {name: np.zeros((0, len(zip_codes))) for name in CATCHMENT_METRICS}, np.zeros(0, dtype=np.int64)
+
+    df['zip_code'] = df['zip_code'].astype(str)
+    df[CATCHMENT_METRICS] = df[CATCHMENT_METRICS].astype("float64").fillna(0)
+    months = sorted(df['year_month'].unique())
+    table = df.pivot_table(index='year_month', columns='zip_code', values=CATCHMENT_METRICS, aggfunc='sum')
+    monthly = {
+        name: table[name].reindex(index=months, columns=list(zip_codes), fill_value=0).fillna(0).to_numpy(dtype=np.float64)
+        for name in CATCHMENT_METRICS
+    }
+    return monthly, np.array([month_serial(m) for m in months], dtype=np.int64)
+
+
+def build_catchment_response(
+    points: ZipPoints,
+    candidates: Tuple[str, ...],
+    distance,
+    positions,
+    membership,
+    monthly,
+    month_serials,
+    product_category: str,
+    radius_miles: float,
+    assignment: str,
+    ring_miles: Optional[List[float]],
+    time_period: str,
+    tool_context: Optional[ToolContext]
+) -> dict:
+    """Aggregate the catchment ZIPs' demand per location and build the analyze_catchments response."""
+
+    totals = period_totals(monthly, month_serials, time_period)
+    shipments = totals["total_shipments"]
+    near_distance = distance[positions].astype(np.float64)
+    members = membership.astype(np.float64)
+
+    # Every catchment aggregate is one [zip] @ [zip, location] product
+    def catchment_sum(values):
+        return values @ members
+
+    catchment_shipments = catchment_sum(shipments)
+    catchment_value = catchment_sum(totals["total_value"])
+    comparable = catchment_sum(totals["comparable_shipments"])
+    prior = catchment_sum(totals["prior_shipments"])
+    demand_rows = catchment_sum(totals["demand_rows"])
+    share_rows = catchment_sum(totals["share_rows"])
+    shippers = catchment_sum(totals["unique_shippers"])
+    concentration = catchment_sum(totals["market_concentration_index"])
+    major = catchment_sum(totals["major_brand_volume"])
+    small = catchment_sum(totals["small_business_volume"])
+    distance_sum = (shipments[:, None] * near_distance * members).sum(axis=0)
+
+    radii = ring_radii(radius_miles, ring_miles)
+    in_rings = [membership & (near_distance <= r) for r in radii]
+    ring_shipments = [shipments @ ring.astype(np.float64) for ring in in_rings]
+    ring_zips = [ring.sum(axis=0) for ring in in_rings]
+    shared = membership & (membership.sum(axis=1) > 1)[:, None]
+
+    catchments = []
+    for i, zip_code in enumerate(candidates):
+        site = points.index[zip_code]
+        volume = catchment_shipments[i]
+        in_catchment = np.flatnonzero(membership[:, i])
+        busiest = in_catchment[np.argsort(-shipments[in_catchment], kind="stable")][:TOP_CATCHMENT_ZIPS]
+        record = {
+            "zip_code": zip_code,
+            "city": points.labels["city"][site],
+            "state": points.labels["state"][site],
+            "metro_area": points.labels["metro"][site],
+            "lat": float(points.coords[site, 0]),
+            "lng": float(points.coords[site, 1]),
+            "zip_codes": int(len(in_catchment)),
+            "total_shipments": int(round(volume)),
+            "total_value": round(float(catchment_value[i]), 2),
+            "yoy_growth_pct": growth_pct(comparable[i], prior[i]),
+            "avg_unique_shippers": round(float(shippers[i] / demand_rows[i]), 1) if demand_rows[i] else None,
+            "avg_market_concentration": round(float(concentration[i] / share_rows[i]), 1) if share_rows[i] else None,
+            "major_brand_share_pct": round(float(major[i] / (major[i] + small[i]) * 100), 1) if major[i] + small[i] > 0 else None,
+            "avg_distance_miles": round(float(distance_sum[i] / volume), 1) if volume else None,
+            "rings": [
+                {
+                    "within_miles": round(r, 1),
+                    "zip_codes": int(ring_zips[j][i]),
+                    "total_shipments": int(round(ring_shipments[j][i])),
+                    "share_pct": round(float(ring_shipments[j][i] / volume * 100), 1) if volume else None,
+                }
+                for j, r in enumerate(radii)
+            ],
+            "top_zip_codes": [
+                {
+                    "zip_code": points.zip_codes[positions[z]],
+                    "city": points.labels["city"][positions[z]],
+                    "distance_miles": round(float(near_distance[z, i]), 1),
+                    "total_shipments": int(round(shipments[z])),
+                }
+                for z in busiest
+            ],
+        }
+        if assignment == "radius":
+            record["shared_zip_codes"] = int(shared[:, i].sum())
+        catchments.append(record)
+
+    summary = {
+        "locations": len(candidates),
+        "zip_codes_in_catchments": int(len(positions)),
+        "total_shipments": int(round(shipments.sum())),
+        "yoy_growth_pct": growth_pct(totals["comparable_shipments"].sum(), totals["prior_shipments"].sum()),
+        "growth_compared_to": "same months one year earlier"
+    }
+    if assignment == "radius":
+        summary["overlapping_zip_codes"] = int((membership.sum(axis=1) > 1).sum())
+
+    # Generate insights
+    insights = []
+    busiest = max(catchments, key=lambda c: c["total_shipments"])
+    insights.append(
+        f"Largest catchment: {busiest['zip_code']} ({busiest['city']}) with {busiest['total_shipments']:,} "
+        f"{product_category} shipments from {busiest['zip_codes']} ZIP codes within {radius_miles:g} miles"
+    )
+    growing = [c for c in catchments if c["yoy_growth_pct"] is not None]
+    if len(catchments) > 1 and growing:
+        fastest = max(growing, key=lambda c: c["yoy_growth_pct"])
+        insights.append(f"Fastest-growing catchment: {fastest['zip_code']} ({fastest['yoy_growth_pct']:+.1f}% YoY)")
+    concentrated = [c for c in catchments if c["avg_market_concentration"] is not None]
+    if len(catchments) > 1 and concentrated:
+        open_market = min(concentrated, key=lambda c: c["avg_market_concentration"])
+        insights.append(
+            f"Least major-brand competition: {open_market['zip_code']} "
+            f"({open_market['avg_market_concentration']:.0f}% market concentration)"
+        )
+    if summary.get("overlapping_zip_codes"):
+        insights.append(
+            f"{summary['overlapping_zip_codes']} ZIP codes fall in more than one catchment - "
+            "use assignment='nearest' to split them"
+        )
+
+    response = {
+        "query_parameters": {
+            "product_category": product_category,
+            "locations": list(candidates),
+            "radius_miles": radius_miles,
+            "assignment": assignment,
+            "time_period": time_period
+        },
+        "summary": summary,
+        "insights": insights,
+        "catchments": catchments
+    }
+
+    # Keep the catchments server-side so the map tool can plot them by handle
+    result_handle = put_result(tool_context, "analyze_catchments", catchments, summary)
+    if result_handle:
+        response["result_handle"] = result_handle
+
+    return response
+
+
+def analyze_catchments(
+    product_category: str,
+    locations: List[str],
+    radius_miles: float = 10.0,
+    assignment: str = "nearest",
+    ring_miles: Optional[List[float]] = None,
+    time_period: str = "last_12_months",
+    tool_context: Optional[ToolContext] = None
+) -> str:
+    """
+    Analyze the catchment areas of one or more candidate store locations.
+
+    Computes which ZIP codes each location would serve and the demand, growth and
+    competition inside each catchment, with distance rings. Use this when the user asks:
+    - "What demand is within 10 miles of 85004?"
+    - How candidate sites compare on the market around them
+    - How much of a location's demand is close in vs. further out
+
+    Args:
+        product_category: Product category (e.g., 'pet_supplies', 'consumer_electronics')
+        locations: Candidate locations as ZIP codes (e.g., ['85004', '85254']); the
+                   sites returned by select_sites can be passed directly
+        radius_miles: Catchment radius in miles (default: 10, max: 100)
+        assignment: How ZIP codes are assigned to locations:
+            - 'nearest': Each ZIP within the radius belongs to its closest location only
+            - 'radius': Every ZIP within the radius of a location (catchments may overlap)
+        ring_miles: Optional distance rings in miles (default: a quarter, half and the full radius)
+        time_period: Demand period: 'last_6_months', 'last_12_months', 'last_24_months', 'q1_2025', etc.
+
+    Returns:
+        JSON string with one catchment per location (ZIP codes, shipments, value,
+        year-over-year growth, unique shippers, market concentration, major brand
+        share, shipments per ring and busiest ZIP codes) and a 'result_handle' that
+        generate_map_visualization accepts
+
+    Example:
+        analyze_catchments('pet_supplies', ['85004', '85254'], radius_miles=5)
+        Returns the pet supply demand each of the two Phoenix-area locations would serve
+    """
+
+    product_category, error = resolve_category(product_category)
+    if error:
+        return error
+
+    error = check_catchment_request(locations, radius_miles, assignment)
+    if error:
+        return error
+
+    try:
+        points = load_zip_points()
+    except Exception as e:
+        return json.dumps({
+            "error": f"Could not load ZIP code coordinates: {e}"
+        }, indent=2)
+
+    candidates, error = resolve_locations(points, locations)
+    if error:
+        return error
+
+    distance = candidate_distances(candidates)
+    positions, membership = catchment_membership(distance, radius_miles, assignment)
+
+    tensor = load_demand_tensor()
+    if tensor is not None:
+        monthly, month_serials = catchment_monthly_from_tensor(tensor, product_category, positions)
+        response = build_catchment_response(
+            points, candidates, distance, positions, membership, monthly, month_serials,
+            product_category, radius_miles, assignment, ring_miles, time_period, tool_context
+        )
+        return json.dumps(response, indent=2, default=str)
+
+    client = get_bigquery_client()
+    zip_codes = points.zip_codes[positions].tolist()
+    query = build_catchment_demand_query(product_category, zip_codes)
+
+    try:
+        query_job = client.query(query)
+        results = query_job.result()
+
+        monthly, month_serials = catchment_monthly_from_results(results, zip_codes)
+        response = build_catchment_response(
+            points, candidates, distance, positions, membership, monthly, month_serials,
+            product_category, radius_miles, assignment, ring_miles, time_period, tool_context
+        )
+        return json.dumps(response, indent=2, default=str)
+
+    except Exception as e:
+        return json.dumps({
+            "error": str(e),
+            "query": query
+        }, indent=2)
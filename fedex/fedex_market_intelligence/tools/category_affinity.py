@@ -0,0 +1,233 @@
+"""Category affinity tool - which categories rise together with a category in the same ZIPs."""
+
+from google.adk.tools import ToolContext
+from typing import List, Optional, Tuple
+import json
+import math
+
+from fedex_market_intelligence.shared_libraries.category_affinity import (
+    AFFINITY_PERIOD,
+    CategoryAffinity,
+    load_category_affinity,
+)
+from fedex_market_intelligence.shared_libraries.category_index import resolve_category
+from fedex_market_intelligence.shared_libraries.feature_store import NATIONAL_KEY
+from fedex_market_intelligence.shared_libraries.result_store import put_result
+from fedex_market_intelligence.tools.forecasting import STATE_ABBREVIATIONS
+
+RANK_BY = ["correlation", "lift"]
+
+# Correlation bands of the relationship labels (checked in order)
+RELATIONSHIP_BANDS = [
+    (0.5, "strong"),
+    (0.3, "moderate"),
+    (0.1, "weak"),
+]
+INVERSE_CORRELATION = -0.1
+
+# Lifts backed by fewer ZIPs where both categories over-index are not reported
+MIN_SUPPORT_ZIPS = 3
+
+# Markets with fewer ZIPs than this get a small-sample warning
+MIN_MARKET_ZIPS = 20
+
+
+def relationship(correlation: Optional[float]) -> str:
+    """Label of a co-demand correlation."""
+    if correlation is None:
+        return "unknown"
+    for threshold, label in RELATIONSHIP_BANDS:
+        if correlation >= threshold:
+            return label
+    return "inverse" if correlation <= INVERSE_CORRELATION else "independent"
+
+
+def resolve_market(affinity: CategoryAffinity, market: Optional[str]) -> Tuple[Optional[int], Optional[List[str]]]:
+    """
+    Position of the market in the affinity matrices (or the concentration cube's market tables).
+
+    A market matches a metro, state (code or name) or region exactly, or else the one
+    metro, state or region whose name contains it.
+
+    Returns:
+        (position, None) on a match, (None, [candidate names]) when ambiguous,
+        (None, None) when nothing matches
+    """
+    if not market:
+        return affinity.find_market("national", NATIONAL_KEY), None
+
+    name = market.strip()
+    state = STATE_ABBREVIATIONS.get(name.lower(), name)
+    for level, key in (("metro", name), ("state", state), ("region", name)):
+        position = affinity.find_market(level, key)
+        if position is not None:
+            return position, None
+
+    for level in ("metro", "state", "region"):
+        matches = affinity.markets_containing(level, name)
+        if len(matches) == 1:
+            return matches[0], None
+        if matches:
+            return None, [str(affinity.keys[i]) for i in matches]
+    return None, None
+
+
+def round_or_none(value, digits: int = 2) -> Optional[float]:
+    value = float(value)
+    return None if math.isnan(value) else round(value, digits)
+
+
+def build_adjacency_response(
+    affinity: CategoryAffinity,
+    product_category: str,
+    position: int,
+    top_n: int,
+    rank_by: str,
+    tool_context: Optional[ToolContext]
+) -> dict:
+    """Rank the other categories by co-demand with product_category in one market."""
+
+    category = affinity.category_index[product_category]
+    correlation = affinity.correlation[position, category]
+    lift = affinity.lift[position, category]
+    support = affinity.support[position, category]
+
+    others = []
+    for i, other in enumerate(affinity.categories):
+        if i == category:
+            continue
+        supported = support[i] >= MIN_SUPPORT_ZIPS
+        record = {
+            "product_category": other,
+            "correlation": round_or_none(correlation[i]),
+            "lift": round_or_none(lift[i]) if supported else None,
+            "both_over_index_zip_codes": int(support[i]),
+        }
+        record["relationship"] = relationship(record["correlation"])
+        others.append(record)
+
+    # Unknown values sort last
+    others.sort(key=lambda r: (r[rank_by] is None, -(r[rank_by] or 0)))
+    adjacent = [{"rank": rank, **record} for rank, record in enumerate(others[:top_n], 1)]
+
+    market_zips = int(affinity.zip_counts[position])
+    summary = {
+        "market_level": str(affinity.levels[position]),
+        "market_key": str(affinity.keys[position]),
+        "market_zip_codes": market_zips,
+        "categories_compared": len(others),
+        "strongly_related": sum(1 for r in others if r["relationship"] == "strong"),
+        "period": f"{AFFINITY_PERIOD.replace('_', ' ')} through {affinity.as_of}",
+        "ranked_by": rank_by
+    }
+
+    # Generate insights
+    insights = []
+    if adjacent and adjacent[0]["correlation"] is not None:
+        top = adjacent[0]
+        text = (
+            f"{top['product_category']} moves most with {product_category} in {summary['market_key']} "
+            f"(correlation {top['correlation']:.2f}"
+        )
+        if top["lift"] is not None:
+            text += f", {top['lift']:.1f}x as likely to over-index in the same ZIP codes"
+        insights.append(text + ")")
+    inverse = [r for r in others if r["relationship"] == "inverse"]
+    if inverse:
+        insights.append(f"Moves against {product_category}: {', '.join(r['product_category'] for r in inverse)}")
+    if market_zips < MIN_MARKET_ZIPS:
+        insights.append(f"Only {market_zips} ZIP codes in this market - treat the relationships as indicative")
+
+    response = {
+        "query_parameters": {
+            "product_category": product_category,
+            "market": summary["market_key"],
+            "top_n": top_n,
+            "rank_by": rank_by
+        },
+        "summary": summary,
+        "insights": insights,
+        "adjacent_categories": adjacent,
+        "methodology": (
+            "Correlation of log monthly shipments over the market's ZIP x month cells after removing ZIP and "
+            "month effects; lift of both categories over-indexing (share of a ZIP's shipments above their "
+            "market share) in the same ZIP codes."
+        )
+    }
+
+    result_handle = put_result(tool_context, "find_adjacent_categories", adjacent, summary)
+    if result_handle:
+        response["result_handle"] = result_handle
+
+    return response
+
+
+def find_adjacent_categories(
+    product_category: str,
+    market: Optional[str] = None,
+    top_n: int = 5,
+    rank_by: str = "correlation",
+    tool_context: Optional[ToolContext] = None
+) -> str:
+    """
+    Find the product categories whose demand rises and falls with a category.
+
+    Reads precomputed co-demand matrices, so any market answers instantly. Use this
+    when the user asks:
+    - Which categories go together (e.g., "does pet supplies demand move with home decor?")
+    - Adjacent / cross-sell categories for a market
+    - Which categories grow in the same ZIP codes as a category
+
+    Args:
+        product_category: Product category (e.g., 'pet_supplies', 'home_decor')
+        market: Optional market - metro, state (code or name) or region
+                (e.g., 'Phoenix', 'AZ', 'Texas', 'Southwest'); None for national
+        top_n: Number of adjacent categories to return (default: 5)
+        rank_by: 'correlation' (move together month to month, default) or
+                 'lift' (over-index in the same ZIP codes)
+
+    Returns:
+        JSON string with the other categories ranked by co-demand (correlation,
+        lift, ZIP codes where both over-index, relationship strength) and insights
+
+    Example:
+        find_adjacent_categories('pet_supplies', 'Phoenix')
+        Returns the categories whose Phoenix demand moves most with pet supplies
+    """
+
+    product_category, error = resolve_category(product_category)
+    if error:
+        return error
+
+    if rank_by not in RANK_BY:
+        return json.dumps({
+            "error": f"Unknown rank_by '{rank_by}'",
+            "valid_rank_by": RANK_BY
+        }, indent=2)
+
+    affinity = load_category_affinity()
+    if affinity is None:
+        return json.dumps({
+            "error": "Category affinity matrices are not available",
+            "suggestion": "Run data/build_category_affinity.py and set CATEGORY_AFFINITY_PATH, or set DEMAND_TENSOR_PATH"
+        }, indent=2)
+    if not affinity.has_category(product_category):
+        return json.dumps({
+            "error": f"Unknown product category '{product_category}'",
+            "available_categories": affinity.categories
+        }, indent=2)
+
+    position, candidates = resolve_market(affinity, market)
+    if position is None:
+        if candidates:
+            return json.dumps({
+                "error": f"Market '{market}' is ambiguous",
+                "matching_markets": candidates[:10]
+            }, indent=2)
+        return json.dumps({
+            "error": f"Unknown market '{market}'",
+            "suggestion": "Use a metro, state (code or name) or region name, or omit market for national"
+        }, indent=2)
+
+    response = build_adjacency_response(affinity, product_category, position, top_n, rank_by, tool_context)
+    return json.dumps(response, indent=2, default=str)
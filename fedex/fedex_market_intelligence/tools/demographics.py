@@ -1,124 +1,150 @@
-"""Demographics tool using US Census API."""
+"""Demographics tool using US Census API.
+
+ZIP codes covered by the demand tensor's ZCTA demographics table are answered
+locally; only the rest go to the Census API.
+"""
 
-import requests
 import json
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
+
+from google.adk.tools import ToolContext
+
+from fedex_market_intelligence.shared_libraries.demand_tensor import load_demand_tensor
+from fedex_market_intelligence.shared_libraries.lazy import lazy_import
+from fedex_market_intelligence.shared_libraries.result_store import (
+    get_result,
+    missing_result_error,
+    rows_to_zip_codes,
+)
+
+requests = lazy_import("requests")
 
 # Census API endpoint (no key required for basic queries)
 CENSUS_API_BASE = "https://api.census.gov/data/2021/acs/acs5"
 
+# Limit to 10 zip codes per request to avoid rate limits
+MAX_ZIP_CODES = 10
 
-def get_demographics(
-    zip_codes: List[str],
-    metrics: Optional[List[str]] = None
-) -> str:
-    """
-    Fetch demographic data from US Census API for specified zip codes.
-    
-    Args:
-        zip_codes: List of 5-digit zip codes
-        metrics: List of metrics to fetch - defaults to ['population', 'income', 'age']
+# Census variable codes
+# https://api.census.gov/data/2021/acs/acs5/variables.html
+VARIABLE_MAP = {
+    'population': 'B01003_001E',  # Total population
+    'income': 'B19013_001E',      # Median household income
+    'age': 'B01002_001E',         # Median age
+    'households': 'B11001_001E',  # Total households
+    'employment': 'B23025_005E',  # Employed population
+}
+
+# Readable output field for each metric
+FIELD_NAMES = {
+    'income': 'median_household_income',
+    'population': 'total_population',
+    'age': 'median_age',
+    'households': 'total_households',
+    'employment': 'employed_population',
+}
+
+
+def census_variables(metrics: List[str]) -> List[str]:
+    """Map metric names to the (deduplicated) Census variable codes to request."""
+    variables = [VARIABLE_MAP.get(m, VARIABLE_MAP['population']) for m in metrics]
+    return list(set(variables))  # Remove duplicates
+
+
+def local_demographics(zip_codes: List[str], metrics: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Demographics records for the ZIP codes found in the local ZCTA table, by ZIP code."""
+    tensor = load_demand_tensor()
+    if tensor is None or not tensor.has_demographics:
+        return {}
     
-    Returns:
-        JSON string with demographic data
-    """
+    fields = [FIELD_NAMES[m] for m in metrics if m in FIELD_NAMES] or [FIELD_NAMES['population']]
+    records = {}
+    for zip_code in zip_codes:
+        values = tensor.zip_demographics(zip_code)
+        if values is None:
+            continue
+        record = {
+            'zip_code': zip_code,
+            'location_name': f"ZCTA5 {zip_code}"
+        }
+        for field in fields:
+            # Same shape as the Census API records: whole numbers, missing values left out
+            if values.get(field):
+                record[field] = int(round(values[field]))
+        records[zip_code] = record
+    return records
+
+
+def census_url(zip_code: str, variables: List[str]) -> str:
+    """Build the ACS request URL for one ZIP code (ZCTA)."""
+    # Add NAME variable for location name
+    variables_str = ','.join(['NAME'] + variables)
+    return f"{CENSUS_API_BASE}?get={variables_str}&for=zip%20code%20tabulation%20area:{zip_code}"
+
+
+def parse_census_response(
+    zip_code: str,
+    status_code: int,
+    data: Optional[List[List[str]]],
+    variables: List[str]
+) -> Dict[str, Any]:
+    """Turn one Census API response into a demographics record (or an error record)."""
+    if status_code != 200:
+        return {
+            'zip_code': zip_code,
+            'error': f'API returned status code {status_code}'
+        }
     
-    if not zip_codes:
-        return json.dumps({
-            "error": "Please provide at least one zip code"
-        }, indent=2)
+    if not data or len(data) <= 1:  # First row is headers
+        return {
+            'zip_code': zip_code,
+            'error': 'No data available for this ZIP code'
+        }
     
-    if metrics is None:
-        metrics = ['population', 'income', 'age']
+    values = data[1]
     
-    # Census variable codes
-    # https://api.census.gov/data/2021/acs/acs5/variables.html
-    variable_map = {
-        'population': 'B01003_001E',  # Total population
-        'income': 'B19013_001E',      # Median household income
-        'age': 'B01002_001E',         # Median age
-        'households': 'B11001_001E',  # Total households
-        'employment': 'B23025_005E',  # Employed population
+    # Parse response
+    demo_data = {
+        'zip_code': zip_code,
+        'location_name': values[0] if len(values) > 0 else 'Unknown'
     }
     
-    # Build variable list
-    variables = [variable_map.get(m, variable_map['population']) for m in metrics]
-    variables = list(set(variables))  # Remove duplicates
-    
-    # Add NAME variable for location name
-    variables_str = ','.join(['NAME'] + variables)
-    
-    # Fetch data for each zip code
-    demographics = []
-    
-    for zip_code in zip_codes[:10]:  # Limit to 10 zip codes to avoid rate limits
-        # Census uses ZCTA (ZIP Code Tabulation Areas)
-        try:
-            url = f"{CENSUS_API_BASE}?get={variables_str}&for=zip%20code%20tabulation%20area:{zip_code}"
-            response = requests.get(url, timeout=10)
+    # Map variables to readable names
+    for i, var_code in enumerate(variables):
+        value_idx = i + 1  # Skip NAME which is at index 0
+        if value_idx < len(values):
+            value = values[value_idx]
             
-            if response.status_code == 200:
-                data = response.json()
-                
-                if len(data) > 1:  # First row is headers
-                    headers = data[0]
-                    values = data[1]
-                    
-                    # Parse response
-                    demo_data = {
-                        'zip_code': zip_code,
-                        'location_name': values[0] if len(values) > 0 else 'Unknown'
-                    }
-                    
-                    # Map variables to readable names
-                    for i, var_code in enumerate(variables):
-                        value_idx = i + 1  # Skip NAME which is at index 0
-                        if value_idx < len(values):
-                            value = values[value_idx]
-                            
-                            # Convert to int if possible
-                            try:
-                                value = int(value) if value and value != '-666666666' else None
-                            except (ValueError, TypeError):
-                                value = None
-                            
-                            # Map back to readable name
-                            for metric_name, var_name in variable_map.items():
-                                if var_name == var_code:
-                                    if metric_name == 'income' and value:
-                                        demo_data['median_household_income'] = value
-                                    elif metric_name == 'population' and value:
-                                        demo_data['total_population'] = value
-                                    elif metric_name == 'age' and value:
-                                        demo_data['median_age'] = value
-                                    elif metric_name == 'households' and value:
-                                        demo_data['total_households'] = value
-                                    elif metric_name == 'employment' and value:
-                                        demo_data['employed_population'] = value
-                    
-                    demographics.append(demo_data)
-                else:
-                    demographics.append({
-                        'zip_code': zip_code,
-                        'error': 'No data available for this ZIP code'
-                    })
-            else:
-                demographics.append({
-                    'zip_code': zip_code,
-                    'error': f'API returned status code {response.status_code}'
-                })
-                
-        except requests.exceptions.RequestException as e:
-            demographics.append({
-                'zip_code': zip_code,
-                'error': f'Request failed: {str(e)}'
-            })
-        except Exception as e:
-            demographics.append({
-                'zip_code': zip_code,
-                'error': f'Unexpected error: {str(e)}'
-            })
+            # Convert to int if possible
+            try:
+                value = int(value) if value and value != '-666666666' else None
+            except (ValueError, TypeError):
+                value = None
+            
+            # Map back to readable name
+            for metric_name, var_name in VARIABLE_MAP.items():
+                if var_name == var_code and value:
+                    demo_data[FIELD_NAMES[metric_name]] = value
     
+    return demo_data
+
+
+def merge_in_order(
+    zip_codes: List[str],
+    local: Dict[str, Dict[str, Any]],
+    fetched: Dict[str, Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    """Local and fetched records in the order the ZIP codes were requested."""
+    return [local.get(z) or fetched[z] for z in zip_codes if z in local or z in fetched]
+
+
+def build_demographics_response(
+    zip_codes: List[str],
+    metrics: List[str],
+    demographics: List[Dict[str, Any]],
+    result_handle: Optional[str]
+) -> Dict[str, Any]:
+    """Summarize per-ZIP demographics records into the get_demographics response."""
     # Generate summary insights
     insights = []
     valid_data = [d for d in demographics if 'error' not in d]
@@ -142,8 +168,9 @@ def get_demographics(
             avg_age = sum(ages) / len(ages)
             insights.append(f"Average median age: {avg_age:.1f} years")
     
-    response = {
+    return {
         "query_parameters": {
+            "result_handle": result_handle,
             "zip_codes_requested": zip_codes,
             "metrics_requested": metrics
         },
@@ -154,8 +181,69 @@ def get_demographics(
         },
         "demographics": demographics,
         "note": "Data sourced from US Census Bureau ACS 5-Year Estimates (2021)",
-        "api_limitations": "Limited to 10 ZIP codes per request to avoid rate limits"
+        "api_limitations": f"ZIP codes not in the local ZCTA table are limited to {MAX_ZIP_CODES} Census API calls per request to avoid rate limits"
     }
+
+
+def get_demographics(
+    zip_codes: Optional[List[str]] = None,
+    metrics: Optional[List[str]] = None,
+    result_handle: Optional[str] = None,
+    tool_context: Optional[ToolContext] = None
+) -> str:
+    """
+    Fetch demographic data from US Census API for specified zip codes.
+    
+    Args:
+        zip_codes: List of 5-digit zip codes
+        metrics: List of metrics to fetch - defaults to ['population', 'income', 'age']
+        result_handle: Handle returned by a query tool; the ZIP codes in its rows are
+                       used instead of the zip_codes argument
+    
+    Returns:
+        JSON string with demographic data
+    """
+    
+    if result_handle:
+        stored = get_result(tool_context, result_handle)
+        if stored is None:
+            return missing_result_error(tool_context, result_handle)
+        zip_codes = rows_to_zip_codes(stored["rows"])
+    
+    if not zip_codes:
+        return json.dumps({
+            "error": "Please provide at least one zip code"
+        }, indent=2)
+    
+    if metrics is None:
+        metrics = ['population', 'income', 'age']
+    
+    variables = census_variables(metrics)
+    local = local_demographics(zip_codes, metrics)
+    
+    # Fetch data for each zip code not in the local table
+    fetched = {}
+    
+    for zip_code in [z for z in zip_codes if z not in local][:MAX_ZIP_CODES]:
+        # Census uses ZCTA (ZIP Code Tabulation Areas)
+        try:
+            response = requests.get(census_url(zip_code, variables), timeout=10)
+            data = response.json() if response.status_code == 200 else None
+            fetched[zip_code] = parse_census_response(zip_code, response.status_code, data, variables)
+        
+        except requests.exceptions.RequestException as e:
+            fetched[zip_code] = {
+                'zip_code': zip_code,
+                'error': f'Request failed: {str(e)}'
+            }
+        except Exception as e:
+            fetched[zip_code] = {
+                'zip_code': zip_code,
+                'error': f'Unexpected error: {str(e)}'
+            }
+    
+    demographics = merge_in_order(zip_codes, local, fetched)
+    
+    response = build_demographics_response(zip_codes, metrics, demographics, result_handle)
     
     return json.dumps(response, indent=2, default=str)
-
@@ -1,73 +1,131 @@
 """Demand forecasting tool using SQL-based time series analysis."""
 
-from google.cloud import bigquery
+from __future__ import annotations
+
+from google.adk.tools import ToolContext
 import json
-from typing import Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from fedex_market_intelligence.config import config
+from fedex_market_intelligence.shared_libraries.bigquery_results import FrameResult
+from fedex_market_intelligence.shared_libraries.category_index import known_categories, resolve_category
+from fedex_market_intelligence.shared_libraries.clients import get_bigquery_client
+from fedex_market_intelligence.shared_libraries.demand_tensor import (
+    DemandTensor,
+    REFERENCE_YEAR_MONTH,
+    load_demand_tensor,
+    month_serial,
+)
+from fedex_market_intelligence.shared_libraries.feature_store import SEASONAL_COLUMNS, load_feature_store
+from fedex_market_intelligence.shared_libraries.lazy import lazy_import
+from fedex_market_intelligence.shared_libraries.result_store import (
+    get_result,
+    missing_result_error,
+    rows_to_zip_codes,
+)
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
 
 PROJECT_ID = config.project_id
 DATASET_ID = config.dataset_id
 
+# Map common state names to abbreviations
+STATE_ABBREVIATIONS = {
+    'california': 'CA', 'texas': 'TX', 'florida': 'FL', 'new york': 'NY',
+    'illinois': 'IL', 'pennsylvania': 'PA', 'ohio': 'OH', 'georgia': 'GA',
+    'north carolina': 'NC', 'michigan': 'MI', 'arizona': 'AZ', 'tennessee': 'TN',
+    'massachusetts': 'MA', 'washington': 'WA', 'colorado': 'CO', 'oregon': 'OR'
+}
 
-def forecast_demand(
-    product_category: str,
-    market: str,
-    forecast_months: int = 6
-) -> str:
+FORECAST_COLUMNS = ['baseline_shipments', 'avg_growth_rate', 'stddev_shipments', 'month_num', 'seasonality_factor']
+
+HISTORY_COLUMNS = [
+    'year_month', 'month_num', 'year_num', 'total_shipments', 'total_value', 'avg_growth_rate', 'zip_count'
+]
+
+# The baseline covers the months from this many months before the reference month up to it
+BASELINE_WINDOW_MONTHS = 12
+
+
+def project_shipments(baseline, avg_growth_rate, seasonality, months_ahead):
     """
-    Forecast future demand using historical trends and seasonality.
+    The forecast_demand model: baseline x monthly-compounded YoY growth x seasonality.
     
-    Use this tool to predict future shipment volumes based on historical patterns.
-    
-    Args:
-        product_category: Product category ID (e.g., 'home_fitness', 'pet_supplies', 'consumer_electronics')
-                         Note: Use the category_id format with underscores, not the display name
-        market: Geographic market (e.g., 'California', 'Phoenix Metro', 'Northeast')
-        forecast_months: Number of months to forecast, between 3 and 12 (default: 6)
+    Works elementwise on scalars or NumPy arrays, so evaluation/backtest_forecasts.py
+    scores exactly what the tool returns.
     
     Returns:
-        JSON string with detailed demand forecast including:
-        - Monthly predictions
-        - Confidence intervals
-        - Growth trends
-        - Seasonality factors
+        (forecast, growth_factor)
+    """
+    growth_factor = (1 + avg_growth_rate / 100 / 12) ** months_ahead  # Convert YoY to monthly
+    return baseline * growth_factor * seasonality, growth_factor
+
+
+def check_forecast_request(
+    forecast_months: int,
+    result_handle: Optional[str],
+    tool_context: Optional[ToolContext]
+) -> Tuple[Optional[List[str]], Optional[str]]:
+    """
+    Validate forecast_demand arguments and resolve a result handle to ZIP codes.
     
-    Example:
-        forecast_demand('home_fitness', 'California', 6)
+    Returns:
+        (zip_codes, error) - zip_codes is None when no handle was given; error is a
+        JSON error string to return as-is, or None when the request is valid
     """
     
     if forecast_months < 3 or forecast_months > 12:
-        return json.dumps({
+        return None, json.dumps({
             "error": "Forecast months must be between 3 and 12"
         }, indent=2)
     
-    client = bigquery.Client(project=PROJECT_ID)
+    # A result handle pins the forecast to the ZIP codes of an earlier result
+    zip_codes = None
+    if result_handle:
+        stored = get_result(tool_context, result_handle)
+        if stored is None:
+            return None, missing_result_error(tool_context, result_handle)
+        zip_codes = rows_to_zip_codes(stored["rows"])
+        if not zip_codes:
+            return None, json.dumps({
+                "error": f"Result '{result_handle}' contains no ZIP codes to forecast",
+                "suggestion": "Use a ZIP-level result (e.g. find_market_opportunities) or pass only market"
+            }, indent=2)
     
-    # Parse market location - handle common state names
-    market_lower = market.lower()
+    return zip_codes, None
+
+
+def forecast_location_filter(market: str, zip_codes: Optional[List[str]]) -> str:
+    """SQL filter for the market's ZIPs (or exactly zip_codes when given)."""
     
-    # Map common state names to abbreviations
-    state_mapping = {
-        'california': 'CA', 'texas': 'TX', 'florida': 'FL', 'new york': 'NY',
-        'illinois': 'IL', 'pennsylvania': 'PA', 'ohio': 'OH', 'georgia': 'GA',
-        'north carolina': 'NC', 'michigan': 'MI', 'arizona': 'AZ', 'tennessee': 'TN',
-        'massachusetts': 'MA', 'washington': 'WA', 'colorado': 'CO', 'oregon': 'OR'
-    }
+    if zip_codes:
+        zip_list = ", ".join(f"'{z}'" for z in zip_codes)
+        return f"ad.zip_code IN ({zip_list})"
     
-    state_abbr = state_mapping.get(market_lower, market_lower.upper()[:2])
+    # Parse market location - handle common state names
+    market_lower = market.lower()
+    state_abbr = STATE_ABBREVIATIONS.get(market_lower, market_lower.upper()[:2])
     
-    location_filter = f"""(
+    return f"""(
         LOWER(gm.city) LIKE '%{market_lower}%' OR
         LOWER(gm.metro_area) LIKE '%{market_lower}%' OR
         LOWER(gm.region) LIKE '%{market_lower}%' OR
         LOWER(gm.state) LIKE '%{market_lower}%' OR
         UPPER(gm.state) = '{state_abbr}'
     )"""
+
+
+def build_history_query(
+    product_category: str,
+    market: str,
+    zip_codes: Optional[List[str]]
+) -> str:
+    """Build the SQL for a market's monthly history (the forecast's historical_data)."""
+    
+    location_filter = forecast_location_filter(market, zip_codes)
     
-    # Query to get historical data and calculate trends
     query = f"""
-        WITH historical_data AS (
             SELECT 
                 ad.year_month,
                 EXTRACT(MONTH FROM PARSE_DATE('%Y-%m', ad.year_month)) as month_num,
@@ -83,14 +141,28 @@ def forecast_demand(
             AND {location_filter}
             GROUP BY ad.year_month
             ORDER BY ad.year_month
-        ),
+    """
+    
+    return query
+
+
+def build_forecast_query(
+    product_category: str,
+    market: str,
+    zip_codes: Optional[List[str]]
+) -> str:
+    """Build the SQL for forecast_demand (shared by the sync and async tool)."""
+    
+    # Query to get historical data and calculate trends
+    query = f"""
+        WITH historical_data AS ({build_history_query(product_category, market, zip_codes)}),
         recent_trends AS (
             SELECT 
                 AVG(total_shipments) as avg_monthly_shipments,
                 AVG(avg_growth_rate) as avg_growth_rate,
                 STDDEV(total_shipments) as stddev_shipments
             FROM historical_data
-            WHERE year_month >= FORMAT_DATE('%Y-%m', DATE_SUB(DATE('2025-12-31'), INTERVAL 12 MONTH))
+            WHERE year_month >= FORMAT_DATE('%Y-%m', DATE_SUB(DATE('2025-12-31'), INTERVAL {BASELINE_WINDOW_MONTHS} MONTH))
         ),
         seasonality AS (
             SELECT 
@@ -110,110 +182,311 @@ def forecast_demand(
         ORDER BY month_num
     """
     
+    return query
+
+
+def market_zip_mask(tensor: DemandTensor, market: str) -> np.ndarray:
+    """ZIPs of a market, matched like the SQL location filter (city/metro/region/state name or state)."""
+    market_lower = market.lower()
+    state_abbr = STATE_ABBREVIATIONS.get(market_lower, market_lower.upper()[:2])
+    zips = tensor.label_equals("state", state_abbr)
+    for level in ("city", "metro", "region", "state"):
+        zips |= tensor.level_mask(level, market_lower)
+    return zips
+
+
+def history_from_tensor(
+    tensor: DemandTensor,
+    product_category: str,
+    market: str,
+    zip_codes: Optional[List[str]]
+) -> FrameResult:
+    """
+    Compute the history query's result rows from the demand tensor.
+    
+    Same semantics as build_history_query: one row per month with at least one
+    demand row over the matching ZIPs (like GROUP BY year_month).
+    """
+    
+    empty = FrameResult(pd.DataFrame(columns=HISTORY_COLUMNS), 0)
+    if not tensor.has_category(product_category):
+        return empty
+    
+    zips = tensor.zip_mask(zip_codes) if zip_codes else market_zip_mask(tensor, market)
+    
+    rows = tensor.slice(product_category, "demand_rows")[:, zips]
+    row_counts = rows.sum(axis=1)
+    months = row_counts > 0
+    if not months.any():
+        return empty
+    
+    def monthly_sum(metric):
+        return tensor.slice(product_category, metric)[:, zips].sum(axis=1, dtype=np.float64)[months]
+    
+    serials = tensor.month_serials[months]
+    frame = pd.DataFrame({
+        'year_month': np.asarray(tensor.months)[months],
+        'month_num': tensor.month_numbers[months],
+        'year_num': serials // 12,
+        'total_shipments': monthly_sum("total_shipments"),
+        'total_value': monthly_sum("total_value"),
+        'avg_growth_rate': monthly_sum("growth_rate_yoy") / row_counts[months],
+        'zip_count': row_counts[months].astype(np.int64),
+    }, columns=HISTORY_COLUMNS)
+    return FrameResult(frame, len(frame))
+
+
+def forecast_rows_from_history(history: pd.DataFrame) -> FrameResult:
+    """
+    Turn monthly history rows into the forecast query's result rows.
+    
+    Same semantics as build_forecast_query: a baseline (mean / sample stddev / mean
+    growth) over the last 12 months and a seasonality factor per calendar month.
+    """
+    
+    if history.empty:
+        return FrameResult(pd.DataFrame(columns=FORECAST_COLUMNS), 0)
+    
+    totals = history['total_shipments'].astype("float64").to_numpy()
+    growth = history['avg_growth_rate'].astype("float64").to_numpy()
+    serials = np.array([month_serial(m) for m in history['year_month']])
+    month_numbers = history['month_num'].astype("int64").to_numpy()
+    
+    recent = serials >= month_serial(REFERENCE_YEAR_MONTH) - BASELINE_WINDOW_MONTHS
+    baseline = totals[recent].mean() if recent.any() else None
+    # Months without growth values are skipped, like SQL AVG over NULLs
+    recent_growth = growth[recent & np.isfinite(growth)]
+    avg_growth_rate = recent_growth.mean() if len(recent_growth) else None
+    stddev = totals[recent].std(ddof=1) if recent.sum() > 1 else None
+    
+    overall_mean = totals.mean()
+    frame = pd.DataFrame([
+        {
+            'baseline_shipments': baseline,
+            'avg_growth_rate': avg_growth_rate,
+            'stddev_shipments': stddev,
+            'month_num': int(month_num),
+            'seasonality_factor': totals[month_numbers == month_num].mean() / overall_mean if overall_mean else None,
+        }
+        for month_num in np.unique(month_numbers)
+    ], columns=FORECAST_COLUMNS)
+    return FrameResult(frame, len(frame))
+
+
+def forecast_results_from_tensor(
+    tensor: DemandTensor,
+    product_category: str,
+    market: str,
+    zip_codes: Optional[List[str]]
+) -> FrameResult:
+    """Compute the forecast query's result rows from the demand tensor (via the monthly history)."""
+    
+    history = history_from_tensor(tensor, product_category, market, zip_codes)
+    return forecast_rows_from_history(history.frame)
+
+
+def forecast_results_from_features(features: Dict[str, Any]) -> FrameResult:
+    """Turn a feature store row into the forecast query's result rows (one per calendar month)."""
+    frame = pd.DataFrame([
+        {
+            'baseline_shipments': features['baseline_shipments'],
+            'avg_growth_rate': features['avg_growth_rate'],
+            'stddev_shipments': features['stddev_shipments'],
+            'month_num': month_num,
+            'seasonality_factor': features[column],
+        }
+        for month_num, column in enumerate(SEASONAL_COLUMNS, start=1)
+        if features[column] is not None
+    ], columns=FORECAST_COLUMNS)
+    return FrameResult(frame, len(frame))
+
+
+def forecast_results_from_store(
+    product_category: str,
+    market: str,
+    zip_codes: Optional[List[str]]
+) -> Optional[FrameResult]:
+    """
+    Forecast rows from the precomputed feature table, or None to compute them.
+    
+    Used when the market names exactly one ZIP code, metro or state (state names
+    are mapped to their abbreviation); result-handle forecasts cover an ad-hoc
+    ZIP set and are always computed.
+    """
+    
+    store = load_feature_store()
+    if store is None or zip_codes:
+        return None
+    
+    market_key = STATE_ABBREVIATIONS.get(market.lower().strip(), market)
+    features = store.resolve(market_key, product_category)
+    if features is None:
+        return None
+    return forecast_results_from_features(features)
+
+
+def build_forecast_response(
+    results,
+    product_category: str,
+    market: str,
+    forecast_months: int,
+    result_handle: Optional[str]
+) -> dict:
+    """Turn the baseline/seasonality rows into the forecast_demand response."""
+    
+    # Extract baseline and seasonality
+    baseline_shipments = 0
+    avg_growth_rate = 0
+    stddev_shipments = 0
+    seasonality_factors = {}
+    
+    for row in results:
+        baseline_shipments = row['baseline_shipments'] or 0
+        avg_growth_rate = row['avg_growth_rate'] or 0
+        stddev_shipments = row['stddev_shipments'] or 0
+        seasonality_factors[row['month_num']] = row['seasonality_factor'] or 1.0
+    
+    if baseline_shipments == 0:
+        # Provide helpful suggestions
+        available_categories = known_categories()
+        
+        return {
+            "error": f"No historical data found for '{product_category}' in {market}",
+            "suggestion": "Try a different market or product category",
+            "help": {
+                "note": "Make sure to use the category_id format (with underscores)",
+                "example_categories": available_categories[:10],
+                "example_markets": ["California", "Phoenix Metro", "Austin", "Chicago Metro", "Northeast", "Southwest"]
+            }
+        }
+    
+    # Generate forecast
+    forecasts = []
+    current_date = "2025-12-31"
+    
+    for i in range(1, forecast_months + 1):
+        # Calculate future month/year
+        future_month = (12 + i) % 12  # Start from Jan 2026
+        if future_month == 0:
+            future_month = 12
+        future_year = 2026 if i <= 12 else 2027
+    
+        # Get seasonality factor
+        seasonality = seasonality_factors.get(future_month, 1.0)
+    
+        # Calculate forecast with growth and seasonality
+        forecast_value, growth_factor = project_shipments(baseline_shipments, avg_growth_rate, seasonality, i)
+    
+        # Calculate confidence interval (simple approach)
+        confidence_lower = max(0, forecast_value - stddev_shipments)
+        confidence_upper = forecast_value + stddev_shipments
+    
+        forecasts.append({
+            "month": f"{future_year}-{future_month:02d}",
+            "forecasted_shipments": int(round(forecast_value)),
+            "confidence_interval_lower": int(round(confidence_lower)),
+            "confidence_interval_upper": int(round(confidence_upper)),
+            "seasonality_factor": round(seasonality, 2),
+            "growth_factor": round(growth_factor, 2)
+        })
+    
+    # Generate insights
+    insights = []
+    total_forecast = sum(f['forecasted_shipments'] for f in forecasts)
+    avg_forecast = total_forecast / len(forecasts)
+    
+    peak_month = max(forecasts, key=lambda x: x['forecasted_shipments'])
+    insights.append(f"Peak demand expected in {peak_month['month']} with {peak_month['forecasted_shipments']:,} shipments")
+    
+    if avg_growth_rate > 10:
+        insights.append(f"Strong growth momentum: {avg_growth_rate:.1f}% YoY growth rate")
+    elif avg_growth_rate < 0:
+        insights.append(f"Declining trend: {avg_growth_rate:.1f}% YoY growth rate")
+    else:
+        insights.append(f"Stable market: {avg_growth_rate:.1f}% YoY growth rate")
+    
+    response = {
+        "query_parameters": {
+            "product_category": product_category,
+            "market": market,
+            "forecast_months": forecast_months,
+            "result_handle": result_handle
+        },
+        "baseline_metrics": {
+            "current_avg_monthly_shipments": int(round(baseline_shipments)),
+            "avg_growth_rate_yoy": round(avg_growth_rate, 2),
+            "volatility_stddev": int(round(stddev_shipments))
+        },
+        "forecast": forecasts,
+        "summary": {
+            "total_forecasted_shipments": total_forecast,
+            "avg_monthly_forecast": int(round(avg_forecast)),
+            "insights": insights
+        },
+        "methodology": "Simple time series forecast using 12-month moving average, historical growth rates, and seasonal patterns"
+    }
+    
+    return response
+
+
+def forecast_demand(
+    product_category: str,
+    market: str,
+    forecast_months: int = 6,
+    result_handle: Optional[str] = None,
+    tool_context: Optional[ToolContext] = None
+) -> str:
+    """
+    Forecast future demand using historical trends and seasonality.
+    
+    Use this tool to predict future shipment volumes based on historical patterns.
+    
+    Args:
+        product_category: Product category ID (e.g., 'home_fitness', 'pet_supplies', 'consumer_electronics')
+                         Note: Use the category_id format with underscores, not the display name
+        market: Geographic market (e.g., 'California', 'Phoenix Metro', 'Northeast')
+        forecast_months: Number of months to forecast, between 3 and 12 (default: 6)
+        result_handle: Optional handle returned by a query tool; the forecast then covers
+                       exactly the ZIP codes in that result (market is used as its label)
+    
+    Returns:
+        JSON string with detailed demand forecast including:
+        - Monthly predictions
+        - Confidence intervals
+        - Growth trends
+        - Seasonality factors
+    
+    Example:
+        forecast_demand('home_fitness', 'California', 6)
+    """
+    
+    product_category, error = resolve_category(product_category)
+    if error:
+        return error
+    
+    zip_codes, error = check_forecast_request(forecast_months, result_handle, tool_context)
+    if error:
+        return error
+    
+    # A key lookup in the feature table, else array slicing over the memory-mapped
+    # tensor, instead of a BigQuery job
+    results = forecast_results_from_store(product_category, market, zip_codes)
+    if results is None:
+        tensor = load_demand_tensor()
+        if tensor is not None:
+            results = forecast_results_from_tensor(tensor, product_category, market, zip_codes)
+    if results is not None:
+        response = build_forecast_response(results, product_category, market, forecast_months, result_handle)
+        return json.dumps(response, indent=2, default=str)
+    
+    client = get_bigquery_client()
+    query = build_forecast_query(product_category, market, zip_codes)
+    
     try:
         query_job = client.query(query)
         results = query_job.result()
         
-        # Extract baseline and seasonality
-        baseline_shipments = 0
-        avg_growth_rate = 0
-        stddev_shipments = 0
-        seasonality_factors = {}
-        
-        for row in results:
-            baseline_shipments = row['baseline_shipments'] or 0
-            avg_growth_rate = row['avg_growth_rate'] or 0
-            stddev_shipments = row['stddev_shipments'] or 0
-            seasonality_factors[row['month_num']] = row['seasonality_factor'] or 1.0
-        
-        if baseline_shipments == 0:
-            # Provide helpful suggestions
-            available_categories = [
-                "pet_supplies", "consumer_electronics", "coffee_products", "skincare",
-                "home_fitness", "winter_outerwear", "books", "toys", "home_decor",
-                "kitchen_appliances", "baby_products", "vitamins_supplements", 
-                "outdoor_gear", "beauty_cosmetics", "jewelry", "sporting_goods"
-            ]
-            
-            return json.dumps({
-                "error": f"No historical data found for '{product_category}' in {market}",
-                "suggestion": "Try a different market or product category",
-                "help": {
-                    "note": "Make sure to use the category_id format (with underscores)",
-                    "example_categories": available_categories[:10],
-                    "example_markets": ["California", "Phoenix Metro", "Austin", "Chicago Metro", "Northeast", "Southwest"]
-                }
-            }, indent=2)
-        
-        # Generate forecast
-        forecasts = []
-        current_date = "2025-12-31"
-        
-        # Apply growth rate (as monthly rate)
-        monthly_growth_rate = avg_growth_rate / 100 / 12  # Convert YoY to monthly
-        
-        for i in range(1, forecast_months + 1):
-            # Calculate future month/year
-            future_month = (12 + i) % 12  # Start from Jan 2026
-            if future_month == 0:
-                future_month = 12
-            future_year = 2026 if i <= 12 else 2027
-            
-            # Get seasonality factor
-            seasonality = seasonality_factors.get(future_month, 1.0)
-            
-            # Calculate forecast with growth and seasonality
-            growth_factor = (1 + monthly_growth_rate) ** i
-            forecast_value = baseline_shipments * growth_factor * seasonality
-            
-            # Calculate confidence interval (simple approach)
-            confidence_lower = max(0, forecast_value - stddev_shipments)
-            confidence_upper = forecast_value + stddev_shipments
-            
-            forecasts.append({
-                "month": f"{future_year}-{future_month:02d}",
-                "forecasted_shipments": int(round(forecast_value)),
-                "confidence_interval_lower": int(round(confidence_lower)),
-                "confidence_interval_upper": int(round(confidence_upper)),
-                "seasonality_factor": round(seasonality, 2),
-                "growth_factor": round(growth_factor, 2)
-            })
-        
-        # Generate insights
-        insights = []
-        total_forecast = sum(f['forecasted_shipments'] for f in forecasts)
-        avg_forecast = total_forecast / len(forecasts)
-        
-        peak_month = max(forecasts, key=lambda x: x['forecasted_shipments'])
-        insights.append(f"Peak demand expected in {peak_month['month']} with {peak_month['forecasted_shipments']:,} shipments")
-        
-        if avg_growth_rate > 10:
-            insights.append(f"Strong growth momentum: {avg_growth_rate:.1f}% YoY growth rate")
-        elif avg_growth_rate < 0:
-            insights.append(f"Declining trend: {avg_growth_rate:.1f}% YoY growth rate")
-        else:
-            insights.append(f"Stable market: {avg_growth_rate:.1f}% YoY growth rate")
-        
-        response = {
-            "query_parameters": {
-                "product_category": product_category,
-                "market": market,
-                "forecast_months": forecast_months
-            },
-            "baseline_metrics": {
-                "current_avg_monthly_shipments": int(round(baseline_shipments)),
-                "avg_growth_rate_yoy": round(avg_growth_rate, 2),
-                "volatility_stddev": int(round(stddev_shipments))
-            },
-            "forecast": forecasts,
-            "summary": {
-                "total_forecasted_shipments": total_forecast,
-                "avg_monthly_forecast": int(round(avg_forecast)),
-                "insights": insights
-            },
-            "methodology": "Simple time series forecast using 12-month moving average, historical growth rates, and seasonal patterns"
-        }
-        
+        response = build_forecast_response(results, product_category, market, forecast_months, result_handle)
         return json.dumps(response, indent=2, default=str)
         
     except Exception as e:
@@ -1,38 +1,76 @@
 """Geographic analysis tool for location-based insights."""
 
-from google.cloud import bigquery
-from typing import Optional, List
+from google.adk.tools import ToolContext
+from typing import TYPE_CHECKING, Optional, List
 import json
 
 from fedex_market_intelligence.config import config
+from fedex_market_intelligence.shared_libraries.bigquery_results import (
+    column_mean,
+    column_sum,
+    frame_to_records,
+    read_frame,
+    round_columns,
+)
+from fedex_market_intelligence.shared_libraries.category_index import resolve_category
+from fedex_market_intelligence.shared_libraries.clients import get_bigquery_client
+from fedex_market_intelligence.shared_libraries.pagination import save_cursor
+from fedex_market_intelligence.shared_libraries.result_store import put_result
+
+if TYPE_CHECKING:
+    from google.cloud import bigquery
 
 PROJECT_ID = config.project_id
 DATASET_ID = config.dataset_id
 
+# Segments precomputed as segment_<name> flags in the ZCTA demographics table
+# (thresholds in data/load_zcta_demographics.py)
+DEMOGRAPHIC_SEGMENTS = {
+    "high_income": "Median household income of $100k or more",
+    "low_income": "Median household income under $50k",
+    "millennial_heavy": "18%+ of residents aged 25-34",
+    "family_heavy": "35%+ of households with children under 18",
+    "senior_heavy": "20%+ of residents aged 65 or older",
+}
 
-def analyze_geographic_demand(
+
+def demographic_segment(demographic_filter: Optional[str]) -> Optional[str]:
+    """The segment a demographic filter applies, or None when it cannot be applied."""
+    if not demographic_filter or not config.zcta_demographics_table:
+        return None
+    segment = demographic_filter.strip().lower()
+    return segment if segment in DEMOGRAPHIC_SEGMENTS else None
+
+
+def demographic_note(demographic_filter: Optional[str]) -> Optional[str]:
+    """Explain how (or why not) a demographic filter was applied."""
+    if not demographic_filter:
+        return None
+    segment = demographic_segment(demographic_filter)
+    if segment:
+        return (f"Filtered to ZIP codes in the '{segment}' segment ({DEMOGRAPHIC_SEGMENTS[segment]}); "
+                "population and income cover the same ZIP codes.")
+    if not config.zcta_demographics_table:
+        return (f"Demographic filter '{demographic_filter}' needs the ZCTA demographics table "
+                "(data/load_zcta_demographics.py). Results show all areas.")
+    return (f"Unknown demographic filter '{demographic_filter}'. Supported segments: "
+            f"{', '.join(DEMOGRAPHIC_SEGMENTS)}. Results show all areas.")
+
+
+def build_geographic_query(
     product_category: str,
-    geographic_scope: str = "metro",
-    demographic_filter: Optional[str] = None,
-    time_period: str = "last_12_months",
-    top_n: int = 10
+    geographic_scope: str,
+    time_period: str,
+    demographic_filter: Optional[str] = None
 ) -> str:
-    """
-    Analyze demand patterns by geographic location.
+    """Build the SQL for analyze_geographic_demand (shared by the sync and async tool).
     
-    Args:
-        product_category: Product category to analyze
-        geographic_scope: Level of analysis - 'zip', 'city', 'metro', 'state', 'region'
-        demographic_filter: Optional demographic filter (e.g., 'millennial_heavy', 'high_income')
-        time_period: Time range to analyze
-        top_n: Number of top locations to return
-    
-    Returns:
-        JSON string with geographic analysis results
+    With the ZCTA demographics table configured, each location is enriched with the
+    population, households and population-weighted median income / age of its ZIP
+    codes, and a demographic filter is a join on a precomputed segment flag - all
+    in the same query.
     """
     
-    client = bigquery.Client(project=PROJECT_ID)
-    
     # Parse time period
     time_filter = ""
     if time_period == "last_6_months":
@@ -46,21 +84,36 @@ def analyze_geographic_demand(
     if geographic_scope == "zip":
         group_field = "ad.zip_code, gm.city, gm.state, gm.metro_area, gm.lat, gm.lng"
         select_fields = "ad.zip_code as location, gm.city, gm.state, gm.metro_area, gm.lat, gm.lng"
+        location_field = "gm.zip_code"
     elif geographic_scope == "city":
         group_field = "gm.city, gm.state"
         select_fields = "CONCAT(gm.city, ', ', gm.state) as location, ANY_VALUE(gm.lat) as lat, ANY_VALUE(gm.lng) as lng"
+        location_field = "CONCAT(gm.city, ', ', gm.state)"
     elif geographic_scope == "metro":
         group_field = "gm.metro_area, gm.region"
         select_fields = "gm.metro_area as location, gm.region, ANY_VALUE(gm.lat) as lat, ANY_VALUE(gm.lng) as lng"
+        location_field = "gm.metro_area"
     elif geographic_scope == "state":
         group_field = "gm.state, gm.region"
         select_fields = "gm.state as location, gm.region, ANY_VALUE(gm.lat) as lat, ANY_VALUE(gm.lng) as lng"
+        location_field = "gm.state"
     elif geographic_scope == "region":
         group_field = "gm.region"
         select_fields = "gm.region as location, ANY_VALUE(gm.lat) as lat, ANY_VALUE(gm.lng) as lng"
+        location_field = "gm.region"
     else:
         group_field = "gm.metro_area, gm.region"
         select_fields = "gm.metro_area as location, gm.region, ANY_VALUE(gm.lat) as lat, ANY_VALUE(gm.lng) as lng"
+        location_field = "gm.metro_area"
+    
+    # Demographic segment: inner join on the precomputed flag
+    segment = demographic_segment(demographic_filter)
+    segment_join = ""
+    segment_filter = ""
+    if segment:
+        segment_join = f"""JOIN `{PROJECT_ID}.{DATASET_ID}.{config.zcta_demographics_table}` zd
+            ON ad.zip_code = zd.zip_code"""
+        segment_filter = f"AND zd.segment_{segment}"
     
     query = f"""
         SELECT 
@@ -77,53 +130,147 @@ def analyze_geographic_demand(
             ON ad.zip_code = gm.zip_code
         LEFT JOIN `{PROJECT_ID}.{DATASET_ID}.category_hierarchy` ch
             ON ad.product_category = ch.category_id
+        {segment_join}
         WHERE ad.product_category = '{product_category}'
         {time_filter}
+        {segment_filter}
         GROUP BY {group_field}, ch.category_name
+    """
+    
+    if not config.zcta_demographics_table:
+        return f"""{query}
         ORDER BY total_shipments DESC
-        LIMIT {top_n}
     """
     
+    # Enrich every location from the same ZIP codes (segment members only when filtered)
+    return f"""
+        WITH demand AS ({query}),
+        area_demographics AS (
+            SELECT 
+                {location_field} as location,
+                SUM(zd.total_population) as population,
+                SUM(zd.total_households) as households,
+                ROUND(SAFE_DIVIDE(
+                    SUM(zd.median_household_income * zd.total_population),
+                    SUM(IF(zd.median_household_income IS NULL, 0, zd.total_population))
+                ), 0) as median_household_income,
+                ROUND(SAFE_DIVIDE(
+                    SUM(zd.median_age * zd.total_population),
+                    SUM(IF(zd.median_age IS NULL, 0, zd.total_population))
+                ), 1) as median_age
+            FROM `{PROJECT_ID}.{DATASET_ID}.geographic_metadata` gm
+            JOIN `{PROJECT_ID}.{DATASET_ID}.{config.zcta_demographics_table}` zd
+                ON gm.zip_code = zd.zip_code
+            WHERE TRUE {segment_filter}
+            GROUP BY location
+        )
+        SELECT 
+            d.*,
+            dm.population,
+            dm.households,
+            dm.median_household_income,
+            dm.median_age
+        FROM demand d
+        LEFT JOIN area_demographics dm
+            ON d.location = dm.location
+        ORDER BY d.total_shipments DESC
+    """
+
+
+def build_geographic_response(
+    query_job: "bigquery.QueryJob",
+    results,
+    product_category: str,
+    geographic_scope: str,
+    demographic_filter: Optional[str],
+    time_period: str,
+    top_n: int,
+    tool_context: Optional[ToolContext]
+) -> dict:
+    """Read the first result page and build the analyze_geographic_demand response."""
+    
+    # Read columnar and round numeric values vectorized
+    df = read_frame(results, max_rows=top_n)
+    round_columns(df, ['avg_growth_rate_yoy', 'avg_growth_rate_mom', 'total_value'])
+    data = frame_to_records(df)
+    
+    response = {
+        "query_parameters": {
+            "product_category": product_category,
+            "geographic_scope": geographic_scope,
+            "demographic_filter": demographic_filter,
+            "time_period": time_period
+        },
+        "summary": {
+            "total_locations": len(data),
+            "total_shipments": column_sum(df, 'total_shipments'),
+            "avg_growth_rate": round(column_mean(df, 'avg_growth_rate_yoy'), 2),
+            "total_population": column_sum(df, 'population')
+        },
+        "top_locations": data,
+        "demographic_note": demographic_note(demographic_filter)
+    }
+    
+    # Keep the full result server-side so other tools can reuse it by handle
+    result_handle = put_result(tool_context, "analyze_geographic_demand", data, response["summary"])
+    if result_handle:
+        response["result_handle"] = result_handle
+    
+    response["pagination"] = save_cursor(
+        tool_context, "analyze_geographic_demand", query_job, results.total_rows or 0, top_n,
+        response["query_parameters"]
+    )
+    
+    return response
+
+
+def analyze_geographic_demand(
+    product_category: str,
+    geographic_scope: str = "metro",
+    demographic_filter: Optional[str] = None,
+    time_period: str = "last_12_months",
+    top_n: int = 10,
+    tool_context: Optional[ToolContext] = None
+) -> str:
+    """
+    Analyze demand patterns by geographic location.
+    
+    Args:
+        product_category: Product category to analyze
+        geographic_scope: Level of analysis - 'zip', 'city', 'metro', 'state', 'region'
+        demographic_filter: Optional demographic segment - 'high_income', 'low_income',
+                            'millennial_heavy', 'family_heavy' or 'senior_heavy'; only ZIP codes
+                            in the segment are counted
+        time_period: Time range to analyze
+        top_n: Number of top locations to return per page; use fetch_result_page with the
+               returned cursor_id to get the next locations
+    
+    Returns:
+        JSON string with geographic analysis results; each location includes its population,
+        households, median household income and median age. Includes a 'result_handle' that can be
+        passed to generate_map_visualization, get_demographics or forecast_demand instead
+        of copying rows.
+    """
+    
+    product_category, error = resolve_category(product_category)
+    if error:
+        return error
+    
+    client = get_bigquery_client()
+    query = build_geographic_query(product_category, geographic_scope, time_period, demographic_filter)
+    
     try:
+        # No LIMIT in SQL: the full ranking stays in the job's destination table
+        # and only the first page is read here
         query_job = client.query(query)
-        results = query_job.result()
-        
-        # Convert to list of dicts
-        data = []
-        for row in results:
-            row_dict = dict(row)
-            # Round numeric values
-            if 'avg_growth_rate_yoy' in row_dict:
-                row_dict['avg_growth_rate_yoy'] = round(row_dict['avg_growth_rate_yoy'], 2)
-            if 'avg_growth_rate_mom' in row_dict:
-                row_dict['avg_growth_rate_mom'] = round(row_dict['avg_growth_rate_mom'], 2)
-            if 'total_value' in row_dict:
-                row_dict['total_value'] = round(row_dict['total_value'], 2)
-            data.append(row_dict)
-        
-        # If demographic filter requested, add note
-        demographic_note = None
-        if demographic_filter:
-            demographic_note = f"Note: Demographic filter '{demographic_filter}' would require Census API integration to be fully applied. Results show all areas for now."
-        
-        response = {
-            "query_parameters": {
-                "product_category": product_category,
-                "geographic_scope": geographic_scope,
-                "demographic_filter": demographic_filter,
-                "time_period": time_period
-            },
-            "summary": {
-                "total_locations": len(data),
-                "total_shipments": sum(row.get('total_shipments', 0) for row in data),
-                "avg_growth_rate": round(sum(row.get('avg_growth_rate_yoy', 0) for row in data) / len(data), 2) if data else 0
-            },
-            "top_locations": data,
-            "demographic_note": demographic_note
-        }
+        results = query_job.result(max_results=top_n)
         
+        response = build_geographic_response(
+            query_job, results, product_category, geographic_scope, demographic_filter,
+            time_period, top_n, tool_context
+        )
         return json.dumps(response, indent=2, default=str)
-        
+    
     except Exception as e:
         return json.dumps({
             "error": str(e),
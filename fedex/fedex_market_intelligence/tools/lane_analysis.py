@@ -0,0 +1,221 @@
+"""Lane analysis tool - origin-destination flows, inbound/outbound balance and lane growth."""
+
+from google.adk.tools import ToolContext
+from typing import Optional
+import json
+
+from fedex_market_intelligence.shared_libraries.category_index import resolve_category
+from fedex_market_intelligence.shared_libraries.lazy import lazy_import
+from fedex_market_intelligence.shared_libraries.od_matrices import OD_LEVELS, load_od_matrices
+from fedex_market_intelligence.shared_libraries.result_store import put_result
+
+np = lazy_import("numpy")
+
+# |net flow| within this share of an area's inbound + outbound counts as balanced
+BALANCED_SHARE = 0.05
+
+
+def growth_pct(current: float, prior: float) -> Optional[float]:
+    """Year-over-year % change (None without prior flow)."""
+    if prior <= 0:
+        return None
+    return round((current - prior) / prior * 100, 1)
+
+
+def market_lanes(flows, market_areas):
+    """Non-zero inter-area lanes of a matrix with the market at either end, as (origin, destination, shipments)."""
+    flows = flows.tocoo()
+    keep = (flows.row != flows.col) & (market_areas[flows.row] | market_areas[flows.col]) & (flows.data > 0)
+    return flows.row[keep], flows.col[keep], flows.data[keep].astype(np.float64)
+
+
+def lane_records(matrices, level: str, current, prior, market_areas, top_n: int):
+    """Largest lanes touching the market with their year-earlier flow, plus the market's lane totals."""
+    origins, destinations, shipments = market_lanes(current, market_areas)
+    prior_total = market_lanes(prior, market_areas)[2].sum()
+    total = shipments.sum()
+    lane_count = len(shipments)
+
+    order = np.argsort(-shipments, kind="stable")[:top_n]
+    origins, destinations, shipments = origins[order], destinations[order], shipments[order]
+    previous = np.asarray(prior[origins, destinations]).ravel() if len(order) else np.zeros(0)
+
+    labels = matrices.labels[level]
+    coords = matrices.coords[level]
+    lanes = []
+    for origin, destination, volume, before in zip(origins, destinations, shipments, previous):
+        lanes.append({
+            "lane": f"{labels[origin]} → {labels[destination]}",
+            "origin": labels[origin],
+            "destination": labels[destination],
+            "shipments": int(round(volume)),
+            "share_pct": round(volume / total * 100, 1),
+            "prior_year_shipments": int(round(float(before))),
+            "growth_pct": growth_pct(volume, float(before)),
+            "origin_lat": float(coords[origin, 0]),
+            "origin_lng": float(coords[origin, 1]),
+            "destination_lat": float(coords[destination, 0]),
+            "destination_lng": float(coords[destination, 1]),
+        })
+    totals = {
+        "lanes_with_flow": lane_count,
+        "lane_shipments": int(round(total)),
+        "prior_year_lane_shipments": int(round(prior_total)),
+    }
+    return lanes, totals
+
+
+def balance_records(matrices, level: str, current, prior, market_areas, top_n: int):
+    """Inbound / outbound balance of the market's areas, busiest first."""
+    def totals(flows):
+        internal = flows.diagonal().astype(np.float64)
+        inbound = np.asarray(flows.sum(axis=0)).ravel() - internal
+        outbound = np.asarray(flows.sum(axis=1)).ravel() - internal
+        return inbound, outbound, internal
+
+    inbound, outbound, internal = totals(current)
+    prior_inbound, prior_outbound, _ = totals(prior)
+
+    volume = inbound + outbound
+    areas = np.flatnonzero(market_areas & (volume + internal > 0))
+    areas = areas[np.argsort(-volume[areas], kind="stable")][:top_n]
+
+    labels = matrices.labels[level]
+    coords = matrices.coords[level]
+    records = []
+    for area in areas:
+        net = inbound[area] - outbound[area]
+        if abs(net) <= BALANCED_SHARE * volume[area]:
+            balance = "balanced"
+        else:
+            balance = "net importer" if net > 0 else "net exporter"
+        records.append({
+            "location": labels[area],
+            "lat": float(coords[area, 0]),
+            "lng": float(coords[area, 1]),
+            "inbound_shipments": int(round(inbound[area])),
+            "outbound_shipments": int(round(outbound[area])),
+            "internal_shipments": int(round(internal[area])),
+            "net_flow": int(round(net)),
+            "flow_balance": balance,
+            "inbound_outbound_ratio": round(inbound[area] / outbound[area], 2) if outbound[area] > 0 else None,
+            "inbound_growth_pct": growth_pct(inbound[area], prior_inbound[area]),
+            "outbound_growth_pct": growth_pct(outbound[area], prior_outbound[area]),
+        })
+    return records
+
+
+def analyze_shipping_lanes(
+    product_category: str,
+    market: Optional[str] = None,
+    level: str = "metro",
+    time_period: str = "last_12_months",
+    top_n: int = 10,
+    tool_context: Optional[ToolContext] = None
+) -> str:
+    """
+    Analyze shipping lanes: where a category's shipments flow from and to.
+
+    Reads precomputed origin-destination flow matrices, so any market and period
+    answers instantly. Use this when the user asks about:
+    - Top lanes / corridors (e.g., "where do Phoenix's pet supplies come from?")
+    - Inbound vs outbound balance (net importer or exporter markets)
+    - Which flows are growing or shrinking year over year
+
+    Args:
+        product_category: Product category (e.g., 'pet_supplies', 'consumer_electronics')
+        market: Optional market - ZIP code, state code, or city/metro/state name
+                (e.g., '85004', 'AZ', 'Phoenix'). Lanes with the market at either end
+                are returned; None for all lanes nationwide
+        level: Area level of the lanes: 'zip', 'metro' or 'state' (default: 'metro')
+        time_period: Time period: 'last_6_months', 'last_12_months', 'last_24_months', 'q1_2025', etc.
+        top_n: Number of lanes and areas to return (default: 10)
+
+    Returns:
+        JSON string with the top lanes (shipments, share, year-over-year growth and
+        both endpoints' coordinates), the inbound/outbound balance of the market's
+        areas, and a 'result_handle' for the lane rows
+
+    Example:
+        analyze_shipping_lanes('pet_supplies', 'Phoenix', level='metro')
+        Returns the metro-to-metro lanes into and out of Phoenix with their growth
+    """
+
+    product_category, error = resolve_category(product_category)
+    if error:
+        return error
+
+    if level not in OD_LEVELS:
+        return json.dumps({
+            "error": f"Unknown level '{level}'",
+            "valid_levels": OD_LEVELS
+        }, indent=2)
+
+    matrices = load_od_matrices()
+    if matrices is None:
+        return json.dumps({
+            "error": "Lane matrices are not available",
+            "suggestion": "Run data/build_od_matrices.py and set OD_MATRICES_PATH"
+        }, indent=2)
+    if not matrices.has_category(product_category):
+        return json.dumps({
+            "error": f"Unknown product category '{product_category}'",
+            "available_categories": matrices.categories
+        }, indent=2)
+
+    market_areas = matrices.area_mask(level, market)
+    if not market_areas.any():
+        return json.dumps({
+            "error": f"No {level} areas match market '{market}'",
+            "suggestion": "Use a ZIP code, state code, or city/metro/state name"
+        }, indent=2)
+
+    months = matrices.month_mask(time_period)
+    current = matrices.flow_matrix(level, product_category, months)
+    prior = matrices.flow_matrix(level, product_category, matrices.year_earlier(months))
+
+    lanes, totals = lane_records(matrices, level, current, prior, market_areas, top_n)
+    balance = balance_records(matrices, level, current, prior, market_areas, top_n)
+
+    summary = {
+        **totals,
+        "flow_growth_pct": growth_pct(totals["lane_shipments"], totals["prior_year_lane_shipments"]),
+        "top_lanes_share_pct": round(sum(lane["share_pct"] for lane in lanes), 1),
+        "growth_compared_to": "same months one year earlier"
+    }
+
+    # Generate insights
+    insights = []
+    if lanes:
+        top = lanes[0]
+        insights.append(f"Busiest lane: {top['lane']} with {top['shipments']:,} shipments ({top['share_pct']}% of lane volume)")
+        growing = [lane for lane in lanes if lane["growth_pct"] is not None]
+        if growing:
+            fastest = max(growing, key=lambda lane: lane["growth_pct"])
+            insights.append(f"Fastest-growing top lane: {fastest['lane']} ({fastest['growth_pct']:+.1f}% YoY)")
+    if market and balance:
+        area = balance[0]
+        insights.append(
+            f"{area['location']} is a {area['flow_balance']}: {area['inbound_shipments']:,} in vs "
+            f"{area['outbound_shipments']:,} out"
+        )
+
+    response = {
+        "query_parameters": {
+            "product_category": product_category,
+            "market": market or "All markets",
+            "level": level,
+            "time_period": time_period
+        },
+        "summary": summary,
+        "insights": insights,
+        "top_lanes": lanes,
+        "flow_balance": balance
+    }
+
+    # Keep the lane rows server-side so later calls can refer to them by handle
+    result_handle = put_result(tool_context, "analyze_shipping_lanes", lanes, summary)
+    if result_handle:
+        response["result_handle"] = result_handle
+
+    return json.dumps(response, indent=2, default=str)
@@ -1,43 +1,40 @@
 """Market comparison tool for side-by-side analysis."""
 
-from google.cloud import bigquery
-from typing import List, Optional
+from typing import Dict, List, Optional
 import json
 
 from fedex_market_intelligence.config import config
+from fedex_market_intelligence.shared_libraries.bigquery_results import (
+    FrameResult,
+    frame_to_records,
+    read_frame,
+    round_columns,
+)
+from fedex_market_intelligence.shared_libraries.category_index import resolve_category
+from fedex_market_intelligence.shared_libraries.clients import get_bigquery_client
+from fedex_market_intelligence.shared_libraries.concentration import ConcentrationCube, load_concentration_cube
+from fedex_market_intelligence.shared_libraries.demand_tensor import DemandTensor, load_demand_tensor
+from fedex_market_intelligence.shared_libraries.lazy import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
 
 PROJECT_ID = config.project_id
 DATASET_ID = config.dataset_id
 
+COMPARISON_COLUMNS = [
+    'market_name', 'unique_zip_codes', 'total_shipments', 'total_value', 'avg_growth_rate_yoy',
+    'avg_growth_rate_mom', 'avg_unique_shippers', 'avg_market_concentration',
+    'total_major_brand_volume', 'total_small_business_volume', 'months_with_data'
+]
 
-def compare_markets(
+
+def build_comparison_query(
     product_category: str,
     markets: List[str],
-    time_period: str = "last_12_months",
-    metrics: Optional[List[str]] = None
+    time_period: str
 ) -> str:
-    """
-    Compare multiple markets side-by-side.
-    
-    Args:
-        product_category: Product category to compare
-        markets: List of markets to compare (cities, metros, states)
-        time_period: Time period for comparison
-        metrics: List of metrics to compare - defaults to ['volume', 'growth', 'value', 'competition']
-    
-    Returns:
-        JSON string with market comparison results
-    """
-    
-    if metrics is None:
-        metrics = ['volume', 'growth', 'value', 'competition']
-    
-    if not markets or len(markets) < 2:
-        return json.dumps({
-            "error": "Please provide at least 2 markets to compare"
-        }, indent=2)
-    
-    client = bigquery.Client(project=PROJECT_ID)
+    """Build the SQL for compare_markets (shared by the sync and async tool)."""
     
     # Parse time period
     time_filter = ""
@@ -109,72 +106,247 @@ def compare_markets(
         ORDER BY total_shipments DESC
     """
     
+    return query
+
+
+def comparison_results_from_tensor(
+    tensor: DemandTensor,
+    product_category: str,
+    markets: List[str],
+    time_period: str
+) -> FrameResult:
+    """
+    Compute the comparison query's result rows from the demand tensor.
+    
+    Each ZIP is assigned to the first market it matches by city, then metro, then
+    state (the CASE order of build_comparison_query). Per-market aggregates are then
+    one matrix multiply of the market x zip assignment matrix with each metric.
+    """
+    
+    if not tensor.has_category(product_category):
+        return FrameResult(pd.DataFrame(columns=COMPARISON_COLUMNS), 0)
+    
+    assignment = np.full(len(tensor.zip_codes), -1)
+    for level in ("city", "metro", "state"):
+        for i, market in enumerate(markets):
+            matches = tensor.level_mask(level, market.lower().replace(",", "").strip())
+            assignment[(assignment < 0) & matches] = i
+    
+    markets_by_zip = np.zeros((len(markets), len(tensor.zip_codes)))
+    assigned = assignment >= 0
+    markets_by_zip[assignment[assigned], np.flatnonzero(assigned)] = 1
+    
+    months = tensor.month_mask(time_period)
+    
+    def metric(name):
+        return tensor.slice(product_category, name)[months].astype(np.float64)
+    
+    # market_share is LEFT JOINed onto demand rows, so share metrics only count there
+    demand_rows = metric("demand_rows")
+    share_rows = demand_rows * metric("share_rows")
+    
+    def market_sum(values):
+        return markets_by_zip @ values.sum(axis=0)
+    
+    row_counts = market_sum(demand_rows)
+    share_counts = market_sum(share_rows)
+    
+    def market_mean(name, rows, counts):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(counts > 0, market_sum(metric(name) * rows) / counts, np.nan)
+    
+    frame = pd.DataFrame({
+        'market_name': markets,
+        'unique_zip_codes': markets_by_zip @ (demand_rows.sum(axis=0) > 0),
+        'total_shipments': market_sum(metric("total_shipments")),
+        'total_value': market_sum(metric("total_value")),
+        'avg_growth_rate_yoy': market_mean("growth_rate_yoy", demand_rows, row_counts),
+        'avg_growth_rate_mom': market_mean("growth_rate_mom", demand_rows, row_counts),
+        'avg_unique_shippers': market_mean("unique_shippers", demand_rows, row_counts),
+        'avg_market_concentration': market_mean("market_concentration_index", share_rows, share_counts),
+        'total_major_brand_volume': np.where(share_counts > 0, market_sum(metric("major_brand_volume") * share_rows), np.nan),
+        'total_small_business_volume': np.where(share_counts > 0, market_sum(metric("small_business_volume") * share_rows), np.nan),
+        'months_with_data': ((markets_by_zip @ demand_rows.T) > 0).sum(axis=1),
+    }, columns=COMPARISON_COLUMNS)
+    
+    # Only markets with rows appear, volume leader first (GROUP BY ... ORDER BY total_shipments DESC)
+    frame = frame[row_counts > 0].sort_values('total_shipments', ascending=False).reset_index(drop=True)
+    for column in ['unique_zip_codes', 'total_shipments', 'months_with_data']:
+        frame[column] = frame[column].astype('int64')
+    for column in ['total_major_brand_volume', 'total_small_business_volume']:
+        frame[column] = frame[column].round().astype('Int64')
+    
+    return FrameResult(frame, len(frame))
+
+
+def market_concentrations(
+    cube: ConcentrationCube,
+    product_category: str,
+    markets: List[str],
+    time_period: str
+) -> Dict[str, dict]:
+    """
+    Shipper HHI, top shippers and subcategory drill-down of each market from the concentration cube.
+    
+    ZIPs are assigned to markets like comparison_results_from_tensor (city, then metro,
+    then state) and summed over the time period's months.
+    """
+    
+    assignment = np.full(len(cube.zip_codes), -1)
+    for level in ("city", "metro", "state"):
+        for i, market in enumerate(markets):
+            matches = cube.label_mask(level, market.lower().replace(",", "").strip())
+            assignment[(assignment < 0) & matches] = i
+    
+    months = cube.month_mask(time_period)
+    concentrations = {}
+    for i, market in enumerate(markets):
+        if (assignment == i).any():
+            concentration = cube.concentration(product_category, assignment == i, months)
+            if concentration is not None:
+                concentrations[market] = concentration
+    return concentrations
+
+
+def build_comparison_response(
+    results,
+    product_category: str,
+    markets: List[str],
+    time_period: str
+) -> dict:
+    """Read the query result and build the compare_markets response."""
+    
+    # Read columnar and round numeric values vectorized
+    df = read_frame(results)
+    round_columns(df, ['total_value', 'avg_growth_rate_yoy', 'avg_growth_rate_mom',
+                       'avg_unique_shippers', 'avg_market_concentration'])
+    
+    # Calculate derived metrics (share columns stay null when a market has no volume)
+    if not df.empty:
+        major_volume = df['total_major_brand_volume'].fillna(0).astype("float64")
+        small_volume = df['total_small_business_volume'].fillna(0).astype("float64")
+        total_volume = (major_volume + small_volume).where(lambda v: v > 0)
+        df['major_brand_share_pct'] = (major_volume / total_volume * 100).round(1)
+        df['small_business_share_pct'] = (small_volume / total_volume * 100).round(1)
+    
+    comparison_data = frame_to_records(df)
+    
+    # Shipper-level concentration when the concentration cube is configured
+    drilldown = {}
+    cube = load_concentration_cube()
+    if cube is not None and cube.has_category(product_category) and comparison_data:
+        concentrations = market_concentrations(
+            cube, product_category, [x['market_name'] for x in comparison_data], time_period
+        )
+        for row in comparison_data:
+            concentration = concentrations.get(row['market_name'])
+            row['shipper_hhi'] = concentration['shipper_hhi'] if concentration else None
+            row['concentration_level'] = concentration['concentration_level'] if concentration else None
+            row['top_shippers'] = concentration['top_shippers'] if concentration else []
+            if concentration:
+                drilldown[row['market_name']] = concentration['subcategories']
+    
+    # Generate insights
+    insights = []
+    if len(comparison_data) >= 2:
+        # Volume leader
+        volume_leader = max(comparison_data, key=lambda x: x.get('total_shipments', 0))
+        insights.append(f"{volume_leader['market_name']} leads in volume with {volume_leader['total_shipments']:,} shipments")
+    
+        # Growth leader
+        growth_leader = max(comparison_data, key=lambda x: x.get('avg_growth_rate_yoy', 0))
+        insights.append(f"{growth_leader['market_name']} shows fastest growth at {growth_leader['avg_growth_rate_yoy']:.1f}% YoY")
+    
+        # Competition analysis
+        competition_data = [x for x in comparison_data if x.get('avg_market_concentration') is not None]
+        if competition_data:
+            least_competitive = min(competition_data, key=lambda x: x.get('avg_market_concentration', 100))
+            insights.append(f"{least_competitive['market_name']} has lowest major brand dominance at {least_competitive['avg_market_concentration']:.0f}%")
+    
+        # Shipper concentration (concentration cube)
+        hhi_data = [x for x in comparison_data if x.get('shipper_hhi') is not None]
+        if len(hhi_data) >= 2:
+            most = max(hhi_data, key=lambda x: x['shipper_hhi'])
+            least = min(hhi_data, key=lambda x: x['shipper_hhi'])
+            insights.append(f"{most['market_name']} is the most concentrated (shipper HHI {most['shipper_hhi']:,}, {most['concentration_level']}); {least['market_name']} the least (HHI {least['shipper_hhi']:,})")
+    
+    # Winner in each category
+    winners = {}
+    if comparison_data:
+        winners = {
+            "volume": max(comparison_data, key=lambda x: x.get('total_shipments', 0))['market_name'],
+            "growth": max(comparison_data, key=lambda x: x.get('avg_growth_rate_yoy', 0))['market_name'],
+            "value": max(comparison_data, key=lambda x: x.get('total_value', 0))['market_name'],
+        }
+        if any(x.get('avg_market_concentration') is not None for x in comparison_data):
+            winners["opportunity"] = min([x for x in comparison_data if x.get('avg_market_concentration') is not None], 
+                                        key=lambda x: x.get('avg_market_concentration', 100))['market_name']
+    
+    response = {
+        "query_parameters": {
+            "product_category": product_category,
+            "markets_compared": markets,
+            "time_period": time_period
+        },
+        "summary": {
+            "markets_analyzed": len(comparison_data),
+            "insights": insights,
+            "winners_by_metric": winners
+        },
+        "comparison_data": comparison_data
+    }
+    if drilldown:
+        response["subcategory_drilldown"] = drilldown
+    
+    return response
+
+
+def compare_markets(
+    product_category: str,
+    markets: List[str],
+    time_period: str = "last_12_months",
+    metrics: Optional[List[str]] = None
+) -> str:
+    """
+    Compare multiple markets side-by-side.
+    
+    Args:
+        product_category: Product category to compare
+        markets: List of markets to compare (cities, metros, states)
+        time_period: Time period for comparison
+        metrics: List of metrics to compare - defaults to ['volume', 'growth', 'value', 'competition']
+    
+    Returns:
+        JSON string with market comparison results
+    """
+    
+    product_category, error = resolve_category(product_category)
+    if error:
+        return error
+    
+    if metrics is None:
+        metrics = ['volume', 'growth', 'value', 'competition']
+    
+    if not markets or len(markets) < 2:
+        return json.dumps({
+            "error": "Please provide at least 2 markets to compare"
+        }, indent=2)
+    
+    # Array slicing over the memory-mapped tensor instead of a BigQuery job
+    tensor = load_demand_tensor()
+    if tensor is not None:
+        results = comparison_results_from_tensor(tensor, product_category, markets, time_period)
+        response = build_comparison_response(results, product_category, markets, time_period)
+        return json.dumps(response, indent=2, default=str)
+    
+    client = get_bigquery_client()
+    query = build_comparison_query(product_category, markets, time_period)
+    
     try:
         query_job = client.query(query)
         results = query_job.result()
         
-        # Convert to list of dicts
-        comparison_data = []
-        for row in results:
-            row_dict = dict(row)
-            
-            # Round numeric values
-            for key in ['total_value', 'avg_growth_rate_yoy', 'avg_growth_rate_mom', 
-                       'avg_unique_shippers', 'avg_market_concentration']:
-                if key in row_dict and row_dict[key] is not None:
-                    row_dict[key] = round(row_dict[key], 2)
-            
-            # Calculate derived metrics
-            total_volume = (row_dict.get('total_major_brand_volume', 0) or 0) + (row_dict.get('total_small_business_volume', 0) or 0)
-            if total_volume > 0:
-                row_dict['major_brand_share_pct'] = round((row_dict.get('total_major_brand_volume', 0) or 0) / total_volume * 100, 1)
-                row_dict['small_business_share_pct'] = round((row_dict.get('total_small_business_volume', 0) or 0) / total_volume * 100, 1)
-            
-            comparison_data.append(row_dict)
-        
-        # Generate insights
-        insights = []
-        if len(comparison_data) >= 2:
-            # Volume leader
-            volume_leader = max(comparison_data, key=lambda x: x.get('total_shipments', 0))
-            insights.append(f"{volume_leader['market_name']} leads in volume with {volume_leader['total_shipments']:,} shipments")
-            
-            # Growth leader
-            growth_leader = max(comparison_data, key=lambda x: x.get('avg_growth_rate_yoy', 0))
-            insights.append(f"{growth_leader['market_name']} shows fastest growth at {growth_leader['avg_growth_rate_yoy']:.1f}% YoY")
-            
-            # Competition analysis
-            competition_data = [x for x in comparison_data if x.get('avg_market_concentration') is not None]
-            if competition_data:
-                least_competitive = min(competition_data, key=lambda x: x.get('avg_market_concentration', 100))
-                insights.append(f"{least_competitive['market_name']} has lowest major brand dominance at {least_competitive['avg_market_concentration']:.0f}%")
-        
-        # Winner in each category
-        winners = {}
-        if comparison_data:
-            winners = {
-                "volume": max(comparison_data, key=lambda x: x.get('total_shipments', 0))['market_name'],
-                "growth": max(comparison_data, key=lambda x: x.get('avg_growth_rate_yoy', 0))['market_name'],
-                "value": max(comparison_data, key=lambda x: x.get('total_value', 0))['market_name'],
-            }
-            if any(x.get('avg_market_concentration') is not None for x in comparison_data):
-                winners["opportunity"] = min([x for x in comparison_data if x.get('avg_market_concentration') is not None], 
-                                            key=lambda x: x.get('avg_market_concentration', 100))['market_name']
-        
-        response = {
-            "query_parameters": {
-                "product_category": product_category,
-                "markets_compared": markets,
-                "time_period": time_period
-            },
-            "summary": {
-                "markets_analyzed": len(comparison_data),
-                "insights": insights,
-                "winners_by_metric": winners
-            },
-            "comparison_data": comparison_data
-        }
-        
+        response = build_comparison_response(results, product_category, markets, time_period)
         return json.dumps(response, indent=2, default=str)
         
     except Exception as e:
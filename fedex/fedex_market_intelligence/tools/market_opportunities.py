@@ -1,59 +1,41 @@
 """Market opportunity identification tool - find gaps and underserved areas."""
 
-from google.cloud import bigquery
+from google.adk.tools import ToolContext
 from typing import Optional
 import json
 
 from fedex_market_intelligence.config import config
+from fedex_market_intelligence.shared_libraries.bigquery_results import (
+    frame_to_records,
+    read_frame,
+    round_columns,
+)
+from fedex_market_intelligence.shared_libraries.category_index import resolve_category
+from fedex_market_intelligence.shared_libraries.clients import get_bigquery_client
+from fedex_market_intelligence.shared_libraries.concentration import load_concentration_cube
+from fedex_market_intelligence.shared_libraries.result_store import put_result
+from fedex_market_intelligence.tools.category_affinity import resolve_market
 
 PROJECT_ID = config.project_id
 DATASET_ID = config.dataset_id
 
+# Human-readable description of each gap type (anything unrecognized is 'emerging')
+GAP_TYPE_DESCRIPTIONS = {
+    "low_competition": "Areas with high demand but low major brand presence",
+    "high_growth": "Fast-growing markets with momentum",
+    "underserved": "High demand areas with few suppliers",
+    "emerging": "Emerging markets with strong growth signals",
+}
 
-def find_market_opportunities(
+
+def build_opportunities_query(
     product_category: str,
     market: str,
-    gap_type: str = "low_competition",
-    min_demand_threshold: int = 50,
-    top_n: int = 10
+    gap_type: str,
+    min_demand_threshold: int,
+    top_n: int
 ) -> str:
-    """
-    Find market opportunities by identifying gaps, underserved areas, and high-potential locations.
-    
-    This tool analyzes FedEx shipping data to find ZIP codes with untapped business potential.
-    Use this when the user asks about:
-    - Where to open a new location
-    - Finding areas with low competition
-    - Identifying underserved markets
-    - Discovering high-growth opportunities
-    - Spotting gaps in market coverage
-    
-    Args:
-        product_category: Product category (e.g., 'pet_supplies', 'consumer_electronics', 'coffee_products')
-        market: Geographic market name (e.g., 'Phoenix', 'Chicago', 'Northeast')
-                Note: Use city/metro/region names; "suburbs" keyword will be auto-handled
-        gap_type: Type of opportunity to find:
-            - 'low_competition': Areas with demand but low major brand presence
-            - 'high_growth': Fast-growing markets (>20% YoY growth)
-            - 'underserved': High demand areas with few suppliers
-            - 'emerging': Growing markets with strong momentum (>15% growth)
-        min_demand_threshold: Minimum monthly shipments required (default: 50)
-                              Lower this (e.g., 10-20) for niche categories or smaller markets
-        top_n: Number of top opportunities to return (default: 10)
-    
-    Returns:
-        JSON string with detailed market opportunity analysis including:
-        - ZIP codes with opportunity scores
-        - Demand metrics and growth rates
-        - Competition levels
-        - Actionable insights
-    
-    Example:
-        find_market_opportunities('pet_supplies', 'Phoenix', 'low_competition')
-        Returns ZIP codes in Phoenix with high pet supply demand but low competition
-    """
-    
-    client = bigquery.Client(project=PROJECT_ID)
+    """Build the SQL for find_market_opportunities (shared by the sync and async tool)."""
     
     # Parse market location - handle "suburbs" and state names
     market_lower = market.lower()
@@ -84,25 +66,21 @@ def find_market_opportunities(
         # Areas with demand but low major brand presence
         additional_filters = "AND market_concentration < 50"
         order_by = "market_concentration ASC, total_shipments DESC"
-        description = "Areas with high demand but low major brand presence"
         
     elif gap_type == "high_growth":
         # Fast growing markets
         additional_filters = "AND avg_growth_rate > 20"
         order_by = "avg_growth_rate DESC"
-        description = "Fast-growing markets with momentum"
         
     elif gap_type == "underserved":
         # High demand but few unique shippers
         additional_filters = "AND avg_unique_shippers < 10"
         order_by = "total_shipments DESC"
-        description = "High demand areas with few suppliers"
         
     else:  # emerging
         # Growing markets with increasing demand
         additional_filters = "AND avg_growth_rate > 15 AND total_shipments > 50"
         order_by = "avg_growth_rate DESC"
-        description = "Emerging markets with strong growth signals"
     
     query = f"""
         WITH opportunity_data AS (
@@ -143,67 +121,162 @@ def find_market_opportunities(
         LIMIT {top_n}
     """
     
+    return query
+
+
+def build_opportunities_response(
+    results,
+    product_category: str,
+    market: str,
+    gap_type: str,
+    min_demand_threshold: int,
+    tool_context: Optional[ToolContext]
+) -> dict:
+    """Read the query result and build the find_market_opportunities response."""
+    
+    description = GAP_TYPE_DESCRIPTIONS.get(gap_type, GAP_TYPE_DESCRIPTIONS["emerging"])
+    
+    # Read columnar and round numeric values vectorized
+    df = read_frame(results)
+    row_count = len(df)
+    round_columns(df, ['avg_monthly_value', 'avg_growth_rate', 'market_concentration',
+                       'avg_major_brand_volume', 'avg_small_business_volume', 'avg_unique_shippers'])
+    
+    # Add opportunity score (simple weighted calculation) as a column
+    if row_count:
+        shipments = df['total_shipments'].fillna(0)
+        growth = df['avg_growth_rate'].fillna(0)
+        if gap_type == "low_competition":
+            score = (100 - df['market_concentration'].fillna(50)) + (shipments / 10)
+        elif gap_type == "high_growth":
+            score = growth
+        elif gap_type == "underserved":
+            score = shipments / df['avg_unique_shippers'].replace(0, 1).fillna(1)
+        else:  # emerging
+            score = growth * 1.5
+        df['opportunity_score'] = score.astype("float64").round(2)
+    
+    opportunities = frame_to_records(df)
+    
+    # Shipper-level concentration of each ZIP and the market when the concentration cube is configured
+    market_concentration = None
+    cube = load_concentration_cube()
+    if cube is not None and cube.has_category(product_category):
+        zip_concentration = cube.zip_summaries([row['zip_code'] for row in opportunities], product_category)
+        for row in opportunities:
+            row.update(zip_concentration.get(str(row['zip_code']), {
+                "shipper_hhi": None, "concentration_level": None, "top_shipper": None, "top_shipper_share_pct": None
+            }))
+        position, _ = resolve_market(cube, market.lower().replace(" suburbs", "").replace(" suburban", "").strip())
+        if position is not None:
+            market_concentration = cube.market_summary(position, product_category)
+    
+    # Generate insights
+    insights = []
+    if opportunities:
+        top = opportunities[0]
+        if gap_type == "low_competition":
+            insights.append(f"Top opportunity in {top.get('city', 'unknown')}: {top.get('total_shipments', 0)} monthly shipments with only {top.get('market_concentration', 0):.0f}% major brand dominance")
+        elif gap_type == "high_growth":
+            insights.append(f"Fastest growth in {top.get('city', 'unknown')}: {top.get('avg_growth_rate', 0):.1f}% YoY growth")
+        elif gap_type == "underserved":
+            insights.append(f"Most underserved: {top.get('city', 'unknown')} with {top.get('total_shipments', 0)} monthly shipments but only {top.get('avg_unique_shippers', 0):.0f} suppliers")
+    elif row_count == 0 and min_demand_threshold > 20:
+        # Suggest trying with lower threshold
+        insights.append(f"No opportunities found with current threshold ({min_demand_threshold} shipments/month). Try lowering the min_demand_threshold parameter.")
+    if market_concentration:
+        leader = market_concentration['top_shippers'][0] if market_concentration['top_shippers'] else None
+        insight = f"{market_concentration['market_key']} is {market_concentration['concentration_level']} (shipper HHI {market_concentration['shipper_hhi']:,})"
+        if leader:
+            insight += f"; {leader['shipper']} leads with {leader['share_pct']:.1f}% of volume"
+        insights.append(insight)
+    
+    response = {
+        "query_parameters": {
+            "product_category": product_category,
+            "market": market,
+            "gap_type": gap_type,
+            "description": description,
+            "min_demand_threshold": min_demand_threshold
+        },
+        "summary": {
+            "opportunities_found": len(opportunities),
+            "analysis_type": description
+        },
+        "insights": insights,
+        "opportunities": opportunities
+    }
+    if market_concentration:
+        response["market_concentration"] = market_concentration
+    
+    # Keep the full result server-side so other tools can reuse it by handle
+    result_handle = put_result(tool_context, "find_market_opportunities", opportunities, response["summary"])
+    if result_handle:
+        response["result_handle"] = result_handle
+    
+    return response
+
+
+def find_market_opportunities(
+    product_category: str,
+    market: str,
+    gap_type: str = "low_competition",
+    min_demand_threshold: int = 50,
+    top_n: int = 10,
+    tool_context: Optional[ToolContext] = None
+) -> str:
+    """
+    Find market opportunities by identifying gaps, underserved areas, and high-potential locations.
+    
+    This tool analyzes FedEx shipping data to find ZIP codes with untapped business potential.
+    Use this when the user asks about:
+    - Where to open a new location
+    - Finding areas with low competition
+    - Identifying underserved markets
+    - Discovering high-growth opportunities
+    - Spotting gaps in market coverage
+    
+    Args:
+        product_category: Product category (e.g., 'pet_supplies', 'consumer_electronics', 'coffee_products')
+        market: Geographic market name (e.g., 'Phoenix', 'Chicago', 'Northeast')
+                Note: Use city/metro/region names; "suburbs" keyword will be auto-handled
+        gap_type: Type of opportunity to find:
+            - 'low_competition': Areas with demand but low major brand presence
+            - 'high_growth': Fast-growing markets (>20% YoY growth)
+            - 'underserved': High demand areas with few suppliers
+            - 'emerging': Growing markets with strong momentum (>15% growth)
+        min_demand_threshold: Minimum monthly shipments required (default: 50)
+                              Lower this (e.g., 10-20) for niche categories or smaller markets
+        top_n: Number of top opportunities to return (default: 10)
+    
+    Returns:
+        JSON string with detailed market opportunity analysis including:
+        - ZIP codes with opportunity scores
+        - Demand metrics and growth rates
+        - Competition levels
+        - Actionable insights
+        - A 'result_handle' that generate_map_visualization, get_demographics and
+          forecast_demand accept instead of copied rows
+    
+    Example:
+        find_market_opportunities('pet_supplies', 'Phoenix', 'low_competition')
+        Returns ZIP codes in Phoenix with high pet supply demand but low competition
+    """
+    
+    product_category, error = resolve_category(product_category)
+    if error:
+        return error
+    
+    client = get_bigquery_client()
+    query = build_opportunities_query(product_category, market, gap_type, min_demand_threshold, top_n)
+    
     try:
         query_job = client.query(query)
         results = query_job.result()
         
-        # Convert to list of dicts
-        opportunities = []
-        row_count = 0
-        for row in results:
-            row_count += 1
-            row_dict = dict(row)
-            
-            # Round numeric values
-            for key in ['avg_monthly_value', 'avg_growth_rate', 'market_concentration', 
-                       'avg_major_brand_volume', 'avg_small_business_volume', 'avg_unique_shippers']:
-                if key in row_dict and row_dict[key] is not None:
-                    row_dict[key] = round(row_dict[key], 2)
-            
-            # Add opportunity score (simple weighted calculation)
-            score = 0
-            if gap_type == "low_competition":
-                score = (100 - row_dict.get('market_concentration', 50)) + (row_dict.get('total_shipments', 0) / 10)
-            elif gap_type == "high_growth":
-                score = row_dict.get('avg_growth_rate', 0)
-            elif gap_type == "underserved":
-                score = row_dict.get('total_shipments', 0) / (row_dict.get('avg_unique_shippers', 1) or 1)
-            else:  # emerging
-                score = row_dict.get('avg_growth_rate', 0) * 1.5
-            
-            row_dict['opportunity_score'] = round(score, 2)
-            opportunities.append(row_dict)
-        
-        # Generate insights
-        insights = []
-        if opportunities:
-            top = opportunities[0]
-            if gap_type == "low_competition":
-                insights.append(f"Top opportunity in {top.get('city', 'unknown')}: {top.get('total_shipments', 0)} monthly shipments with only {top.get('market_concentration', 0):.0f}% major brand dominance")
-            elif gap_type == "high_growth":
-                insights.append(f"Fastest growth in {top.get('city', 'unknown')}: {top.get('avg_growth_rate', 0):.1f}% YoY growth")
-            elif gap_type == "underserved":
-                insights.append(f"Most underserved: {top.get('city', 'unknown')} with {top.get('total_shipments', 0)} monthly shipments but only {top.get('avg_unique_shippers', 0):.0f} suppliers")
-        elif row_count == 0 and min_demand_threshold > 20:
-            # Suggest trying with lower threshold
-            insights.append(f"No opportunities found with current threshold ({min_demand_threshold} shipments/month). Try lowering the min_demand_threshold parameter.")
-        
-        response = {
-            "query_parameters": {
-                "product_category": product_category,
-                "market": market,
-                "gap_type": gap_type,
-                "description": description,
-                "min_demand_threshold": min_demand_threshold
-            },
-            "summary": {
-                "opportunities_found": len(opportunities),
-                "analysis_type": description
-            },
-            "insights": insights,
-            "opportunities": opportunities
-        }
-        
+        response = build_opportunities_response(
+            results, product_category, market, gap_type, min_demand_threshold, tool_context
+        )
         return json.dumps(response, indent=2, default=str)
         
     except Exception as e:
@@ -0,0 +1,77 @@
+"""Pagination tool - fetch further pages of a previous query result."""
+
+from google.adk.tools import ToolContext
+from typing import Optional
+import json
+
+from fedex_market_intelligence.shared_libraries.clients import get_bigquery_client
+from fedex_market_intelligence.shared_libraries.pagination import get_cursor, read_page
+from fedex_market_intelligence.shared_libraries.result_store import put_result
+
+
+def fetch_result_page(
+    cursor_id: str,
+    page_number: int = 2,
+    tool_context: Optional[ToolContext] = None
+) -> str:
+    """
+    Fetch another page of a paginated query result without re-running the query.
+
+    Use this when the user asks for "the next 100", "more results" or a specific page
+    after query_shipment_trends or analyze_geographic_demand returned a 'pagination'
+    block with has_more = true.
+
+    Args:
+        cursor_id: The 'cursor_id' from the previous result's pagination block (e.g. 'cur_1a2b3c4d')
+        page_number: Page to fetch, 1-based (default: 2, the page after the first)
+
+    Returns:
+        JSON string with the rows of the requested page, its pagination block and a
+        'result_handle' for the page rows
+    """
+
+    cursor = get_cursor(tool_context, cursor_id)
+    if cursor is None:
+        return json.dumps({
+            "error": f"Cursor '{cursor_id}' not found in this session",
+            "suggestion": "Re-run the original query tool to get a new cursor_id"
+        }, indent=2)
+
+    total_pages = cursor["total_pages"]
+    if page_number < 1 or page_number > total_pages:
+        return json.dumps({
+            "error": f"Page {page_number} is out of range - this result has {total_pages} pages",
+            "cursor_id": cursor_id
+        }, indent=2)
+
+    try:
+        client = get_bigquery_client()
+        data = read_page(client, cursor, page_number)
+
+        response = {
+            "query_parameters": cursor["query_parameters"],
+            "source_tool": cursor["tool"],
+            "pagination": {
+                "cursor_id": cursor_id,
+                "page": page_number,
+                "page_size": cursor["page_size"],
+                "total_rows": cursor["total_rows"],
+                "total_pages": total_pages,
+                "has_more": page_number < total_pages
+            },
+            "data": data
+        }
+
+        result_handle = put_result(tool_context, cursor["tool"], data)
+        if result_handle:
+            response["result_handle"] = result_handle
+
+        return json.dumps(response, indent=2, default=str)
+
+    except Exception as e:
+        # The anonymous destination table expires about 24 hours after the query
+        return json.dumps({
+            "error": str(e),
+            "cursor_id": cursor_id,
+            "suggestion": "The cached result may have expired - re-run the original query tool"
+        }, indent=2)
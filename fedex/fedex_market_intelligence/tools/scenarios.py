@@ -0,0 +1,285 @@
+"""Demand scenario tool - Monte Carlo what-if paths around the demand forecast."""
+
+from __future__ import annotations
+
+from google.adk.tools import ToolContext
+from typing import List, Optional, Tuple
+import json
+import time
+
+from fedex_market_intelligence.shared_libraries.bigquery_results import read_frame
+from fedex_market_intelligence.shared_libraries.category_index import resolve_category
+from fedex_market_intelligence.shared_libraries.clients import get_bigquery_client
+from fedex_market_intelligence.shared_libraries.demand_tensor import (
+    REFERENCE_YEAR_MONTH,
+    load_demand_tensor,
+    month_serial,
+)
+from fedex_market_intelligence.shared_libraries.lazy import lazy_import
+from fedex_market_intelligence.shared_libraries.result_store import put_result
+from fedex_market_intelligence.shared_libraries.scenarios import (
+    DEFAULT_PATHS,
+    MAX_PATHS,
+    fitted_residuals,
+    percentile_bands,
+    simulate_paths,
+)
+from fedex_market_intelligence.tools.forecasting import (
+    BASELINE_WINDOW_MONTHS,
+    build_history_query,
+    check_forecast_request,
+    forecast_rows_from_history,
+    history_from_tensor,
+    project_shipments,
+)
+
+np = lazy_import("numpy")
+
+MIN_PATHS = 100
+
+
+def finite_or(value, default: float) -> float:
+    """value as a float, or default when it is missing or NaN."""
+    return float(value) if value is not None and np.isfinite(value) else default
+
+
+def check_scenario_request(
+    forecast_months: int,
+    seasonality_change_pct: float,
+    num_paths: int,
+    result_handle: Optional[str],
+    tool_context: Optional[ToolContext]
+) -> Tuple[Optional[List[str]], Optional[str]]:
+    """
+    Validate a scenario request (shared by the sync and async tool).
+
+    Returns:
+        (the result handle's ZIP codes or None, JSON error string or None)
+    """
+
+    if not MIN_PATHS <= num_paths <= MAX_PATHS:
+        return None, json.dumps({
+            "error": f"num_paths must be between {MIN_PATHS} and {MAX_PATHS}",
+            "num_paths": num_paths
+        }, indent=2)
+    if seasonality_change_pct < -100:
+        return None, json.dumps({
+            "error": "seasonality_change_pct cannot be below -100 (-100 removes seasonality entirely)",
+            "seasonality_change_pct": seasonality_change_pct
+        }, indent=2)
+
+    return check_forecast_request(forecast_months, result_handle, tool_context)
+
+
+def future_months(forecast_months: int) -> List[Tuple[int, int]]:
+    """(year, month) of each forecast month, starting Jan 2026 like forecast_demand."""
+    return [(2026 + (i - 1) // 12, (i - 1) % 12 + 1) for i in range(1, forecast_months + 1)]
+
+
+def build_scenario_response(
+    history,
+    product_category: str,
+    market: str,
+    forecast_months: int,
+    growth_change_pct: float,
+    seasonality_change_pct: float,
+    num_paths: int,
+    result_handle: Optional[str],
+    tool_context: Optional[ToolContext]
+) -> dict:
+    """Simulate baseline and scenario paths from the monthly history rows and summarize them."""
+
+    history = read_frame(history)
+    forecast_rows = forecast_rows_from_history(history).frame
+    baseline = finite_or(forecast_rows['baseline_shipments'].iloc[0], 0.0) if len(forecast_rows) else 0.0
+
+    if baseline <= 0:
+        return {
+            "error": f"No historical data found for '{product_category}' in {market}",
+            "suggestion": "Try a different market or product category (use the category_id format with underscores)"
+        }
+
+    avg_growth_rate = finite_or(forecast_rows['avg_growth_rate'].iloc[0], 0.0)
+    seasonality_by_month = {
+        int(row.month_num): finite_or(row.seasonality_factor, 1.0) for row in forecast_rows.itertuples()
+    }
+
+    # The baseline window: its growth rates are bootstrapped, and its months' distance
+    # from the fitted model (centered on the window, with the month's seasonality)
+    # are the residuals
+    totals = history['total_shipments'].astype("float64").to_numpy()
+    growth = history['avg_growth_rate'].astype("float64").to_numpy()
+    serials = np.array([month_serial(m) for m in history['year_month']])
+    window = serials >= month_serial(REFERENCE_YEAR_MONTH) - BASELINE_WINDOW_MONTHS
+    window_seasonality = np.array([seasonality_by_month.get(int(m), 1.0) for m in history['month_num'][window]])
+    expected, _ = project_shipments(
+        baseline, avg_growth_rate, window_seasonality, serials[window] - serials[window].mean()
+    )
+    residuals = fitted_residuals(totals[window], expected)
+    growth_rates = growth[window & np.isfinite(growth)]
+
+    months = future_months(forecast_months)
+    seasonality = np.array([seasonality_by_month.get(month, 1.0) for _, month in months])
+
+    started = time.perf_counter()
+    paths = simulate_paths(
+        project_shipments, baseline, growth_rates, residuals, seasonality, num_paths,
+        growth_change_pct, seasonality_change_pct
+    )
+    scenario_bands = percentile_bands(paths["scenario"])
+    baseline_median = np.median(paths["baseline"], axis=0)
+    scenario_totals = paths["scenario"].sum(axis=1)
+    baseline_totals = paths["baseline"].sum(axis=1)
+    total_bands = percentile_bands(scenario_totals)
+    baseline_total_median = float(np.median(baseline_totals))
+    probability_below = float((scenario_totals < baseline_total_median).mean())
+    simulation_seconds = time.perf_counter() - started
+
+    forecast, _ = project_shipments(baseline, avg_growth_rate, seasonality, np.arange(1, forecast_months + 1))
+
+    monthly = []
+    for i, (year, month) in enumerate(months):
+        record = {"month": f"{year}-{month:02d}"}
+        record.update({name: int(round(band[i])) for name, band in scenario_bands.items()})
+        record["baseline_p50"] = int(round(baseline_median[i]))
+        record["forecast_demand_shipments"] = int(round(forecast[i]))
+        monthly.append(record)
+
+    median_change_pct = (
+        (float(total_bands["p50"]) / baseline_total_median - 1) * 100 if baseline_total_median else 0.0
+    )
+    summary = {
+        "horizon_total": {name: int(round(value)) for name, value in total_bands.items()},
+        "baseline_horizon_total_p50": int(round(baseline_total_median)),
+        "median_change_pct": round(median_change_pct, 2),
+        "probability_below_baseline_median": round(probability_below, 3),
+        "baseline_growth_rate_yoy": round(avg_growth_rate, 2),
+        "scenario_growth_rate_yoy": round(avg_growth_rate * (1 + growth_change_pct / 100), 2),
+        "residual_months": int(len(residuals)),
+        "num_paths": num_paths,
+        "simulation_seconds": round(simulation_seconds, 4)
+    }
+
+    # Generate insights
+    insights = []
+    shocked = growth_change_pct or seasonality_change_pct
+    if shocked:
+        direction = "below" if median_change_pct < 0 else "above"
+        insights.append(
+            f"Median {forecast_months}-month demand is {abs(median_change_pct):.1f}% {direction} the baseline "
+            f"({summary['horizon_total']['p50']:,} vs {summary['baseline_horizon_total_p50']:,} shipments)"
+        )
+        insights.append(f"{probability_below:.0%} of scenario paths finish below the baseline median")
+    insights.append(
+        f"90% of paths fall between {summary['horizon_total']['p5']:,} and "
+        f"{summary['horizon_total']['p95']:,} shipments over {forecast_months} months"
+    )
+    if len(residuals) < 6:
+        insights.append(f"Only {len(residuals)} months of history in the baseline window - the bands are indicative")
+
+    response = {
+        "query_parameters": {
+            "product_category": product_category,
+            "market": market,
+            "forecast_months": forecast_months,
+            "growth_change_pct": growth_change_pct,
+            "seasonality_change_pct": seasonality_change_pct,
+            "num_paths": num_paths,
+            "result_handle": result_handle
+        },
+        "summary": summary,
+        "insights": insights,
+        "monthly_bands": monthly,
+        "methodology": (
+            "Monte Carlo paths of the forecast_demand model (12-month baseline x YoY growth x seasonality). "
+            "Each path draws its growth rate as the mean of a bootstrap resample of the baseline window's "
+            "monthly growth rates and its monthly noise from the window's residuals around the model. The "
+            "scenario scales the growth rate and seasonal swing; baseline and scenario share the same draws."
+        )
+    }
+
+    handle = put_result(tool_context, "simulate_demand_scenario", monthly, summary)
+    if handle:
+        response["result_handle"] = handle
+
+    return response
+
+
+def simulate_demand_scenario(
+    product_category: str,
+    market: str,
+    forecast_months: int = 6,
+    growth_change_pct: float = 0.0,
+    seasonality_change_pct: float = 0.0,
+    num_paths: int = DEFAULT_PATHS,
+    result_handle: Optional[str] = None,
+    tool_context: Optional[ToolContext] = None
+) -> str:
+    """
+    Simulate what-if demand scenarios with Monte Carlo percentile bands.
+
+    Runs thousands of simulated demand paths around the forecast_demand model,
+    with and without a shock to growth or seasonality. Use this when the user asks:
+    - What if growth changes (e.g., "what if pet supplies growth halves in the Southwest?")
+    - What if the seasonal peak is weaker or stronger
+    - How uncertain a forecast is (range of outcomes, downside risk)
+
+    Args:
+        product_category: Product category ID (e.g., 'pet_supplies', 'home_fitness')
+        market: Geographic market (e.g., 'Southwest', 'Phoenix Metro', 'California')
+        forecast_months: Number of months to simulate, between 3 and 12 (default: 6)
+        growth_change_pct: Relative change to the YoY growth rate in percent
+                           (e.g., -50 halves growth, 100 doubles it; default: 0)
+        seasonality_change_pct: Relative change to the seasonal swing in percent
+                                (e.g., -50 halves peaks and troughs, -100 removes them; default: 0)
+        num_paths: Number of simulated paths, between 100 and 20000 (default: 5000)
+        result_handle: Optional handle returned by a query tool; the scenario then covers
+                       exactly the ZIP codes in that result (market is used as its label)
+
+    Returns:
+        JSON string with monthly percentile bands (p5-p95) of the scenario next to the
+        baseline median, horizon totals, the median change and the probability of
+        finishing below the baseline median
+
+    Example:
+        simulate_demand_scenario('pet_supplies', 'Southwest', 6, growth_change_pct=-50)
+        Returns the demand range if pet supplies growth halves in the Southwest
+    """
+
+    product_category, error = resolve_category(product_category)
+    if error:
+        return error
+
+    zip_codes, error = check_scenario_request(
+        forecast_months, seasonality_change_pct, num_paths, result_handle, tool_context
+    )
+    if error:
+        return error
+
+    # The same monthly history forecast_demand builds on: tensor slices, else one query
+    tensor = load_demand_tensor()
+    if tensor is not None:
+        history = history_from_tensor(tensor, product_category, market, zip_codes)
+        response = build_scenario_response(
+            history, product_category, market, forecast_months, growth_change_pct,
+            seasonality_change_pct, num_paths, result_handle, tool_context
+        )
+        return json.dumps(response, indent=2, default=str)
+
+    client = get_bigquery_client()
+    query = build_history_query(product_category, market, zip_codes)
+
+    try:
+        history = client.query(query).result()
+
+        response = build_scenario_response(
+            history, product_category, market, forecast_months, growth_change_pct,
+            seasonality_change_pct, num_paths, result_handle, tool_context
+        )
+        return json.dumps(response, indent=2, default=str)
+
+    except Exception as e:
+        return json.dumps({
+            "error": str(e),
+            "query": query
+        }, indent=2)
@@ -0,0 +1,340 @@
+"""Site selection tool - where to put N locations to best serve a market's demand."""
+
+from google.adk.tools import ToolContext
+from typing import Optional
+import json
+import time
+
+from fedex_market_intelligence.config import config
+from fedex_market_intelligence.shared_libraries.bigquery_results import FrameResult, read_frame
+from fedex_market_intelligence.shared_libraries.category_index import resolve_category
+from fedex_market_intelligence.shared_libraries.clients import get_bigquery_client
+from fedex_market_intelligence.shared_libraries.demand_tensor import DemandTensor, load_demand_tensor
+from fedex_market_intelligence.shared_libraries.lazy import lazy_import
+from fedex_market_intelligence.shared_libraries.result_store import put_result
+from fedex_market_intelligence.shared_libraries.site_selection import (
+    OBJECTIVES,
+    haversine_miles,
+    solve_site_selection,
+    top_candidates,
+)
+from fedex_market_intelligence.tools.forecasting import STATE_ABBREVIATIONS, market_zip_mask
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+PROJECT_ID = config.project_id
+DATASET_ID = config.dataset_id
+
+SITE_DEMAND_COLUMNS = ['zip_code', 'city', 'state', 'metro_area', 'lat', 'lng', 'total_shipments']
+
+# Most sites a single call may open
+MAX_SITES = 20
+
+
+def build_site_demand_query(product_category: str, market: str, time_period: str) -> str:
+    """Build the SQL for select_sites' demand points (shared by the sync and async tool)."""
+
+    market_lower = market.lower()
+    state_abbr = STATE_ABBREVIATIONS.get(market_lower, market_lower.upper()[:2])
+
+    location_filter = f"""(
+        LOWER(gm.city) LIKE '%{market_lower}%' OR
+        LOWER(gm.metro_area) LIKE '%{market_lower}%' OR
+        LOWER(gm.region) LIKE '%{market_lower}%' OR
+        LOWER(gm.state) LIKE '%{market_lower}%' OR
+        UPPER(gm.state) = '{state_abbr}'
+    )"""
+
+    time_filter = ""
+    if time_period == "last_6_months":
+        time_filter = "AND DATE_DIFF(DATE('2025-12-31'), PARSE_DATE('%Y-%m', ad.year_month), MONTH) <= 6"
+    elif time_period == "last_12_months":
+        time_filter = "AND DATE_DIFF(DATE('2025-12-31'), PARSE_DATE('%Y-%m', ad.year_month), MONTH) <= 12"
+    elif time_period == "last_24_months":
+        time_filter = "AND DATE_DIFF(DATE('2025-12-31'), PARSE_DATE('%Y-%m', ad.year_month), MONTH) <= 24"
+    elif time_period.startswith("q") and "2025" in time_period:
+        quarter = time_period[1]
+        time_filter = f"AND EXTRACT(YEAR FROM PARSE_DATE('%Y-%m', ad.year_month)) = 2025 AND EXTRACT(QUARTER FROM PARSE_DATE('%Y-%m', ad.year_month)) = {quarter}"
+
+    query = f"""
+        SELECT
+            ad.zip_code,
+            gm.city,
+            gm.state,
+            gm.metro_area,
+            gm.lat,
+            gm.lng,
+            SUM(ad.total_shipments) as total_shipments
+        FROM `{PROJECT_ID}.{DATASET_ID}.aggregated_demand` ad
+        JOIN `{PROJECT_ID}.{DATASET_ID}.geographic_metadata` gm
+            ON ad.zip_code = gm.zip_code
+        WHERE ad.product_category = '{product_category}'
+        AND {location_filter}
+        AND gm.lat IS NOT NULL AND gm.lng IS NOT NULL
+        {time_filter}
+        GROUP BY ad.zip_code, gm.city, gm.state, gm.metro_area, gm.lat, gm.lng
+    """
+
+    return query
+
+
+def site_demand_from_tensor(
+    tensor: DemandTensor,
+    product_category: str,
+    market: str,
+    time_period: str
+) -> FrameResult:
+    """Compute the demand query's rows (shipments per ZIP of the market) from the demand tensor."""
+
+    if not tensor.has_category(product_category):
+        return FrameResult(pd.DataFrame(columns=SITE_DEMAND_COLUMNS), 0)
+
+    months = tensor.month_mask(time_period)
+    zips = market_zip_mask(tensor, market)
+    coords = np.asarray(tensor.zip_coords)
+    # Only ZIPs with demand rows in the period and known coordinates, like the SQL join
+    has_rows = tensor.slice(product_category, "demand_rows")[months].sum(axis=0) > 0
+    zips &= has_rows & np.isfinite(coords).all(axis=1)
+
+    positions = np.flatnonzero(zips)
+    shipments = tensor.slice(product_category, "total_shipments")[months][:, positions].sum(axis=0, dtype=np.float64)
+    frame = pd.DataFrame({
+        'zip_code': np.asarray(tensor.zip_codes)[positions],
+        'city': tensor.zip_labels["city"][positions],
+        'state': tensor.zip_labels["state"][positions],
+        'metro_area': tensor.zip_labels["metro"][positions],
+        'lat': coords[positions, 0],
+        'lng': coords[positions, 1],
+        'total_shipments': shipments.round().astype(np.int64),
+    }, columns=SITE_DEMAND_COLUMNS)
+    return FrameResult(frame, len(frame))
+
+
+def build_site_selection_response(
+    results,
+    product_category: str,
+    market: str,
+    num_sites: int,
+    objective: str,
+    coverage_radius_miles: float,
+    site_capacity: Optional[int],
+    time_period: str,
+    tool_context: Optional[ToolContext]
+) -> dict:
+    """Solve the site selection over the demand rows and build the select_sites response."""
+
+    df = read_frame(results)
+    df = df[df['total_shipments'].fillna(0) > 0].reset_index(drop=True)
+
+    query_parameters = {
+        "product_category": product_category,
+        "market": market,
+        "num_sites": num_sites,
+        "objective": objective,
+        "coverage_radius_miles": coverage_radius_miles,
+        "site_capacity": site_capacity,
+        "time_period": time_period
+    }
+
+    if len(df) < num_sites:
+        return {
+            "error": f"Only {len(df)} ZIP codes with {product_category} demand in '{market}' - fewer than {num_sites} sites",
+            "query_parameters": query_parameters
+        }
+
+    # Every ZIP with demand is a demand point; the heaviest ones (all in most markets) are candidates
+    lat = df['lat'].to_numpy(dtype=np.float64)
+    lng = df['lng'].to_numpy(dtype=np.float64)
+    weights = df['total_shipments'].to_numpy(dtype=np.float64)
+    candidates = top_candidates(weights, max(config.max_site_candidates, num_sites))
+
+    start = time.perf_counter()
+    distance = haversine_miles(lat, lng, lat[candidates], lng[candidates])
+    solution = solve_site_selection(
+        distance, weights, num_sites, objective, coverage_radius_miles, site_capacity
+    )
+    solve_seconds = time.perf_counter() - start
+
+    # Solver sites are candidate columns; map them back to rows of df
+    columns = solution["sites"]
+    sites = [int(candidates[column]) for column in columns]
+    assignment = solution["assignment"]
+    served = assignment >= 0
+    point_distance = np.full(len(df), np.nan)
+    point_distance[served] = distance[np.flatnonzero(served), np.asarray(columns)[assignment[served]]]
+    total_demand = weights.sum()
+
+    locations = []
+    for position, site in enumerate(sites):
+        members = assignment == position
+        demand = weights[members].sum()
+        record = {
+            "zip_code": df.at[site, 'zip_code'],
+            "city": df.at[site, 'city'],
+            "state": df.at[site, 'state'],
+            "metro_area": df.at[site, 'metro_area'],
+            "lat": float(lat[site]),
+            "lng": float(lng[site]),
+            "assigned_shipments": int(round(demand)),
+            "demand_share_pct": round(demand / total_demand * 100, 1),
+            "zip_codes_served": int(members.sum()),
+            "avg_distance_miles": round(float(weights[members] @ point_distance[members] / demand), 1) if demand else None,
+            "max_distance_miles": round(float(point_distance[members].max()), 1) if members.any() else None,
+        }
+        if site_capacity:
+            record["utilization_pct"] = round(demand / site_capacity * 100, 1)
+        locations.append(record)
+
+    # Largest catchment first
+    locations.sort(key=lambda record: record["assigned_shipments"], reverse=True)
+    locations = [{"rank": rank, **record} for rank, record in enumerate(locations, 1)]
+
+    served_demand = weights[served].sum()
+    within_radius = weights[served & (point_distance <= coverage_radius_miles)].sum()
+    summary = {
+        "sites_selected": len(locations),
+        "demand_zip_codes": len(df),
+        "candidate_sites": len(candidates),
+        "total_shipments": int(round(total_demand)),
+        "weighted_avg_distance_miles": round(float(weights[served] @ point_distance[served] / served_demand), 1) if served_demand else None,
+        "demand_within_radius_pct": round(within_radius / total_demand * 100, 1),
+        "unserved_shipments": int(round(total_demand - served_demand)),
+        "solve_seconds": round(solve_seconds, 3)
+    }
+    if not site_capacity and solution["greedy_cost"] > 0:
+        summary["improvement_over_greedy_pct"] = round(
+            (solution["greedy_cost"] - solution["cost"]) / solution["greedy_cost"] * 100, 2
+        )
+
+    # Generate insights
+    insights = [
+        f"{len(locations)} sites put {summary['demand_within_radius_pct']}% of {market} {product_category} demand "
+        f"within {coverage_radius_miles:g} miles (average {summary['weighted_avg_distance_miles']} miles)"
+    ]
+    top = locations[0]
+    insights.append(
+        f"Largest catchment: {top['zip_code']} ({top['city']}) serving {top['assigned_shipments']:,} shipments "
+        f"from {top['zip_codes_served']} ZIP codes"
+    )
+    if summary["unserved_shipments"]:
+        insights.append(
+            f"{summary['unserved_shipments']:,} shipments exceed the combined capacity - add sites or raise site_capacity"
+        )
+
+    candidate_note = (
+        f"the {len(candidates)} with the most demand" if len(candidates) < len(df) else "the same ZIP codes"
+    )
+    response = {
+        "query_parameters": query_parameters,
+        "summary": summary,
+        "insights": insights,
+        "sites": locations,
+        "methodology": (
+            f"Demand points are the market's ZIP codes, weighted by shipments; candidate sites are {candidate_note}. "
+            "Sites are chosen greedily and improved with swap passes over a haversine distance matrix."
+        )
+    }
+
+    # Keep the sites server-side so the map tool can plot them by handle
+    result_handle = put_result(tool_context, "select_sites", locations, summary)
+    if result_handle:
+        response["result_handle"] = result_handle
+
+    return response
+
+
+def check_site_request(num_sites: int, objective: str, coverage_radius_miles: float) -> Optional[str]:
+    """Validate select_sites arguments; returns an error JSON string or None."""
+    if objective not in OBJECTIVES:
+        return json.dumps({
+            "error": f"Unknown objective '{objective}'",
+            "valid_objectives": OBJECTIVES
+        }, indent=2)
+    if not 1 <= num_sites <= MAX_SITES:
+        return json.dumps({
+            "error": f"num_sites must be between 1 and {MAX_SITES}"
+        }, indent=2)
+    if coverage_radius_miles <= 0:
+        return json.dumps({
+            "error": "coverage_radius_miles must be positive"
+        }, indent=2)
+    return None
+
+
+def select_sites(
+    product_category: str,
+    market: str,
+    num_sites: int = 3,
+    objective: str = "p_median",
+    coverage_radius_miles: float = 10.0,
+    site_capacity: Optional[int] = None,
+    time_period: str = "last_12_months",
+    tool_context: Optional[ToolContext] = None
+) -> str:
+    """
+    Choose the best ZIP codes for N new locations to serve a market's demand.
+
+    Solves a facility location problem over the market's ZIP codes, weighted by
+    shipment demand. Use this when the user asks:
+    - "Where should we put 3 new stores to cover Phoenix?"
+    - Where to place warehouses / pickup points to minimize delivery distance
+    - How many locations are needed to cover a market within N miles
+
+    Args:
+        product_category: Product category (e.g., 'pet_supplies', 'consumer_electronics')
+        market: Market to cover - city, metro, state or region name (e.g., 'Phoenix', 'Texas')
+        num_sites: Number of locations to place (default: 3, max: 20)
+        objective: What to optimize:
+            - 'p_median': Minimize the average distance from demand to its nearest site
+            - 'max_coverage': Maximize demand within coverage_radius_miles of a site
+        coverage_radius_miles: Service radius in miles (default: 10)
+        site_capacity: Optional shipments each site can serve over time_period (same units
+                       as the demand totals); demand beyond it is reported as unserved
+        time_period: Demand period: 'last_6_months', 'last_12_months', 'last_24_months', 'q1_2025', etc.
+
+    Returns:
+        JSON string with the chosen sites (ZIP code, coordinates, demand served, ZIP
+        codes served, average distance, utilization), coverage summary and a
+        'result_handle' that generate_map_visualization accepts
+
+    Example:
+        select_sites('pet_supplies', 'Phoenix', num_sites=3)
+        Returns the 3 Phoenix ZIP codes that minimize average distance to pet supply demand
+    """
+
+    product_category, error = resolve_category(product_category)
+    if error:
+        return error
+
+    error = check_site_request(num_sites, objective, coverage_radius_miles)
+    if error:
+        return error
+
+    tensor = load_demand_tensor()
+    if tensor is not None:
+        results = site_demand_from_tensor(tensor, product_category, market, time_period)
+        response = build_site_selection_response(
+            results, product_category, market, num_sites, objective, coverage_radius_miles,
+            site_capacity, time_period, tool_context
+        )
+        return json.dumps(response, indent=2, default=str)
+
+    client = get_bigquery_client()
+    query = build_site_demand_query(product_category, market, time_period)
+
+    try:
+        query_job = client.query(query)
+        results = query_job.result()
+
+        response = build_site_selection_response(
+            results, product_category, market, num_sites, objective, coverage_radius_miles,
+            site_capacity, time_period, tool_context
+        )
+        return json.dumps(response, indent=2, default=str)
+
+    except Exception as e:
+        return json.dumps({
+            "error": str(e),
+            "query": query
+        }, indent=2)
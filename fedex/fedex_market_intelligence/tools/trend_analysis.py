@@ -1,37 +1,63 @@
 """Time series analysis tool for shipment trends."""
 
-from google.cloud import bigquery
-from typing import Optional
+from google.adk.tools import ToolContext
+from typing import TYPE_CHECKING, Optional
 import json
 
 from fedex_market_intelligence.config import config
+from fedex_market_intelligence.shared_libraries.bigquery_results import (
+    column_mean,
+    column_sum,
+    frame_to_records,
+    read_frame,
+)
+from fedex_market_intelligence.shared_libraries.category_index import resolve_category
+from fedex_market_intelligence.shared_libraries.clients import get_bigquery_client
+from fedex_market_intelligence.shared_libraries.feature_store import SEASONAL_COLUMNS, load_feature_store
+from fedex_market_intelligence.shared_libraries.pagination import save_cursor
+from fedex_market_intelligence.shared_libraries.result_store import put_result
+
+if TYPE_CHECKING:
+    from google.cloud import bigquery
 
 PROJECT_ID = config.project_id
 DATASET_ID = config.dataset_id
 
+# Feature store columns returned as trend_features
+TREND_FEATURE_FIELDS = [
+    'as_of', 'trend_direction', 'trend_slope', 'trend_slope_pct', 'momentum_3m_pct',
+    'volatility', 'peak_month', 'baseline_shipments', 'avg_growth_rate'
+]
 
-def query_shipment_trends(
+
+def lookup_trend_features(product_category: str, location: Optional[str]) -> Optional[dict]:
+    """Precomputed trend features for the location (a ZIP code, metro, state or None for national)."""
+    store = load_feature_store()
+    if store is None:
+        return None
+    features = store.resolve(location, product_category)
+    if features is None:
+        return None
+    
+    trend = {'level': features['level'], 'key': features['key']}
+    for field in TREND_FEATURE_FIELDS:
+        value = features[field]
+        trend[field] = round(value, 2) if isinstance(value, float) else value
+    trend['seasonal_indices'] = {
+        month_num: round(features[column], 2)
+        for month_num, column in enumerate(SEASONAL_COLUMNS, start=1)
+        if features[column] is not None
+    }
+    return trend
+
+
+def build_trends_query(
     product_category: str,
-    location: Optional[str] = None,
-    time_period: str = "last_12_months",
-    metric: str = "volume",
-    limit: int = 100
+    location: Optional[str],
+    time_period: str,
+    metric: str
 ) -> str:
-    """
-    Analyze shipment trends over time for specific products and locations.
-    
-    Args:
-        product_category: Product category to analyze (e.g., 'pet_supplies', 'consumer_electronics')
-        location: Geographic filter - can be zip code, city, state, metro area, or region
-        time_period: Time range - 'last_6_months', 'last_12_months', 'last_24_months', 'last_36_months', 'ytd', 'q3_2025'
-        metric: What to measure - 'volume', 'growth_rate', 'value', 'market_share'
-        limit: Maximum number of results to return
-    
-    Returns:
-        JSON string with trend analysis results
-    """
-    
-    client = bigquery.Client(project=PROJECT_ID)
+    """Build the SQL for query_shipment_trends (shared by the sync and async tool)."""
     
     # Parse time period
     where_clauses = [f"ad.product_category = '{product_category}'"]
@@ -127,54 +153,118 @@ def query_shipment_trends(
             ON ad.product_category = ch.category_id
         WHERE {' AND '.join(where_clauses)}
         ORDER BY {order_by}
-        LIMIT {limit}
     """
     
+    return query
+
+
+def build_trends_response(
+    query_job: "bigquery.QueryJob",
+    results,
+    query_parameters: dict,
+    limit: int,
+    tool_context: Optional[ToolContext],
+    trend_features: Optional[dict] = None
+) -> dict:
+    """Read the first result page and build the query_shipment_trends response."""
+    
+    # Read columnar and compute summary statistics vectorized
+    df = read_frame(results, max_rows=limit)
+    data = frame_to_records(df)
+    
+    # Keep the full result server-side so other tools can reuse it by handle
+    result_handle = put_result(tool_context, "query_shipment_trends", data)
+    
+    # Calculate summary statistics
+    if data:
+        total_shipments = column_sum(df, 'total_shipments')
+        avg_growth = column_mean(df, 'growth_rate_yoy')
+    
+        summary = {
+            "query_parameters": query_parameters,
+            "summary_statistics": {
+                "total_records": len(data),
+                "total_shipments": int(total_shipments),
+                "average_growth_rate_yoy": round(avg_growth, 2)
+            },
+            "data": data[:limit]
+        }
+    else:
+        summary = {
+            "query_parameters": query_parameters,
+            "summary_statistics": {
+                "total_records": 0,
+                "message": "No data found for the specified criteria"
+            },
+            "data": []
+        }
+    
+    if trend_features:
+        summary["trend_features"] = trend_features
+    
+    if result_handle:
+        summary["result_handle"] = result_handle
+    
+    summary["pagination"] = save_cursor(
+        tool_context, "query_shipment_trends", query_job, results.total_rows or 0, limit, query_parameters
+    )
+    
+    return summary
+
+
+def query_shipment_trends(
+    product_category: str,
+    location: Optional[str] = None,
+    time_period: str = "last_12_months",
+    metric: str = "volume",
+    limit: int = 100,
+    tool_context: Optional[ToolContext] = None
+) -> str:
+    """
+    Analyze shipment trends over time for specific products and locations.
+    
+    Args:
+        product_category: Product category to analyze (e.g., 'pet_supplies', 'consumer_electronics')
+        location: Geographic filter - can be zip code, city, state, metro area, or region
+        time_period: Time range - 'last_6_months', 'last_12_months', 'last_24_months', 'last_36_months', 'ytd', 'q3_2025'
+        metric: What to measure - 'volume', 'growth_rate', 'value', 'market_share'
+        limit: Maximum number of results to return per page; use fetch_result_page with the
+               returned cursor_id to get the next page
+    
+    Returns:
+        JSON string with trend analysis results. When 'trend_features' is present it gives the
+        precomputed trend direction, slope, momentum, volatility and peak month for the
+        location - use it instead of inferring the trend from the rows. Includes a
+        'result_handle' that can be passed to generate_map_visualization, get_demographics
+        or forecast_demand instead of copying rows.
+    """
+    
+    product_category, error = resolve_category(product_category)
+    if error:
+        return error
+    
+    client = get_bigquery_client()
+    query = build_trends_query(product_category, location, time_period, metric)
+    
+    query_parameters = {
+        "product_category": product_category,
+        "location": location or "All locations",
+        "time_period": time_period,
+        "metric": metric
+    }
+    
     try:
+        # No LIMIT in SQL: the full ordered result stays in the job's destination
+        # table and only the first page is read here
         query_job = client.query(query)
-        results = query_job.result()
-        
-        # Convert to list of dicts
-        data = []
-        for row in results:
-            data.append(dict(row))
-        
-        # Calculate summary statistics
-        if data:
-            total_shipments = sum(row.get('total_shipments', 0) for row in data)
-            avg_growth = sum(row.get('growth_rate_yoy', 0) for row in data) / len(data) if data else 0
-            
-            summary = {
-                "query_parameters": {
-                    "product_category": product_category,
-                    "location": location or "All locations",
-                    "time_period": time_period,
-                    "metric": metric
-                },
-                "summary_statistics": {
-                    "total_records": len(data),
-                    "total_shipments": int(total_shipments),
-                    "average_growth_rate_yoy": round(avg_growth, 2)
-                },
-                "data": data[:limit]
-            }
-        else:
-            summary = {
-                "query_parameters": {
-                    "product_category": product_category,
-                    "location": location or "All locations",
-                    "time_period": time_period,
-                    "metric": metric
-                },
-                "summary_statistics": {
-                    "total_records": 0,
-                    "message": "No data found for the specified criteria"
-                },
-                "data": []
-            }
-        
-        return json.dumps(summary, indent=2, default=str)
+        results = query_job.result(max_results=limit)
         
+        response = build_trends_response(
+            query_job, results, query_parameters, limit, tool_context,
+            lookup_trend_features(product_category, location)
+        )
+        return json.dumps(response, indent=2, default=str)
+    
     except Exception as e:
         return json.dumps({
             "error": str(e),
@@ -4,30 +4,49 @@ import json
 from typing import List, Dict, Optional
 from urllib.parse import urlencode
 
+from google.adk.tools import ToolContext
+
 from fedex_market_intelligence.config import config
+from fedex_market_intelligence.shared_libraries.result_store import (
+    get_result,
+    missing_result_error,
+    rows_to_locations,
+)
 
 GOOGLE_MAPS_API_KEY = config.google_maps_api_key
 
 
 def generate_map_visualization(
-    locations: List[Dict[str, any]],
+    locations: Optional[List[Dict[str, any]]] = None,
     center_location: Optional[str] = None,
     map_type: str = "demand_heatmap",
-    zoom_level: int = 10
+    zoom_level: int = 10,
+    result_handle: Optional[str] = None,
+    tool_context: Optional[ToolContext] = None
 ) -> str:
     """
     Generate Google Maps visualization URLs and embed codes.
     
+    Prefer passing result_handle from a previous tool result over copying locations.
+    
     Args:
         locations: List of location dicts with 'lat', 'lng', 'label', and optional 'value' fields
         center_location: Center point for map (city name or lat/lng)
         map_type: Type of visualization - 'demand_heatmap', 'markers', 'comparison'
         zoom_level: Map zoom level (1-20)
+        result_handle: Handle returned by a query tool (e.g. 'res_1a2b3c4d'); its rows
+                       are plotted server-side instead of the locations argument
     
     Returns:
         JSON string with map URLs and embed code
     """
     
+    if result_handle:
+        stored = get_result(tool_context, result_handle)
+        if stored is None:
+            return missing_result_error(tool_context, result_handle)
+        locations = rows_to_locations(stored["rows"])
+    
     if not locations:
         return json.dumps({
             "error": "Please provide at least one location to visualize"
@@ -155,6 +174,7 @@ def generate_map_visualization(
     
     response = {
         "query_parameters": {
+            "result_handle": result_handle,
             "locations_count": len(locations),
             "map_type": map_type,
             "center": center,
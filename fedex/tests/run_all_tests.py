@@ -9,6 +9,7 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 from test_config import run_config_tests
 from test_tools import run_all_tests as run_tool_tests
 from test_agent import run_agent_tests
+from test_cold_start import run_cold_start_tests
 
 
 def main():
@@ -36,6 +37,11 @@ def main():
     print("-" * 70)
     results.append(("Agent", run_agent_tests()))
     
+    # Run cold start tests
+    print("\n\n⏱️  PHASE 4: Cold Start Tests")
+    print("-" * 70)
+    results.append(("Cold Start", run_cold_start_tests()))
+    
     # Final summary
     print("\n\n" + "=" * 70)
     print(" " * 25 + "FINAL SUMMARY")
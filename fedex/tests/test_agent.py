@@ -16,7 +16,7 @@ def test_agent_initialization():
     try:
         assert root_agent is not None, "Agent not initialized"
         assert root_agent.name == "fedex_market_intelligence_agent", "Wrong agent name"
-        assert len(root_agent.tools) == 7, f"Expected 7 tools, got {len(root_agent.tools)}"
+        assert len(root_agent.tools) == 14, f"Expected 14 tools, got {len(root_agent.tools)}"
         
         print("✓ Agent initialized successfully")
         print(f"  - Name: {root_agent.name}")
@@ -37,9 +37,9 @@ def test_agent_tools_loaded():
     try:
         assert hasattr(root_agent, 'tools'), "Agent has no tools attribute"
         tool_count = len(root_agent.tools)
-        assert tool_count == 7, f"Expected 7 tools, got {tool_count}"
+        assert tool_count == 14, f"Expected 14 tools, got {tool_count}"
         
-        print("✓ All 7 tools loaded successfully")
+        print("✓ All 14 tools loaded successfully")
         for i, tool in enumerate(root_agent.tools, 1):
             if hasattr(tool, 'name'):
                 print(f"  {i}. {tool.name}")
@@ -0,0 +1,115 @@
+"""Cold-start tests for the FedEx Market Intelligence Agent."""
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+# Budget for importing the agent in a fresh interpreter (google.adk itself included)
+COLD_START_BUDGET_SECONDS = float(os.getenv("COLD_START_BUDGET_SECONDS", "5.0"))
+
+# Must not be imported (or initialized) by importing the agent
+# (httpx is not listed: google.genai, which agent.py needs for its types, imports it)
+DEFERRED_MODULES = ["pandas", "numpy", "pyarrow", "scipy", "google.cloud.bigquery", "vertexai"]
+
+# Runs in a fresh interpreter: google.adk and google.genai.types are imported first
+# so only what the agent package itself adds is measured and checked
+COLD_START_PROBE = """
+import json, sys, time
+import google.adk.agents, google.adk.tools, google.genai.types
+from fedex_market_intelligence.shared_libraries.lazy import is_loaded
+before = {name for name in %(modules)r if is_loaded(name)}
+start = time.perf_counter()
+import fedex_market_intelligence.agent
+elapsed = time.perf_counter() - start
+after = {name for name in %(modules)r if is_loaded(name)}
+print(json.dumps({"seconds": elapsed, "eager": sorted(after - before)}))
+"""
+
+
+def run_probe():
+    """Import the agent in a fresh interpreter and return the probe's measurements."""
+    env = dict(os.environ, PYTHONPATH=str(PROJECT_ROOT), PREWARM_ON_START="false")
+    proc = subprocess.run(
+        [sys.executable, "-c", COLD_START_PROBE % {"modules": DEFERRED_MODULES}],
+        cwd=PROJECT_ROOT, env=env, capture_output=True, text=True, timeout=120
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr else "probe failed")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def test_cold_start_budget(probe):
+    """Test that importing the agent stays within the cold-start budget."""
+    print("Testing Cold Start Budget...")
+
+    try:
+        seconds = probe["seconds"]
+        assert seconds <= COLD_START_BUDGET_SECONDS, (
+            f"agent import took {seconds:.2f}s (budget {COLD_START_BUDGET_SECONDS:.2f}s) - "
+            "run deployment/profile_imports.py to see what got slower"
+        )
+        print(f"✓ Agent imported in {seconds:.2f}s (budget {COLD_START_BUDGET_SECONDS:.2f}s)")
+        return True
+
+    except Exception as e:
+        print(f"✗ Cold start budget: {str(e)}")
+        return False
+
+
+def test_heavy_modules_deferred(probe):
+    """Test that heavy modules and clients are not loaded at import time."""
+    print("\nTesting Deferred Imports...")
+
+    try:
+        eager = probe["eager"]
+        assert not eager, f"imported eagerly by the agent package: {', '.join(eager)}"
+        print(f"✓ Deferred until first use: {', '.join(DEFERRED_MODULES)}")
+        return True
+
+    except Exception as e:
+        print(f"✗ Deferred imports: {str(e)}")
+        return False
+
+
+def run_cold_start_tests():
+    """Run all cold-start tests."""
+    print("=" * 60)
+    print("FedEx Market Intelligence Agent - Cold Start Tests")
+    print("=" * 60)
+    print()
+
+    try:
+        probe = run_probe()
+    except Exception as e:
+        print(f"✗ Could not import the agent in a fresh interpreter: {str(e)}")
+        return 1
+
+    results = []
+
+    # Run tests
+    results.append(test_cold_start_budget(probe))
+    results.append(test_heavy_modules_deferred(probe))
+
+    # Summary
+    passed = sum(results)
+    total = len(results)
+
+    print("\n" + "=" * 60)
+    print("TEST SUMMARY")
+    print("=" * 60)
+    print(f"Passed: {passed}/{total}")
+    print(f"Failed: {total - passed}/{total}")
+
+    return 0 if all(results) else 1
+
+
+if __name__ == "__main__":
+    exit_code = run_cold_start_tests()
+    sys.exit(exit_code)
@@ -1,13 +1,20 @@
 """Test all tools in the FedEx Market Intelligence Agent."""
 
+import asyncio
 import json
 import sys
+import tempfile
+from contextlib import contextmanager
 from pathlib import Path
+from types import SimpleNamespace
+
+import pandas as pd
 
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from fedex_market_intelligence.tools import (
+    TOOLS,
     query_shipment_trends,
     analyze_geographic_demand,
     find_market_opportunities,
@@ -15,7 +22,80 @@ from fedex_market_intelligence.tools import (
     forecast_demand,
     get_demographics,
     generate_map_visualization,
+    fetch_result_page,
+)
+from fedex_market_intelligence.tools import async_tools
+from fedex_market_intelligence.shared_libraries.anomalies import AnomalyIndex, scan_anomalies
+from fedex_market_intelligence.shared_libraries.catchments import ZipPoints, catchment_membership
+from fedex_market_intelligence.shared_libraries.category_affinity import CategoryAffinity, compute_affinity
+from fedex_market_intelligence.shared_libraries.category_index import CategoryIndex
+from fedex_market_intelligence.shared_libraries.async_backends import AdmissionController, AdmissionRejected
+from fedex_market_intelligence.shared_libraries.coalescing import SingleFlight
+from fedex_market_intelligence.shared_libraries.concentration import ConcentrationCube
+from fedex_market_intelligence.shared_libraries.demand_tensor import DemandTensor
+from fedex_market_intelligence.shared_libraries.feature_store import FeatureStore
+from fedex_market_intelligence.shared_libraries.od_matrices import ODMatrices
+from fedex_market_intelligence.tools import demographics, geographic_analysis, site_selection
+from fedex_market_intelligence.tools.forecasting import (
+    forecast_results_from_features,
+    forecast_results_from_tensor,
+)
+from fedex_market_intelligence.tools.catchment_analysis import (
+    build_catchment_response,
+    catchment_monthly_from_results,
+    catchment_monthly_from_tensor,
 )
+from fedex_market_intelligence.tools.category_affinity import build_adjacency_response, resolve_market
+from fedex_market_intelligence.tools.lane_analysis import balance_records, lane_records
+from fedex_market_intelligence.tools.market_comparison import comparison_results_from_tensor, market_concentrations
+from fedex_market_intelligence.tools.scenarios import build_scenario_response
+from fedex_market_intelligence.tools.site_selection import build_site_selection_response
+from fedex_market_intelligence.shared_libraries.bigquery_results import FrameResult
+from data.build_concentration_cube import VOLUME_COLUMNS, build_concentration_cube
+from data.build_demand_features import compute_features
+from data.build_demand_tensor import build_tensor
+from data.build_od_matrices import build_od_matrices
+from evaluation.backtest_forecasts import run_backtest
+from evaluation.load_test_agent import DEFAULT_SCRIPTS, ScriptedLlm, load_scripts, tool_error
+from fedex_market_intelligence.shared_libraries.result_store import put_result
+from fedex_market_intelligence.shared_libraries.site_selection import haversine_miles
+
+# ZIP centroids of the small markets the tensor, lane and catchment tests build
+TEST_ZIPS = {
+    "85004": {"city": "Phoenix", "state": "AZ", "metro_area": "Phoenix Metro", "lat": 33.45, "lng": -112.07},
+    "85006": {"city": "Phoenix", "state": "AZ", "metro_area": "Phoenix Metro", "lat": 33.47, "lng": -112.05},
+    "85254": {"city": "Scottsdale", "state": "AZ", "metro_area": "Phoenix Metro", "lat": 33.6, "lng": -111.9},
+    "78701": {"city": "Austin", "state": "TX", "metro_area": "Austin Metro", "lat": 30.27, "lng": -97.74},
+}
+
+
+def make_geo(zip_codes=("85004", "85254", "78701")):
+    """geographic_metadata rows for TEST_ZIPS (two Phoenix Metro ZIPs and Austin by default)."""
+    return pd.DataFrame([{"zip_code": z, "region": "Southwest", **TEST_ZIPS[z]} for z in zip_codes])
+
+
+def make_share(demand, major_brand_volume=6, small_business_volume=4, market_concentration_index=60.0):
+    """market_share rows with the same volumes for every demand row."""
+    return demand[["zip_code", "year_month", "product_category"]].assign(
+        major_brand_volume=major_brand_volume,
+        small_business_volume=small_business_volume,
+        market_concentration_index=market_concentration_index,
+    )
+
+
+@contextmanager
+def make_demand_tensor(demand, geo=None, share=None, zcta=None):
+    """Build a DemandTensor in a temporary directory, usable only inside the with block."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "tensor"
+        share = make_share(demand) if share is None else share
+        build_tensor(demand, share, make_geo() if geo is None else geo, path, zcta)
+        tensor = DemandTensor(path)
+        try:
+            yield tensor
+        finally:
+            # Release the memory maps before the directory is removed
+            vars(tensor).clear()
 
 
 class TestResults:
@@ -257,6 +337,816 @@ def test_generate_map_visualization(results):
         results.add_fail(test_name, str(e))
 
 
+def test_result_handle_handoff(results):
+    """Test that a stored result handle can be mapped without copying rows."""
+    test_name = "result_handle_handoff"
+    
+    try:
+        # Minimal stand-in for ADK's ToolContext: only session state is used
+        tool_context = SimpleNamespace(state={})
+        rows = [
+            {"zip_code": "85254", "city": "Scottsdale", "lat": 33.6, "lng": -111.9, "total_shipments": 1240},
+            {"zip_code": "85004", "city": "Phoenix", "lat": 33.45, "lng": -112.07, "total_shipments": 980}
+        ]
+        handle = put_result(tool_context, "find_market_opportunities", rows)
+        
+        response = generate_map_visualization(result_handle=handle, tool_context=tool_context)
+        data = json.loads(response)
+        
+        assert data["query_parameters"]["locations_count"] == 2, "Handle rows not loaded"
+        assert data["locations_plotted"][0]["label"] == "85254", "Wrong label for ZIP row"
+        
+        missing = json.loads(generate_map_visualization(result_handle="res_missing", tool_context=tool_context))
+        assert "error" in missing, "Unknown handle should return an error"
+        
+        results.add_pass(test_name)
+            
+    except Exception as e:
+        results.add_fail(test_name, str(e))
+
+
+def test_fetch_result_page(results):
+    """Test that a paginated query can be continued from its cursor."""
+    test_name = "fetch_result_page"
+    
+    try:
+        tool_context = SimpleNamespace(state={})
+        first_page = json.loads(query_shipment_trends(
+            product_category="pet_supplies",
+            time_period="last_12_months",
+            limit=25,
+            tool_context=tool_context
+        ))
+        
+        pagination = first_page.get("pagination") or {}
+        if not pagination.get("has_more"):
+            results.add_pass(f"{test_name} (single page - nothing to fetch)")
+            return
+        
+        response = fetch_result_page(
+            cursor_id=pagination["cursor_id"],
+            page_number=2,
+            tool_context=tool_context
+        )
+        data = json.loads(response)
+        
+        assert "error" not in data, data.get("error")
+        assert data["pagination"]["page"] == 2, "Wrong page returned"
+        assert 0 < len(data["data"]) <= 25, "Page size not respected"
+        results.add_pass(test_name)
+            
+    except Exception as e:
+        results.add_fail(test_name, str(e))
+
+
+def test_async_tools(results):
+    """Test the async tool variants and the per-backend concurrency limit."""
+    test_name = "async_tools"
+    
+    try:
+        # Async and sync tools share the response builders, so the shape must match
+        response = asyncio.run(async_tools.get_demographics(
+            zip_codes=["10001", "10002"],
+            metrics=["population", "income"]
+        ))
+        data = json.loads(response)
+        assert [d["zip_code"] for d in data["demographics"]] == ["10001", "10002"], "Order not preserved"
+        
+        compare = json.loads(asyncio.run(async_tools.compare_markets("pet_supplies", ["Phoenix"])))
+        assert "error" in compare, "Single market should be rejected"
+        
+        # The agent registers either list, so they must name the same tools in the same order
+        assert [tool.__name__ for tool in async_tools.TOOLS] == [tool.__name__ for tool in TOOLS], "Tool lists differ"
+        assert asyncio.iscoroutinefunction(async_tools.TOOLS[TOOLS.index(get_demographics)]), "Sync tool in the async list"
+        
+        # No more than max_concurrency callers may hold a slot at once
+        limiter = AdmissionController("test", 2, max_queue=10, queue_timeout=5)
+        active = []
+        peak = []
+        
+        async def call():
+            async with limiter.admit():
+                active.append(1)
+                peak.append(len(active))
+                await asyncio.sleep(0.01)
+                active.pop()
+        
+        async def burst():
+            await asyncio.gather(*[call() for _ in range(6)])
+        
+        asyncio.run(burst())
+        assert max(peak) == 2, f"Limiter allowed {max(peak)} concurrent calls"
+        
+        results.add_pass(test_name)
+            
+    except Exception as e:
+        results.add_fail(test_name, str(e))
+
+
+def test_single_flight_and_admission(results):
+    """Test that identical concurrent calls share one execution and bursts are shed."""
+    test_name = "single_flight_and_admission"
+    
+    try:
+        flight = SingleFlight("test")
+        calls = []
+        
+        async def slow_query():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return {"rows": 42}
+        
+        async def burst():
+            return await asyncio.gather(*[flight.do("same-sql", slow_query) for _ in range(5)])
+        
+        shared = asyncio.run(burst())
+        assert len(calls) == 1, f"Expected one execution, got {len(calls)}"
+        assert all(r == {"rows": 42} for r in shared), "Result not fanned out to every caller"
+        assert flight.stats()["coalesced"] == 4 and flight.stats()["in_flight"] == 0
+        
+        # One slot, no queue: the second concurrent caller is rejected immediately
+        admission = AdmissionController("test", 1, max_queue=0, queue_timeout=5)
+        
+        async def hold():
+            async with admission.admit():
+                await asyncio.sleep(0.05)
+        
+        async def overload():
+            return await asyncio.gather(hold(), hold(), return_exceptions=True)
+        
+        outcomes = asyncio.run(overload())
+        assert sum(isinstance(o, AdmissionRejected) for o in outcomes) == 1, "Overflow not rejected"
+        
+        # A queued caller gives up once its deadline passes
+        admission = AdmissionController("test", 1, max_queue=5, queue_timeout=0.01)
+        outcomes = asyncio.run(overload())
+        assert sum(isinstance(o, AdmissionRejected) for o in outcomes) == 1, "Queue deadline not enforced"
+        
+        results.add_pass(test_name)
+            
+    except Exception as e:
+        results.add_fail(test_name, str(e))
+
+
+def test_demand_tensor(results):
+    """Test building, mapping and querying a small demand tensor."""
+    test_name = "demand_tensor"
+    
+    try:
+        demand = pd.DataFrame([
+            {"zip_code": z, "year_month": f"2025-{m:02d}", "product_category": "pet_supplies",
+             "total_shipments": shipments * m, "total_value": shipments * m * 10.0, "unique_shippers": 3,
+             "growth_rate_mom": 1.0, "growth_rate_yoy": 5.0}
+            for z, shipments in [("85004", 10), ("85254", 20), ("78701", 5)]
+            for m in range(1, 13)
+        ])
+        
+        with make_demand_tensor(demand) as tensor:
+            assert tensor.shape == (1, len(tensor.metrics), 12, 3), f"Unexpected shape {tensor.shape}"
+            assert tensor.level_mask("metro", "phoenix").sum() == 2, "Metro membership wrong"
+            
+            frame = comparison_results_from_tensor(tensor, "pet_supplies", ["Phoenix", "Austin"], "last_12_months").frame
+            assert frame["market_name"].tolist() == ["Phoenix", "Austin"], "Markets not ordered by volume"
+            assert frame["total_shipments"].tolist() == [30 * 78, 5 * 78], "Wrong market totals"
+            assert frame["months_with_data"].tolist() == [12, 12], "Wrong month count"
+            
+            rows = list(forecast_results_from_tensor(tensor, "pet_supplies", "Arizona", None))
+            assert len(rows) == 12, "Expected one seasonality row per month"
+            assert rows[0]["baseline_shipments"] == 30 * 6.5, "Wrong baseline"
+        
+        results.add_pass(test_name)
+            
+    except Exception as e:
+        results.add_fail(test_name, str(e))
+
+
+def test_demographic_join_disabled(results):
+    """Test that geographic queries do not reference the ZCTA table when it is not configured."""
+    test_name = "demographic_join_disabled"
+    
+    try:
+        original_table = geographic_analysis.config.zcta_demographics_table
+        geographic_analysis.config.zcta_demographics_table = ""
+        try:
+            for demographic_filter in [None, "high_income"]:
+                query = geographic_analysis.build_geographic_query("pet_supplies", "metro", "last_12_months", demographic_filter)
+                assert "zd." not in query and "area_demographics" not in query, (
+                    f"Query references the demographics table (filter {demographic_filter})"
+                )
+            assert "needs the ZCTA demographics table" in geographic_analysis.demographic_note("high_income"), (
+                "Filter without the table should be reported as unavailable"
+            )
+        finally:
+            geographic_analysis.config.zcta_demographics_table = original_table
+        
+        results.add_pass(test_name)
+            
+    except Exception as e:
+        results.add_fail(test_name, str(e))
+
+
+def test_demographic_join(results):
+    """Test demographic segment filters and local ZCTA demographics."""
+    test_name = "demographic_join"
+    
+    try:
+        original_table = geographic_analysis.config.zcta_demographics_table
+        geographic_analysis.config.zcta_demographics_table = "zcta_demographics"
+        try:
+            query = geographic_analysis.build_geographic_query("pet_supplies", "metro", "last_12_months", "High_Income")
+            assert "zd.segment_high_income" in query, "Segment flag not joined"
+            assert "area_demographics" in query, "Locations not enriched with demographics"
+            
+            query = geographic_analysis.build_geographic_query("pet_supplies", "metro", "last_12_months", "dog_owners")
+            assert "segment_" not in query, "Unknown segment should not filter"
+            assert "Unknown demographic filter" in geographic_analysis.demographic_note("dog_owners")
+        finally:
+            geographic_analysis.config.zcta_demographics_table = original_table
+        
+        demand = pd.DataFrame([
+            {"zip_code": z, "year_month": "2025-01", "product_category": "pet_supplies", "total_shipments": 10,
+             "total_value": 100.0, "unique_shippers": 3, "growth_rate_mom": 1.0, "growth_rate_yoy": 5.0}
+            for z in ["85004", "85254"]
+        ])
+        # 85004 has no ZCTA record
+        zcta = pd.DataFrame([
+            {"zip_code": "85254", "total_population": 45000, "median_household_income": 121000.0, "median_age": 41.5,
+             "segment_high_income": True, "segment_senior_heavy": False},
+        ])
+        
+        with make_demand_tensor(demand, make_geo(["85004", "85254"]), zcta=zcta) as tensor:
+            assert tensor.segments == ["high_income", "senior_heavy"], f"Unexpected segments {tensor.segments}"
+            assert tensor.segment_mask("high_income").tolist() == [False, True], "Wrong segment mask"
+            assert tensor.zip_demographics("85004") is None, "ZIP without ZCTA record should have no demographics"
+            
+            original = demographics.load_demand_tensor
+            demographics.load_demand_tensor = lambda t=tensor: t
+            try:
+                local = demographics.local_demographics(["85254", "85004", "10001"], ["population", "income"])
+            finally:
+                demographics.load_demand_tensor = original
+            assert list(local) == ["85254"], "Only ZIPs in the local table should be answered locally"
+            assert local["85254"]["total_population"] == 45000, "Wrong local population"
+            assert local["85254"]["median_household_income"] == 121000, "Wrong local income"
+        
+        results.add_pass(test_name)
+            
+    except Exception as e:
+        results.add_fail(test_name, str(e))
+
+
+def test_forecast_backtest(results):
+    """Test the vectorized rolling-origin backtest on series with known answers."""
+    test_name = "forecast_backtest"
+    
+    try:
+        # 36 months: books is flat (every model is exact), toys repeats the same year (seasonal naive is exact)
+        demand = pd.DataFrame([
+            {"zip_code": z, "year_month": f"{2023 + t // 12}-{t % 12 + 1:02d}", "product_category": category,
+             "total_shipments": shipments, "total_value": shipments * 10.0, "unique_shippers": 3,
+             "growth_rate_mom": 0.0, "growth_rate_yoy": 0.0}
+            for z in ["85004", "78701"]
+            for t in range(36)
+            for category, shipments in [("books", 100), ("toys", 50 + 10 * (t % 12))]
+        ])
+        
+        with make_demand_tensor(demand, make_geo(["85004", "78701"])) as tensor:
+            report = run_backtest(tensor, level="metro", horizon=6, min_history=24)
+        
+        assert report["series"] == 4, f"Expected 2 categories x 2 metros, got {report['series']}"
+        assert report["cutoffs"] == 12, f"Expected 12 cutoffs, got {report['cutoffs']}"
+        
+        books = report["models"]["forecast_demand"]["by_category"]["books"]
+        assert books["mape"] == 0 and books["coverage"] == 100, f"Flat series should be exact: {books}"
+        toys = report["models"]["seasonal_naive"]["by_category"]["toys"]
+        assert toys["smape"] == 0, f"Seasonal naive should be exact on a repeating year: {toys}"
+        assert report["models"]["naive"]["by_category"]["toys"]["smape"] > 0, "Naive should miss seasonality"
+        assert set(report["models"]["forecast_demand"]["by_horizon"]) == {"1", "2", "3", "4", "5", "6"}
+        
+        results.add_pass(test_name)
+            
+    except Exception as e:
+        results.add_fail(test_name, str(e))
+
+
+def test_feature_store(results):
+    """Test that precomputed features match what forecast_demand computes per call."""
+    test_name = "feature_store"
+    
+    try:
+        demand = pd.DataFrame([
+            {"zip_code": z, "year_month": f"{2024 + t // 12}-{t % 12 + 1:02d}", "product_category": "pet_supplies",
+             "total_shipments": shipments + 5 * t + (15 if t % 12 == 11 else 0), "total_value": 100.0,
+             "unique_shippers": 3, "growth_rate_mom": 1.0, "growth_rate_yoy": 5.0 + z_index}
+            for z_index, (z, shipments) in enumerate([("85004", 100), ("85254", 200), ("78701", 50)])
+            for t in range(24)
+        ])
+        
+        with make_demand_tensor(demand) as tensor:
+            features_path = tensor.path.parent / "features.parquet"
+            compute_features(tensor).to_parquet(features_path, index=False)
+            store = FeatureStore(features_path)
+            
+            computed = forecast_results_from_tensor(tensor, "pet_supplies", "Arizona", None).frame
+            stored = forecast_results_from_features(store.resolve("AZ", "pet_supplies")).frame
+            assert stored["month_num"].tolist() == computed["month_num"].tolist(), "Seasonal months differ"
+            for column in ["baseline_shipments", "avg_growth_rate", "stddev_shipments", "seasonality_factor"]:
+                difference = (stored[column] - computed[column]).abs().max()
+                assert difference < 1e-3 * computed[column].abs().max(), f"{column} differs by {difference}"
+            
+            phoenix = store.resolve("phoenix metro", "pet_supplies")
+            assert phoenix["level"] == "metro", "Metro label should resolve case-insensitively"
+            assert phoenix["trend_direction"] == "growing", f"Expected growing, got {phoenix['trend_direction']}"
+            assert phoenix["peak_month"] == 12, f"Expected a December peak, got {phoenix['peak_month']}"
+            assert store.resolve("85254", "pet_supplies")["level"] == "zip", "ZIP should resolve"
+            assert store.resolve(None, "pet_supplies")["level"] == "national", "No location should be national"
+            assert store.resolve("Phoenix", "pet_supplies") is None, "Partial names are computed, not looked up"
+        
+        results.add_pass(test_name)
+            
+    except Exception as e:
+        results.add_fail(test_name, str(e))
+
+
+def test_demand_anomalies(results):
+    """Test that the anomaly scan flags a spike and a collapse and the month index filters them."""
+    test_name = "demand_anomalies"
+    
+    try:
+        # 24 noisy-but-steady months; the last month spikes in 85004 and collapses in 78701
+        last = {"85004": 500, "78701": 10}
+        demand = pd.DataFrame([
+            {"zip_code": z, "year_month": f"{2024 + t // 12}-{t % 12 + 1:02d}", "product_category": "pet_supplies",
+             "total_shipments": last[z] if t == 23 and z in last else 100 + (t * 7) % 5, "total_value": 100.0,
+             "unique_shippers": 3, "growth_rate_mom": 0.0, "growth_rate_yoy": 0.0}
+            for z in ["85004", "85254", "78701"]
+            for t in range(24)
+        ])
+        
+        with make_demand_tensor(demand) as tensor:
+            anomalies = scan_anomalies(tensor)
+        
+        december = anomalies[anomalies["year_month"] == "2025-12"].set_index("zip_code")
+        assert set(december.index) == {"85004", "78701"}, f"Unexpected anomalies: {december.index.tolist()}"
+        assert december.loc["85004", "direction"] == "spike", "85004 should spike"
+        assert december.loc["78701", "direction"] == "collapse", "78701 should collapse"
+        assert 95 <= december.loc["85004", "expected_shipments"] <= 105, "Expected value should ignore the spike"
+        
+        index = AnomalyIndex(anomalies)
+        assert index.months[-1] == "2025-12", "Months not indexed"
+        assert index.months[0] == "2025-01", "Scanned months without anomalies should be indexed"
+        assert index.for_month("2025-06").empty, "A month without anomalies should be empty"
+        assert index.for_month("2025-12", "AZ")["zip_code"].tolist() == ["85004"], "State filter failed"
+        assert index.for_month("2025-12", "austin")["zip_code"].tolist() == ["78701"], "City filter failed"
+        assert len(index.for_month("2025-12", direction="spike")) == 1, "Direction filter failed"
+        assert index.for_month("2025-12", "85254").empty, "Steady ZIP should have no anomalies"
+        
+        results.add_pass(test_name)
+            
+    except Exception as e:
+        results.add_fail(test_name, str(e))
+
+
+def test_lane_matrices(results):
+    """Test building the sparse lane matrices and reading lanes and balance from them."""
+    test_name = "lane_matrices"
+    
+    try:
+        # Austin -> Phoenix doubles year over year; Phoenix -> Austin is flat; 85004 -> 85254 stays in Phoenix
+        flows = pd.DataFrame([
+            {"product_category": "pet_supplies", "year_month": f"{year}-{month:02d}",
+             "origin_zip_code": origin, "destination_zip_code": destination, "shipments": shipments}
+            for year, scale in [(2024, 1), (2025, 2)]
+            for month in range(1, 13)
+            for origin, destination, shipments in [("78701", "85004", 30 * scale), ("78701", "85254", 10 * scale),
+                                                  ("85004", "78701", 25), ("85004", "85254", 7)]
+        ])
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            build_od_matrices(flows, make_geo(), Path(tmp))
+            matrices = ODMatrices(Path(tmp))
+        
+        months = matrices.month_mask("q3_2025")
+        current = matrices.flow_matrix("metro", "pet_supplies", months)
+        prior = matrices.flow_matrix("metro", "pet_supplies", matrices.year_earlier(months))
+        phoenix = matrices.area_mask("metro", "phoenix")
+        assert matrices.area_mask("metro", "AZ").tolist() == phoenix.tolist(), "State code should match the metro"
+        
+        lanes, totals = lane_records(matrices, "metro", current, prior, phoenix, top_n=10)
+        assert [lane["lane"] for lane in lanes] == ["Austin Metro → Phoenix Metro", "Phoenix Metro → Austin Metro"], \
+            f"Unexpected lanes: {lanes}"
+        assert lanes[0]["shipments"] == 3 * 80 and lanes[0]["growth_pct"] == 100.0, f"Wrong inbound lane: {lanes[0]}"
+        assert lanes[1]["growth_pct"] == 0.0, "Flat lane should not grow"
+        assert totals["lane_shipments"] == 3 * 105, f"Wrong lane total: {totals}"
+        
+        balance = balance_records(matrices, "metro", current, prior, phoenix, top_n=10)
+        assert len(balance) == 1 and balance[0]["location"] == "Phoenix Metro", f"Unexpected balance: {balance}"
+        assert balance[0]["inbound_shipments"] == 240 and balance[0]["outbound_shipments"] == 75, "Wrong totals"
+        assert balance[0]["internal_shipments"] == 21, "Internal flows should stay off the lanes"
+        assert balance[0]["flow_balance"] == "net importer", "Phoenix should be a net importer"
+        
+        zip_flows = matrices.flow_matrix("zip", "pet_supplies", months)
+        zip_prior = matrices.flow_matrix("zip", "pet_supplies", matrices.year_earlier(months))
+        zip_lanes, _ = lane_records(matrices, "zip", zip_flows, zip_prior, matrices.area_mask("zip", "85254"), top_n=10)
+        assert [lane["origin"] for lane in zip_lanes] == ["78701", "85004"], f"Unexpected ZIP lanes: {zip_lanes}"
+        
+        results.add_pass(test_name)
+            
+    except Exception as e:
+        results.add_fail(test_name, str(e))
+
+
+def test_site_selection(results):
+    """Test the greedy-plus-swap site selection on two well-separated demand clusters."""
+    test_name = "site_selection"
+    
+    try:
+        # Four Phoenix ZIPs of 100 shipments and three Austin ZIPs of 50, a few miles apart within each city
+        demand = pd.DataFrame([
+            {"zip_code": f"850{i:02d}", "city": "Phoenix", "state": "AZ", "metro_area": "Phoenix Metro",
+             "lat": 33.45 + 0.02 * i, "lng": -112.07, "total_shipments": 100}
+            for i in range(4)
+        ] + [
+            {"zip_code": f"787{i:02d}", "city": "Austin", "state": "TX", "metro_area": "Austin Metro",
+             "lat": 30.27 + 0.02 * i, "lng": -97.74, "total_shipments": 50}
+            for i in range(3)
+        ])
+        
+        def solve(**kwargs):
+            arguments = dict(num_sites=2, objective="p_median", coverage_radius_miles=5.0, site_capacity=None)
+            arguments.update(kwargs)
+            return build_site_selection_response(
+                FrameResult(demand, len(demand)), "pet_supplies", "Southwest", arguments["num_sites"],
+                arguments["objective"], arguments["coverage_radius_miles"], arguments["site_capacity"],
+                "last_12_months", None
+            )
+        
+        response = solve()
+        sites = response["sites"]
+        assert [site["city"] for site in sites] == ["Phoenix", "Austin"], f"Expected one site per city: {sites}"
+        assert [site["zip_codes_served"] for site in sites] == [4, 3], "Each site should serve its own city"
+        assert sites[0]["zip_code"] in ("85001", "85002"), "Phoenix site should be central (the 1-median)"
+        assert response["summary"]["demand_within_radius_pct"] == 100.0, "Every ZIP is within 5 miles of a site"
+        
+        coverage = solve(objective="max_coverage")
+        assert coverage["summary"]["demand_within_radius_pct"] == 100.0, "Max coverage should cover both cities"
+        
+        capacitated = solve(site_capacity=250)
+        summary = capacitated["summary"]
+        assert all(site["assigned_shipments"] <= 250 for site in capacitated["sites"]), "Capacity exceeded"
+        assert 0 < summary["unserved_shipments"] <= 100, f"Unexpected unserved demand: {summary}"
+        assert sum(site["assigned_shipments"] for site in capacitated["sites"]) + summary["unserved_shipments"] == 550
+        
+        assert "error" in solve(num_sites=8), "More sites than candidate ZIPs should be rejected"
+        
+        # Capped to the 3 heaviest ZIPs (all in Phoenix); Austin is still served as demand
+        max_site_candidates = site_selection.config.max_site_candidates
+        site_selection.config.max_site_candidates = 3
+        try:
+            capped = solve()
+        finally:
+            site_selection.config.max_site_candidates = max_site_candidates
+        assert capped["summary"]["candidate_sites"] == 3, f"Candidates not capped: {capped['summary']}"
+        assert {site["zip_code"] for site in capped["sites"]} <= {"85000", "85001", "85002"}, "Site outside the candidates"
+        assert sum(site["zip_codes_served"] for site in capped["sites"]) == 7, "Every ZIP should still be served"
+        assert "the 3 with the most demand" in capped["methodology"]
+        
+        results.add_pass(test_name)
+            
+    except Exception as e:
+        results.add_fail(test_name, str(e))
+
+
+def test_catchments(results):
+    """Test catchment membership, rings and growth from the tensor and from query rows."""
+    test_name = "catchments"
+    
+    try:
+        # 85006 is ~2 miles from 85004 and ~12 from 85254; 85004 and 85254 are ~14 miles apart
+        # Every ZIP ships 50% more each month of 2025 than in the same month of 2024
+        demand = pd.DataFrame([
+            {"zip_code": z, "year_month": f"{year}-{m:02d}", "product_category": "pet_supplies",
+             "total_shipments": base * (1.5 if year == 2025 else 1), "total_value": base * 10.0,
+             "unique_shippers": 4, "growth_rate_mom": 0.0, "growth_rate_yoy": 50.0}
+            for z, base in [("85004", 10), ("85006", 20), ("85254", 30), ("78701", 5)]
+            for year in (2024, 2025)
+            for m in range(1, 13)
+        ])
+        share = make_share(demand)
+        candidates = ("85004", "85254")
+        
+        with make_demand_tensor(demand, make_geo(TEST_ZIPS), share) as tensor:
+            points = ZipPoints(tensor.zip_codes, tensor.zip_coords, tensor.zip_labels)
+            sites = [points.index[z] for z in candidates]
+            distance = haversine_miles(points.coords[:, 0], points.coords[:, 1], points.coords[sites, 0], points.coords[sites, 1])
+            
+            def analyze(radius_miles, assignment, monthly_source):
+                positions, membership = catchment_membership(distance, radius_miles, assignment)
+                monthly, month_serials = monthly_source(positions)
+                return build_catchment_response(
+                    points, candidates, distance, positions, membership, monthly, month_serials,
+                    "pet_supplies", radius_miles, assignment, None, "q3_2025", None
+                )
+            
+            from_tensor = lambda positions, t=tensor: catchment_monthly_from_tensor(t, "pet_supplies", positions)
+            response = analyze(5.0, "nearest", from_tensor)
+            downtown, scottsdale = response["catchments"]
+            assert downtown["zip_codes"] == 2 and scottsdale["zip_codes"] == 1, "Wrong catchment membership"
+            assert downtown["total_shipments"] == (10 + 20) * 1.5 * 3, "Wrong catchment shipments"
+            assert downtown["yoy_growth_pct"] == 50.0, f"Wrong growth: {downtown['yoy_growth_pct']}"
+            assert downtown["avg_market_concentration"] == 60.0, "Wrong market concentration"
+            assert downtown["major_brand_share_pct"] == 60.0, "Wrong major brand share"
+            assert [ring["total_shipments"] for ring in downtown["rings"]] == [45, 135, 135], "Wrong ring totals"
+            assert response["summary"]["zip_codes_in_catchments"] == 3, "Austin should be in no catchment"
+            
+            overlapping = analyze(15.0, "radius", from_tensor)
+            assert overlapping["summary"]["overlapping_zip_codes"] == 3, "All Phoenix ZIPs are within 15 miles of both"
+            assert analyze(15.0, "nearest", from_tensor)["summary"].get("overlapping_zip_codes") is None
+            
+            # The query path pivots monthly rows into the same [month, zip] arrays
+            rows = demand.merge(share, on=["zip_code", "year_month", "product_category"]).assign(demand_rows=1, share_rows=1)
+            from_rows = lambda positions: catchment_monthly_from_results(
+                FrameResult(rows[rows["zip_code"].isin(points.zip_codes[positions])], None),
+                points.zip_codes[positions].tolist()
+            )
+            queried = analyze(5.0, "nearest", from_rows)
+            assert queried["catchments"] == response["catchments"], "Query rows and tensor disagree"
+        
+        results.add_pass(test_name)
+            
+    except Exception as e:
+        results.add_fail(test_name, str(e))
+
+
+def test_category_affinity(results):
+    """Test co-demand correlation and lift between categories."""
+    test_name = "category_affinity"
+    
+    try:
+        import numpy as np
+        
+        rng = np.random.default_rng(7)
+        zip_codes = [f"850{i:02d}" for i in range(12)]
+        geo = pd.DataFrame([
+            {"zip_code": z, "city": "Phoenix", "state": "AZ", "metro_area": "Phoenix Metro", "region": "Southwest",
+             "lat": 33.45, "lng": -112.07}
+            for z in zip_codes
+        ])
+        months = [f"{year}-{m:02d}" for year in (2024, 2025) for m in range(1, 13)]
+        # Pet supplies and home decor share one ZIP x month shock and over-index in the first six ZIPs;
+        # electronics has its own shocks and over-indexes in the other six
+        shared = rng.lognormal(0, 0.4, (len(zip_codes), len(months)))
+        own = rng.lognormal(0, 0.4, (len(zip_codes), len(months)))
+        rows = []
+        for z, zip_code in enumerate(zip_codes):
+            for t, year_month in enumerate(months):
+                for category, level, shock in [("pet_supplies", 200 if z < 6 else 50, shared),
+                                               ("home_decor", 300 if z < 6 else 80, shared),
+                                               ("electronics", 100 if z < 6 else 400, own)]:
+                    rows.append({"zip_code": zip_code, "year_month": year_month, "product_category": category,
+                                 "total_shipments": round(level * shock[z, t]), "total_value": 0.0,
+                                 "unique_shippers": 1, "growth_rate_mom": 0.0, "growth_rate_yoy": 0.0})
+        demand = pd.DataFrame(rows)
+        share = make_share(demand, major_brand_volume=0, small_business_volume=0, market_concentration_index=50.0)
+        
+        with make_demand_tensor(demand, geo, share) as tensor:
+            affinity = compute_affinity(tensor)
+            affinity.save(tensor.path.parent / "affinity.npz")
+            affinity = CategoryAffinity.load(tensor.path.parent / "affinity.npz")
+        
+        assert len(affinity) == 4, f"Expected national, region, state and metro markets, got {len(affinity)}"
+        position, _ = resolve_market(affinity, "Phoenix")
+        assert affinity.keys[position] == "Phoenix Metro", "Metro not resolved by partial name"
+        assert resolve_market(affinity, "Arizona")[0] == affinity.find_market("state", "AZ"), "State name not resolved"
+        assert resolve_market(affinity, "Boston") == (None, None), "Unknown market should not resolve"
+        
+        response = build_adjacency_response(affinity, "pet_supplies", position, 5, "correlation", None)
+        decor, electronics = response["adjacent_categories"]
+        assert decor["product_category"] == "home_decor", f"Home decor should rank first: {response['adjacent_categories']}"
+        assert decor["correlation"] > 0.8 and decor["relationship"] == "strong", f"Weak shared-shock correlation: {decor}"
+        assert abs(electronics["correlation"]) < 0.3, f"Independent shocks should not correlate: {electronics}"
+        assert decor["lift"] == 2.0 and decor["both_over_index_zip_codes"] == 6, f"Wrong lift: {decor}"
+        assert electronics["lift"] is None, "Lift without supporting ZIPs should not be reported"
+        
+        results.add_pass(test_name)
+            
+    except Exception as e:
+        results.add_fail(test_name, str(e))
+
+
+def test_demand_scenarios(results):
+    """Test Monte Carlo scenario bands against the deterministic forecast."""
+    test_name = "demand_scenarios"
+    
+    try:
+        import numpy as np
+        
+        rng = np.random.default_rng(11)
+        months = [(year, m) for year in (2024, 2025) for m in range(1, 13)]
+        history = pd.DataFrame([
+            {"year_month": f"{year}-{m:02d}", "month_num": m, "year_num": year,
+             "total_shipments": 1000 * (1.1 if year == 2025 else 1.0) * (1 + 0.2 * np.sin(m / 2)) * rng.lognormal(0, 0.05),
+             "total_value": 0.0, "avg_growth_rate": 10 + rng.normal(0, 2), "zip_count": 50}
+            for year, m in months
+        ])
+        
+        def simulate(**shock):
+            return build_scenario_response(
+                FrameResult(history, len(history)), "pet_supplies", "Southwest", 6,
+                shock.get("growth", 0.0), shock.get("seasonality", 0.0), 2000, None, None
+            )
+        
+        base = simulate()
+        for month in base["monthly_bands"]:
+            assert month["p5"] <= month["p25"] <= month["p50"] <= month["p75"] <= month["p95"], f"Unordered bands: {month}"
+            assert month["p50"] == month["baseline_p50"], "Unshocked scenario should equal the baseline"
+            assert abs(month["p50"] / month["forecast_demand_shipments"] - 1) < 0.05, f"Median far from forecast: {month}"
+        assert base["summary"]["median_change_pct"] == 0, "Unshocked scenario should not change the median"
+        
+        halved = simulate(growth=-50)
+        assert halved["summary"]["horizon_total"]["p50"] < base["summary"]["horizon_total"]["p50"], "Halved growth should lower demand"
+        assert halved["summary"]["probability_below_baseline_median"] > 0.5, "Halved growth should mostly finish below the baseline"
+        assert halved["summary"]["scenario_growth_rate_yoy"] == round(base["summary"]["baseline_growth_rate_yoy"] / 2, 2), "Growth not halved"
+        
+        def swing(response):
+            medians = [m["p50"] for m in response["monthly_bands"]]
+            return max(medians) / min(medians)
+        
+        flat = simulate(seasonality=-100)
+        assert swing(flat) < min(swing(base), 1.1), "Removing seasonality should flatten the median path"
+        
+        empty = build_scenario_response(FrameResult(history.iloc[:0], 0), "pet_supplies", "Nowhere", 6, 0.0, 0.0, 2000, None, None)
+        assert "No historical data" in empty["error"], "Missing history should return an error"
+        
+        results.add_pass(test_name)
+            
+    except Exception as e:
+        results.add_fail(test_name, str(e))
+
+
+def test_category_index(results):
+    """Test resolving free-text category names to category IDs."""
+    test_name = "category_index"
+    
+    try:
+        taxonomy = {
+            "pet_supplies": ("Pet Supplies", ["dog_food", "cat_litter"]),
+            "consumer_electronics": ("Consumer Electronics", ["laptops", "headphones"]),
+            "home_fitness": ("Home Fitness Equipment", ["treadmills", "yoga_mats"]),
+            "home_decor": ("Home Decor", ["wall_art", "rugs"]),
+            "kitchen_appliances": ("Kitchen Appliances", ["blenders", "coffee_makers"]),
+            "coffee_products": ("Coffee Products", ["coffee_beans", "espresso"]),
+        }
+        index = CategoryIndex([
+            {"category_id": category_id, "category_name": name, "subcategory": subcategory,
+             "keywords": json.dumps([name.lower(), subcategory.replace("_", " ")])}
+            for category_id, (name, subcategories) in taxonomy.items()
+            for subcategory in subcategories
+        ])
+        
+        expected = {
+            "home_fitness": "home_fitness",
+            "Home Fitness": "home_fitness",
+            "home-fitness equipment": "home_fitness",
+            "dog food": "pet_supplies",
+            "puppy": "pet_supplies",
+            "electroncs": "consumer_electronics",
+            "laptop": "consumer_electronics",
+            "gym equipment": "home_fitness",
+            "coffee": "coffee_products",
+        }
+        for text, category_id in expected.items():
+            resolved, candidates = index.resolve(text)
+            assert resolved == category_id, f"'{text}' resolved to {resolved} (candidates {candidates})"
+        
+        resolved, candidates = index.resolve("home")
+        assert resolved is None and set(candidates) == {"home_fitness", "home_decor"}, "Ambiguous name should not resolve"
+        assert index.resolve("quantum widgets") == (None, []), "Unrelated text should not match"
+        
+        results.add_pass(test_name)
+            
+    except Exception as e:
+        results.add_fail(test_name, str(e))
+
+
+def test_concentration_cube(results):
+    """Test shipper HHI, top shippers and subcategory split from the concentration cube."""
+    test_name = "concentration_cube"
+    
+    try:
+        geo = pd.DataFrame([
+            {"zip_code": "85001", "city": "Phoenix", "state": "AZ", "metro_area": "Phoenix Metro", "region": "Southwest"},
+            {"zip_code": "85002", "city": "Phoenix", "state": "AZ", "metro_area": "Phoenix Metro", "region": "Southwest"},
+            {"zip_code": "85701", "city": "Tucson", "state": "AZ", "metro_area": "Tucson Metro", "region": "Southwest"},
+        ])
+        # 85001 has one shipper; 85002 splits 60/20 between two brands plus 20% from individuals
+        volume = pd.DataFrame([
+            ("pet_supplies", "2025-06", "85001", "food", "Brand_A", 100),
+            ("pet_supplies", "2025-06", "85002", "food", "Brand_A", 60),
+            ("pet_supplies", "2025-06", "85002", "toys", "Brand_B", 20),
+            ("pet_supplies", "2025-06", "85002", "food", "Individual", 20),
+            ("pet_supplies", "2025-06", "85701", "toys", "Brand_C", 50),
+            ("pet_supplies", "2025-06", "85701", "toys", "Brand_D", 50),
+            ("pet_supplies", "2024-06", "85001", "food", "Brand_A", 50),
+            ("pet_supplies", "2024-06", "85001", "food", "Brand_B", 50),
+        ], columns=VOLUME_COLUMNS)
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            build_concentration_cube(volume, geo, Path(tmp))
+            cube = ConcentrationCube(Path(tmp))
+        
+        zips = cube.zip_summaries(["85001", "85002", "99999"], "pet_supplies")
+        assert zips["85001"]["shipper_hhi"] == 10000, f"A single shipper should score 10000: {zips['85001']}"
+        assert zips["85002"]["shipper_hhi"] == 4000, f"Individuals should only dilute shares: {zips['85002']}"
+        assert zips["85002"]["top_shipper"] == "Brand_A" and zips["85002"]["top_shipper_share_pct"] == 60.0, "Wrong top shipper"
+        assert "99999" not in zips, "Unknown ZIP codes should be left out"
+        
+        position, _ = resolve_market(cube, "Phoenix")
+        phoenix = cube.market_summary(position, "pet_supplies")
+        assert phoenix["market_key"] == "Phoenix Metro", f"Metro not resolved: {phoenix['market_key']}"
+        assert phoenix["shipper_hhi"] == 6500 and phoenix["concentration_level"] == "highly concentrated", f"Wrong metro HHI: {phoenix}"
+        assert phoenix["shipper_count"] == 2, "Pooled shippers should not be counted"
+        assert [s["shipper"] for s in phoenix["top_shippers"]] == ["Brand_A", "Brand_B"], f"Wrong ranking: {phoenix['top_shippers']}"
+        food, toys = phoenix["subcategories"]
+        assert (food["subcategory"], food["shipments"], food["shipper_hhi"]) == ("food", 180, 7901), f"Wrong food split: {food}"
+        assert (toys["subcategory"], toys["shipments"], toys["shipper_hhi"]) == ("toys", 20, 10000), f"Wrong toys split: {toys}"
+        
+        national = cube.market_summary(cube.find_market("national", "ALL"), "pet_supplies")
+        assert national["shipper_hhi_year_earlier"] == 5000, f"Wrong prior-year HHI: {national}"
+        
+        # Ad-hoc periods and ZIP sets are summed from the cube and agree with the tables
+        compared = market_concentrations(cube, "pet_supplies", ["Phoenix", "Tucson", "Boston"], "q2_2025")
+        assert compared["Phoenix"]["shipper_hhi"] == 6500 and compared["Phoenix"]["subcategories"] == phoenix["subcategories"], "Ad-hoc sum disagrees"
+        assert compared["Tucson"]["shipper_hhi"] == 5000 and compared["Tucson"]["concentration_level"] == "highly concentrated", f"Wrong Tucson: {compared['Tucson']}"
+        assert "Boston" not in compared, "Unmatched markets should be left out"
+        assert market_concentrations(cube, "pet_supplies", ["Phoenix"], "q1_2025") == {}, "Months without volume should be left out"
+        
+        results.add_pass(test_name)
+            
+    except Exception as e:
+        results.add_fail(test_name, str(e))
+
+
+def test_scripted_load_model(results):
+    """Test that the load test's scripted model replays tool calls step by step."""
+    test_name = "scripted_load_model"
+    
+    try:
+        from google.adk.models.llm_request import LlmRequest
+        from google.genai import types
+        
+        from fedex_market_intelligence.agent import root_agent
+        
+        conversations = load_scripts(DEFAULT_SCRIPTS)
+        tool_names = {tool.name for tool in root_agent.tools}
+        scripted = {call["name"] for c in conversations for t in c["turns"] for step in t["tool_calls"] for call in step}
+        assert scripted <= tool_names, f"Scripts call unknown tools: {scripted - tool_names}"
+        
+        turn = {
+            "user": "Forecast Phoenix",
+            "tool_calls": [
+                [{"name": "forecast_demand", "args": {"product_category": "pet_supplies", "market": "Phoenix"}}],
+                [{"name": "compare_markets", "args": {"product_category": "pet_supplies", "markets": ["Phoenix", "Austin"]}},
+                 {"name": "select_sites", "args": {"product_category": "pet_supplies", "market": "Phoenix"}}],
+            ],
+            "reply": "Done"
+        }
+        model = ScriptedLlm(model="scripted", turns={turn["user"]: turn})
+        contents = [types.Content(role="user", parts=[types.Part(text="Forecast Phoenix")])]
+        
+        def respond():
+            async def first():
+                async for response in model.generate_content_async(LlmRequest(contents=list(contents))):
+                    return response.content
+            return asyncio.run(first())
+        
+        def answer(content):
+            contents.append(content)
+            contents.append(types.Content(role="user", parts=[
+                types.Part(function_response=types.FunctionResponse(name=part.function_call.name, response={"result": "{}"}))
+                for part in content.parts
+            ]))
+        
+        step = respond()
+        assert [p.function_call.name for p in step.parts] == ["forecast_demand"], "First step not replayed"
+        answer(step)
+        step = respond()
+        assert [p.function_call.name for p in step.parts] == ["compare_markets", "select_sites"], "Parallel calls not replayed"
+        answer(step)
+        assert respond().parts[0].text == "Done", "Reply not returned after the last step"
+        
+        contents[:] = [types.Content(role="user", parts=[types.Part(text="Unscripted question")])]
+        assert respond().parts[0].text.startswith("No script for"), "Unscripted turns should be reported"
+        
+        assert tool_error(json.dumps({"error": "No data"})) == "No data", "Tool error not detected"
+        assert tool_error({"result": json.dumps({"rows": []})}) is None, "Successful response flagged as error"
+        
+        results.add_pass(test_name)
+            
+    except Exception as e:
+        results.add_fail(test_name, str(e))
+
+
 def run_all_tests():
     """Run all tool tests."""
     print("=" * 60)
@@ -277,6 +1167,24 @@ def run_all_tests():
     test_forecast_demand(results)
     test_get_demographics(results)
     test_generate_map_visualization(results)
+    test_result_handle_handoff(results)
+    test_fetch_result_page(results)
+    test_async_tools(results)
+    test_single_flight_and_admission(results)
+    test_demand_tensor(results)
+    test_demographic_join(results)
+    test_demographic_join_disabled(results)
+    test_forecast_backtest(results)
+    test_feature_store(results)
+    test_demand_anomalies(results)
+    test_lane_matrices(results)
+    test_site_selection(results)
+    test_catchments(results)
+    test_category_affinity(results)
+    test_demand_scenarios(results)
+    test_category_index(results)
+    test_concentration_cube(results)
+    test_scripted_load_model(results)
     
     # Print summary
     success = results.print_summary()